@@ -23,6 +23,11 @@ import { MessageSquare } from 'lucide-react';
 import SmartAnalysisPanel from './SmartAnalysisPanel'; // [NEW] Smart Analysis Panel
 
 
+// Server-side result cache TTL (seconds) for the CARGA count and first page: dashboard
+// auto-refresh repeats the same queries. Only DML sent through /api/query invalidates it,
+// other changes show up once it expires.
+const CARGA_CACHE_TTL = 15;
+
 // DATA SOURCES CONFIGURATION
 const CARGA_OPTS = [
     { id: 'contrato_coletivo', title: 'Contrato Coletivo', icon: '👥', target: 'carga_input', tableName: 'incorpora.tb_ope_contrato_coletivo' },
@@ -3140,7 +3145,10 @@ From vw_empresa_conveniada_cad e
                 // but the dashboard modal will cover it.
                 setMenuState('carga_result');
                 setShowFilters(false);
-                // Reset pagination
+                // Reset pagination (and release the previous server cursor, if any)
+                if (paginationParams.sessionId) {
+                    fetch(`${apiUrl}/api/query/session/${paginationParams.sessionId}`, { method: 'DELETE' }).catch(() => { });
+                }
                 setPaginationParams({ offset: 0, hasMore: true });
             } else {
                 setIsLoadingMore(true);
@@ -3299,7 +3307,7 @@ From vw_empresa_conveniada_cad e
                     countPromise = fetch(`${apiUrl}/api/query`, {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ sql: countSql })
+                        body: JSON.stringify({ sql: countSql, cacheTtl: CARGA_CACHE_TTL })
                     })
                         .then(res => res.json())
                         .then(countData => {
@@ -3352,15 +3360,22 @@ From vw_empresa_conveniada_cad e
 
                 console.log('[CARGA] Fetching Data Params:', { limit: PAGE_SIZE, offset: currentOffset });
 
-                const fetchPromise = fetch(`${apiUrl}/api/query`, {
+                // Cursor mode: the first page opens a server-side cursor, "load more" reads the next chunk from it.
+                // If the session expired (410) or can't serve the offset (409), fall back to a plain offset query.
+                // The first page is cached briefly server-side; a cached hit has no sessionId and the
+                // following pages then use plain offset queries.
+                const cursorSessionId = isLoadMore ? paginationParams.sessionId : null;
+                const fetchPage = (body) => fetch(`${apiUrl}/api/query`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        sql: baseSql,
-                        limit: PAGE_SIZE,
-                        offset: currentOffset
-                    })
+                    body: JSON.stringify(body)
                 });
+                const fetchPromise = (cursorSessionId
+                    ? fetchPage({ sessionId: cursorSessionId, limit: PAGE_SIZE, offset: currentOffset })
+                    : fetchPage({ sql: baseSql, limit: PAGE_SIZE, offset: currentOffset, cursor: currentOffset === 0, cacheTtl: currentOffset === 0 ? CARGA_CACHE_TTL : undefined })
+                ).then(res => (res.status === 410 || res.status === 409)
+                    ? fetchPage({ sql: baseSql, limit: PAGE_SIZE, offset: currentOffset })
+                    : res);
 
                 const timeoutPromise = new Promise((_, reject) =>
                     setTimeout(() => reject(new Error("Timeout: A consulta demorou muito para responder (> 30s). Verifique sua conexão ou tente filtros mais específicos.")), 30000)
@@ -3390,12 +3405,13 @@ From vw_empresa_conveniada_cad e
                     }
                 } else {
                     const rowsReturned = data.rows ? data.rows.length : 0;
-                    const hasMore = rowsReturned === PAGE_SIZE;
+                    const hasMore = data.hasMore !== undefined ? data.hasMore : rowsReturned === PAGE_SIZE;
 
                     setPaginationParams(prev => ({
                         ...prev,
                         offset: isLoadMore ? (prev.offset + rowsReturned) : rowsReturned,
-                        hasMore: hasMore
+                        hasMore: hasMore,
+                        sessionId: data.sessionId || null
                     }));
 
                     if (isLoadMore) {
@@ -3568,49 +3584,33 @@ From vw_empresa_conveniada_cad e
                 baseSql += ` WHERE ${whereClauses.join(' AND ')}`;
             }
 
-            // 2. Wrap and Aggregate
-            let finalSql = '';
-            if (config.type === 'kpi') {
-                if (config.aggType === 'count') {
-                    finalSql = `SELECT COUNT(*) as VAL FROM (${baseSql})`;
-                } else {
-                    const aggFn = config.aggType === 'avg' ? 'AVG' : 'SUM';
-                    const col = config.yAxis || '1'; // Safety
-                    finalSql = `SELECT ${aggFn}(${col}) as VAL FROM (${baseSql})`;
-                }
-            } else {
-                // Charts (Bar, Pie, Line, Area)
-                const groupCol = config.xAxis;
-                const valueCol = config.yAxis; // Optional if count
-                const aggFn = config.aggType === 'avg' ? 'AVG' : (config.aggType === 'sum' ? 'SUM' : 'COUNT');
-
-                // Value Expression
-                let valExpr = 'COUNT(*)';
-                if (config.aggType === 'sum' || config.aggType === 'avg') {
-                    valExpr = `${aggFn}(${valueCol})`;
-                }
-
-                finalSql = `SELECT "${groupCol}" as NAME, ${valExpr} as VALUE FROM (${baseSql}) GROUP BY "${groupCol}" ORDER BY 2 DESC`;
-            }
+            // 2. Aggregate in the database: only the chart points come back (see /api/chart-data).
+            // Circular charts show the top 20 slices and fold the rest into "Outros" server-side.
+            const isCircular = ['pie', 'donut', 'treemap'].includes(config.type);
+            const spec = {
+                sql: baseSql,
+                dimension: config.type === 'kpi' ? null : config.xAxis,
+                measure: config.yAxis,
+                aggType: config.aggType || 'count',
+                topN: isCircular ? 20 : config.topN,
+                others: isCircular,
+                cacheTtl: 15
+            };
 
             // 3. Execute
             try {
-                const res = await fetch(`${apiUrl}/api/query`, {
+                const res = await fetch(`${apiUrl}/api/chart-data`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ sql: finalSql })
+                    body: JSON.stringify(spec)
                 });
                 const data = await res.json();
-                if (data.rows) {
-                    if (config.type === 'kpi') {
-                        // Single Value
-                        return { value: data.rows[0][0], label: config.title };
-                    } else {
-                        // List
-                        return data.rows.map(r => ({ name: r[0], value: r[1] }));
-                    }
+                if (data.error) return { error: data.error };
+                if (config.type === 'kpi') {
+                    // Single Value
+                    return { value: data.points[0] ? data.points[0].value : 0, label: config.title };
                 }
-                return [];
+                return data.points.map(p => p.others ? { name: null, value: p.value, isOthers: true } : { name: p.name, value: p.value });
             } catch (e) {
                 console.error("Aggregation Failed", e);
                 return [];
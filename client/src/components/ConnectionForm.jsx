@@ -83,7 +83,8 @@ function ConnectionForm({ onConnect, savedConnections = [], onSaveConnection, on
             user: conn.user,
             password: decryptPassword(conn.password),
             connectString: conn.isDefault ? decryptPassword(conn.connectString) : conn.connectString,
-            connectionName: conn.connectionName || ''
+            connectionName: conn.connectionName || '',
+            callTimeout: conn.callTimeout || ''
         });
         setStatus({ type: '', message: '' });
         setShowPassword(false); // Reset password visibility
@@ -340,6 +341,21 @@ function ConnectionForm({ onConnect, savedConnections = [], onSaveConnection, on
                                 />
                             </div>
 
+                            <div className="space-y-1">
+                                <label className="text-[10px] font-bold text-slate-500 uppercase tracking-wider ml-1">Tempo limite por consulta (s)</label>
+                                <input
+                                    type="number"
+                                    min="0"
+                                    name="callTimeout"
+                                    value={formData.callTimeout || ''}
+                                    onChange={handleChange}
+                                    disabled={isViewOnly}
+                                    className="w-full bg-slate-50 border border-slate-200 rounded-xl px-4 py-2.5 outline-none focus:bg-white focus:border-blue-500 focus:ring-4 focus:ring-blue-500/10 transition-all font-semibold text-slate-700 text-sm placeholder:text-slate-300"
+                                    placeholder="Sem limite"
+                                    title="Consultas que passarem deste tempo são interrompidas no banco"
+                                />
+                            </div>
+
                             {/* Status Message */}
                             <div className="min-h-[2.5rem] flex items-center justify-center">
                                 {status.message && (
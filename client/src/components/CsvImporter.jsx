@@ -660,6 +660,9 @@ function CsvImporter({ isVisible, connectionName }) {
                                                                 }}
                                                                 className="w-full text-xs border-none bg-transparent focus:ring-0 p-0 text-gray-500 cursor-pointer"
                                                             >
+                                                                {!['VARCHAR2(255)', 'NUMBER', 'DATE', 'CLOB'].includes(col.type) && (
+                                                                    <option value={col.type}>{col.type}</option>
+                                                                )}
                                                                 <option value="VARCHAR2(255)">VARCHAR2(255)</option>
                                                                 <option value="NUMBER">NUMBER</option>
                                                                 <option value="DATE">DATE</option>
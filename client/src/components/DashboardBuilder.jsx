@@ -36,6 +36,10 @@ import DataView from './DataView';
 import { FixedSizeList as List } from 'react-window';
 import { LayoutGrid, BarChart2, PieChart as PieIcon, TrendingUp, Hash, Layers, Table as TableIcon, ArrowLeft, ArrowRight, Trash2, Plus, Search as SearchIcon, Star, Clock, Save, GripVertical, Check } from 'lucide-react';
 const API_URL = 'http://localhost:3001'; // Standard Dev Port
+// Server-side result cache TTLs (seconds) sent as `cacheTtl` to /api/query: widgets and users
+// asking for the same drill-down share one execution; lookups and column lists change rarely
+const DRILL_CACHE_TTL = 15;
+const LOOKUP_CACHE_TTL = 300;
 
 // --- ENTERPRISE ANALYTICS PALETTE ---
 // --- ENTERPRISE ANALYTICS PALETTE (Lighter/Vibrant) ---
@@ -286,12 +290,15 @@ const ChartVisuals = ({ data, chart, showValues, onDrillDown }) => {
         const isCircular = chart.type === 'pie' || chart.type === 'donut' || chart.type === 'treemap';
 
         if (isCircular) {
+            // Server-aggregated data (/api/chart-data) already carries its "Outros" bucket
+            const folded = data.filter(item => item.isOthers);
+
             // Sort Descending
-            const sorted = [...data].sort((a, b) => (Number(b.value) || 0) - (Number(a.value) || 0));
+            const sorted = data.filter(item => !item.isOthers).sort((a, b) => (Number(b.value) || 0) - (Number(a.value) || 0));
 
             // 1. Grouping Logic (Top 20 + Others) - Increased from 5 to 20 to show more detail
             const grouped = [];
-            let othersSum = 0;
+            let othersSum = folded.reduce((acc, item) => acc + (Number(item.value) || 0), 0);
             const TOP_LIMIT = 20;
 
             sorted.forEach((item, index) => {
@@ -1121,13 +1128,14 @@ export default function DashboardBuilder({
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({
                             sql: finalSql,
-                            limit: 1000 // Keep limit for View
+                            limit: 1000, // Keep limit for View
+                            cacheTtl: DRILL_CACHE_TTL
                         })
                     }).then(r => r.json()),
                     fetch(`${API_URL}/api/query`, {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ sql: countSql }) // No limit for COUNT
+                        body: JSON.stringify({ sql: countSql, cacheTtl: DRILL_CACHE_TTL }) // No limit for COUNT
                     }).then(r => r.json())
                 ]);
 
@@ -1403,7 +1411,7 @@ export default function DashboardBuilder({
             const response = await fetch('http://localhost:3001/api/query', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ sql: query })
+                body: JSON.stringify({ sql: query, cacheTtl: LOOKUP_CACHE_TTL })
             });
             const data = await response.json();
             if (data.rows) {
@@ -1751,7 +1759,7 @@ export default function DashboardBuilder({
                     fetch('/api/query', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ sql: metaSql })
+                        body: JSON.stringify({ sql: metaSql, cacheTtl: LOOKUP_CACHE_TTL })
                     }).then(res => res.json()).then(data => {
                         if (data.metaData) {
                             const cols = data.metaData.map(c => ({ name: c.name, type: c.dbType?.name || 'VARCHAR2' }));
@@ -1803,7 +1811,7 @@ export default function DashboardBuilder({
                         fetch('http://localhost:3001/api/query', {
                             method: 'POST',
                             headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({ sql: metaSql })
+                            body: JSON.stringify({ sql: metaSql, cacheTtl: LOOKUP_CACHE_TTL })
                         }).then(res => res.json()).then(data => {
                             if (data.metaData) {
                                 const cols = data.metaData.map(c => ({ name: c.name, type: c.dbType?.name || 'VARCHAR2' }));
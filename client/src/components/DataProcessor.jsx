@@ -27,6 +27,7 @@ const DataProcessor = ({ isVisible, connection }) => {
     const [exportTableName, setExportTableName] = useState('');
     const [showExportModal, setShowExportModal] = useState(false);
     const [showDownloadMenu, setShowDownloadMenu] = useState(false);
+    const [exportProgress, setExportProgress] = useState(null); // % while rows are uploaded
 
     // --- Input Dialog State ---
     const [inputDialog, setInputDialog] = useState({
@@ -393,6 +394,44 @@ const DataProcessor = ({ isVisible, connection }) => {
         return json;
     };
 
+    const BULK_CHUNK_ROWS = 10000;
+
+    const bulkInsertRows = async (tableName, columns, rows) => {
+        const headers = {
+            'Content-Type': 'application/json',
+            'x-db-connection': JSON.stringify(connection)
+        };
+        const openRes = await fetch('http://127.0.0.1:3001/api/bulk-insert', {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({ tableName, columns })
+        });
+        const session = await openRes.json();
+        if (!openRes.ok) throw new Error(session.error || 'Falha ao iniciar carga.');
+
+        try {
+            for (let i = 0; i < rows.length; i += BULK_CHUNK_ROWS) {
+                const chunk = rows.slice(i, i + BULK_CHUNK_ROWS);
+                const res = await fetch(`http://127.0.0.1:3001/api/bulk-insert/${session.id}/rows`, {
+                    method: 'POST',
+                    headers: { ...headers, 'Content-Type': 'application/x-ndjson' },
+                    body: chunk.map(row => JSON.stringify(row)).join('\n')
+                });
+                const json = await res.json();
+                if (!res.ok) throw new Error(json.error || 'Falha ao enviar dados.');
+                setExportProgress(Math.round(((i + chunk.length) / rows.length) * 100));
+            }
+
+            const finishRes = await fetch(`http://127.0.0.1:3001/api/bulk-insert/${session.id}/finish`, { method: 'POST', headers });
+            const finished = await finishRes.json();
+            if (!finishRes.ok) throw new Error(finished.error || 'Falha ao concluir carga.');
+            return finished;
+        } catch (err) {
+            fetch(`http://127.0.0.1:3001/api/bulk-insert/${session.id}`, { method: 'DELETE' }).catch(() => { });
+            throw err;
+        }
+    };
+
     const startExport = async () => {
         if (!exportTableName) return alert("Digite o nome da tabela.");
         if (!connection) return alert("Sem conexão com banco de dados.");
@@ -403,11 +442,11 @@ const DataProcessor = ({ isVisible, connection }) => {
         try {
             // 1. Create Table
             const safeTableName = cleanupColName(exportTableName);
-            const colDefs = data.columns.map((col, i) => {
-                const safeCol = cleanupColName(col) || `COL_${i}`;
-                const type = inferType(i, data.rows);
-                return `${safeCol} ${type}`;
-            }).join(', ');
+            const tableColumns = data.columns.map((col, i) => ({
+                name: cleanupColName(col) || `COL_${i}`,
+                type: inferType(i, data.rows)
+            }));
+            const colDefs = tableColumns.map(c => `${c.name} ${c.type}`).join(', ');
 
             const createSql = `CREATE TABLE ${safeTableName} (${colDefs})`;
             console.log("Creating:", createSql);
@@ -425,27 +464,12 @@ const DataProcessor = ({ isVisible, connection }) => {
                 }
             }
 
-            // 2. Insert Data (Batch)
-            const BATCH_SIZE = 50;
-            const cols = data.columns.map((c, i) => cleanupColName(c) || `COL_${i}`).join(', ');
-
-            for (let i = 0; i < data.rows.length; i += BATCH_SIZE) {
-                const chunk = data.rows.slice(i, i + BATCH_SIZE);
-
-                // Construct INSERT ALL
-                let insertBlock = "INSERT ALL\n";
-                chunk.forEach(row => {
-                    const values = row.map(val => {
-                        if (val === null || val === undefined) return 'NULL';
-                        const str = String(val).replace(/'/g, "''"); // Escape quotes
-                        return `'${str}'`; // Treat everything as string literals for safety, Oracle casts if needed.
-                        // Ideally we'd match types but '123' works for NUMBER.
-                    }).join(', ');
-                    insertBlock += `  INTO ${safeTableName} (${cols}) VALUES (${values})\n`;
-                });
-                insertBlock += "SELECT * FROM dual";
-
-                await executeSql(insertBlock);
+            // 2. Insert Data: one server-side session, rows posted as NDJSON chunks and
+            // loaded with a prepared, typed executeMany (same types as the CREATE TABLE)
+            const result = await bulkInsertRows(safeTableName, tableColumns, data.rows);
+            if (result.failed > 0) {
+                alert(`Tabela ${safeTableName}: ${result.inserted} registros inseridos, ${result.failed} rejeitados.`);
+                return;
             }
 
             alert(`Sucesso! Tabela ${safeTableName} criada com ${data.rows.length} registros.`);
@@ -455,6 +479,7 @@ const DataProcessor = ({ isVisible, connection }) => {
             alert("Erro na exportação: " + err.message);
         } finally {
             setLoading(false);
+            setExportProgress(null);
         }
     };
 
@@ -728,7 +753,9 @@ const DataProcessor = ({ isVisible, connection }) => {
                             {loading && (
                                 <div className="absolute inset-0 bg-white/80 z-50 flex items-center justify-center flex-col">
                                     <div className="w-10 h-10 border-4 border-emerald-500 border-t-transparent rounded-full animate-spin mb-4"></div>
-                                    <span className="text-slate-600 font-bold">Processando arquivo...</span>
+                                    <span className="text-slate-600 font-bold">
+                                        {exportProgress !== null ? `Exportando para o banco... ${exportProgress}%` : 'Processando arquivo...'}
+                                    </span>
                                 </div>
                             )}
 
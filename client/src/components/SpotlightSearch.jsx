@@ -40,17 +40,29 @@ const SpotlightSearch = ({ pagesMap, onNavigate, theme }) => {
             return;
         }
 
-        const q = query.toLowerCase();
-        // Perform Local Search
-        const matches = searchIndex.filter(item => {
-            const titleMatch = item.NM_TITLE && item.NM_TITLE.toLowerCase().includes(q);
-            const contentMatch = item.SNIPPET && item.SNIPPET.toLowerCase().includes(q);
-            return titleMatch || contentMatch;
-        }).slice(0, 50); // Limit to 50 results
-
-        setResults(matches);
-        setSelectedIndex(0);
+        // Ranked search on the server's inverted index (debounced)
+        clearTimeout(debounceRef.current);
+        let cancelled = false;
+        debounceRef.current = setTimeout(() => {
+            fetch(`http://localhost:3001/api/docs/search-index?q=${encodeURIComponent(query)}`)
+                .then(res => res.json())
+                .then(data => {
+                    if (cancelled) return;
+                    setResults(Array.isArray(data) ? data : []);
+                    setSelectedIndex(0);
+                })
+                .catch(e => {
+                    if (cancelled) return;
+                    console.error("Search failed, filtering titles locally", e);
+                    const q = query.toLowerCase();
+                    setResults(searchIndex.filter(item => item.NM_TITLE && item.NM_TITLE.toLowerCase().includes(q)).slice(0, 50));
+                });
+        }, 150);
 
+        return () => {
+            cancelled = true;
+            clearTimeout(debounceRef.current);
+        };
     }, [query, searchIndex]);
 
     useEffect(() => {
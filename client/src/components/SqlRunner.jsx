@@ -1,5 +1,5 @@
 import { format } from 'sql-formatter';
-import React, { useState, useEffect, useContext, useRef } from 'react';
+import React, { useState, useEffect, useContext, useRef, useMemo } from 'react';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 import * as XLSX from 'xlsx';
@@ -13,7 +13,7 @@ import { autocompletion } from '@codemirror/autocomplete';
 import { keymap, EditorView } from '@codemirror/view';
 import { defaultKeymap, historyKeymap } from '@codemirror/commands';
 import { PanelGroup, Panel, PanelResizeHandle } from 'react-resizable-panels';
-import { PanelRightClose, PanelRightOpen, Share2, Play, Square, Download, FolderOpen, Save, Trash2, Plus, X, Search, Database, MessageSquare, Zap, LogOut, Home, Maximize2, Minimize2, Eye, Activity } from 'lucide-react';
+import { PanelRightClose, PanelRightOpen, Share2, Play, Square, Download, FolderOpen, Save, Trash2, Plus, X, Search, Database, MessageSquare, Zap, LogOut, Home, Maximize2, Minimize2, Eye, Activity, FileSpreadsheet } from 'lucide-react';
 import AutoSizer from 'react-virtualized-auto-sizer';
 import { FixedSizeList as VirtualList } from 'react-window';
 import ErrorBoundary from './ErrorBoundary';
@@ -26,7 +26,9 @@ import VariableInputModal from './VariableInputModal';
 // --- V3.0 Editor Theme ---
 import { createTheme } from '@uiw/codemirror-themes';
 import { tags as t } from '@lezer/highlight';
-import { PLSQL_AUTOCOMPLETE_DATABASE } from '../utils/plsql_data';
+import { loadPlsqlCatalog, SchemaIndex, createSqlCompleter } from '../utils/sqlCompletion';
+import { readResultStream } from '../utils/resultStream';
+import ResultIndexClient from '../utils/resultIndexClient';
 
 const themeDefs = {
     light: {
@@ -291,8 +293,8 @@ const createDynamicTheme = (themeDef) => {
 
 // --- Standalone Row Component (V3.0 Style) ---
 const SqlRunnerRow = ({ index, style, data }) => {
-    const { rows, columnOrder, visibleColumns, columnWidths } = data;
-    const row = rows[index];
+    const { rows, view, columnOrder, visibleColumns, columnWidths, columnIndex } = data;
+    const row = rows[view ? view[index] : index];
 
     // Strict Guard
     if (!row) return <div style={style} />;
@@ -329,7 +331,7 @@ const SqlRunnerRow = ({ index, style, data }) => {
         >
             {columnOrder.map(colName => {
                 if (!visibleColumns[colName]) return null;
-                const originalIdx = data.metaData ? data.metaData.findIndex(m => m.name === colName) : -1;
+                const originalIdx = columnIndex[colName] ?? -1;
                 const width = (columnWidths && columnWidths[colName]) || 150;
                 const val = row[originalIdx];
                 const displayVal = formatCellValue(val);
@@ -353,6 +355,10 @@ const SqlRunnerRow = ({ index, style, data }) => {
 
 // ... SqlRunnerRow component (unchanged)
 
+// Results of at least this many rows (or "Todas") come from /api/query/stream
+const STREAM_MIN_ROWS = 1000;
+const STREAM_PUBLISH_MS = 300;
+
 const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, savedQueries, setSavedQueries, onDisconnect, connection: globalConnection, savedConnections, onSaveConnection, onDeleteConnection }) => {
     const { theme } = useContext(ThemeContext);
     const { apiUrl } = useApi();
@@ -469,32 +475,49 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
         return { ...schemaData };
     }, [schemaData]);
 
-    const customPlSqlCompleter = (context) => {
-        let word = context.matchBefore(/[\w\.$]*/)
-        if (!word || (word.from === word.to && !context.explicit)) return null;
-
-        const suggestions = [];
+    // Completion: the PL/SQL catalog trie is loaded after first paint; the schema dictionary
+    // (compact; the browser revalidates it through the server ETag) is fetched per connection and merged with sidebar tables.
+    const catalogRef = useRef(null);
+    const schemaIndexRef = useRef(null);
+    const [schemaDictionary, setSchemaDictionary] = useState(null);
 
-        if (PLSQL_AUTOCOMPLETE_DATABASE) {
-            // Keywords
-            if (PLSQL_AUTOCOMPLETE_DATABASE.keywords) {
-                suggestions.push(...PLSQL_AUTOCOMPLETE_DATABASE.keywords.map(kw => ({ label: kw, type: "keyword", boost: -1 })));
-            }
-            // System Vars
-            if (PLSQL_AUTOCOMPLETE_DATABASE.system_vars) {
-                suggestions.push(...PLSQL_AUTOCOMPLETE_DATABASE.system_vars.map(v => ({ label: v, type: "variable" })));
-            }
-            // Functions
-            if (PLSQL_AUTOCOMPLETE_DATABASE.functions) {
-                suggestions.push(...PLSQL_AUTOCOMPLETE_DATABASE.functions.map(f => ({ label: f, type: "function" })));
-            }
+    useEffect(() => {
+        const load = () => loadPlsqlCatalog()
+            .then(trie => { catalogRef.current = trie; })
+            .catch(err => console.error("Failed to load PL/SQL catalog", err));
+        if (window.requestIdleCallback) {
+            const handle = window.requestIdleCallback(load, { timeout: 2000 });
+            return () => window.cancelIdleCallback(handle);
         }
+        const timer = setTimeout(load, 200);
+        return () => clearTimeout(timer);
+    }, []);
 
-        return {
-            from: word.from,
-            options: suggestions
-        };
-    };
+    const completionConnection = activeTab.connection || globalConnection;
+    useEffect(() => {
+        if (!completionConnection) return;
+        let active = true;
+        const headers = { 'x-db-connection': JSON.stringify(completionConnection) };
+        fetch(`${apiUrl}/api/schema/dictionary?format=compact`, { headers })
+            .then(res => (res.ok ? res.json() : null))
+            .then(data => {
+                if (active && data) setSchemaDictionary(data);
+            })
+            .catch(err => console.error("Failed to fetch schema dictionary", err));
+        return () => { active = false; };
+    }, [apiUrl, JSON.stringify(completionConnection)]);
+
+    const schemaIndex = useMemo(() => new SchemaIndex(schemaDictionary, schemaData), [schemaDictionary, schemaData]);
+    schemaIndexRef.current = schemaIndex;
+
+    // Stable source: reads the refs, so the editor extension is not rebuilt on every render
+    const sqlCompleter = useMemo(() => createSqlCompleter({
+        getCatalog: () => {
+            if (!catalogRef.current) loadPlsqlCatalog().then(trie => { catalogRef.current = trie; }).catch(() => { });
+            return catalogRef.current;
+        },
+        getSchema: () => schemaIndexRef.current
+    }), []);
 
     // Column Management State
     const [visibleColumns, setVisibleColumns] = useState({});
@@ -502,6 +525,9 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
     const [columnFilters, setColumnFilters] = useState({});
     const [showFilters, setShowFilters] = useState(false);
     const [serverSideFilter, setServerSideFilter] = useState(false);
+    const [sortConfig, setSortConfig] = useState(null); // { column, direction: 'asc' | 'desc' }
+    const [rowView, setRowView] = useState(null); // { meta, indices } computed by the result index worker
+    const resultIndexRef = useRef(null);
     const [draggingCol, setDraggingCol] = useState(null);
 
     // --- Auto Column Width Calculation ---
@@ -565,7 +591,7 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
             const autoWidths = calculateColumnWidths(activeTab.results);
             setColumnWidths(autoWidths);
         }
-    }, [activeTab.results]);
+    }, [activeTab.results?.metaData]); // streamed results grow rows under the same metaData
 
     // Helper: Get Connection Headers
     const getConnectionHeaders = () => {
@@ -665,10 +691,18 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
 
 
     const abortControllerRef = useRef(null);
+    const executionIdRef = useRef(null);
     const handleCancelQuery = () => {
         if (abortControllerRef.current) {
             abortControllerRef.current.abort();
             abortControllerRef.current = null;
+            // Aborting closes the request (the server then breaks the statement); cancel explicitly as well
+            const executionId = executionIdRef.current;
+            if (executionId) {
+                [executionId, `${executionId}-count`].forEach(id => {
+                    fetch(`http://127.0.0.1:3001/api/executions/${encodeURIComponent(id)}/cancel`, { method: 'POST' }).catch(() => { });
+                });
+            }
             updateActiveTab({ loading: false, error: "Execução cancelada pelo usuário." });
             showToast("Execução cancelada.", "info");
         }
@@ -717,6 +751,8 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
         if (abortControllerRef.current) abortControllerRef.current.abort();
         abortControllerRef.current = new AbortController();
         const signal = abortControllerRef.current.signal;
+        const executionId = crypto.randomUUID();
+        executionIdRef.current = executionId;
 
         try {
             let rawSql = getSmartSql();
@@ -763,46 +799,97 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
             }
             // -----------------------------------
 
+            // What actually ran (statement under the cursor, variables substituted): server-side exports re-run it
+            updateActiveTab({ executedSql: cleanSql });
+
             const conn = activeTab.connection || globalConnection;
 
-            const res = await fetch('http://127.0.0.1:3001/api/query', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    ...getConnectionHeaders()
-                },
-                body: JSON.stringify({
-                    sql: cleanSql,
-                    limit: limit,
-                    filter: serverSideFilter ? columnFilters : null,
-                    // Redundant via body, but reliable
-                    connection: conn
-                }),
-                signal
-            });
-            const data = await res.json();
-            if (data.error) throw new Error(data.error);
+            // Large results are streamed (columnar frames): the grid fills in while rows arrive
+            if (limit === 'all' || Number(limit) >= STREAM_MIN_ROWS) {
+                const res = await fetch('http://127.0.0.1:3001/api/query/stream', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        ...getConnectionHeaders()
+                    },
+                    body: JSON.stringify({
+                        sql: cleanSql,
+                        limit: limit,
+                        filter: serverSideFilter ? columnFilters : null,
+                        format: 'columnar',
+                        executionId,
+                        connection: conn
+                    }),
+                    signal
+                });
 
-            const normalizedData = {
-                ...data,
-                rows: Array.isArray(data.rows) ? data.rows : [],
-                metaData: Array.isArray(data.metaData) ? data.metaData : []
-            };
+                const rows = [];
+                let metaData = null;
+                let lastPublish = 0;
+                const publish = (streaming) => {
+                    lastPublish = Date.now();
+                    updateActiveTab({ results: { metaData, rows: rows.slice(), streaming }, loading: false });
+                };
+                const summary = await readResultStream(res, {
+                    onMeta: (meta) => { metaData = meta; },
+                    onRows: (chunk) => {
+                        for (let i = 0; i < chunk.length; i++) rows.push(chunk[i]);
+                        if (Date.now() - lastPublish >= STREAM_PUBLISH_MS) publish(true);
+                    }
+                });
 
-            if (data.rowsAffected !== undefined) {
-                showToast(`Sucesso. Linhas afetadas: ${data.rowsAffected}`);
-            } else if (!data.rows && !data.metaData) {
-                showToast("Comando executado com sucesso.");
-            }
+                if (summary.rowsAffected !== undefined) {
+                    showToast(`Sucesso. Linhas afetadas: ${summary.rowsAffected}`);
+                    updateActiveTab({ results: { metaData: [], rows: [], rowsAffected: summary.rowsAffected }, loading: false });
+                    return;
+                }
+                publish(false);
+                // The stream read everything: the total is known without a COUNT(*)
+                if (!summary.truncated) {
+                    updateActiveTab({ totalRecords: summary.rowCount });
+                    return;
+                }
+            } else {
+                const res = await fetch('http://127.0.0.1:3001/api/query', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        ...getConnectionHeaders()
+                    },
+                    body: JSON.stringify({
+                        sql: cleanSql,
+                        limit: limit,
+                        filter: serverSideFilter ? columnFilters : null,
+                        executionId,
+                        // Redundant via body, but reliable
+                        connection: conn
+                    }),
+                    signal
+                });
+                const data = await res.json();
+                if (data.error) throw new Error(data.error);
+
+                const normalizedData = {
+                    ...data,
+                    rows: Array.isArray(data.rows) ? data.rows : [],
+                    metaData: Array.isArray(data.metaData) ? data.metaData : []
+                };
+
+                if (data.rowsAffected !== undefined) {
+                    showToast(`Sucesso. Linhas afetadas: ${data.rowsAffected}`);
+                } else if (!data.rows && !data.metaData) {
+                    showToast("Comando executado com sucesso.");
+                }
 
-            updateActiveTab({ results: normalizedData, loading: false });
+                updateActiveTab({ results: normalizedData, loading: false });
+            }
 
             // Fetch Total Count
             try {
                 const countRes = await fetch('http://127.0.0.1:3001/api/query/count', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json', ...getConnectionHeaders() },
-                    body: JSON.stringify({ sql: cleanSql, connection: conn }),
+                    body: JSON.stringify({ sql: cleanSql, executionId: `${executionId}-count`, connection: conn }),
                     signal
                 });
                 const countData = await countRes.json();
@@ -814,7 +901,10 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
         } catch (err) {
             if (err.name !== 'AbortError') updateActiveTab({ error: err.message, loading: false });
         } finally {
-            abortControllerRef.current = null;
+            if (executionIdRef.current === executionId) {
+                abortControllerRef.current = null;
+                executionIdRef.current = null;
+            }
         }
     };
 
@@ -895,32 +985,57 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
     // The previous code had `getFilteredRows`, `performNativeSave` etc.
     // I will execute a larger replacement to be safe.
 
-    const getFilteredRows = () => {
-        if (!activeTab.results) return [];
-        const filters = columnFilters || {};
-        let hasFilters = false;
-        for (const key in filters) {
-            if (Object.prototype.hasOwnProperty.call(filters, key) && filters[key] && String(filters[key]).trim() !== '') {
-                hasFilters = true;
-                break;
-            }
-        }
-        if (!hasFilters || serverSideFilter) return activeTab.results.rows || [];
-
-        return (activeTab.results.rows || []).filter(row => {
-            return columnOrder.every((colName, idx) => {
-                const filterVal = filters[colName];
-                if (!filterVal) return true;
-                if (!activeTab.results.metaData) return true;
-                const originalIdx = activeTab.results.metaData.findIndex(m => m.name === colName);
-                if (originalIdx === -1) return true;
-                const cellValue = String(row[originalIdx] || '').toLowerCase();
-                return cellValue.includes(String(filterVal).toLowerCase());
+    // Client-side filter/sort runs in a worker over a copy of the result; the grid only gets the
+    // matching row indices back. Without filters or sort the rows are shown as they came.
+    const resultMeta = activeTab.results?.metaData;
+    const allRows = activeTab.results?.rows || [];
+
+    useEffect(() => {
+        if (!resultMeta) return;
+        const filters = {};
+        if (!serverSideFilter) {
+            resultMeta.forEach((m, idx) => {
+                const value = columnFilters[m.name];
+                if (value && String(value).trim() !== '') filters[idx] = value;
             });
+        }
+        const sortIdx = sortConfig ? resultMeta.findIndex(m => m.name === sortConfig.column) : -1;
+        const sort = sortIdx !== -1 ? { column: sortIdx, direction: sortConfig.direction } : null;
+        if (Object.keys(filters).length === 0 && !sort) {
+            setRowView(null);
+            return;
+        }
+
+        if (!resultIndexRef.current) resultIndexRef.current = new ResultIndexClient();
+        const index = resultIndexRef.current;
+        let active = true;
+        index.sync(resultMeta, allRows);
+        index.query(filters, sort).then(indices => {
+            if (active && indices) setRowView({ meta: resultMeta, indices });
         });
-    };
+        return () => { active = false; };
+    }, [resultMeta, allRows, columnFilters, serverSideFilter, sortConfig]);
 
-    const filteredRows = getFilteredRows();
+    useEffect(() => () => {
+        if (resultIndexRef.current) resultIndexRef.current.terminate();
+    }, []);
+
+    const activeView = rowView && rowView.meta === resultMeta ? rowView.indices : null;
+    const visibleRowCount = activeView ? activeView.length : allRows.length;
+
+    const columnIndex = useMemo(() => {
+        const map = {};
+        (resultMeta || []).forEach((m, idx) => { map[m.name] = idx; });
+        return map;
+    }, [resultMeta]);
+
+    const toggleSort = (colName) => {
+        setSortConfig(prev => {
+            if (!prev || prev.column !== colName) return { column: colName, direction: 'asc' };
+            if (prev.direction === 'asc') return { column: colName, direction: 'desc' };
+            return null;
+        });
+    };
 
     // ... (rest of export logic)
     // Helper for consistency
@@ -977,6 +1092,60 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
         }
     };
 
+    // Excel is generated on the server straight from the query stream; the renderer only polls
+    // progress and gets a file path (Electron) or a download URL back. It re-runs the SQL the grid
+    // came from, so it is only used when the grid shows that result as is (no client-side filter/sort).
+    const exportXlsxFromServer = async (cleanSql) => {
+        showToast("Gerando Excel no servidor...", "info", 2000);
+        try {
+            const startRes = await fetch(`${apiUrl}/api/export/xlsx`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', ...getConnectionHeaders() },
+                body: JSON.stringify({ sql: cleanSql, filter: serverSideFilter ? columnFilters : null, job: true, connection: activeTab.connection })
+            });
+            let job = await startRes.json();
+            if (!startRes.ok) throw new Error(job.error || "Erro na exportação");
+
+            while (job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const statusRes = await fetch(`${apiUrl}/api/export/jobs/${job.id}`);
+                job = await statusRes.json();
+                if (!statusRes.ok) throw new Error(job.error || "Erro na exportação");
+                showToast(`Gerando Excel... ${Number(job.rows).toLocaleString('pt-BR')} linhas`, "info", 1500);
+            }
+            if (job.status !== 'done') throw new Error(job.error || "Exportação cancelada");
+
+            const filename = `exportacao_${getFormattedTimestamp()}.xlsx`;
+            if (window.electronAPI && window.electronAPI.invoke) {
+                const filePath = await window.electronAPI.invoke('dialog:show-save', {
+                    defaultPath: filename,
+                    filters: [{ name: 'Excel Files', extensions: ['xlsx'] }]
+                });
+                if (!filePath) {
+                    fetch(`${apiUrl}/api/export/jobs/${job.id}`, { method: 'DELETE' });
+                    return;
+                }
+                const saveRes = await fetch(`${apiUrl}/api/export/jobs/${job.id}/save`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ filePath })
+                });
+                const saved = await saveRes.json();
+                if (!saveRes.ok) throw new Error(saved.error || "Erro ao salvar arquivo");
+                fetch(`${apiUrl}/api/export/jobs/${job.id}`, { method: 'DELETE' });
+                window.electronAPI.showItemInFolder(filePath);
+            } else {
+                const link = document.createElement('a');
+                link.href = `${apiUrl}/api/export/jobs/${job.id}/download`;
+                link.download = filename;
+                link.click();
+            }
+            showToast(job.truncated ? "Excel gerado (limite de 1.048.576 linhas do Excel atingido)" : "Download concluído!");
+        } catch (err) {
+            showToast("Erro: " + err.message, 'error');
+        }
+    };
+
     const performNativeSave = async (filename, content, type) => {
         if (window.electronAPI && window.electronAPI.saveFile) {
             const savedPath = await window.electronAPI.saveFile({ filename, content, type });
@@ -1001,6 +1170,7 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
 
     const exportData = async (type) => {
         if (!activeTab.results || !activeTab.results.rows || activeTab.results.rows.length === 0) return alert("Sem dados.");
+        if (type === 'xlsx' && !activeView && activeTab.executedSql) return exportXlsxFromServer(activeTab.executedSql);
 
         showToast("Gerando arquivo...", "info", 0);
         setTimeout(async () => {
@@ -1008,7 +1178,8 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                 const header = activeTab.results.metaData.map(m => m.name);
 
                 // Process rows for formatting
-                const formattedRows = filteredRows.map(row => {
+                const exportRows = activeView ? Array.from(activeView, i => allRows[i]) : allRows;
+                const formattedRows = exportRows.map(row => {
                     return row.map(cell => formatValueForExport(cell));
                 });
 
@@ -1017,6 +1188,7 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                 let contentToSend;
 
                 if (type === 'xlsx') {
+                    // Filtered/sorted view: exactly the rows shown in the grid
                     const wb = XLSX.utils.book_new();
                     const ws = XLSX.utils.aoa_to_sheet(data);
                     XLSX.utils.book_append_sheet(wb, ws, "Results");
@@ -1535,7 +1707,7 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                                                             theme={createDynamicTheme(themeDefs[currentThemeId])}
                                                             extensions={[
                                                                 sql({ schema: editorSchema, dialect: PLSQL, upperCaseKeywords: true }),
-                                                                autocompletion({ override: [customPlSqlCompleter] }),
+                                                                autocompletion({ override: [sqlCompleter] }),
                                                                 keymap.of([
                                                                     { key: "F8", run: () => { executeQuery(); return true; } },
                                                                     ...defaultKeymap,
@@ -1658,6 +1830,11 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                                                                             {activeTab.totalRecords.toLocaleString()} registros
                                                                         </span>
                                                                     )}
+                                                                    {activeTab.results?.streaming && (
+                                                                        <span className="text-[10px] font-bold text-[var(--accent-primary)] animate-pulse">
+                                                                            carregando… {allRows.length.toLocaleString()} linhas
+                                                                        </span>
+                                                                    )}
                                                                 </div>
                                                             </div>
 
@@ -1675,6 +1852,9 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                                                             <button onClick={() => exportData('csv')} className="p-2 text-[var(--text-muted)] hover:text-[var(--accent-primary)] hover:bg-[var(--bg-active)] rounded-lg transition-all" title="Baixar CSV">
                                                                 <Download size={18} />
                                                             </button>
+                                                            <button onClick={() => exportData('xlsx')} className="p-2 text-[var(--text-muted)] hover:text-[var(--accent-primary)] hover:bg-[var(--bg-active)] rounded-lg transition-all" title="Baixar Excel">
+                                                                <FileSpreadsheet size={18} />
+                                                            </button>
                                                             <div className="relative group/save">
                                                                 {showSaveInput ? (
                                                                     <div className="flex items-center gap-1 bg-[var(--bg-main)] p-1 rounded-lg animate-in fade-in slide-in-from-right-4">
@@ -1721,13 +1901,23 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                                                                                 onDragEnd={handleDragEnd}
                                                                             >
                                                                                 <div className="flex items-center justify-between mb-0.5">
-                                                                                    <span className="truncate">{colName}</span>
+                                                                                    <span
+                                                                                        className="truncate cursor-pointer hover:text-[var(--accent-primary)]"
+                                                                                        onClick={() => toggleSort(colName)}
+                                                                                        title="Ordenar"
+                                                                                    >
+                                                                                        {colName}
+                                                                                    </span>
+                                                                                    {sortConfig && sortConfig.column === colName && (
+                                                                                        <span className="text-[9px] text-[var(--accent-primary)] ml-1">{sortConfig.direction === 'asc' ? '▲' : '▼'}</span>
+                                                                                    )}
                                                                                 </div>
                                                                                 {showFilters && (
                                                                                     <div className="relative">
                                                                                         <input
                                                                                             type="text"
                                                                                             placeholder="Filtrar..."
+                                                                                            title={serverSideFilter ? 'Texto: abc, =exato, prefixo* | Número: 10, >10, 1..20 | Data: 31/01/2024, 01/2024, >2023' : undefined}
                                                                                             className="w-full text-[10px] px-2 py-1 bg-[var(--bg-main)] border border-[var(--border-sub)] rounded-md focus:border-[var(--accent-primary)] focus:bg-[var(--bg-panel)] outline-none transition-all placeholder:text-[var(--text-muted)] text-[var(--text-primary)]"
                                                                                             value={columnFilters[colName] || ''}
                                                                                             onChange={e => setColumnFilters({ ...columnFilters, [colName]: e.target.value })}
@@ -1750,14 +1940,16 @@ const SqlRunner = ({ isVisible, tabs, setTabs, activeTabId, setActiveTabId, save
                                                                             <VirtualList
                                                                                 height={height}
                                                                                 width={width}
-                                                                                itemCount={filteredRows.length}
+                                                                                itemCount={visibleRowCount}
                                                                                 itemSize={38}
                                                                                 outerRef={setListOuterElement}
                                                                                 itemData={{
-                                                                                    rows: filteredRows,
+                                                                                    rows: allRows,
+                                                                                    view: activeView,
                                                                                     columnOrder,
                                                                                     visibleColumns,
                                                                                     columnWidths,
+                                                                                    columnIndex,
                                                                                     metaData: activeTab.results.metaData
                                                                                 }}
                                                                             >
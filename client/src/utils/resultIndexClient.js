@@ -0,0 +1,53 @@
+// Main-thread side of workers/resultIndex.worker.js.
+// Rows are mirrored into the worker once (and appended while a streamed result arrives);
+// query() resolves with the row indices to display. Only the latest query resolves:
+// results of superseded queries (older keystrokes) are dropped.
+
+export default class ResultIndexClient {
+    constructor() {
+        this.worker = new Worker(new URL('../workers/resultIndex.worker.js', import.meta.url), { type: 'module' });
+        this.worker.onmessage = (event) => this.onResult(event.data);
+        this.source = null; // metaData of the mirrored result
+        this.mirrored = 0;
+        this.seq = 0;
+        this.pending = null;
+    }
+
+    /**
+     * Mirrors rows of a result: a new metaData array means a new result, otherwise only rows past
+     * the ones already sent are appended (streamed results grow in place).
+     */
+    sync(metaData, rows) {
+        if (metaData !== this.source) {
+            this.source = metaData;
+            this.mirrored = 0;
+            this.worker.postMessage({ type: 'reset', columnCount: metaData.length });
+        }
+        if (rows.length > this.mirrored) {
+            this.worker.postMessage({ type: 'append', rows: rows.slice(this.mirrored) });
+            this.mirrored = rows.length;
+        }
+    }
+
+    query(filters, sort) {
+        const id = ++this.seq;
+        if (this.pending) this.pending.resolve(null);
+        return new Promise((resolve) => {
+            this.pending = { id, resolve };
+            this.worker.postMessage({ type: 'query', id, filters, sort });
+        });
+    }
+
+    onResult(msg) {
+        if (msg.type !== 'result' || !this.pending || msg.id !== this.pending.id) return;
+        const { resolve } = this.pending;
+        this.pending = null;
+        resolve(msg.indices);
+    }
+
+    terminate() {
+        this.worker.terminate();
+        if (this.pending) this.pending.resolve(null);
+        this.pending = null;
+    }
+}
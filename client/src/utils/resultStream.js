@@ -0,0 +1,78 @@
+// Reader for POST /api/query/stream (frame layout documented in server/utils/resultStream.js).
+// Frames are decoded as they arrive: onMeta(metaData) once, then onRows(rows) per chunk with
+// row arrays in the same shape /api/query returns, so the grid can render the first chunk
+// while the rest is still downloading.
+
+function decodeColumnar(frame, dicts) {
+    const columns = frame.cols.map((col, ci) => {
+        if (col.v) return col.v;
+        const dict = dicts[ci] || (dicts[ci] = []);
+        for (const s of col.d) dict.push(s);
+        return col.c.map(code => (code === -1 ? null : dict[code]));
+    });
+    const rows = new Array(frame.n);
+    for (let ri = 0; ri < frame.n; ri++) {
+        const row = new Array(columns.length);
+        for (let ci = 0; ci < columns.length; ci++) row[ci] = columns[ci][ri];
+        rows[ri] = row;
+    }
+    return rows;
+}
+
+/**
+ * @param {Response} response fetch response of /api/query/stream
+ * @returns {Promise<{ metaData, rowCount, truncated, rowsAffected }>}
+ */
+export async function readResultStream(response, { onMeta, onRows } = {}) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!response.ok || contentType.includes('application/json')) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.error || `Erro HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const dicts = [];
+    let buffered = '';
+    let metaData = [];
+    let summary = null;
+
+    const handle = (line) => {
+        if (!line) return;
+        const frame = JSON.parse(line);
+        switch (frame.t) {
+            case 'meta':
+                metaData = frame.metaData || [];
+                if (onMeta) onMeta(metaData);
+                break;
+            case 'rows':
+                if (onRows) onRows(frame.rows);
+                break;
+            case 'cols':
+                if (onRows) onRows(decodeColumnar(frame, dicts));
+                break;
+            case 'end':
+                summary = frame;
+                break;
+            case 'error':
+                throw new Error(frame.error);
+            default:
+                break;
+        }
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        let newline;
+        while ((newline = buffered.indexOf('\n')) !== -1) {
+            handle(buffered.slice(0, newline));
+            buffered = buffered.slice(newline + 1);
+        }
+    }
+    handle(buffered + decoder.decode());
+
+    if (!summary) throw new Error('Transmissão do resultado interrompida.');
+    return { metaData, rowCount: summary.rows, truncated: summary.truncated, rowsAffected: summary.rowsAffected };
+}
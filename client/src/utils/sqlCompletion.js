@@ -0,0 +1,332 @@
+// SQL editor completion engine.
+// Candidates live in compact prefix tries: keys are kept sorted, so every trie node covers a
+// contiguous range of entries, and nodes with more than TOP_K entries below them keep their
+// TOP_K best-ranked entries precomputed. A prefix query walks the prefix and reads that list
+// (or ranks the few entries of a small range): O(prefix + k), whatever the catalog size.
+//
+// Sources:
+//   - PL/SQL catalog (utils/plsql_data.js: keywords, objects, system vars), loaded on demand
+//     with a dynamic import so it stays out of the initial bundle;
+//   - schema dictionary (/api/schema/dictionary?format=compact) plus the tables/columns
+//     already opened in the sidebar: owners, tables and, for aliases found in the statement,
+//     their columns.
+
+const TOP_K = 40;
+const IDENTIFIER = /^[A-Za-z_$#]/;
+
+// Higher weight ranks first; within a weight, shorter labels first
+const WEIGHTS = { column: 100, table: 60, variable: 50, namespace: 40, function: 30, keyword: 20 };
+
+export class PrefixTrie {
+    /**
+     * @param {Array<{ label: string, type: string, detail?: string }>} entries
+     */
+    constructor(entries) {
+        const byKey = new Map();
+        for (const entry of entries) {
+            if (!entry.label || !IDENTIFIER.test(entry.label)) continue;
+            const key = entry.label.toUpperCase();
+            const current = byKey.get(key);
+            if (!current || (WEIGHTS[entry.type] || 0) > (WEIGHTS[current.type] || 0)) byKey.set(key, entry);
+        }
+        const keys = Array.from(byKey.keys()).sort();
+        this.entries = keys.map(k => byKey.get(k));
+        this.size = keys.length;
+
+        // Global rank of every entry; ranges are ordered by it
+        const byRank = keys.map((_, i) => i).sort((a, b) => compareEntries(this.entries[a], this.entries[b]));
+        this.rank = new Int32Array(this.size);
+        byRank.forEach((entryIdx, pos) => { this.rank[entryIdx] = pos; });
+
+        this.build(keys);
+    }
+
+    build(keys) {
+        const code = [0];
+        const firstChild = [-1];
+        const nextSibling = [-1];
+        const lastChild = [-1];
+        const lo = [0];
+        const hi = [this.size];
+
+        // Keys are sorted: each insertion shares a prefix with the previous path and appends
+        // children in order, so sibling lists come out sorted as well
+        const path = [0];
+        let previous = '';
+        keys.forEach((key, i) => {
+            let common = 0;
+            while (common < key.length && common < previous.length && key[common] === previous[common]) common++;
+            path.length = common + 1;
+            for (let depth = 0; depth <= common; depth++) hi[path[depth]] = i + 1;
+            for (let depth = common; depth < key.length; depth++) {
+                const parent = path[depth];
+                const node = code.length;
+                code.push(key.charCodeAt(depth));
+                firstChild.push(-1);
+                nextSibling.push(-1);
+                lastChild.push(-1);
+                lo.push(i);
+                hi.push(i + 1);
+                if (lastChild[parent] === -1) firstChild[parent] = node;
+                else nextSibling[lastChild[parent]] = node;
+                lastChild[parent] = node;
+                path.push(node);
+            }
+            previous = key;
+        });
+
+        this.code = Uint16Array.from(code);
+        this.firstChild = Int32Array.from(firstChild);
+        this.nextSibling = Int32Array.from(nextSibling);
+        this.lo = Int32Array.from(lo);
+        this.hi = Int32Array.from(hi);
+
+        // Precomputed top lists for large ranges; a node covering the same range as its parent
+        // (single-child chains) shares the parent's list
+        this.topStart = new Int32Array(code.length).fill(-1);
+        const lists = [];
+        let offset = 0;
+        const visit = (node, parent) => {
+            if (hi[node] - lo[node] > TOP_K) {
+                if (parent !== -1 && lo[parent] === lo[node] && hi[parent] === hi[node]) {
+                    this.topStart[node] = this.topStart[parent];
+                } else {
+                    const top = this.rankRange(lo[node], hi[node], TOP_K);
+                    this.topStart[node] = offset;
+                    lists.push(top);
+                    offset += top.length;
+                }
+            }
+            for (let child = firstChild[node]; child !== -1; child = nextSibling[child]) {
+                if (hi[child] - lo[child] > TOP_K) visit(child, node);
+            }
+        };
+        visit(0, -1);
+        this.top = new Int32Array(offset);
+        let at = 0;
+        for (const list of lists) {
+            this.top.set(list, at);
+            at += list.length;
+        }
+    }
+
+    rankRange(from, to, limit) {
+        const range = [];
+        for (let i = from; i < to; i++) range.push(i);
+        range.sort((a, b) => this.rank[a] - this.rank[b]);
+        return range.slice(0, limit);
+    }
+
+    findNode(prefix) {
+        let node = 0;
+        for (let i = 0; i < prefix.length && node !== -1; i++) {
+            const c = prefix.charCodeAt(i);
+            let child = this.firstChild[node];
+            while (child !== -1 && this.code[child] !== c) child = this.nextSibling[child];
+            node = child;
+        }
+        return node;
+    }
+
+    /**
+     * Best-ranked entries whose label starts with `prefix` (case-insensitive).
+     */
+    lookup(prefix, limit = TOP_K) {
+        if (this.size === 0) return [];
+        const node = this.findNode(String(prefix || '').toUpperCase());
+        if (node === -1) return [];
+        const count = Math.min(limit, TOP_K);
+        let indices;
+        if (this.topStart[node] !== -1) {
+            indices = this.top.subarray(this.topStart[node], this.topStart[node] + count);
+        } else {
+            indices = this.rankRange(this.lo[node], this.hi[node], count);
+        }
+        return Array.from(indices, i => this.entries[i]);
+    }
+}
+
+function compareEntries(a, b) {
+    return ((WEIGHTS[b.type] || 0) - (WEIGHTS[a.type] || 0))
+        || (a.label.length - b.label.length)
+        || (a.label < b.label ? -1 : a.label > b.label ? 1 : 0);
+}
+
+// --- PL/SQL catalog (lazy) ---
+
+let catalogPromise = null;
+
+/**
+ * Loads utils/plsql_data.js in its own chunk and builds its trie once.
+ */
+export function loadPlsqlCatalog() {
+    if (!catalogPromise) {
+        catalogPromise = import('./plsql_data').then(({ PLSQL_AUTOCOMPLETE_DATABASE: data }) => {
+            const entries = [];
+            (data.keywords || []).forEach(label => entries.push({ label, type: 'keyword' }));
+            (data.objects || []).forEach(label => entries.push({ label, type: 'function' }));
+            (data.functions || []).forEach(label => entries.push({ label, type: 'function' }));
+            (data.system_vars || []).forEach(label => entries.push({ label, type: 'variable' }));
+            return new PrefixTrie(entries);
+        }).catch(err => {
+            catalogPromise = null;
+            throw err;
+        });
+    }
+    return catalogPromise;
+}
+
+// --- Schema dictionary ---
+
+export class SchemaIndex {
+    /**
+     * @param {{ currentUser?: string, owners?: Object<string, Object<string, string[]>> }} dictionary compact dictionary
+     * @param {Object<string, string[]>} extraTables tables opened in the sidebar (name -> columns)
+     */
+    constructor(dictionary, extraTables = {}) {
+        this.owners = (dictionary && dictionary.owners) || {};
+        this.tables = new Map(); // TABLE and OWNER.TABLE -> columns
+        this.ownerTries = new Map();
+
+        const entries = [];
+        // Owners come in lookup priority order: the first owner of a short name wins
+        Object.keys(this.owners).forEach(owner => {
+            entries.push({ label: owner, type: 'namespace', detail: 'owner' });
+            Object.keys(this.owners[owner]).forEach(table => {
+                const columns = this.owners[owner][table];
+                this.tables.set(`${owner}.${table}`, columns);
+                if (!this.tables.has(table)) {
+                    this.tables.set(table, columns);
+                    entries.push({ label: table, type: 'table', detail: owner });
+                }
+            });
+        });
+        Object.keys(extraTables || {}).forEach(name => {
+            const key = name.toUpperCase();
+            const known = this.tables.get(key);
+            if (!known || (known.length === 0 && extraTables[name].length > 0)) this.tables.set(key, extraTables[name]);
+            if (!known && !key.includes('.')) entries.push({ label: name, type: 'table' });
+        });
+        this.trie = new PrefixTrie(entries);
+    }
+
+    columnsOf(name) {
+        return this.tables.get(String(name).toUpperCase()) || null;
+    }
+
+    /**
+     * Tables of one owner, with the owner's trie built on first use.
+     */
+    tablesOf(owner, prefix, limit) {
+        const key = String(owner).toUpperCase();
+        if (!this.owners[key]) return null;
+        let trie = this.ownerTries.get(key);
+        if (!trie) {
+            trie = new PrefixTrie(Object.keys(this.owners[key]).map(label => ({ label, type: 'table', detail: key })));
+            this.ownerTries.set(key, trie);
+        }
+        return trie.lookup(prefix, limit);
+    }
+}
+
+const NOT_ALIAS = new Set(['WHERE', 'ON', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'NATURAL',
+    'GROUP', 'ORDER', 'HAVING', 'CONNECT', 'START', 'UNION', 'MINUS', 'INTERSECT', 'FETCH', 'FOR', 'USING',
+    'SET', 'VALUES', 'PARTITION', 'SAMPLE', 'PIVOT', 'UNPIVOT', 'WITH', 'SELECT', 'AND', 'OR', 'AS']);
+
+/**
+ * Tables referenced by the statement, keyed by alias and by table name:
+ * "FROM PACIENTE P JOIN HUMASTER.ATENDIMENTO A" -> { P: PACIENTE, PACIENTE: PACIENTE, A: HUMASTER.ATENDIMENTO, ... }.
+ * Only names the schema index knows are kept, so select-list commas do not add noise.
+ */
+export function tableAliases(sqlText, schemaIndex) {
+    const aliases = new Map();
+    if (!schemaIndex || !sqlText) return aliases;
+    const pattern = /(?:\bFROM|\bJOIN|\bUPDATE|\bINTO|,)\s+([A-Za-z_][\w$#]*(?:\.[A-Za-z_][\w$#]*)?)(?:\s+(?:AS\s+)?([A-Za-z_][\w$#]*))?/gi;
+    let match;
+    while ((match = pattern.exec(sqlText)) !== null) {
+        const table = match[1].toUpperCase();
+        if (!schemaIndex.columnsOf(table)) continue;
+        aliases.set(table, table);
+        const shortName = table.includes('.') ? table.split('.').pop() : null;
+        if (shortName && !aliases.has(shortName)) aliases.set(shortName, table);
+        const alias = match[2] && match[2].toUpperCase();
+        if (alias && !NOT_ALIAS.has(alias)) aliases.set(alias, table);
+    }
+    return aliases;
+}
+
+// --- CodeMirror completion source ---
+
+function toOption(entry) {
+    const option = { label: entry.label, type: entry.type };
+    if (entry.detail) option.detail = entry.detail;
+    return option;
+}
+
+function columnEntries(columns, prefix, detail) {
+    const upper = prefix.toUpperCase();
+    const out = [];
+    for (const col of columns || []) {
+        if (String(col).toUpperCase().startsWith(upper)) out.push({ label: col, type: 'column', detail });
+    }
+    return out;
+}
+
+/**
+ * Builds a completion source. `getCatalog()` returns the loaded catalog trie (or null while it
+ * loads) and `getSchema()` the current SchemaIndex (or null).
+ */
+export function createSqlCompleter({ getCatalog, getSchema, limit = 30 }) {
+    return (context) => {
+        const word = context.matchBefore(/[\w.$#]*/);
+        if (!word || (word.from === word.to && !context.explicit)) return null;
+
+        const schema = getSchema();
+        const catalog = getCatalog();
+        const text = word.text;
+        const dot = text.lastIndexOf('.');
+
+        // Qualified name: alias./table./owner. -> columns or tables of that owner
+        if (dot !== -1) {
+            const qualifier = text.slice(0, dot).toUpperCase();
+            const prefix = text.slice(dot + 1);
+            const from = word.from + dot + 1;
+            if (!schema) return null;
+
+            const aliases = tableAliases(context.state.doc.toString(), schema);
+            const table = aliases.get(qualifier) || qualifier;
+            const columns = schema.columnsOf(table);
+            if (columns) {
+                return { from, options: columnEntries(columns, prefix, table).slice(0, limit * 4).map(toOption), filter: false };
+            }
+            const tables = schema.tablesOf(qualifier, prefix, limit);
+            return tables ? { from, options: tables.map(toOption), filter: false } : null;
+        }
+
+        const candidates = [];
+        if (schema) {
+            const aliases = tableAliases(context.state.doc.toString(), schema);
+            new Set(aliases.values()).forEach(table => {
+                candidates.push(...columnEntries(schema.columnsOf(table), text, table));
+            });
+            candidates.push(...schema.trie.lookup(text, limit));
+        }
+        if (catalog) candidates.push(...catalog.lookup(text, limit));
+
+        // Exact match first, then weight/length; the same label from two sources shows once
+        const upper = text.toUpperCase();
+        const seen = new Set();
+        const options = candidates
+            .sort((a, b) => ((b.label.toUpperCase() === upper) - (a.label.toUpperCase() === upper)) || compareEntries(a, b))
+            .filter(entry => {
+                const key = entry.label.toUpperCase();
+                if (seen.has(key)) return false;
+                seen.add(key);
+                return true;
+            })
+            .slice(0, limit)
+            .map(toOption);
+
+        return { from: word.from, options, filter: false };
+    };
+}
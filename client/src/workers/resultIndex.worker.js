@@ -0,0 +1,140 @@
+// Filter/sort index for SqlRunner result grids, off the main thread.
+// Holds a column-major copy of the result and answers { filters, sort } with the matching row
+// indices (an Int32Array handed back as a transferable), so the grid only swaps index views.
+//   - Lower-cased text of a column is built the first time that column is filtered.
+//   - The sort permutation of a column is built once per direction-independent order and
+//     reused; descending walks it backwards (nulls stay last).
+//   - When every filter only grew (typing more characters), the previous match set is
+//     narrowed instead of scanning all rows again.
+// Messages in:  { type: 'reset', columnCount } | { type: 'append', rows } | { type: 'query', id, filters, sort }
+// Messages out: { type: 'result', id, indices, total }
+
+const collator = new Intl.Collator('pt-BR', { numeric: true, sensitivity: 'base' });
+
+let columns = [];
+let lower = [];
+let perms = new Map(); // column -> { order: Int32Array, nonNull: number }
+let length = 0;
+let last = null; // { filters, matches } of the previous filtered query
+
+function reset(columnCount) {
+    columns = Array.from({ length: columnCount }, () => []);
+    lower = new Array(columnCount).fill(null);
+    perms = new Map();
+    length = 0;
+    last = null;
+}
+
+function append(rows) {
+    for (const row of rows) {
+        for (let ci = 0; ci < columns.length; ci++) columns[ci].push(row[ci]);
+    }
+    const start = length;
+    length += rows.length;
+    // Keep built text columns in step; permutations and the last match set are stale now
+    lower.forEach((col, ci) => {
+        if (!col) return;
+        for (let ri = start; ri < length; ri++) col.push(String(columns[ci][ri] || '').toLowerCase());
+    });
+    perms.clear();
+    last = null;
+}
+
+function lowerColumn(ci) {
+    if (!lower[ci]) lower[ci] = columns[ci].map(v => String(v || '').toLowerCase());
+    return lower[ci];
+}
+
+function compareValues(a, b) {
+    if (typeof a === 'number' && typeof b === 'number') return a - b;
+    return collator.compare(String(a), String(b));
+}
+
+function permutation(ci) {
+    let perm = perms.get(ci);
+    if (perm) return perm;
+    const col = columns[ci];
+    const present = [];
+    const nulls = [];
+    for (let ri = 0; ri < length; ri++) (col[ri] === null || col[ri] === undefined ? nulls : present).push(ri);
+    present.sort((a, b) => compareValues(col[a], col[b]) || a - b);
+    const order = new Int32Array(length);
+    order.set(present, 0);
+    order.set(nulls, present.length);
+    perm = { order, nonNull: present.length };
+    perms.set(ci, perm);
+    return perm;
+}
+
+// Previous matches can be reused if each earlier filter is contained in the new one
+function canNarrow(filters) {
+    if (!last) return false;
+    return Object.entries(last.filters).every(([ci, text]) => filters[ci] !== undefined && filters[ci].includes(text));
+}
+
+function filterRows(filters) {
+    const active = Object.entries(filters).map(([ci, text]) => [Number(ci), text]);
+    if (active.length === 0) return null;
+
+    const candidates = canNarrow(filters) ? last.matches : null;
+    const tests = active.map(([ci, text]) => [lowerColumn(ci), text]);
+    const out = new Int32Array(candidates ? candidates.length : length);
+    let count = 0;
+    const total = candidates ? candidates.length : length;
+    for (let k = 0; k < total; k++) {
+        const ri = candidates ? candidates[k] : k;
+        let ok = true;
+        for (let t = 0; t < tests.length; t++) {
+            if (!tests[t][0][ri].includes(tests[t][1])) { ok = false; break; }
+        }
+        if (ok) out[count++] = ri;
+    }
+    const matches = out.slice(0, count);
+    last = { filters, matches };
+    return matches;
+}
+
+function sortRows(matches, sort) {
+    const { order, nonNull } = permutation(sort.column);
+    const keep = matches ? new Uint8Array(length) : null;
+    if (matches) for (let k = 0; k < matches.length; k++) keep[matches[k]] = 1;
+
+    const out = new Int32Array(matches ? matches.length : length);
+    let count = 0;
+    const take = (ri) => { if (!keep || keep[ri]) out[count++] = ri; };
+    if (sort.direction === 'desc') {
+        for (let k = nonNull - 1; k >= 0; k--) take(order[k]);
+    } else {
+        for (let k = 0; k < nonNull; k++) take(order[k]);
+    }
+    for (let k = nonNull; k < length; k++) take(order[k]);
+    return out;
+}
+
+function query({ filters = {}, sort = null }) {
+    const normalized = {};
+    for (const [ci, text] of Object.entries(filters)) {
+        const value = String(text || '').toLowerCase();
+        if (value.trim() !== '' && Number(ci) < columns.length) normalized[ci] = value;
+    }
+    if (Object.keys(normalized).length === 0) last = null;
+
+    const matches = filterRows(normalized);
+    if (sort && sort.column !== undefined && sort.column < columns.length) return sortRows(matches, sort);
+    if (matches) return matches;
+    const all = new Int32Array(length);
+    for (let ri = 0; ri < length; ri++) all[ri] = ri;
+    return all;
+}
+
+self.onmessage = (event) => {
+    const msg = event.data;
+    if (msg.type === 'reset') reset(msg.columnCount);
+    else if (msg.type === 'append') append(msg.rows);
+    else if (msg.type === 'query') {
+        // The match set is cached as `last`; only a copy is transferred
+        const indices = query(msg);
+        const transfer = indices === (last && last.matches) ? indices.slice() : indices;
+        self.postMessage({ type: 'result', id: msg.id, indices: transfer, total: length }, [transfer.buffer]);
+    }
+};
@@ -1,6 +1,14 @@
 const oracledb = require('oracledb');
-const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
+const schemaCache = require('./services/schemaCacheService');
+const LruCache = require('./utils/lruCache');
+const PoolManager = require('./utils/poolManager');
+const executions = require('./services/queryExecutionService');
+const { parseDate } = require('./utils/csvTypes');
+const { createEncoder } = require('./utils/resultStream');
+const { createLogger } = require('./utils/logger');
+const metrics = require('./services/metricsService');
 
 try {
     oracledb.initOracleClient({ libDir: path.join(__dirname, 'instantclient') });
@@ -15,19 +23,33 @@ oracledb.autoCommit = true;
 oracledb.fetchAsString = [oracledb.CLOB];
 
 const LOG_FILE = path.join(__dirname, 'server_log.txt');
+const logger = createLogger('DB', { file: LOG_FILE, console: true });
 
 function log(msg) {
-    const timestamp = new Date().toISOString();
-    const logMsg = `[${timestamp}] ${msg}\n`;
-    console.log(msg);
-    try {
-        fs.appendFileSync(LOG_FILE, logMsg);
-    } catch (e) {
-        console.error("Failed to write to log file:", e);
-    }
+    logger.info(msg);
 }
 
-const poolCache = {};
+// Pool sizing and limits (see utils/poolManager). In thick mode every round trip runs on a
+// libuv worker; UV_THREADPOOL_SIZE only takes effect when set before the process starts
+// (start_app.bat), so here it is just reported (libuv default: 4).
+const POOL_MAX = Number(process.env.DB_POOL_MAX) || 10;
+
+const pools = new PoolManager(oracledb, {
+    log,
+    poolMin: Number(process.env.DB_POOL_MIN ?? 1),
+    poolMax: POOL_MAX,
+    poolIncrement: Number(process.env.DB_POOL_INCREMENT) || 1,
+    poolTimeout: 60, // Close idle connections after 60s
+    queueMax: Number(process.env.DB_QUEUE_MAX) || 500,
+    queueTimeout: Number(process.env.DB_QUEUE_TIMEOUT_MS) || 60000,
+    pingInterval: Number(process.env.DB_PING_INTERVAL ?? 30),
+    // Per-connection cache of parsed cursors: repeated statements (bound filters,
+    // paging, bulk inserts) skip the parse round trip entirely
+    stmtCacheSize: Number(process.env.DB_STMT_CACHE_SIZE) || 100,
+    maxPools: Number(process.env.DB_MAX_POOLS) || 8,
+    idleMs: Number(process.env.DB_POOL_IDLE_MS) || 15 * 60 * 1000,
+    threadPoolSize: Number(process.env.UV_THREADPOOL_SIZE) || 4
+});
 
 // Helper to generate a unique key for the pool based on credentials
 function getPoolKey(params) {
@@ -35,6 +57,71 @@ function getPoolKey(params) {
     return `${params.user}_${params.connectString}`;
 }
 
+// Pool key for request params, resolving the legacy global connection like getConnection does
+function getConnectionKey(params = null) {
+    return getPoolKey(params || lastConnectionParams);
+}
+
+// --- Metadata Cache ---
+// Dictionary lookups (columns, table lists, object search) keyed by "<poolKey>|<kind>|<object>".
+// Values are stored as promises so concurrent callers in one chat turn share a single round trip.
+const metadataCache = new LruCache({
+    maxEntries: Number(process.env.METADATA_CACHE_SIZE) || 1000,
+    ttlMs: Number(process.env.METADATA_CACHE_TTL_MS) || 5 * 60 * 1000
+});
+
+// Statements that change the dictionary and must drop cached metadata for the connection
+const DDL_PATTERN = /^\s*(CREATE|ALTER|DROP|RENAME|COMMENT)\b/i;
+
+function metadataKey(connectionParams, kind, key) {
+    return `${getPoolKey(connectionParams || lastConnectionParams)}|${kind}|${key}`;
+}
+
+// Hands out a deep copy: callers decorate column entries in place (and may reorder the array),
+// which must not leak into the cached value or other callers. structuredClone keeps extra array
+// props like viewDefinition; metadata lists are small, so the copy is cheap next to a round trip.
+function copyMetadata(value) {
+    return value && typeof value === 'object' ? structuredClone(value) : value;
+}
+
+async function cachedMetadata(connectionParams, kind, key, loader) {
+    const cacheKey = metadataKey(connectionParams, kind, key);
+    let pending = metadataCache.get(cacheKey);
+    if (!pending) {
+        pending = loader();
+        metadataCache.set(cacheKey, pending);
+        // Failed lookups must not stick in the cache
+        pending.catch(() => metadataCache.delete(cacheKey));
+    }
+    return copyMetadata(await pending);
+}
+
+/**
+ * Drops cached metadata for a connection. With a table name, only that table's columns
+ * (plus every list/search result, which may include it) are dropped.
+ */
+function invalidateMetadata(connectionParams = null, tableName = null) {
+    const poolKey = getPoolKey(connectionParams || lastConnectionParams);
+    const prefix = `${poolKey}|`;
+    const table = tableName ? tableName.toUpperCase().replace(/"/g, '') : null;
+    const shortName = table && table.includes('.') ? table.split('.').pop() : table;
+
+    const removed = metadataCache.deleteWhere(key => {
+        if (!key.startsWith(prefix)) return false;
+        if (!table) return true;
+        const [, kind, object] = key.split('|');
+        if (kind !== 'columns') return true;
+        const objectShort = object.includes('.') ? object.split('.').pop() : object;
+        return objectShort === shortName;
+    });
+    schemaCache.invalidate(poolKey);
+    if (removed > 0) log(`Metadata cache invalidated for ${poolKey}${table ? ` (${table})` : ''}: ${removed} entries`);
+}
+
+function getMetadataCacheStats() {
+    return metadataCache.stats();
+}
+
 // Stateful connection params (Legacy/Validation only)
 // We keep this for the initial login check, allowing the frontend to validade credentials.
 // But widely execution should pass params explicitly.
@@ -51,39 +138,42 @@ async function getConnection(params = null) {
         }
     }
 
-    // 2. Check Pool Cache
-    const poolKey = getPoolKey(connectionParams);
+    // 2. Pooled connection (pool created on first use, see PoolManager)
+    const stop = metrics.startTimer('db_connection_wait_ms');
+    try {
+        const conn = await pools.acquire(getPoolKey(connectionParams), connectionParams);
+        stop({ status: 'ok' });
+        return conn;
+    } catch (err) {
+        stop({ status: 'error' });
+        throw err;
+    }
+}
 
-    if (!poolCache[poolKey]) {
-        log(`[DB] Creating new connection pool for: ${poolKey}`);
+// Checks out a connection linked to a cancellable execution (see services/queryExecutionService).
+// Cancelled while waiting for the connection: it goes straight back and QUERY_CANCELLED is thrown.
+async function getTrackedConnection(connectionParams, execution) {
+    const conn = await getConnection(connectionParams);
+    if (execution) {
         try {
-            poolCache[poolKey] = await oracledb.createPool({
-                user: connectionParams.user,
-                password: connectionParams.password,
-                connectString: connectionParams.connectString,
-                poolMin: 1,
-                poolMax: 10,
-                poolIncrement: 1,
-                poolTimeout: 60 // Close idle connections after 60s
-            });
-            log(`[DB] Pool created successfully.`);
+            executions.attach(execution, conn);
         } catch (err) {
-            log(`[DB] Failed to create pool: ${err.message}`);
+            try { await conn.close(); } catch (e) { /* already released */ }
             throw err;
         }
     }
+    return conn;
+}
 
-    // 3. Get Connection from Pool
-    try {
-        const pool = poolCache[poolKey];
-        const conn = await pool.getConnection();
-        return conn;
-    } catch (err) {
-        log(`[DB] Error getting connection from pool: ${err.message}`);
-        // If pool is invalid, try to recreate it (simple retry logic)
-        delete poolCache[poolKey];
-        throw err;
-    }
+async function releaseTracked(conn, execution) {
+    if (execution) executions.detach(execution);
+    await conn.close();
+}
+
+// Rows per statement and slow statement log (see services/metricsService)
+function recordStatement(op, sql, params, ms, rows) {
+    metrics.increment('db_rows_returned_total', { op }, rows);
+    metrics.recordStatement(sql, params, ms, rows, op);
 }
 
 async function checkConnection(params) {
@@ -91,13 +181,18 @@ async function checkConnection(params) {
     try {
         // This will create the pool if it doesn't exist
         conn = await getConnection(params);
+        await conn.ping();
 
         // Store for legacy fallback
         lastConnectionParams = params;
         log("Connection successful for user: " + params.user);
+
+        // Warm-up: open a few more sessions in the background so the first screens don't wait for logons
+        const warmCount = Number(process.env.DB_POOL_WARM) || 3;
+        pools.warm(getPoolKey(params), params, warmCount).catch(e => log(`Pool warm-up failed: ${e.message}`));
         return true;
     } catch (err) {
-        log("Connection failed: " + err.message);
+        logger.error("Connection failed: " + err.message);
         throw err;
     } finally {
         if (conn) {
@@ -107,6 +202,10 @@ async function checkConnection(params) {
 }
 
 async function getTables(search = '', connectionParams = null) {
+    return cachedMetadata(connectionParams, 'tables', String(search || '').toUpperCase(), () => loadTables(search, connectionParams));
+}
+
+async function loadTables(search, connectionParams) {
     let conn;
     try {
         conn = await getConnection(connectionParams);
@@ -139,11 +238,14 @@ async function getTables(search = '', connectionParams = null) {
 
 // Smart Search Logic
 async function findObjects(term, connectionParams = null) {
+    term = term ? term.trim() : '';
+    if (!term) return [];
+    return cachedMetadata(connectionParams, 'objects', term.toUpperCase(), () => loadObjects(term, connectionParams));
+}
+
+async function loadObjects(term, connectionParams) {
     let conn;
     try {
-        term = term ? term.trim() : '';
-        if (!term) return [];
-
         conn = await getConnection(connectionParams);
 
         const baseQuery = `SELECT OWNER, OBJECT_NAME, OBJECT_TYPE 
@@ -198,11 +300,14 @@ async function findObjects(term, connectionParams = null) {
 }
 
 async function findTablesByColumn(columnName, connectionParams = null) {
+    const term = columnName ? columnName.trim().toUpperCase() : '';
+    if (!term) return [];
+    return cachedMetadata(connectionParams, 'tablesByColumn', term, () => loadTablesByColumn(term, connectionParams));
+}
+
+async function loadTablesByColumn(term, connectionParams) {
     let conn;
     try {
-        const term = columnName ? columnName.trim().toUpperCase() : '';
-        if (!term) return [];
-
         conn = await getConnection(connectionParams);
 
         // Blocklist for system schemas
@@ -240,6 +345,10 @@ async function findTablesByColumn(columnName, connectionParams = null) {
 }
 
 async function getColumns(tableNameInput, connectionParams = null) {
+    return cachedMetadata(connectionParams, 'columns', String(tableNameInput).toUpperCase(), () => loadColumns(tableNameInput, connectionParams));
+}
+
+async function loadColumns(tableNameInput, connectionParams) {
     let conn;
     try {
         let owner, tableName;
@@ -252,7 +361,7 @@ async function getColumns(tableNameInput, connectionParams = null) {
             tableName = tableNameInput;
         }
 
-        console.log(`[DB] getColumns for: ${tableName}, Owner: ${owner || 'ANY'}`);
+        logger.debug(`getColumns for: ${tableName}, Owner: ${owner || 'ANY'}`);
 
         conn = await getConnection(connectionParams);
 
@@ -322,7 +431,7 @@ async function getColumns(tableNameInput, connectionParams = null) {
         }
 
         if (finalRows.length > 0) {
-            console.log("[DB] First Row Sample:", finalRows[0]);
+            logger.debug("First Row Sample:", finalRows[0]);
         } else {
             console.log("[DB] No columns found for:", tableName);
         }
@@ -360,81 +469,190 @@ async function getColumns(tableNameInput, connectionParams = null) {
     }
 }
 
-async function getSchemaDictionary(connectionParams = null) {
-    let conn;
+// Blocklist for system schemas (shared by dictionary scans)
+const SYSTEM_OWNERS = `
+    'SYS', 'SYSTEM', 'OUTLN', 'DBSNMP', 'APPQOSSYS', 'WMSYS', 'CTXSYS', 
+    'XDB', 'ORDDATA', 'ORDSYS', 'MDSYS', 'OLAPSYS', 'LBACSYS', 'DVSYS', 
+    'GSMADMIN_INTERNAL', 'APEX_040000', 'APEX_030200', 'AUDSYS'
+`;
+
+// If more than this many tables changed since the last sync, a full rescan is cheaper than chunked lookups
+const SCHEMA_INCREMENTAL_MAX_CHANGES = 2000;
+const SCHEMA_CHUNK_SIZE = 250;
+const SCHEMA_FETCH_ROWS = 5000;
+
+// In-flight refreshes per pool, so concurrent callers share one dictionary scan
+const schemaRefreshes = {};
+
+function getCurrentUser(connectionParams) {
+    if (connectionParams && connectionParams.user) return connectionParams.user.toUpperCase();
+    if (lastConnectionParams) return lastConnectionParams.user.toUpperCase();
+    return 'USER';
+}
+
+// LAST_DDL_TIME per table/view, keyed by "OWNER.NAME"
+async function fetchObjectTimestamps(conn) {
+    const result = await conn.execute(
+        `SELECT OWNER, OBJECT_NAME, LAST_DDL_TIME
+         FROM ALL_OBJECTS
+         WHERE OBJECT_TYPE IN ('TABLE', 'VIEW')
+         AND OWNER NOT IN (${SYSTEM_OWNERS})`,
+        [],
+        { maxRows: 0 }
+    );
+    const stamps = new Map();
+    result.rows.forEach(([owner, name, ddl]) => {
+        stamps.set(`${owner}.${name}`, ddl ? new Date(ddl).getTime() : 0);
+    });
+    return stamps;
+}
+
+async function fetchAllColumns(conn, currentUser) {
+    const sql = `
+        SELECT OWNER, TABLE_NAME, COLUMN_NAME
+        FROM ALL_TAB_COLUMNS
+        WHERE OWNER NOT IN (${SYSTEM_OWNERS})
+        ORDER BY 
+            CASE 
+                WHEN OWNER = :currentUser THEN 0
+                WHEN OWNER IN ('HUMASTER', 'INCORPORA') THEN 1
+                ELSE 2 
+            END,
+            OWNER, TABLE_NAME, COLUMN_ID
+    `;
+
+    // Paged through a result set: a row cap would silently drop the last tables' columns, and
+    // the cache would keep them that way while their LAST_DDL_TIME stays the same
+    const result = await conn.execute(sql, { currentUser }, { resultSet: true, fetchArraySize: SCHEMA_FETCH_ROWS });
+
+    const columns = {};
     try {
-        conn = await getConnection(connectionParams);
-        const currentUser = (connectionParams && connectionParams.user) ? connectionParams.user.toUpperCase() : (lastConnectionParams ? lastConnectionParams.user.toUpperCase() : 'USER');
+        let rows;
+        do {
+            rows = await result.resultSet.getRows(SCHEMA_FETCH_ROWS);
+            rows.forEach(([owner, name, col]) => {
+                const key = `${owner}.${name}`;
+                if (!columns[key]) columns[key] = [];
+                columns[key].push(col);
+            });
+        } while (rows.length === SCHEMA_FETCH_ROWS);
+    } finally {
+        await result.resultSet.close();
+    }
+    return columns;
+}
 
-        // Blocklist for system schemas
-        const ownerBlocklist = `
-            'SYS', 'SYSTEM', 'OUTLN', 'DBSNMP', 'APPQOSSYS', 'WMSYS', 'CTXSYS', 
-            'XDB', 'ORDDATA', 'ORDSYS', 'MDSYS', 'OLAPSYS', 'LBACSYS', 'DVSYS', 
-            'GSMADMIN_INTERNAL', 'APEX_040000', 'APEX_030200', 'AUDSYS'
-        `;
+// Re-reads columns only for the given "OWNER.NAME" keys, in bound tuple chunks
+async function fetchColumnsFor(conn, fullNames) {
+    const columns = {};
+    for (let i = 0; i < fullNames.length; i += SCHEMA_CHUNK_SIZE) {
+        const chunk = fullNames.slice(i, i + SCHEMA_CHUNK_SIZE);
+        const binds = {};
+        const tuples = chunk.map((fullName, j) => {
+            const dot = fullName.indexOf('.');
+            binds[`o${j}`] = fullName.substring(0, dot);
+            binds[`t${j}`] = fullName.substring(dot + 1);
+            return `(:o${j}, :t${j})`;
+        });
 
-        // Fetch columns for tables and views
-        const sql = `
-            SELECT OWNER, TABLE_NAME, COLUMN_NAME, DATA_TYPE
-            FROM ALL_TAB_COLUMNS
-            WHERE OWNER NOT IN (${ownerBlocklist})
-            ORDER BY 
-                CASE 
-                    WHEN OWNER = '${currentUser}' THEN 0
-                    WHEN OWNER IN ('HUMASTER', 'INCORPORA') THEN 1
-                    ELSE 2 
-                END,
-                OWNER, TABLE_NAME, COLUMN_ID
-        `;
+        const result = await conn.execute(
+            `SELECT OWNER, TABLE_NAME, COLUMN_NAME
+             FROM ALL_TAB_COLUMNS
+             WHERE (OWNER, TABLE_NAME) IN (${tuples.join(', ')})
+             ORDER BY OWNER, TABLE_NAME, COLUMN_ID`,
+            binds,
+            { maxRows: 0 }
+        );
+        result.rows.forEach(([owner, name, col]) => {
+            const key = `${owner}.${name}`;
+            if (!columns[key]) columns[key] = [];
+            columns[key].push(col);
+        });
+    }
+    return columns;
+}
 
-        // Set a safe limit (200,000 columns)
-        const result = await conn.execute(sql, [], { maxRows: 200000 });
+/**
+ * Brings the cached schema dictionary for this connection up to date.
+ * Uses ALL_OBJECTS.LAST_DDL_TIME to re-read only tables created or altered since the last sync.
+ * @returns {Promise<object>} cache entry (see schemaCacheService)
+ */
+async function refreshSchemaDictionary(connectionParams = null, options = {}) {
+    const poolKey = getPoolKey(connectionParams || lastConnectionParams);
+    const cached = schemaCache.get(poolKey);
+    if (cached && !options.force && schemaCache.isFresh(cached)) return cached;
 
-        const dictionary = {};
+    if (schemaRefreshes[poolKey]) return schemaRefreshes[poolKey];
 
-        // Optimized Single Pass approach:
-        // Map: Owner -> Table -> [Cols]
-        const tempMap = {};
-        result.rows.forEach(row => {
-            const [owner, name, col] = row;
-            if (!tempMap[owner]) tempMap[owner] = {};
-            if (!tempMap[owner][name]) tempMap[owner][name] = [];
-            tempMap[owner][name].push(col);
-        });
+    schemaRefreshes[poolKey] = (async () => {
+        let conn;
+        try {
+            conn = await getConnection(connectionParams);
+            const currentUser = getCurrentUser(connectionParams);
+            const started = Date.now();
+
+            const stamps = await fetchObjectTimestamps(conn);
+            const tables = {};
+
+            let changed = [];
+            const full = !cached || cached.currentUser !== currentUser;
+            if (!full) {
+                stamps.forEach((ddl, fullName) => {
+                    const prev = cached.tables[fullName];
+                    if (prev && prev.d === ddl) tables[fullName] = prev;
+                    else changed.push(fullName);
+                });
+            }
+            const removed = full ? 0 : Object.keys(cached.tables).filter(k => !stamps.has(k)).length;
+
+            if (full || changed.length > SCHEMA_INCREMENTAL_MAX_CHANGES) {
+                const columns = await fetchAllColumns(conn, currentUser);
+                stamps.forEach((ddl, fullName) => {
+                    tables[fullName] = { d: ddl, c: columns[fullName] || [] };
+                });
+                log(`Schema dictionary full scan for ${poolKey}: ${stamps.size} objects in ${Date.now() - started}ms`);
+                changed = null;
+            } else if (changed.length > 0) {
+                const columns = await fetchColumnsFor(conn, changed);
+                changed.forEach(fullName => {
+                    tables[fullName] = { d: stamps.get(fullName), c: columns[fullName] || [] };
+                });
+                log(`Schema dictionary incremental refresh for ${poolKey}: ${changed.length} changed, ${removed} removed in ${Date.now() - started}ms`);
+            }
 
-        // Build final dictionary
-        Object.keys(tempMap).forEach(owner => {
-            Object.keys(tempMap[owner]).forEach(table => {
-                const cols = tempMap[owner][table];
-                const fullName = `${owner}.${table}`;
-
-                // Always add full name
-                dictionary[fullName] = cols;
-
-                // Add short name logic
-                if (owner === currentUser) {
-                    // Always win
-                    dictionary[table] = cols;
-                } else {
-                    // Only if empty
-                    if (!dictionary[table]) {
-                        dictionary[table] = cols;
-                    }
-                }
-            });
-        });
+            const entry = { currentUser, syncedAt: Date.now(), tables };
+            schemaCache.set(poolKey, entry, changed === null || changed.length > 0 || removed > 0);
+            return entry;
+        } finally {
+            if (conn) await conn.close();
+            delete schemaRefreshes[poolKey];
+        }
+    })();
 
-        return dictionary;
+    return schemaRefreshes[poolKey];
+}
 
-    } finally {
-        if (conn) await conn.close();
-    }
+async function getSchemaDictionary(connectionParams = null, options = {}) {
+    const entry = await refreshSchemaDictionary(connectionParams, options);
+    return schemaCache.buildDictionary(entry);
+}
+
+/**
+ * Serialized dictionary for HTTP responses.
+ * @param {string} format 'full' (legacy flat map) | 'compact' (grouped by owner)
+ * @returns {Promise<{etag: string, body: string}>}
+ */
+async function getSchemaDictionaryPayload(connectionParams = null, format = 'full', options = {}) {
+    await refreshSchemaDictionary(connectionParams, options);
+    return schemaCache.getPayload(getPoolKey(connectionParams || lastConnectionParams), format);
 }
 
 async function executeQuery(sql, params = [], limit = 50000, extraOptions = {}, connectionParams = null) {
     let conn;
+    const { execution, ...driverOptions } = extraOptions;
+    extraOptions = driverOptions;
     try {
-        conn = await getConnection(connectionParams);
+        conn = await getTrackedConnection(connectionParams, execution);
 
         // Handle Pagination (Offset + Limit)
         // If offset is provided in extraOptions, we wrap the query
@@ -476,17 +694,21 @@ async function executeQuery(sql, params = [], limit = 50000, extraOptions = {},
         // Remove offset from extraOptions passed to driver to avoid errors if driver doesn't support it
         if (options.offset !== undefined) delete options.offset;
 
-        console.log(`[DB] Executing SQL (Offset: ${currentOffset}, Limit: ${limit})...`);
+        logger.debug(`Executing SQL (Offset: ${currentOffset}, Limit: ${limit})...`);
         // if (params && params.length > 0) console.log(`[DB] Params: ${JSON.stringify(params)}`);
 
+        const stop = metrics.startTimer('db_execute_ms', { op: 'query' });
         const result = await conn.execute(finalSql, params, options);
+        const rowCount = result.rows ? result.rows.length : (result.rowsAffected || 0);
+        recordStatement('query', sql, params, stop(), rowCount);
+        if (DDL_PATTERN.test(sql)) invalidateMetadata(connectionParams);
         return {
             metaData: result.metaData,
             rows: result.rows,
             rowsAffected: result.rowsAffected
         };
     } finally {
-        if (conn) await conn.close();
+        if (conn) await releaseTracked(conn, execution);
     }
 }
 
@@ -496,7 +718,11 @@ async function execute(sql, params = [], options = {}, connectionParams = null)
         conn = await getConnection(connectionParams);
         // Default autoCommit to true if not specified
         const execOptions = { autoCommit: true, ...options };
-        return await conn.execute(sql, params, execOptions);
+        const stop = metrics.startTimer('db_execute_ms', { op: 'execute' });
+        const result = await conn.execute(sql, params, execOptions);
+        recordStatement('execute', sql, params, stop(), result.rows ? result.rows.length : (result.rowsAffected || 0));
+        if (DDL_PATTERN.test(sql)) invalidateMetadata(connectionParams);
+        return result;
     } finally {
         if (conn) await conn.close();
     }
@@ -550,52 +776,82 @@ async function createTable(tableName, columns, indices = [], grants = [], connec
         }
 
         log("Table created successfully");
+        invalidateMetadata(connectionParams, tableName);
     } catch (err) {
-        log("Error creating table: " + err.message);
+        logger.error("Error creating table: " + err.message);
         throw err;
     } finally {
         if (conn) await conn.close();
     }
 }
 
+// Converts a parsed CSV/JSON row value into the bind value for its target column type
+function toBindValue(val, col) {
+    if (val === undefined || val === null || val === '') return null;
+
+    if (col.type === 'NUMBER') {
+        if (typeof val === 'string') {
+            val = val.replace(',', '.');
+        }
+        const num = Number(val);
+        return isNaN(num) ? null : num;
+    }
+
+    if (col.type === 'DATE') {
+        // dateFormat comes from the CSV analysis stage (e.g. 'DD/MM/YYYY'), which new Date() can't read
+        return parseDate(val, col.dateFormat);
+    }
+
+    return String(val);
+}
+
+// Rows are objects keyed by column name (CSV parser) or arrays in column order (bulk insert API)
+function toBindRow(row, columns) {
+    if (Array.isArray(row)) return columns.map((c, i) => toBindValue(row[i], c));
+    return columns.map(c => {
+        let val = row[c.name];
+        if (val === undefined) {
+            val = row[c.originalName];
+        }
+        return toBindValue(val, c);
+    });
+}
+
+// Explicit bind types let executeMany skip per-row type inference. String buffers are sized
+// from the batch itself: a declared size smaller than a value would fail the whole call
+// (NJS-058) instead of rejecting just that row through batchErrors.
+function getBindDefs(columns, binds) {
+    return columns.map((c, idx) => {
+        if (c.type === 'NUMBER') return { type: oracledb.NUMBER };
+        if (c.type === 'DATE') return { type: oracledb.DATE };
+        if (c.type === 'CLOB') return { type: oracledb.CLOB };
+        let maxSize = 1;
+        for (const row of binds) {
+            const val = row[idx];
+            if (val !== null && val.length > maxSize) maxSize = val.length;
+        }
+        return { type: oracledb.STRING, maxSize: maxSize * 4 }; // worst case UTF-8 bytes per char
+    });
+}
+
+function buildInsertSql(tableName, columns) {
+    const colNames = columns.map(c => `"${c.name}"`).join(', ');
+    const bindVars = columns.map((_, i) => `:${i + 1}`).join(', ');
+    return `INSERT INTO "${tableName}" (${colNames}) VALUES (${bindVars})`;
+}
+
 async function insertData(tableName, columns, data, connectionParams = null) {
     let conn;
     try {
         conn = await getConnection(connectionParams);
 
         // Construct INSERT statement
-        const colNames = columns.map(c => `"${c.name}"`).join(', ');
-        const bindVars = columns.map((_, i) => `:${i + 1}`).join(', ');
-        const sql = `INSERT INTO "${tableName}" (${colNames}) VALUES (${bindVars})`;
+        const sql = buildInsertSql(tableName, columns);
 
-        log("Executing Insert SQL (first 100 chars): " + sql.substring(0, 100));
+        logger.debug("Executing Insert SQL (first 100 chars): " + sql.substring(0, 100));
 
         // Prepare data for bind
-        const binds = data.map(row => {
-            return columns.map(c => {
-                let val = row[c.name];
-                if (val === undefined) {
-                    val = row[c.originalName];
-                }
-
-                if (val === undefined || val === null || val === '') return null;
-
-                if (c.type === 'NUMBER') {
-                    if (typeof val === 'string') {
-                        val = val.replace(',', '.');
-                    }
-                    const num = Number(val);
-                    return isNaN(num) ? null : num;
-                }
-
-                if (c.type === 'DATE') {
-                    const d = new Date(val);
-                    return isNaN(d.getTime()) ? null : d;
-                }
-
-                return String(val);
-            });
-        });
+        const binds = data.map(row => toBindRow(row, columns));
 
         // Use executeMany for performance
         const options = { autoCommit: true, batchErrors: true };
@@ -604,22 +860,182 @@ async function insertData(tableName, columns, data, connectionParams = null) {
         if (result.batchErrors && result.batchErrors.length > 0) {
             log("Batch Errors: " + JSON.stringify(result.batchErrors));
         } else {
-            log(`Inserted ${result.rowsAffected} rows.`);
+            logger.sample('insert', 5000, 'info', `Inserted ${result.rowsAffected} rows.`);
         }
 
         return result;
     } catch (err) {
-        log("Error inserting data: " + err.message);
+        logger.error("Error inserting data: " + err.message);
         throw err;
     } finally {
         if (conn) await conn.close();
     }
 }
 
-async function getStream(sql, params = [], connectionParams = null) {
+/**
+ * Opens a bulk loader bound to a single pooled connection for a whole import job.
+ * The INSERT text is built once, so the statement is parsed once and reused from the
+ * statement cache by every executeMany call. Commits happen every
+ * `commitEvery` rows instead of per batch.
+ *
+ * Usage: insert(rows) per batch -> execute(ddl) for post-load indexes/grants -> finish() | abort()
+ */
+async function openBulkLoader(tableName, columns, options = {}, connectionParams = null) {
+    const commitEvery = Number(options.commitEvery) || 50000;
+    const conn = await getConnection(connectionParams);
+    const sql = buildInsertSql(tableName, columns);
+
+    let sinceCommit = 0;
+    let closed = false;
+    const stats = { inserted: 0, failed: 0, batches: 0, commits: 0 };
+    const opened = Date.now();
+
+    log(`Bulk loader opened for ${tableName} (commit every ${commitEvery} rows)`);
+
+    const release = async () => {
+        if (closed) return;
+        closed = true;
+        try { await conn.close(); } catch (e) { log("Bulk loader close error: " + e.message); }
+    };
+
+    return {
+        stats,
+
+        async insert(rows) {
+            if (!rows || rows.length === 0) return stats;
+            const binds = rows.map(row => toBindRow(row, columns));
+            const bindDefs = getBindDefs(columns, binds);
+            const stop = metrics.startTimer('db_execute_ms', { op: 'executeMany' });
+            const result = await conn.executeMany(sql, binds, { autoCommit: false, batchErrors: true, bindDefs });
+            stop();
+
+            const failed = result.batchErrors ? result.batchErrors.length : 0;
+            if (failed > 0 && stats.failed === 0) {
+                log("Bulk loader batch errors (first batch with errors): " + JSON.stringify(result.batchErrors.slice(0, 5)));
+            }
+            stats.inserted += result.rowsAffected || 0;
+            stats.failed += failed;
+            stats.batches++;
+
+            sinceCommit += rows.length;
+            if (sinceCommit >= commitEvery) {
+                await conn.commit();
+                stats.commits++;
+                sinceCommit = 0;
+            }
+            return stats;
+        },
+
+        // Runs DDL (indexes, grants) on the loader connection after the data is in
+        async execute(statement) {
+            return conn.execute(statement, [], { autoCommit: true });
+        },
+
+        async commit() {
+            await conn.commit();
+            stats.commits++;
+            sinceCommit = 0;
+        },
+
+        async finish() {
+            try {
+                if (sinceCommit > 0) {
+                    await conn.commit();
+                    stats.commits++;
+                }
+                log(`Bulk load into ${tableName} finished: ${stats.inserted} rows, ${stats.failed} rejected, ${stats.commits} commits`);
+                metrics.recordTransfer('import', {}, stats.inserted, Date.now() - opened);
+            } finally {
+                await release();
+            }
+            return stats;
+        },
+
+        // Rolls back rows since the last commit interval and releases the connection
+        async abort() {
+            try { await conn.rollback(); } catch (e) { log("Bulk loader rollback error: " + e.message); }
+            await release();
+            return stats;
+        }
+    };
+}
+
+/**
+ * Result columns ({ name, dbTypeName }) of a query without executing it: one parse round trip,
+ * cached per SQL text like the other dictionary lookups.
+ */
+async function describeQuery(sql, connectionParams = null) {
+    const key = crypto.createHash('sha1').update(sql).digest('hex');
+    return cachedMetadata(connectionParams, 'query', key, async () => {
+        let conn;
+        try {
+            conn = await getConnection(connectionParams);
+            const info = await conn.getStatementInfo(sql);
+            return (info.metaData || []).map(m => ({ name: m.name, dbTypeName: m.dbTypeName }));
+        } finally {
+            if (conn) await conn.close();
+        }
+    });
+}
+
+/**
+ * Runs sql through a result set and hands the rows to onFrame as encoded frames
+ * (see utils/resultStream): meta first, then one frame per chunk, then end. Only one chunk is
+ * held in memory; onFrame's promise is awaited, so a slow client slows the fetch down.
+ * options: { format: 'ndjson' | 'columnar', chunkRows, maxRows (0 = all), execution }
+ */
+async function streamQuery(sql, params = [], options = {}, connectionParams = null, onFrame) {
+    const format = options.format === 'columnar' ? 'columnar' : 'ndjson';
+    const chunkRows = Math.min(Math.max(Number(options.chunkRows) || 2000, 100), 10000);
+    const maxRows = Number(options.maxRows) || 0;
+    let conn;
+    try {
+        conn = await getTrackedConnection(connectionParams, options.execution);
+        const started = Date.now();
+        const stop = metrics.startTimer('db_execute_ms', { op: 'stream' });
+        const result = await conn.execute(sql, params, { resultSet: true, fetchArraySize: Math.min(chunkRows, 1000) });
+        stop();
+        if (!result.resultSet) {
+            if (DDL_PATTERN.test(sql)) invalidateMetadata(connectionParams);
+            await onFrame({ t: 'meta', format, metaData: [] });
+            await onFrame({ t: 'end', rows: 0, truncated: false, rowsAffected: result.rowsAffected });
+            return { rows: 0, truncated: false };
+        }
+
+        const encoder = createEncoder(format, result.metaData);
+        let sent = 0;
+        let truncated = false;
+        try {
+            await onFrame({ t: 'meta', format, metaData: result.metaData });
+            while (true) {
+                const want = maxRows ? Math.min(chunkRows, maxRows - sent) : chunkRows;
+                if (want <= 0) {
+                    truncated = (await result.resultSet.getRows(1)).length > 0;
+                    break;
+                }
+                const stopFetch = metrics.startTimer('db_fetch_ms', { op: 'stream' });
+                const rows = await result.resultSet.getRows(want);
+                stopFetch();
+                if (rows.length === 0) break;
+                sent += rows.length;
+                await onFrame(encoder.encode(rows));
+                if (rows.length < want) break;
+            }
+        } finally {
+            await result.resultSet.close();
+        }
+        await onFrame({ t: 'end', rows: sent, truncated });
+        recordStatement('stream', sql, params, Date.now() - started, sent);
+        return { rows: sent, truncated };
+    } finally {
+        if (conn) await releaseTracked(conn, options.execution);
+    }
+}
+
+async function getStream(sql, params = [], connectionParams = null, options = {}) {
     const conn = await getConnection(connectionParams);
     return {
-        stream: conn.queryStream(sql, params),
+        stream: conn.queryStream(sql, params, options),
         connection: conn
     };
 }
@@ -644,6 +1060,7 @@ async function dropTable(tableName, connectionParams = null) {
         conn = await getConnection(connectionParams);
         await conn.execute(`DROP TABLE "${tableName.toUpperCase()}"`);
         log(`Table ${tableName} dropped.`);
+        invalidateMetadata(connectionParams, tableName);
     } catch (err) {
         if (err.errorNum !== 942) {
             throw err;
@@ -653,10 +1070,10 @@ async function dropTable(tableName, connectionParams = null) {
     }
 }
 
-async function getExplainPlan(sql, params = [], connectionParams = null) {
+async function getExplainPlan(sql, params = [], connectionParams = null, options = {}) {
     let conn;
     try {
-        conn = await getConnection(connectionParams);
+        conn = await getTrackedConnection(connectionParams, options.execution);
 
         // 1. Generate unique statement ID
         const statementId = `EXP_${Date.now()}_${Math.floor(Math.random() * 1000)}`;
@@ -672,7 +1089,7 @@ async function getExplainPlan(sql, params = [], connectionParams = null) {
 
         const explainSql = `EXPLAIN PLAN SET STATEMENT_ID = '${statementId}' FOR ${sql}`;
         // We don't pass params to EXPLAIN PLAN itself, as it doesn't execute the query.
-        log(`[DB] Explaining Plan: ${statementId}`);
+        logger.debug(`Explaining Plan: ${statementId}`);
         await conn.execute(explainSql);
 
         // 3. Fetch the Plan
@@ -698,25 +1115,47 @@ async function getExplainPlan(sql, params = [], connectionParams = null) {
         }
         throw err;
     } finally {
-        if (conn) await conn.close();
+        if (conn) await releaseTracked(conn, options.execution);
     }
 }
 
+function getPoolStats() {
+    return pools.stats();
+}
+
+async function closeAllPools(drainSeconds) {
+    log('Closing connection pools...');
+    await pools.closeAll(drainSeconds);
+}
+
 module.exports = {
     checkConnection,
     getTables,
-    getColumns,
+    // Dictionary lookups (also used by aiService) are timed per function
+    getColumns: metrics.wrap('db_metadata_ms', { op: 'getColumns' }, getColumns),
     executeQuery,
     createTable,
     insertData,
+    openBulkLoader,
     checkTableExists,
     dropTable,
     getStream,
+    streamQuery,
     getConnection,
+    getTrackedConnection,
+    releaseTracked,
     execute,
     oracledb,
-    findObjects,
-    findTablesByColumn,
+    findObjects: metrics.wrap('db_metadata_ms', { op: 'findObjects' }, findObjects),
+    findTablesByColumn: metrics.wrap('db_metadata_ms', { op: 'findTablesByColumn' }, findTablesByColumn),
     getSchemaDictionary,
-    getExplainPlan
+    getSchemaDictionaryPayload,
+    getExplainPlan,
+    describeQuery,
+    getConnectionKey,
+    invalidateMetadata,
+    getMetadataCacheStats,
+    getPoolStats,
+    closeAllPools,
+    pools
 };
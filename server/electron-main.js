@@ -403,6 +403,8 @@ app.on('ready', async () => {
             console.log('Port 3001 is free. Starting internal server...');
             serverPort = 3001;
             await startServer(serverPort);
+            // Incremental snapshots of the data folder in the background
+            dataBackupService.startSchedule(app.getVersion());
         }
     } catch (err) {
         console.error("Failed to start/connect server:", err);
@@ -440,6 +442,18 @@ ipcMain.on('restart_app', async () => {
     autoUpdater.quitAndInstall();
 });
 
+ipcMain.handle('list-snapshots', async () => {
+    return dataBackupService.listSnapshots();
+});
+
+// Services hold their data in memory, so a restore over the data folder is followed by a relaunch
+ipcMain.handle('restore-snapshot', async (event, id) => {
+    log.info(`Restoring snapshot ${id}...`);
+    await dataBackupService.restoreSnapshot(id);
+    app.relaunch();
+    app.exit(0);
+});
+
 
 ipcMain.handle('get-server-port', () => {
     return serverPort;
@@ -13,6 +13,20 @@ const learningService = require('./services/learningService');
 const chatService = require('./services/chatService');
 // const docsChatService = require('./services/docsChatService');
 const knowledgeService = require('./services/knowledgeService');
+const cursorSessions = require('./services/cursorSessionService');
+const csvAnalysis = require('./services/csvAnalysisService');
+const exportService = require('./services/exportService');
+const bulkInsert = require('./services/bulkInsertService');
+const verifyService = require('./services/verifyService');
+const queryCache = require('./services/queryCacheService');
+const executions = require('./services/queryExecutionService');
+const { compileColumnFilter, applyColumnFilter } = require('./utils/columnFilter');
+const { compileChartQuery, toChartPoints } = require('./utils/chartQuery');
+const { ndjsonWriter } = require('./utils/resultStream');
+const { createLogger, flushAll: flushLogs } = require('./utils/logger');
+const { flushAll: flushStores } = require('./utils/jsonStore');
+const metrics = require('./services/metricsService');
+const llmCache = require('./services/llmCacheService');
 const { parseSigoSql } = require('./services/sigoSqlParser');
 const multer = require('multer');
 // const path = require('path'); // Already imported at top
@@ -27,13 +41,11 @@ const docService = require('./services/localDocService');
 // const setupDocs = require('./scripts/setupDocs'); // Deprecated for Local Storage
 
 const debugLogPath = path.join(os.tmpdir(), 'hap_debug.log');
+const bootLog = createLogger('Server', { file: debugLogPath });
 function debugLog(msg) {
-  try {
-    fs.appendFileSync(debugLogPath, new Date().toISOString() + ': ' + msg + '\n');
-  } catch (e) {
-    // ignore
-  }
+  bootLog.info(msg);
 }
+const apiLog = createLogger('API', { file: path.join(__dirname, 'server_log.txt') });
 
 debugLog('Starting server...');
 debugLog('Node version: ' + process.version);
@@ -81,6 +93,26 @@ app.use(cors());
 app.use(compression()); // Enable GZIP compression
 app.use(express.json({ limit: '50mb' })); // Increased limit for data import
 
+// Per-route latency (labelled by the matched route pattern, not the raw URL) and the time
+// res.json spends serializing, for /api requests
+app.use((req, res, next) => {
+  if (!req.path.startsWith('/api')) return next();
+  const routeOf = () => (req.route ? req.baseUrl + req.route.path : 'unmatched');
+  const stop = metrics.startTimer('http_request_ms', { method: req.method });
+  const json = res.json.bind(res);
+  res.json = (body) => {
+    const stopSerialize = metrics.startTimer('http_serialize_ms', { route: routeOf() });
+    const result = json(body);
+    stopSerialize();
+    return result;
+  };
+  res.once('finish', () => stop({ route: routeOf(), status: res.statusCode }));
+  res.once('close', () => {
+    if (!res.writableFinished) stop({ route: routeOf(), status: 'aborted' });
+  });
+  next();
+});
+
 // Disable caching for all routes
 app.use((req, res, next) => {
   res.set('Cache-Control', 'no-store, no-cache, must-revalidate, private');
@@ -279,7 +311,9 @@ app.post('/api/chat/login', async (req, res) => {
 
 app.get('/api/chat/history', async (req, res) => {
   try {
-    const { username } = req.query;
+    const { username, before, limit } = req.query;
+    // Paginated ({ messages, nextCursor }) when a page is asked for, the full list otherwise
+    if (before || limit) return res.json(await chatService.getHistoryPage(username, { before, limit }));
     const history = await chatService.getHistory(username);
     res.json(history);
   } catch (e) { res.status(500).json({ error: e.message }); }
@@ -565,17 +599,48 @@ app.get('/api/columns/:table', async (req, res) => {
 });
 
 // 3.1 Get Schema Dictionary (Tables & Columns)
+// ?format=compact groups tables by owner (no short-name duplicates); ?refresh=1 forces revalidation.
+// Clients send If-None-Match with the last ETag and get a 304 when nothing changed.
 app.get('/api/schema/dictionary', async (req, res) => {
   try {
     const dbParams = getDbParams(req);
-    const dictionary = await db.getSchemaDictionary(dbParams);
-    res.json(dictionary);
+    const format = req.query.format === 'compact' ? 'compact' : 'full';
+    const force = req.query.refresh === '1' || req.query.refresh === 'true';
+    const payload = await db.getSchemaDictionaryPayload(dbParams, format, { force });
+
+    res.set('Cache-Control', 'private, no-cache');
+    res.set('ETag', payload.etag);
+    if (req.headers['if-none-match'] === payload.etag) {
+      return res.status(304).end();
+    }
+    res.type('application/json').send(payload.body);
   } catch (err) {
     console.error("Schema Dictionary Error:", err);
     res.status(500).json({ error: err.message });
   }
 });
 
+// 3.2 Metadata / query result cache statistics / manual invalidation
+app.get('/api/cache/stats', (req, res) => {
+  res.json({ metadata: db.getMetadataCacheStats(), queries: queryCache.stats() });
+});
+
+// 3.3 Connection pool statistics (open / in use / queued / checkout wait per pool)
+app.get('/api/db/pools', (req, res) => {
+  res.json(db.getPoolStats());
+});
+
+app.post('/api/cache/invalidate', (req, res) => {
+  try {
+    const dbParams = getDbParams(req);
+    db.invalidateMetadata(dbParams, req.body.tableName || null);
+    queryCache.invalidate(db.getConnectionKey(dbParams));
+    res.json({ success: true });
+  } catch (err) {
+    res.status(500).json({ error: err.message });
+  }
+});
+
 // 4. Execute Query
 app.post('/api/export', async (req, res) => {
   // ... (Export logic is handled client-side now, but keeping this as backup/legacy)
@@ -701,10 +766,56 @@ app.post('/api/chat/ai/message', async (req, res) => {
   }
 });
 
+// Structured column filters from the grid headers, compiled to bind variables (see utils/columnFilter).
+// Column types come from describing the query once (cached), so NUMBER/DATE get typed operators.
+async function compileRequestFilter(sql, filter, dbParams) {
+  if (!filter || typeof filter !== 'object') return null;
+  if (!Object.values(filter).some(v => v !== null && v !== undefined && String(v).trim() !== '')) return null;
+  let metaData = null;
+  try {
+    metaData = await db.describeQuery(sql, dbParams);
+  } catch (e) {
+    console.warn('[API] Could not describe query for filter typing:', e.message);
+  }
+  return compileColumnFilter(filter, metaData);
+}
+
+// HTTP status for database errors: pool exhausted, call timeout, cancelled (client closed request)
+function dbErrorStatus(err) {
+  switch (err.code) {
+    case 'POOL_EXHAUSTED':
+    case 'POOL_LIMIT': return 503;
+    case 'QUERY_TIMEOUT': return 504;
+    case 'QUERY_CANCELLED': return 499;
+    case 'EXECUTION_ID_IN_USE': return 409;
+    default: return 500;
+  }
+}
+
+// Body: { sql, params, limit, offset, filter, cursor, sessionId, cacheTtl, executionId }
+// cacheTtl (seconds) serves SELECTs from the shared result cache; identical requests in flight
+// share one execution. Responses then carry Age and X-Cache (HIT | MISS | COALESCED) headers.
+// "Cache-Control: no-cache" on the request skips a cached entry. In cursor mode the first page
+// is cached without its sessionId: a hit returns no cursor and later pages use plain offsets.
+// Only DML/DDL sent through this endpoint invalidates cached results; anything else waits for the TTL.
 app.post('/api/query', async (req, res) => {
-  const { sql, params, limit, offset, filter } = req.body;
+  const { sql, params, limit, offset, filter, cursor, sessionId, cacheTtl } = req.body;
   const dbParams = getDbParams(req);
-  console.log('[API] /api/query called with SQL:', sql);
+
+  // Cursor mode: next page from an open server-side result set
+  if (sessionId) {
+    try {
+      const page = await cursorSessions.fetch(sessionId, limit, offset);
+      return res.json(page);
+    } catch (err) {
+      if (err.code === 'CURSOR_EXPIRED') return res.status(410).json({ error: err.message, code: err.code });
+      if (err.code === 'CURSOR_REWIND') return res.status(409).json({ error: err.message, code: err.code });
+      console.error('[API] /api/query cursor fetch failed:', err);
+      return res.status(500).json({ error: err.message });
+    }
+  }
+
+  apiLog.debug('/api/query called with SQL:', sql);
   try {
     let finalSql = sql;
 
@@ -714,31 +825,101 @@ app.post('/api/query', async (req, res) => {
     }
 
     // Support structured column filters from UI
-    if (filter && typeof filter === 'object') {
-      const whereClauses = [];
-      Object.entries(filter).forEach(([col, val]) => {
-        if (val && typeof val === 'string' && val.trim() !== '') {
-          // Sanitize column name (basic)
-          const safeCol = col.replace(/[^a-zA-Z0-9_]/g, '');
-          // Escape single quotes
-          const safeVal = val.replace(/'/g, "''");
-          whereClauses.push(`UPPER("${safeCol}") LIKE UPPER('%${safeVal}%')`);
-        }
-      });
+    const compiled = await compileRequestFilter(sql, filter, dbParams);
+    const filtered = applyColumnFilter(finalSql, params || [], compiled);
+    finalSql = filtered.sql;
+
+    const isQuery = /^\s*(\/\*[\s\S]*?\*\/\s*)*\(?\s*(SELECT|WITH)\b/i.test(sql);
+    const connectionKey = db.getConnectionKey(dbParams);
+    const useCache = isQuery && Number(cacheTtl) > 0;
+    const refresh = /no-cache/i.test(req.get('Cache-Control') || '');
+    const sendCached = ({ result, status, ageMs }) => {
+      apiLog.sample('query-cache', 10000, 'info', `Query cache ${status} (age ${Math.floor(ageMs / 1000)}s)`);
+      res.set('Age', String(Math.floor(ageMs / 1000)));
+      res.set('X-Cache', status);
+      res.set('Access-Control-Expose-Headers', 'Age, X-Cache, X-Execution-Id');
+      return res.json(result);
+    };
 
-      if (whereClauses.length > 0) {
-        finalSql = `SELECT * FROM(${sql}\n) WHERE ${whereClauses.join(' AND ')} `;
-      }
+    // Cursor mode: open a result set and keep it for the following pages
+    const tracked = { kind: 'query', sql, connectionParams: dbParams };
+    if (cursor && limit !== 'all' && !offset) {
+      const key = useCache ? queryCache.buildKey(connectionKey, finalSql, filtered.binds, { limit, cursor: true }) : null;
+      const cached = key && !refresh ? queryCache.lookup(key) : null;
+      if (cached) return sendCached(cached);
+
+      const page = await executions.runForRequest(req, res, tracked,
+        (execution) => cursorSessions.open(finalSql, filtered.binds, limit, dbParams, execution));
+      if (!key) return res.json(page);
+      const { sessionId: _session, ...firstPage } = page; // the cursor belongs to this caller
+      queryCache.store(key, firstPage, Number(cacheTtl) * 1000);
+      return sendCached({ result: page, status: 'MISS', ageMs: 0 });
     }
 
-    console.log(`[API] Executing query... (Limit: ${limit}, Offset: ${offset})`);
-    const result = await db.executeQuery(finalSql, params || [], limit, { offset }, dbParams);
-    console.log(`[API] Query executed. Rows: ${result.rows ? result.rows.length : 0}`);
+    if (useCache) {
+      const key = queryCache.buildKey(connectionKey, finalSql, filtered.binds, { limit, offset });
+      // Shared with coalesced requests, so a client leaving doesn't cancel it (call timeout still applies)
+      const cached = await queryCache.run(key, Number(cacheTtl) * 1000,
+        () => executions.run(tracked, (execution) => db.executeQuery(finalSql, filtered.binds, limit, { offset, execution }, dbParams)),
+        { refresh });
+      return sendCached(cached);
+    }
+
+    apiLog.debug(`Executing query... (Limit: ${limit}, Offset: ${offset})`);
+    const result = await executions.runForRequest(req, res, tracked,
+      (execution) => db.executeQuery(finalSql, filtered.binds, limit, { offset, execution }, dbParams));
+    apiLog.sample('query', 10000, 'info', `Query executed. Rows: ${result.rows ? result.rows.length : 0}`);
+
+    // DML/DDL may change what cached SELECTs would return
+    if (!isQuery) queryCache.invalidate(connectionKey);
 
     res.json(result);
   } catch (err) {
-    console.error('[API] /api/query failed:', err);
-    res.status(500).json({ error: err.message });
+    apiLog.error('/api/query failed:', err);
+    if (!res.headersSent) res.status(dbErrorStatus(err)).json({ error: err.message, code: err.code });
+  }
+});
+
+// Dashboard widgets: aggregated chart points computed in the database (see utils/chartQuery).
+// Body: { sql, params, dimension, measure, aggType, filter, topN, others, order, cacheTtl }
+// Returns { points: [{ name, value, others? }], groups }.
+const MAX_CHART_POINTS = 5000;
+app.post('/api/chart-data', async (req, res) => {
+  const { sql, cacheTtl } = req.body;
+  const dbParams = getDbParams(req);
+  if (!sql || !/^\s*(\/\*[\s\S]*?\*\/\s*)*\(?\s*(SELECT|WITH)\b/i.test(sql)) {
+    return res.status(400).json({ error: 'A origem do gráfico deve ser uma consulta SELECT.' });
+  }
+  try {
+    let metaData = null;
+    try {
+      metaData = await db.describeQuery(String(sql).trim().replace(/;\s*$/, ''), dbParams);
+    } catch (e) {
+      console.warn('[API] Could not describe chart source:', e.message);
+    }
+    const compiled = compileChartQuery(req.body, metaData);
+    const load = () => executions.run({ kind: 'chart', sql: compiled.sql, connectionParams: dbParams },
+      (execution) => db.executeQuery(compiled.sql, compiled.binds, MAX_CHART_POINTS, { execution }, dbParams));
+
+    let result;
+    if (Number(cacheTtl) > 0) {
+      const key = queryCache.buildKey(db.getConnectionKey(dbParams), compiled.sql, compiled.binds, { limit: MAX_CHART_POINTS });
+      const refresh = /no-cache/i.test(req.get('Cache-Control') || '');
+      const cached = await queryCache.run(key, Number(cacheTtl) * 1000, load, { refresh });
+      res.set('Age', String(Math.floor(cached.ageMs / 1000)));
+      res.set('X-Cache', cached.status);
+      res.set('Access-Control-Expose-Headers', 'Age, X-Cache');
+      result = cached.result;
+    } else {
+      result = await load();
+    }
+
+    const chart = toChartPoints(result.rows || []);
+    console.log(`[API] /api/chart-data: ${chart.points.length} points from ${chart.groups} groups`);
+    res.json(chart);
+  } catch (err) {
+    console.error('[API] /api/chart-data failed:', err);
+    res.status(dbErrorStatus(err)).json({ error: err.message, code: err.code });
   }
 });
 
@@ -747,11 +928,12 @@ app.post('/api/explain', async (req, res) => {
   const dbParams = getDbParams(req);
   console.log('[API] /api/explain called');
   try {
-    const planLines = await db.getExplainPlan(sql, params, dbParams);
+    const planLines = await executions.runForRequest(req, res, { kind: 'explain', sql, connectionParams: dbParams },
+      (execution) => db.getExplainPlan(sql, params, dbParams, { execution }));
     res.json({ lines: planLines });
   } catch (err) {
     console.error('[API] /api/explain failed:', err);
-    res.status(500).json({ error: err.message });
+    res.status(dbErrorStatus(err)).json({ error: err.message, code: err.code });
   }
 });
 
@@ -769,59 +951,131 @@ app.post('/api/verify-missing', async (req, res) => {
   try {
     console.log(`[API] /api/verify-missing called for ${tableName}.${columnName} with ${values.length} items.`);
 
-    // 1. Prepare unique list
-    const uniqueValues = [...new Set(values.map(v => String(v).trim()).filter(v => v !== ''))];
-    if (uniqueValues.length === 0) return res.json({ missingItems: [], count: 0 });
-
-    // 2. Build Efficient SQL (Tuple IN)
-    const col = columnName; // Expecting safe column name or sanitize if needed
-    let whereClause = '';
-
-    // Simple heuristic: treat as string unless proven otherwise. 
-    // For verify, usually used for ID lists or Codes which are strings or safe numbers.
-    // We will stick to string quoting to be safe, unless col is known number?
-    // Let's assume string for general robustness with 'Tuples'.
-
-    if (uniqueValues.length > 1000) {
-      const tuples = uniqueValues.map(v => `('${v.replace(/'/g, "''")}', '0')`).join(',');
-      whereClause = `(${col}, '0') IN (${tuples})`;
-    } else {
-      const quoted = uniqueValues.map(v => `'${v.replace(/'/g, "''")}'`).join(',');
-      whereClause = `${col} IN (${quoted})`;
-    }
+    // Anti-join in the database over bound chunks (see services/verifyService)
+    const missingItems = [];
+    const stats = await verifyService.verifyMissing(tableName, columnName, values, (batch) => {
+      missingItems.push(...batch);
+    }, dbParams);
 
-    const sql = `SELECT DISTINCT ${col} FROM ${tableName} WHERE ${whereClause}`;
-
-    // 3. Execute with High Limit
-    // We fetching "found" items to diff against "uniqueValues"
-    // Limit 1M is safe for Node server memory (1M strings is maybe 100MB RAM, feasible).
-    const limit = 1000000;
+    console.log(`[API] Verified ${stats.checked} values. Missing: ${stats.missing}`);
+    res.json({ missingItems, count: missingItems.length });
+  } catch (err) {
+    console.error('[API] /api/verify-missing failed:', err);
+    res.status(500).json({ error: err.message });
+  }
+});
 
-    // Not using db.executeQuery with offset, just raw execute if possible or reuse executeQuery with 'all'
-    // executeQuery handles formatting return, which is fine.
-    const result = await db.executeQuery(sql, [], limit, {}, dbParams);
+// Streaming variant for very large lists
+// POST /api/verify-missing/stream?tableName=..&columnName=.. with a text body, one value per line.
+// Responds with NDJSON: { missing: [...] } lines as chunks are checked, then { done, checked, count }.
+app.post('/api/verify-missing/stream', async (req, res) => {
+  const { tableName, columnName } = req.query;
+  const dbParams = getDbParams(req);
 
-    // 4. Calculate Difference
-    const foundSet = new Set(result.rows.map(r => String(r[0]))); // Ensure string comparison
-    const missingItems = uniqueValues.filter(val => !foundSet.has(val));
+  res.setHeader('Content-Type', 'application/x-ndjson');
+  const writeLine = ndjsonWriter(res);
 
-    console.log(`[API] Verified. Found: ${foundSet.size}, Missing: ${missingItems.length}`);
+  try {
+    const stats = await verifyService.verifyMissing(tableName, columnName, verifyService.lines(req), (batch) => writeLine({ missing: batch }), dbParams);
+    console.log(`[API] Verify stream for ${tableName}.${columnName}: ${stats.checked} checked, ${stats.missing} missing`);
+    await writeLine({ done: true, checked: stats.checked, count: stats.missing });
+    res.end();
+  } catch (err) {
+    console.error('[API] /api/verify-missing/stream failed:', err);
+    if (!res.headersSent) res.status(500);
+    res.end(JSON.stringify({ error: err.message }) + '\n');
+  }
+});
 
-    res.json({ missingItems, count: missingItems.length });
+// Streamed results for large grids: frames are written as the cursor is fetched, so the client
+// renders the first chunk while the rest is still arriving and the server holds one chunk at a time.
+// Body: { sql, params, filter, limit, format: 'ndjson' | 'columnar', chunkSize, compress, executionId }
+// Frame layout in utils/resultStream. compress: false opts out of gzip (fast local links).
+app.post('/api/query/stream', async (req, res) => {
+  const { sql, params, filter, limit, format, chunkSize, compress } = req.body;
+  const dbParams = getDbParams(req);
+  const writeFrame = ndjsonWriter(res);
+  try {
+    const compiled = await compileRequestFilter(sql, filter, dbParams);
+    const filtered = applyColumnFilter(sql, params || [], compiled);
+
+    res.setHeader('Content-Type', 'application/x-ndjson');
+    if (compress === false) res.setHeader('Cache-Control', 'no-transform');
+
+    const started = Date.now();
+    const stats = await executions.runForRequest(req, res, { kind: 'stream', sql, connectionParams: dbParams },
+      (execution) => db.streamQuery(filtered.sql, filtered.binds, {
+        format,
+        chunkRows: chunkSize,
+        maxRows: limit === 'all' ? 0 : (Number(limit) || 50000),
+        execution
+      }, dbParams, writeFrame));
+    console.log(`[API] /api/query/stream: ${stats.rows} rows (${format || 'ndjson'}) in ${Date.now() - started}ms`);
+    // DML/DDL may change what cached SELECTs would return
+    if (!/^\s*(\/\*[\s\S]*?\*\/\s*)*\(?\s*(SELECT|WITH)\b/i.test(sql)) queryCache.invalidate(db.getConnectionKey(dbParams));
+    res.end();
   } catch (err) {
-    console.error('[API] /api/verify-missing failed:', err);
-    res.status(500).json({ error: err.message });
+    console.error('[API] /api/query/stream failed:', err.message);
+    if (!res.headersSent) return res.status(dbErrorStatus(err)).json({ error: err.message, code: err.code });
+    if (!res.destroyed) res.end(JSON.stringify({ t: 'error', error: err.message, code: err.code }) + '\n');
   }
 });
 
 app.post('/api/query/count', async (req, res) => {
-  const { sql, params } = req.body;
+  const { sql, params, sessionId } = req.body;
   const dbParams = getDbParams(req);
   try {
+    // Reuse (or lazily start) the background count of an open cursor session
+    if (sessionId) {
+      const count = await cursorSessions.getCount(sessionId);
+      if (count !== null) return res.json({ count });
+      if (!sql) return res.status(410).json({ error: 'Sessão de consulta expirada.', code: 'CURSOR_EXPIRED' });
+    }
+
     const cleanSql = sql.trim().replace(/;$/, '');
     const countSql = `SELECT COUNT(*) FROM (${cleanSql}\n)`;
-    const result = await db.executeQuery(countSql, params || [], 1000, {}, dbParams);
+    const result = await executions.runForRequest(req, res, { kind: 'count', sql, connectionParams: dbParams },
+      (execution) => db.executeQuery(countSql, params || [], 1000, { execution }, dbParams));
     res.json({ count: result.rows[0][0] });
+  } catch (err) {
+    res.status(dbErrorStatus(err)).json({ error: err.message, code: err.code });
+  }
+});
+
+// Metrics: route/DB/Groq timings, import/export throughput, pool and execution gauges,
+// recent slow statements. ?format=prometheus (or Accept: text/plain) for the text format.
+metrics.registerCollector('pools', () => db.getPoolStats());
+metrics.registerCollector('executions', () => executions.stats());
+metrics.registerCollector('query_cache', () => queryCache.stats());
+metrics.registerCollector('metadata_cache', () => db.getMetadataCacheStats());
+metrics.registerCollector('cursors', () => cursorSessions.stats());
+metrics.registerCollector('llm_cache', () => llmCache.stats());
+metrics.registerCollector('chat_log', () => (chatService.messageLog ? chatService.messageLog.stats() : {}));
+
+app.get('/api/metrics', (req, res) => {
+  const wantsText = req.query.format === 'prometheus' || (!req.query.format && /text\/plain/.test(req.get('Accept') || ''));
+  if (wantsText) {
+    res.type('text/plain; version=0.0.4').send(metrics.toPrometheus());
+  } else {
+    res.json(metrics.snapshot());
+  }
+});
+
+// Running statements (SqlRunner queries, counts, explains) and cancellation.
+// Cancelling breaks the statement in the database and frees its pooled connection.
+app.get('/api/executions', (req, res) => {
+  res.json({ running: executions.list(), stats: executions.stats() });
+});
+
+app.post('/api/executions/:id/cancel', (req, res) => {
+  res.json({ success: executions.cancel(req.params.id) });
+});
+
+// Release a cursor session early (tab closed, new query run)
+app.delete('/api/query/session/:id', async (req, res) => {
+  try {
+    const closed = await cursorSessions.close(req.params.id);
+    res.json({ success: closed });
   } catch (err) {
     res.status(500).json({ error: err.message });
   }
@@ -863,84 +1117,119 @@ app.post('/api/upload/sql', upload.single('file'), async (req, res) => {
 });
 
 // Streaming CSV Export
+// Body: { sql, params, filter, gzip, job, parallel }. With `job: true` the export runs in the
+// background into a temp file (see /api/export/jobs) instead of streaming on this request.
 app.post('/api/export/csv', async (req, res) => {
-  const { sql, params, filter } = req.body;
-  let conn;
+  const { sql, params, filter, gzip, job, parallel } = req.body;
+  const dbParams = getDbParams(req);
   try {
-    let finalSql = sql;
-
     // Apply Server-side filtering (Same logic as /api/query)
-    if (filter && typeof filter === 'object') {
-      const whereClauses = [];
-      Object.entries(filter).forEach(([col, val]) => {
-        if (val && typeof val === 'string' && val.trim() !== '') {
-          const safeCol = col.replace(/[^a-zA-Z0-9_]/g, '');
-          const safeVal = val.replace(/'/g, "''");
-          whereClauses.push(`UPPER("${safeCol}") LIKE UPPER('%${safeVal}%')`);
-        }
+    const compiled = await compileRequestFilter(sql, filter, dbParams);
+
+    if (job) {
+      const descriptor = exportService.startJob(sql, params || [], {
+        filter: compiled,
+        gzip: !!gzip,
+        parallel,
+        connectionParams: dbParams
       });
-
-      if (whereClauses.length > 0) {
-        finalSql = `SELECT * FROM(${sql}\n) WHERE ${whereClauses.join(' AND ')} `;
-      }
+      return res.status(202).json(descriptor);
     }
 
-    const { stream, connection } = await db.getStream(finalSql, params || []);
-    conn = connection;
-
     const now = new Date();
     const ts = now.getFullYear() + '-' + String(now.getMonth() + 1).padStart(2, '0') + '-' + String(now.getDate()).padStart(2, '0') + '_' + String(now.getHours()).padStart(2, '0') + '-' + String(now.getMinutes()).padStart(2, '0') + '-' + String(now.getSeconds()).padStart(2, '0');
 
-    res.setHeader('Content-Type', 'text/csv');
-    res.setHeader('Content-Disposition', `attachment; filename = "exportacao_${ts}.csv"`);
-    res.write('\ufeff'); // BOM
-
-    stream.on('metadata', (meta) => {
-      const headers = meta.map(m => m.name).join(';') + '\n';
-      res.write(headers);
-    });
+    if (gzip) {
+      // Already compressed: the compression middleware skips application/gzip
+      res.setHeader('Content-Type', 'application/gzip');
+      res.setHeader('Content-Disposition', `attachment; filename = "exportacao_${ts}.csv.gz"`);
+    } else {
+      res.setHeader('Content-Type', 'text/csv');
+      res.setHeader('Content-Disposition', `attachment; filename = "exportacao_${ts}.csv"`);
+    }
 
-    stream.on('data', (row) => {
-      const csvRow = row.map(val => {
-        if (val === null || val === undefined) return '';
-        if (val instanceof Date) {
-          const d = val;
-          const day = String(d.getDate()).padStart(2, '0');
-          const month = String(d.getMonth() + 1).padStart(2, '0');
-          const year = d.getFullYear();
-          const hours = String(d.getHours()).padStart(2, '0');
-          const minutes = String(d.getMinutes()).padStart(2, '0');
-          const seconds = String(d.getSeconds()).padStart(2, '0');
-          if (hours === '00' && minutes === '00' && seconds === '00') return `${day}/${month}/${year}`;
-          return `${day}/${month}/${year} ${hours}:${minutes}:${seconds}`;
-        }
-        const str = String(val);
-        if (str.includes(';') || str.includes('"') || str.includes('\n')) {
-          return `"${str.replace(/"/g, '""')}"`;
-        }
-        return str;
-      }).join(';') + '\n';
-      res.write(csvRow);
+    const filtered = applyColumnFilter(sql, params || [], compiled);
+    const rows = await exportService.streamQueryToCsv(filtered.sql, filtered.binds, res, {
+      gzip: !!gzip,
+      bom: true,
+      connectionParams: dbParams
     });
+    console.log(`[Export] CSV stream finished: ${rows} rows`);
+  } catch (err) {
+    if (err.code === 'ERR_STREAM_PREMATURE_CLOSE') {
+      console.warn("[Export] Client disconnected, export aborted.");
+      return;
+    }
+    console.error("Export Error:", err);
+    if (!res.headersSent) res.status(500).json({ error: err.message });
+    else res.destroy(err);
+  }
+});
 
-    stream.on('end', () => {
-      res.end();
-      conn.close();
-    });
+// Streaming XLSX Export
+// Body: { sql, params, filter, job }. The workbook is written row by row on the server; with
+// `job: true` the client polls /api/export/jobs/:id for progress and then downloads or saves it.
+app.post('/api/export/xlsx', async (req, res) => {
+  const { sql, params, filter, job } = req.body;
+  const dbParams = getDbParams(req);
+  try {
+    const compiled = await compileRequestFilter(sql, filter, dbParams);
 
-    stream.on('error', (err) => {
-      console.error("Stream Error:", err);
-      if (!res.headersSent) res.status(500).send(err.message);
-      try { conn.close(); } catch (e) { }
-    });
+    if (job) {
+      const descriptor = exportService.startJob(sql, params || [], {
+        format: 'xlsx',
+        filter: compiled,
+        connectionParams: dbParams
+      });
+      return res.status(202).json(descriptor);
+    }
 
+    const filtered = applyColumnFilter(sql, params || [], compiled);
+    res.setHeader('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet');
+    res.setHeader('Content-Disposition', `attachment; filename = "exportacao_${Date.now()}.xlsx"`);
+    const result = await exportService.streamQueryToXlsx(filtered.sql, filtered.binds, res, { connectionParams: dbParams });
+    console.log(`[Export] XLSX stream finished: ${result.rows} rows${result.truncated ? ' (truncated at Excel limit)' : ''}`);
   } catch (err) {
-    console.error("Export Error:", err);
-    if (conn) try { await conn.close(); } catch (e) { }
+    if (err.code === 'ERR_STREAM_PREMATURE_CLOSE') {
+      console.warn("[Export] Client disconnected, export aborted.");
+      return;
+    }
+    console.error("XLSX Export Error:", err);
     if (!res.headersSent) res.status(500).json({ error: err.message });
+    else res.destroy(err);
   }
 });
 
+app.get('/api/export/jobs/:id', (req, res) => {
+  const job = exportService.getJob(req.params.id);
+  if (!job) return res.status(404).json({ error: 'Exportação não encontrada ou expirada.' });
+  res.json(exportService.describe(job));
+});
+
+app.get('/api/export/jobs/:id/download', (req, res) => {
+  const job = exportService.getJob(req.params.id);
+  if (!job) return res.status(404).json({ error: 'Exportação não encontrada ou expirada.' });
+  if (job.status !== 'done') return res.status(409).json({ error: `Exportação ainda não concluída (${job.status}).`, status: job.status });
+  res.download(job.filePath, job.fileName);
+});
+
+// Electron: copy the finished file to the path chosen in the save dialog
+app.post('/api/export/jobs/:id/save', async (req, res) => {
+  const { filePath } = req.body;
+  if (!filePath) return res.status(400).json({ error: 'filePath é obrigatório.' });
+  try {
+    const savedPath = await exportService.saveJobAs(req.params.id, filePath);
+    res.json({ success: true, filePath: savedPath });
+  } catch (err) {
+    res.status(400).json({ error: err.message });
+  }
+});
+
+app.delete('/api/export/jobs/:id', async (req, res) => {
+  const removed = await exportService.removeJob(req.params.id);
+  res.json({ success: removed });
+});
+
 // 5.1 Upload Attachment
 app.post('/api/upload/attachment', uploadAttachment.single('file'), (req, res) => {
   if (!req.file) {
@@ -981,16 +1270,34 @@ function detectDelimiter(filePath) {
   }
 }
 
+// Unusable files are the caller's problem (400); anything else is reported as is (500)
+function csvErrorStatus(err) {
+  return err.code === 'CSV_INVALID' ? 400 : 500;
+}
+
+// Shared response for the CSV analysis endpoints
+async function analyzeCsvFile(filePath, delimiter, originalName) {
+  const analysis = await csvAnalysis.analyze(filePath, delimiter);
+  console.log(`[CSV] Analyzed ${originalName}: ~${analysis.totalRows} rows, ${analysis.sampledRows} sampled in ${analysis.elapsedMs}ms${analysis.exact ? ' (full scan)' : ''}`);
+
+  return {
+    tableName: suggestTableName(originalName),
+    columns: analysis.columns,
+    preview: analysis.preview,
+    filePath: filePath, // Return path for full import
+    delimiter: delimiter,
+    totalEstimatedRows: analysis.totalRows,
+    sampledRows: analysis.sampledRows,
+    exactCount: analysis.exact
+  };
+}
+
 // 6. Upload CSV for Analysis (AI/Heuristic)
 app.post('/api/upload/csv', upload.single('file'), async (req, res) => {
   if (!req.file) {
     return res.status(400).json({ error: 'No file uploaded' });
   }
 
-  const results = [];
-  const headers = [];
-  let rowCount = 0;
-
   try {
     let delimiter = req.body.delimiter;
     if (!delimiter || delimiter === 'auto') {
@@ -1002,46 +1309,12 @@ app.post('/api/upload/csv', upload.single('file'), async (req, res) => {
 
     console.log(`Using delimiter: '${delimiter}' for file ${req.file.originalname}`);
 
-    fs.createReadStream(req.file.path)
-      .pipe(csv({ separator: delimiter }))
-      .on('headers', (headerList) => {
-        headerList.forEach(h => headers.push(h));
-      })
-      .on('data', (data) => {
-        if (rowCount < 100) { // Analyze first 100 rows for type inference
-          results.push(data);
-        }
-        rowCount++;
-      })
-      .on('end', () => {
-        // Analyze types and sanitize names
-        const suggestions = analyzeCsvStructure(headers, results);
-        const tableName = suggestTableName(req.file.originalname);
-
-        // DO NOT DELETE FILE HERE. We need it for the full import.
-        // File will be deleted after import or by OS temp cleanup.
-
-        res.json({
-          tableName,
-          columns: suggestions,
-          preview: results.slice(0, 5),
-          filePath: req.file.path, // Return path for full import
-          delimiter: delimiter,
-          totalEstimatedRows: rowCount // This is just what we read so far, but for full file we'd need to read all. 
-          // Actually, since we read the whole stream here to count? 
-          // No, we should probably stop reading if we just want preview? 
-          // But to count rows we need to read all. 
-          // For speed, let's just read all here? It might be slow for 100k rows.
-          // Let's just return what we have.
-        });
-      })
-      .on('error', (err) => {
-        console.error("CSV Parse Error:", err);
-        res.status(500).json({ error: "Failed to parse CSV file." });
-      });
+    // DO NOT DELETE FILE HERE. We need it for the full import.
+    // File will be deleted after import or by OS temp cleanup.
+    res.json(await analyzeCsvFile(req.file.path, delimiter, req.file.originalname));
   } catch (err) {
-    console.error("Upload Error:", err);
-    res.status(500).json({ error: err.message });
+    console.error("CSV Parse Error:", err);
+    res.status(csvErrorStatus(err)).json({ error: err.message, code: err.code });
   }
 });
 
@@ -1052,10 +1325,6 @@ app.post('/api/analyze-local-csv', async (req, res) => {
     return res.status(400).json({ error: 'No file path provided' });
   }
 
-  const results = [];
-  const headers = [];
-  let rowCount = 0;
-
   try {
     let delimiter = req.body.delimiter;
     if (!delimiter || delimiter === 'auto') {
@@ -1066,37 +1335,10 @@ app.post('/api/analyze-local-csv', async (req, res) => {
 
     console.log(`Analyzing local file: ${filePath} with delimiter: '${delimiter}'`);
 
-    fs.createReadStream(filePath)
-      .pipe(csv({ separator: delimiter }))
-      .on('headers', (headerList) => {
-        headerList.forEach(h => headers.push(h));
-      })
-      .on('data', (data) => {
-        if (rowCount < 100) {
-          results.push(data);
-        }
-        rowCount++;
-      })
-      .on('end', () => {
-        const suggestions = analyzeCsvStructure(headers, results);
-        const tableName = suggestTableName(path.basename(filePath));
-
-        res.json({
-          tableName,
-          columns: suggestions,
-          preview: results.slice(0, 5),
-          filePath: filePath,
-          delimiter: delimiter,
-          totalEstimatedRows: rowCount
-        });
-      })
-      .on('error', (err) => {
-        console.error("CSV Parse Error:", err);
-        res.status(500).json({ error: "Failed to parse CSV file." });
-      });
+    res.json(await analyzeCsvFile(filePath, delimiter, path.basename(filePath)));
   } catch (err) {
     console.error("Analyze Error:", err);
-    res.status(500).json({ error: err.message });
+    res.status(csvErrorStatus(err)).json({ error: err.message, code: err.code });
   }
 });
 
@@ -1114,14 +1356,43 @@ app.post('/api/check-table', async (req, res) => {
 // Global state for active import jobs
 const activeJobs = {};
 
+// Index/grant DDL for an imported table. Run after the data load so rows aren't
+// maintained index by index during the insert.
+function buildImportIndexSql(tableName, columns) {
+  const statements = [];
+  for (const col of columns) {
+    const shortTable = tableName.substring(0, 10);
+    const shortCol = col.name.substring(0, 10);
+    const rand = Math.floor(Math.random() * 1000);
+    const indexName = `IDX_${shortTable}_${shortCol}_${rand}`.toUpperCase().substring(0, 30);
+
+    if (col.type === 'DATE' || col.type === 'NUMBER') {
+      statements.push({ column: col.name, sql: `CREATE INDEX "${indexName}" ON "${tableName}" ("${col.name}")` });
+    } else if (col.type.startsWith('VARCHAR')) {
+      statements.push({ column: col.name, sql: `CREATE INDEX "${indexName}" ON "${tableName}" (UPPER("${col.name}"))` });
+    }
+  }
+  return statements;
+}
+
+function getImportGrantees(grantToUser) {
+  const defaultGrantees = ['RL_ADMINISTRACAO4', 'RL_PLANO_SAUDE4', 'HUMASTER'];
+  const usersToGrant = new Set(defaultGrantees);
+  if (grantToUser) usersToGrant.add(grantToUser.toUpperCase());
+  return usersToGrant;
+}
+
 // 8. Create Table & Import Data
 app.post('/api/create-table', async (req, res) => {
   const { tableName, columns, data, dropIfExists, grantToUser, filePath, delimiter, jobId } = req.body;
+  const batchSize = Number(req.body.batchSize) || 5000;
+  const commitEvery = Number(req.body.commitEvery) || Number(process.env.IMPORT_COMMIT_EVERY) || 50000;
 
   if (jobId) {
     activeJobs[jobId] = { progress: 0, status: 'Starting', cancelled: false, totalRows: 0, insertedRows: 0 };
   }
 
+  let loader = null;
   try {
     if (dropIfExists) {
       await db.dropTable(tableName);
@@ -1131,53 +1402,31 @@ app.post('/api/create-table', async (req, res) => {
     if (jobId) activeJobs[jobId].status = 'Criando tabela...';
     await db.createTable(tableName, columns);
 
-    // 2. CREATE INDICES (Moved before Data)
-    if (jobId) activeJobs[jobId].status = 'Criando índices...';
-    console.log(`Creating indices for table ${tableName}...`);
-
-    for (const col of columns) {
-      const shortTable = tableName.substring(0, 10);
-      const shortCol = col.name.substring(0, 10);
-      const rand = Math.floor(Math.random() * 1000);
-      const indexName = `IDX_${shortTable}_${shortCol}_${rand}`.toUpperCase().substring(0, 30);
-
-      try {
-        if (col.type === 'DATE') {
-          await db.executeQuery(`CREATE INDEX "${indexName}" ON "${tableName}" ("${col.name}")`);
-        } else if (col.type === 'NUMBER') {
-          await db.executeQuery(`CREATE INDEX "${indexName}" ON "${tableName}" ("${col.name}")`);
-        } else if (col.type.startsWith('VARCHAR')) {
-          await db.executeQuery(`CREATE INDEX "${indexName}" ON "${tableName}" (UPPER("${col.name}"))`);
-        }
-      } catch (idxErr) {
-        console.warn(`Failed to create index on ${col.name}:`, idxErr.message);
-      }
-    }
-
-    // 3. GRANT ACCESS (Moved before Data)
-    const defaultGrantees = ['RL_ADMINISTRACAO4', 'RL_PLANO_SAUDE4', 'HUMASTER'];
-    const usersToGrant = new Set(defaultGrantees);
-    if (grantToUser) usersToGrant.add(grantToUser.toUpperCase());
-
-    for (const user of usersToGrant) {
-      if (jobId) activeJobs[jobId].status = `Concedendo acesso a ${user}...`;
-      try {
-        await db.executeQuery(`GRANT ALL ON "${tableName}" TO "${user}"`); // Added quotes for safety
-      } catch (grantErr) {
-        console.warn(`Grant failed for ${user}:`, grantErr.message);
-      }
-    }
-
-    // 4. INSERT DATA (Moved to End)
+    // 2. INSERT DATA (single connection, one prepared INSERT, periodic commits)
     let totalInserted = 0;
     if (jobId) activeJobs[jobId].status = 'Inserindo dados...';
+    loader = await db.openBulkLoader(tableName, columns, { commitEvery });
 
     if (filePath) {
       // FULL IMPORT FROM FILE (STREAMING)
-      console.log(`Starting full streaming import from ${filePath} into ${tableName}`);
+      console.log(`Starting full streaming import from ${filePath} into ${tableName} (batch ${batchSize}, commit every ${commitEvery})`);
 
-      const batchSize = 2000;
       let batch = [];
+      // Pipelining: the previous executeMany binds while the next batch is being parsed
+      let pending = null;
+      let pendingError = null;
+      const flush = (rows) => {
+        pending = loader.insert(rows)
+          .then(stats => {
+            totalInserted = stats.inserted;
+            if (jobId) {
+              activeJobs[jobId].insertedRows = totalInserted;
+              activeJobs[jobId].status = `Inserindo dados... (${totalInserted} linhas)`;
+            }
+            if (stats.batches % 10 === 0) console.log(`Inserted ${totalInserted} rows...`);
+          })
+          .catch(err => { pendingError = err; });
+      };
 
       const stream = fs.createReadStream(filePath)
         .pipe(csv({ separator: delimiter || ';' }));
@@ -1187,6 +1436,9 @@ app.post('/api/create-table', async (req, res) => {
         if (jobId && activeJobs[jobId].cancelled) {
           console.log(`Job ${jobId} cancelled.`);
           stream.destroy();
+          if (pending) await pending;
+          await loader.abort();
+          loader = null;
           if (jobId) activeJobs[jobId].status = 'Cancelled';
           return res.json({ success: false, message: 'Importação cancelada pelo usuário.' });
         }
@@ -1194,24 +1446,20 @@ app.post('/api/create-table', async (req, res) => {
         batch.push(row);
 
         if (batch.length >= batchSize) {
-          await db.insertData(tableName, columns, batch);
-          totalInserted += batch.length;
+          if (pending) await pending;
+          if (pendingError) throw pendingError;
+          flush(batch);
           batch = [];
-
-          if (jobId) {
-            activeJobs[jobId].insertedRows = totalInserted;
-            activeJobs[jobId].status = `Inserindo dados... (${totalInserted} linhas)`;
-          }
-
-          if (totalInserted % 10000 === 0) console.log(`Inserted ${totalInserted} rows...`);
         }
       }
 
       // Insert remaining rows
+      if (pending) await pending;
+      if (pendingError) throw pendingError;
       if (batch.length > 0) {
-        await db.insertData(tableName, columns, batch);
-        totalInserted += batch.length;
-        if (jobId) activeJobs[jobId].insertedRows = totalInserted;
+        flush(batch);
+        await pending;
+        if (pendingError) throw pendingError;
       }
 
       console.log(`Finished import. Total rows: ${totalInserted}`);
@@ -1223,10 +1471,38 @@ app.post('/api/create-table', async (req, res) => {
 
     } else if (data && data.length > 0) {
       // Legacy/Preview import
-      await db.insertData(tableName, columns, data);
-      totalInserted = data.length;
+      const stats = await loader.insert(data);
+      totalInserted = stats.inserted;
+    }
+
+    if (jobId) activeJobs[jobId].insertedRows = totalInserted;
+    await loader.commit();
+
+    // 3. CREATE INDICES (after the load)
+    if (jobId) activeJobs[jobId].status = 'Criando índices...';
+    console.log(`Creating indices for table ${tableName}...`);
+    for (const idx of buildImportIndexSql(tableName, columns)) {
+      if (jobId && activeJobs[jobId].cancelled) break;
+      try {
+        await loader.execute(idx.sql);
+      } catch (idxErr) {
+        console.warn(`Failed to create index on ${idx.column}:`, idxErr.message);
+      }
     }
 
+    // 4. GRANT ACCESS
+    for (const user of getImportGrantees(grantToUser)) {
+      if (jobId) activeJobs[jobId].status = `Concedendo acesso a ${user}...`;
+      try {
+        await loader.execute(`GRANT ALL ON "${tableName}" TO "${user}"`); // Added quotes for safety
+      } catch (grantErr) {
+        console.warn(`Grant failed for ${user}:`, grantErr.message);
+      }
+    }
+
+    await loader.finish();
+    loader = null;
+
     if (jobId) {
       activeJobs[jobId].status = 'Concluído';
       activeJobs[jobId].progress = 100;
@@ -1235,6 +1511,7 @@ app.post('/api/create-table', async (req, res) => {
     res.json({ success: true, message: `Tabela criada, ${totalInserted} linhas importadas e índices gerados.`, totalInserted: totalInserted });
   } catch (err) {
     console.error("Create Table Error:", err);
+    if (loader) await loader.abort();
     if (jobId) {
       activeJobs[jobId].status = 'Erro';
       activeJobs[jobId].error = err.message;
@@ -1279,6 +1556,49 @@ app.post('/api/cancel-import/:jobId', (req, res) => {
   }
 });
 
+// 8.3 Bulk Insert (client-side data, e.g. DataProcessor "export to table")
+// POST /api/bulk-insert { tableName, columns: [{ name, type }] } -> session
+// POST /api/bulk-insert/:id/rows  NDJSON body, one JSON array per row (repeat per chunk)
+// POST /api/bulk-insert/:id/finish -> commit; DELETE /api/bulk-insert/:id -> rollback
+app.post('/api/bulk-insert', async (req, res) => {
+  try {
+    const { tableName, columns, commitEvery } = req.body;
+    const session = await bulkInsert.open(tableName, columns, { commitEvery, connectionParams: getDbParams(req) });
+    res.json(session);
+  } catch (err) {
+    console.error("Bulk Insert Open Error:", err);
+    res.status(400).json({ error: err.message });
+  }
+});
+
+app.post('/api/bulk-insert/:id/rows', async (req, res) => {
+  try {
+    const session = await bulkInsert.appendNdjson(req.params.id, req);
+    res.json(session);
+  } catch (err) {
+    res.status(500).json({ error: err.message, session: bulkInsert.get(req.params.id) });
+  }
+});
+
+app.get('/api/bulk-insert/:id', (req, res) => {
+  const session = bulkInsert.get(req.params.id);
+  if (!session) return res.status(404).json({ error: 'Sessão de carga não encontrada.' });
+  res.json(session);
+});
+
+app.post('/api/bulk-insert/:id/finish', async (req, res) => {
+  try {
+    res.json(await bulkInsert.finish(req.params.id));
+  } catch (err) {
+    res.status(500).json({ error: err.message });
+  }
+});
+
+app.delete('/api/bulk-insert/:id', async (req, res) => {
+  const removed = await bulkInsert.abort(req.params.id);
+  res.json({ success: removed });
+});
+
 // AI Text Processing Endpoint
 app.post('/api/ai/text', async (req, res) => {
   try {
@@ -1322,66 +1642,6 @@ app.get('/api/ai/knowledge', (req, res) => {
   res.json(knowledgeService.knowledge);
 });
 
-function analyzeCsvStructure(headers, rows) {
-  const usedNames = new Set();
-
-  return headers.map(header => {
-    // 1. Sanitize & Truncate for Oracle (30 chars)
-    let cleanName = header
-      .normalize("NFD").replace(/[\u0300-\u036f]/g, "") // Remove accents
-      .replace(/[^a-zA-Z0-9]/g, "_") // Replace special chars with _
-      .toUpperCase();
-
-    // Ensure it starts with a letter (Oracle requirement for unquoted identifiers)
-    if (!/^[A-Z]/.test(cleanName)) {
-      cleanName = 'C_' + cleanName;
-    }
-
-    // Truncate to 28 chars to leave room for deduplication suffix
-    if (cleanName.length > 28) {
-      cleanName = cleanName.substring(0, 28);
-    }
-
-    // Deduplicate
-    let finalName = cleanName;
-    let counter = 1;
-    while (usedNames.has(finalName)) {
-      finalName = `${cleanName}_${counter}`;
-      counter++;
-    }
-    usedNames.add(finalName);
-
-    // 2. Type Inference
-    let isNumber = true;
-    let isDate = true;
-    let hasData = false;
-
-    for (const row of rows) {
-      const val = row[header];
-      if (!val || val.trim() === '') continue;
-      hasData = true;
-
-      // Check Number (allow commas/dots)
-      if (isNaN(Number(val.replace(',', '.')))) isNumber = false;
-
-      // Check Date (simple check)
-      if (isNaN(Date.parse(val))) isDate = false;
-    }
-
-    if (!hasData) isNumber = false; // Default to String if empty
-
-    let type = 'VARCHAR2(255)';
-    if (isNumber) type = 'NUMBER';
-    else if (isDate) type = 'DATE';
-
-    return {
-      name: finalName,
-      type: type,
-      originalName: header
-    };
-  });
-}
-
 function suggestTableName(filename) {
   // Remove extension and sanitize
   let name = filename.split('.').slice(0, -1).join('.');
@@ -1459,7 +1719,7 @@ app.get('/api/docs/search', async (req, res) => {
 
 app.get('/api/docs/search-index', async (req, res) => {
   try {
-    const nodes = await docService.getAllSearchableNodes();
+    const nodes = await docService.getSearchIndex(req.query.q);
     res.json(nodes);
   } catch (e) { res.status(500).json({ error: e.message }); }
 });
@@ -1736,6 +1996,27 @@ app.post('/api/ai/admin/config', async (req, res) => {
 });
 
 
+// Graceful shutdown: stop accepting requests, then let in-flight queries release their connections
+let shuttingDown = false;
+async function shutdown(signal) {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`[Server] ${signal} received, shutting down...`);
+  server.close();
+  try {
+    if (chatService.adapter && chatService.adapter.disconnect) await chatService.adapter.disconnect();
+    await db.closeAllPools(Number(process.env.DB_POOL_DRAIN_SECONDS) || 10);
+    await chatService.flush();
+    await flushStores();
+    await flushLogs();
+  } catch (e) {
+    console.error('[Server] Error during shutdown:', e);
+  }
+  process.exit(0);
+}
+process.once('SIGINT', () => shutdown('SIGINT'));
+process.once('SIGTERM', () => shutdown('SIGTERM'));
+
 // Start Server Function
 const startServer = (port) => {
   return new Promise((resolve, reject) => {
@@ -0,0 +1,133 @@
+const { EventEmitter } = require('events');
+
+// In-process stand-in for the networked adapters (activeBackend: 'memory').
+// Same interface as OracleAdapter/SupabaseAdapter with push delivery through a shared bus,
+// so several instances in one process behave like clients of the same room. Used to
+// exercise the chat fan-out offline; nothing is persisted.
+
+const ONLINE_WINDOW_MS = 30000;
+
+const bus = new EventEmitter();
+bus.setMaxListeners(0);
+
+const room = {
+    messages: [],
+    users: new Map(), // username -> { username, team, user_id, online_at }
+    nextId: 1
+};
+
+class LocalAdapter {
+    constructor(config = {}) {
+        this.config = config;
+        this.onMessageCallback = null;
+        this.onPresenceCallback = null;
+        this.onMessageUpdateCallback = null;
+        this.userId = 'user_' + Math.floor(Math.random() * 100000);
+        this.historyLimit = config.historyLimit || 1000;
+        this.listeners = null;
+    }
+
+    async connect() {
+        this.listeners = {
+            message: (msg) => { if (this.onMessageCallback) this.onMessageCallback(msg); },
+            update: (msg) => { if (this.onMessageUpdateCallback) this.onMessageUpdateCallback(msg); },
+            presence: (users) => { if (this.onPresenceCallback) this.onPresenceCallback(users); }
+        };
+        for (const [event, listener] of Object.entries(this.listeners)) bus.on(event, listener);
+        console.log('[LocalAdapter] Connected to in-memory room.');
+        return true;
+    }
+
+    async disconnect() {
+        if (!this.listeners) return;
+        for (const [event, listener] of Object.entries(this.listeners)) bus.off(event, listener);
+        this.listeners = null;
+        if (this.currentUsername && room.users.get(this.currentUsername)?.user_id === this.userId) {
+            room.users.delete(this.currentUsername);
+            this.publishPresence();
+        }
+    }
+
+    setMessageHandler(callback) {
+        this.onMessageCallback = callback;
+    }
+
+    setMessageUpdateHandler(callback) {
+        this.onMessageUpdateCallback = callback;
+    }
+
+    setPresenceHandler(callback) {
+        this.onPresenceCallback = callback;
+    }
+
+    async trackPresence(username, team) {
+        this.currentUsername = username;
+        room.users.set(username, {
+            username,
+            team: team || 'Geral',
+            user_id: this.userId,
+            online_at: new Date().toISOString()
+        });
+        this.publishPresence();
+    }
+
+    publishPresence() {
+        const cutoff = new Date(Date.now() - ONLINE_WINDOW_MS).toISOString();
+        for (const [name, user] of room.users) {
+            if (user.online_at < cutoff) room.users.delete(name);
+        }
+        bus.emit('presence', Array.from(room.users.values()));
+    }
+
+    async sendMessage(messageObject) {
+        if (!this.listeners) throw new Error("Not connected");
+        const msg = {
+            id: room.nextId++,
+            sender: messageObject.sender,
+            content: messageObject.content,
+            type: messageObject.type || 'TEXT',
+            recipient: messageObject.recipient || 'ALL',
+            metadata: messageObject.metadata || null,
+            timestamp: new Date().toISOString(),
+            read_at: null,
+            reactions: []
+        };
+        room.messages.push(msg);
+        if (room.messages.length > this.historyLimit) room.messages.shift();
+
+        // Refresh the sender's presence like a heartbeat would
+        const user = room.users.get(msg.sender);
+        if (user) user.online_at = msg.timestamp;
+
+        bus.emit('message', msg);
+        return true;
+    }
+
+    async getHistory(limit = 50) {
+        return room.messages.slice(-limit);
+    }
+
+    async markAsRead(messageIds) {
+        const timestamp = new Date().toISOString();
+        for (const msg of room.messages) {
+            if (messageIds.includes(msg.id) && !msg.read_at) {
+                msg.read_at = timestamp;
+                bus.emit('update', msg);
+            }
+        }
+    }
+
+    async addReaction(messageId, emoji, username) {
+        const msg = room.messages.find(m => m.id === messageId);
+        if (!msg || msg.reactions.some(r => r.user === username && r.emoji === emoji)) return;
+        msg.reactions.push({ emoji, user: username });
+        bus.emit('update', msg);
+    }
+
+    async cleanupOldMessages(daysToKeep) {
+        const cutoff = new Date(Date.now() - daysToKeep * 24 * 60 * 60 * 1000).toISOString();
+        room.messages = room.messages.filter(m => m.timestamp >= cutoff);
+    }
+}
+
+module.exports = LocalAdapter;
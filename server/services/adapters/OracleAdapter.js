@@ -1,5 +1,12 @@
 
 const oracledb = require('oracledb');
+const db = require('../../db');
+const AdaptivePoller = require('../../utils/adaptivePoller');
+
+const PRESENCE_INTERVAL_MS = 10000; // Heartbeat + online list
+const ONLINE_WINDOW_SECONDS = 30;
+const SUBSCRIPTION_NAME = 'hap_chat_messages';
+const POLL_MAX_MS = 3000; // Idle polling backs off to this: new messages still show up within ~3s
 
 class OracleAdapter {
     constructor(config) {
@@ -8,28 +15,28 @@ class OracleAdapter {
         this.onMessageCallback = null;
         this.onPresenceCallback = null;
         this.userId = 'user_' + Math.floor(Math.random() * 100000);
-        this.pollingInterval = null;
-        this.heartbeatInterval = null;
+        this.poller = null;
+        this.presenceInterval = null;
+        this.subscribed = false;
+        this.fetching = null;
+        this.fetchAgain = false;
         this.lastPollId = 0;
     }
 
     async connect() {
         console.log('[OracleAdapter] Connecting to ' + this.config.connectString);
         try {
-            this.pool = await oracledb.createPool({
-                user: this.config.user,
-                password: this.config.password,
-                connectString: this.config.connectString,
+            // Managed with the query pools (stats, shutdown) but pinned: the CQN subscription lives on it
+            this.poolKey = `chat:${this.config.user}_${this.config.connectString}`;
+            this.pool = await db.pools.getPool(this.poolKey, this.config, {
                 poolMin: 1,
                 poolMax: 4,
-                poolIncrement: 1
+                events: true, // Required for Continuous Query Notification
+                pinned: true
             });
 
             await this.ensureSchema();
-
-            // Start Polling (Messages + Presence)
-            this.startPolling();
-            this.startHeartbeat();
+            await this.startDelivery();
 
             return true;
         } catch (e) {
@@ -84,160 +91,214 @@ class OracleAdapter {
         }
     }
 
-    startPolling() {
-        this.pollingInterval = setInterval(async () => {
-            // Poll for Messages
-            await this.pollMessages();
-            // Poll for Online Users
-            await this.pollPresence();
-        }, 3000);
+    /**
+     * Push delivery through Continuous Query Notification (client-initiated, so no inbound
+     * port is needed). Without the CHANGE NOTIFICATION grant, or on older servers, falls back
+     * to polling with adaptive backoff. The presence cycle runs in both modes and doubles as
+     * a safety net: it reports MAX(ID), so a lost notification is picked up within one cycle.
+     */
+    async startDelivery() {
+        this.lastPollId = await this.getMaxMessageId();
+
+        try {
+            await this.subscribeChanges();
+            this.subscribed = true;
+            console.log('[OracleAdapter] Push delivery active (CQN).');
+        } catch (e) {
+            console.warn(`[OracleAdapter] CQN unavailable (${e.message}). Using adaptive polling.`);
+            this.startPolling();
+        }
+
+        this.presenceInterval = setInterval(() => this.syncPresence(), PRESENCE_INTERVAL_MS);
+        this.syncPresence();
     }
 
-    startHeartbeat() {
-        this.heartbeatInterval = setInterval(async () => {
-            await this.sendHeartbeat();
-        }, 10000); // Pulse every 10s
+    startPolling() {
+        if (this.poller) return;
+        this.poller = new AdaptivePoller(async () => (await this.fetchNewMessages()) > 0, {
+            minMs: 1000,
+            maxMs: POLL_MAX_MS,
+            name: 'OracleAdapter'
+        });
+        this.poller.start();
     }
 
-    async sendHeartbeat() {
-        if (!this.pool || !this.currentUsername) return;
+    async subscribeChanges() {
         let conn;
         try {
             conn = await this.pool.getConnection();
-            // Upsert Logic (Merge)
-            const sql = `
-                MERGE INTO HAP_CHAT_USERS target
-                USING (SELECT :1 AS username FROM dual) source
-                ON (target.USERNAME = source.username)
-                WHEN MATCHED THEN
-                    UPDATE SET LAST_SEEN = CURRENT_TIMESTAMP, TEAM = :2, USER_ID = :3
-                WHEN NOT MATCHED THEN
-                    INSERT (USERNAME, TEAM, LAST_SEEN, USER_ID) 
-                    VALUES (:1, :2, CURRENT_TIMESTAMP, :3)
-            `;
-            await conn.execute(sql, [this.currentUsername, this.currentTeam || 'Geral', this.userId], { autoCommit: true });
-        } catch (e) {
-            console.error('[OracleAdapter] Heartbeat fail:', e);
+            await conn.subscribe(SUBSCRIPTION_NAME, {
+                sql: 'SELECT ID FROM HAP_CHAT_MESSAGES',
+                clientInitiated: true,
+                callback: (message) => {
+                    if (message.type === oracledb.SUBSCR_EVENT_TYPE_DEREG) {
+                        console.warn('[OracleAdapter] CQN registration dropped. Switching to adaptive polling.');
+                        this.subscribed = false;
+                        this.startPolling();
+                        return;
+                    }
+                    this.requestFetch();
+                }
+            });
         } finally {
             if (conn) await conn.close();
         }
     }
 
-    async pollMessages() {
-        if (!this.pool || !this.onMessageCallback) return;
+    async getMaxMessageId() {
         let conn;
         try {
             conn = await this.pool.getConnection();
-            // Get messages newer than ID (assuming auto-inc ID implies time order effectively enough for polling app)
-            // Or use timestamp. Let's use ID for simplicity if we track lastPollId locally.
-            // On first connect, maybe fetch last 50?
-
-            let query = `SELECT ID, SENDER, CONTENT, MSG_TYPE, RECIPIENT, METADATA, CREATED_AT FROM HAP_CHAT_MESSAGES WHERE ID > :1 ORDER BY ID ASC`;
-
-            // If it's the very first poll, verify where we start. 
-            // Actually, simple logic: get max ID first time, then poll > max ID?
-            // For now, let's just get messages > lastPollId. 
-            // If lastPollId is 0, we might get ALL history. So we should limit.
-
-            if (this.lastPollId === 0) {
-                // First run: Get Max ID to start "now", or get recent 50 history?
-                // The "ChatService" requests history separately. Here we just want *new* incoming realtime events.
-                // So we should start from the checks.
-                const res = await conn.execute('SELECT MAX(ID) as LAST_ID FROM HAP_CHAT_MESSAGES');
-                this.lastPollId = res.rows[0].LAST_ID || 0;
-                return;
-            }
-
-            const result = await conn.execute(query, [this.lastPollId]);
-
-            if (result.rows && result.rows.length > 0) {
-                for (const row of result.rows) {
-                    // row: [ID, SENDER, CONTENT, TYPE, RECIP, META, TIME] (Array if not object mode)
-                    // We need to check execution options. Default is Array.
-                    // Let's assume default behavior check.
+            const res = await conn.execute('SELECT NVL(MAX(ID), 0) AS LAST_ID FROM HAP_CHAT_MESSAGES', [], { outFormat: oracledb.OUT_FORMAT_OBJECT });
+            return res.rows[0].LAST_ID;
+        } catch (e) {
+            console.error('[OracleAdapter] Max ID Error:', e);
+            return 0;
+        } finally {
+            if (conn) await conn.close();
+        }
+    }
 
-                    // To be safe, let's use outFormat: oracledb.OUT_FORMAT_OBJECT if possible, 
-                    // but standard 'execute' returns array by default.
+    // Coalesces notifications that arrive while a fetch is in flight into one extra fetch
+    requestFetch() {
+        if (this.poller) return this.poller.poke();
+        if (this.fetching) {
+            this.fetchAgain = true;
+            return;
+        }
+        this.fetching = this.fetchNewMessages().finally(() => {
+            this.fetching = null;
+            if (this.fetchAgain) {
+                this.fetchAgain = false;
+                this.requestFetch();
+            }
+        });
+    }
 
-                    // Let's stick to array index mapping for simplicity or modify execute.
+    /**
+     * Delivers messages with ID above the cursor. Returns how many were delivered.
+     */
+    async fetchNewMessages() {
+        if (!this.pool || !this.onMessageCallback) return 0;
+        let conn;
+        try {
+            conn = await this.pool.getConnection();
+            const result = await conn.execute(
+                `SELECT ID, SENDER, CONTENT, MSG_TYPE, RECIPIENT, METADATA, CREATED_AT FROM HAP_CHAT_MESSAGES WHERE ID > :1 ORDER BY ID ASC`,
+                [this.lastPollId],
+                {
+                    outFormat: oracledb.OUT_FORMAT_OBJECT,
+                    fetchInfo: { CONTENT: { type: oracledb.STRING }, METADATA: { type: oracledb.STRING } }
                 }
-            }
+            );
 
-            // Re-run with Object Output
-            const resultObj = await conn.execute(query, [this.lastPollId], { outFormat: oracledb.OUT_FORMAT_OBJECT });
-
-            if (resultObj.rows && resultObj.rows.length > 0) {
-                for (const row of resultObj.rows) {
-                    this.lastPollId = row.ID;
-
-                    // Notify Listener
-                    let metadata = null;
-                    if (row.METADATA) {
-                        try {
-                            // CLOB handling: if it's a huge CLOB, we might need manual read. 
-                            // But usually fetchAsString takes care if configured?
-                            // For small JSON, it returns string.
-                            // However, oracledb by default returns stream for CLOB unless fetchInfo is set.
-                            // Let's just assume string for now or use getData.
-                            if (row.METADATA.getData) metadata = await row.METADATA.getData(); // If streaming
-                            else metadata = row.METADATA;
-
-                            if (typeof metadata === 'string') metadata = JSON.parse(metadata);
-                        } catch (e) { }
-                    }
+            for (const row of result.rows) {
+                this.lastPollId = row.ID;
 
-                    // Content CLOB
-                    let content = row.CONTENT;
-                    // ... same CLOB logic check if necessary, assuming fetchAsString or string return for small content
-
-                    const msg = {
-                        id: row.ID,
-                        sender: row.SENDER,
-                        content: content,
-                        type: row.MSG_TYPE,
-                        recipient: row.RECIPIENT,
-                        metadata: metadata,
-                        timestamp: row.CREATED_AT
-                    };
-
-                    this.onMessageCallback(msg);
+                let metadata = null;
+                if (row.METADATA) {
+                    try { metadata = JSON.parse(row.METADATA); } catch (e) { }
                 }
-            }
 
+                this.onMessageCallback({
+                    id: row.ID,
+                    sender: row.SENDER,
+                    content: row.CONTENT,
+                    type: row.MSG_TYPE,
+                    recipient: row.RECIPIENT,
+                    metadata: metadata,
+                    timestamp: row.CREATED_AT
+                });
+            }
+            return result.rows.length;
         } catch (e) {
             console.error('[OracleAdapter] Poll Messages Error:', e);
+            return 0;
         } finally {
             if (conn) await conn.close();
         }
     }
 
-    async pollPresence() {
-        if (!this.pool || !this.onPresenceCallback) return;
+    /**
+     * One round trip per cycle: heartbeat MERGE, newest message ID and the online list
+     * (as a REF CURSOR) in a single PL/SQL block.
+     */
+    async syncPresence() {
+        if (!this.pool) return;
         let conn;
         try {
             conn = await this.pool.getConnection();
-            // Select users seen in last 30 seconds
             const result = await conn.execute(
-                `SELECT USERNAME, TEAM, USER_ID, LAST_SEEN FROM HAP_CHAT_USERS WHERE LAST_SEEN > SYSTIMESTAMP - INTERVAL '30' SECOND`,
-                [],
-                { outFormat: oracledb.OUT_FORMAT_OBJECT }
+                `BEGIN
+                    IF :username IS NOT NULL THEN
+                        MERGE INTO HAP_CHAT_USERS target
+                        USING (SELECT :username AS username FROM dual) source
+                        ON (target.USERNAME = source.username)
+                        WHEN MATCHED THEN
+                            UPDATE SET LAST_SEEN = CURRENT_TIMESTAMP, TEAM = :team, USER_ID = :userId
+                        WHEN NOT MATCHED THEN
+                            INSERT (USERNAME, TEAM, LAST_SEEN, USER_ID)
+                            VALUES (:username, :team, CURRENT_TIMESTAMP, :userId);
+                    END IF;
+                    SELECT NVL(MAX(ID), 0) INTO :maxId FROM HAP_CHAT_MESSAGES;
+                    OPEN :users FOR
+                        SELECT USERNAME, TEAM, USER_ID, LAST_SEEN FROM HAP_CHAT_USERS
+                        WHERE LAST_SEEN > SYSTIMESTAMP - NUMTODSINTERVAL(${ONLINE_WINDOW_SECONDS}, 'SECOND');
+                END;`,
+                {
+                    username: this.currentUsername || null,
+                    team: this.currentTeam || 'Geral',
+                    userId: this.userId,
+                    maxId: { dir: oracledb.BIND_OUT, type: oracledb.NUMBER },
+                    users: { dir: oracledb.BIND_OUT, type: oracledb.CURSOR }
+                },
+                { autoCommit: true, outFormat: oracledb.OUT_FORMAT_OBJECT }
             );
 
-            const onlineUsers = result.rows.map(r => ({
-                username: r.USERNAME,
-                team: r.TEAM,
-                user_id: r.USER_ID,
-                online_at: r.LAST_SEEN
-            }));
+            const cursor = result.outBinds.users;
+            const rows = await cursor.getRows();
+            await cursor.close();
+
+            if (result.outBinds.maxId > this.lastPollId) this.requestFetch();
 
-            this.onPresenceCallback(onlineUsers);
+            if (this.onPresenceCallback) {
+                this.onPresenceCallback(rows.map(r => ({
+                    username: r.USERNAME,
+                    team: r.TEAM,
+                    user_id: r.USER_ID,
+                    online_at: r.LAST_SEEN
+                })));
+            }
         } catch (e) {
-            console.error('[OracleAdapter] Poll Presence Error:', e);
+            console.error('[OracleAdapter] Presence Sync Error:', e);
         } finally {
             if (conn) await conn.close();
         }
     }
 
+    async disconnect() {
+        if (this.poller) this.poller.stop();
+        if (this.presenceInterval) clearInterval(this.presenceInterval);
+        this.poller = null;
+        this.presenceInterval = null;
+        if (!this.pool) return;
+
+        if (this.subscribed) {
+            let conn;
+            try {
+                conn = await this.pool.getConnection();
+                await conn.unsubscribe(SUBSCRIPTION_NAME);
+            } catch (e) {
+                console.warn('[OracleAdapter] Unsubscribe failed:', e.message);
+            } finally {
+                if (conn) await conn.close();
+            }
+            this.subscribed = false;
+        }
+        await db.pools.close(this.poolKey, 0);
+        this.pool = null;
+    }
+
     setMessageHandler(callback) {
         this.onMessageCallback = callback;
     }
@@ -249,7 +310,7 @@ class OracleAdapter {
     async trackPresence(username, team) {
         this.currentUsername = username;
         this.currentTeam = team;
-        await this.sendHeartbeat(); // Immediate pulse
+        await this.syncPresence(); // Immediate pulse
     }
 
     async sendMessage(messageObject) {
@@ -271,6 +332,8 @@ class OracleAdapter {
                 metaStr
             ], { autoCommit: true });
 
+            // Someone is talking: poll at full speed again (CQN mode is notified by the insert)
+            if (this.poller) this.poller.poke();
             return true;
         } catch (e) {
             console.error('[OracleAdapter] Send error:', e);
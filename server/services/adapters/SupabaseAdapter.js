@@ -1,5 +1,10 @@
 const { createClient } = require('@supabase/supabase-js');
 const WebSocket = require('ws'); // Force Node WebSocket
+const AdaptivePoller = require('../../utils/adaptivePoller');
+
+const PRESENCE_LOOKBACK_MS = 3 * 60 * 1000;
+// Idle polling backs off to this: new messages still show up within ~3s
+const POLL_MAX_MS = 3000;
 
 class SupabaseAdapter {
     constructor(config) {
@@ -8,10 +13,11 @@ class SupabaseAdapter {
         this.onMessageCallback = null;
         this.onPresenceCallback = null;
         this.onMessageUpdateCallback = null;
-        this.pollingInterval = null;
+        this.poller = null;
         // Backdate 1 minute to account for clock skew between client and Supabase server
         this.lastPollTime = new Date(Date.now() - 60000).toISOString();
         this.seenMessageIds = new Set();
+        this.recentSenders = null; // sender -> newest created_at, for polled presence (null until the first poll)
         this.userId = 'user_' + Math.floor(Math.random() * 100000); // Temporary ID
     }
 
@@ -82,7 +88,7 @@ class SupabaseAdapter {
 
                     if (status === 'SUBSCRIBED') {
                         this.trackPresence();
-                        if (this.pollingInterval) clearInterval(this.pollingInterval); // Stop polling if WS works
+                        this.stopPolling(); // Stop polling if WS works
                     } else if (status === 'TIMED_OUT' || status === 'CHANNEL_ERROR') {
                         console.warn(`[SupabaseAdapter] Realtime blocked (${status}). Switching to Polling Mode.`);
                         this.startPolling();
@@ -114,24 +120,39 @@ class SupabaseAdapter {
     }
 
     startPolling() {
-        if (this.pollingInterval) return;
-        console.log('[SupabaseAdapter] Starting Polling Fallback (3s interval)...');
-        // Initial Fetch
-        this.poll();
-        this.pollingInterval = setInterval(() => this.poll(), 3000);
+        if (this.poller) return;
+        console.log('[SupabaseAdapter] Starting Polling Fallback (adaptive 1s-3s)...');
+        // Polls fast while messages flow, backs off while the room is idle
+        this.poller = new AdaptivePoller(() => this.poll(), { minMs: 1000, maxMs: POLL_MAX_MS, name: 'SupabaseAdapter' });
+        this.poller.start();
+    }
+
+    stopPolling() {
+        if (this.poller) this.poller.stop();
+        this.poller = null;
+        this.recentSenders = null; // a later restart re-reads the whole presence window
     }
 
+    /**
+     * One REST round trip per cycle, incremental from the newest message seen (30s overlap for
+     * late commits and recent read receipts/reactions). The first cycle reaches back to the
+     * presence lookback; after that, recent senders are tracked in memory for the approximated
+     * presence list. Resolves true when anything changed.
+     */
     async poll() {
+        let changes = 0;
         // Poll for new messages with safety overlap
         try {
-            // Buffer: 30 seconds back from the last "max" time we saw
-            const fetchFrom = new Date(new Date(this.lastPollTime).getTime() - 30000).toISOString();
+            const lookback = new Date(Date.now() - PRESENCE_LOOKBACK_MS).toISOString();
+            let fetchFrom = new Date(new Date(this.lastPollTime).getTime() - 30000).toISOString();
+            if (!this.recentSenders && lookback < fetchFrom) fetchFrom = lookback;
 
             const { data, error } = await this.client
                 .from('messages')
                 .select('*')
                 .gt('created_at', fetchFrom)
                 .order('created_at', { ascending: true });
+            if (error) throw error;
 
             if (data && data.length > 0) {
                 let newCount = 0;
@@ -171,6 +192,7 @@ class SupabaseAdapter {
                                 read_at: msg.read_at,
                                 reactionsStr: currentReactionsStr
                             });
+                            changes++;
 
                             if (this.onMessageUpdateCallback) {
                                 // Normalize for Polling too
@@ -204,6 +226,7 @@ class SupabaseAdapter {
                     }
                 });
                 if (newCount > 0) console.log(`[SupabaseAdapter] Polled ${data.length} items, ${newCount} new.`);
+                changes += newCount;
 
                 // Keep Set/Map from growing infinitely
                 if (this.seenMessageIds.size > 1000) {
@@ -212,73 +235,74 @@ class SupabaseAdapter {
                 }
             }
 
-            // Approximate Presence from recent messages (last 10 mins)
-            this.pollPresence();
+            // Approximate Presence from who sent messages in the last 3 mins
+            if (data) {
+                if (!this.recentSenders) this.recentSenders = new Map();
+                data.forEach(msg => {
+                    const prev = this.recentSenders.get(msg.sender);
+                    if (!prev || msg.created_at > prev) this.recentSenders.set(msg.sender, msg.created_at);
+                });
+                const recent = [];
+                this.recentSenders.forEach((created_at, sender) => {
+                    if (created_at > lookback) recent.push({ sender, created_at });
+                    else this.recentSenders.delete(sender);
+                });
+                this.pollPresence(recent.sort((a, b) => (a.created_at < b.created_at ? 1 : -1)));
+            }
 
         } catch (e) {
             console.error('[SupabaseAdapter] Polling error:', e);
         }
+        return changes > 0;
     }
 
-    async pollPresence() {
-        // Fabricate "Online Users" list based on who has sent messages recently
+    pollPresence(data) {
+        // Fabricate "Online Users" list based on who has sent messages recently (newest first)
         // Since we can't see the real "Presence" state without WS.
-        try {
-            // FIX: Tighten window to 3 minutes to remove inactive "ghosts" quicker
-            const lookback = new Date(Date.now() - 3 * 60 * 1000).toISOString();
-            const { data } = await this.client
-                .from('messages')
-                .select('sender, created_at')
-                .gt('created_at', lookback)
-                .order('created_at', { ascending: false });
-
-            if (data) {
-                const seen = new Set();
-                const activeUsers = [];
-                // Add "Me" first? connect/trackPresence handles this.currentUsername
-                if (this.currentUsername) {
-                    seen.add(this.currentUsername);
-                    activeUsers.push({
-                        username: this.currentUsername,
-                        user_id: this.userId,
-                        online_at: new Date().toISOString(),
-                        team: 'Geral' // Can't know team from messages schema technically unless assuming
-                    });
-                }
+        const seen = new Set();
+        const activeUsers = [];
+        // Add "Me" first? connect/trackPresence handles this.currentUsername
+        if (this.currentUsername) {
+            seen.add(this.currentUsername);
+            activeUsers.push({
+                username: this.currentUsername,
+                user_id: this.userId,
+                online_at: new Date().toISOString(),
+                team: 'Geral' // Can't know team from messages schema technically unless assuming
+            });
+        }
 
-                data.forEach(msg => {
-                    if (!seen.has(msg.sender)) {
-                        seen.add(msg.sender);
-                        activeUsers.push({
-                            username: msg.sender,
-                            user_id: 'legacy_' + msg.sender, // Fake ID
-                            online_at: msg.created_at,
-                            team: 'Geral'
-                        });
-                    }
+        data.forEach(msg => {
+            if (!seen.has(msg.sender)) {
+                seen.add(msg.sender);
+                activeUsers.push({
+                    username: msg.sender,
+                    user_id: 'legacy_' + msg.sender, // Fake ID
+                    online_at: msg.created_at,
+                    team: 'Geral'
                 });
-
-                // Always inject "Rascunho" bot
-                if (!seen.has('Rascunho')) {
-                    activeUsers.push({
-                        username: 'Rascunho',
-                        team: 'Rascunho',
-                        user_id: 'bot_rascunho',
-                        online_at: new Date().toISOString()
-                    });
-                }
-
-                // Manually trigger callback with this fabricated list
-                // We fake the Structure matches what handlePresenceUpdate expects? 
-                // No, handlePresenceUpdate expects Supabase State format { key: [ user... ] }
-                // OR we just bypass handlePresenceUpdate and call the callback directly?
-                // handlePresenceUpdate parsers State. Let's call callback directly.
-                if (this.onPresenceCallback) {
-                    // console.log('[SupabaseAdapter] Polled Active Users:', activeUsers.length);
-                    this.onPresenceCallback(activeUsers);
-                }
             }
-        } catch (e) { }
+        });
+
+        // Always inject "Rascunho" bot
+        if (!seen.has('Rascunho')) {
+            activeUsers.push({
+                username: 'Rascunho',
+                team: 'Rascunho',
+                user_id: 'bot_rascunho',
+                online_at: new Date().toISOString()
+            });
+        }
+
+        // Manually trigger callback with this fabricated list
+        // We fake the Structure matches what handlePresenceUpdate expects? 
+        // No, handlePresenceUpdate expects Supabase State format { key: [ user... ] }
+        // OR we just bypass handlePresenceUpdate and call the callback directly?
+        // handlePresenceUpdate parsers State. Let's call callback directly.
+        if (this.onPresenceCallback) {
+            // console.log('[SupabaseAdapter] Polled Active Users:', activeUsers.length);
+            this.onPresenceCallback(activeUsers);
+        }
     }
 
     async trackPresence(username, team) {
@@ -328,7 +352,7 @@ class SupabaseAdapter {
     }
 
     async disconnect() {
-        if (this.pollingInterval) clearInterval(this.pollingInterval);
+        this.stopPolling();
         if (this.subscription) this.subscription.unsubscribe();
         // client.close() not needed/available really
     }
@@ -454,7 +478,8 @@ class SupabaseAdapter {
         // In Polling mode, connection is "slow".
         // Let's manually trigger it for self-echo if we are polling.
         // Manual echo removed to prevent duplication with index.js optimistic update
-        // if (this.pollingInterval) { ... }
+        // Polling mode: the room is active again, drop back to the fast interval
+        if (this.poller) this.poller.poke();
         return true;
     }
 
@@ -91,7 +91,7 @@ class AgentService {
 
         for (const w of words) {
             if (w.length > 3) {
-                const associations = neuralService.activate(w);
+                const associations = neuralService.activate(w, { limit: 3 });
                 if (associations.length > 0) {
                     context.push({ term: w, related: associations.map(a => a.id).slice(0, 3) });
                 }
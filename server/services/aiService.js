@@ -5,6 +5,40 @@ const knowledgeService = require('./knowledgeService');
 const neuralService = require('./neuralService');
 const agentService = require('./agentService');
 const chatService = require('./chatService'); // Imported for state management
+const metrics = require('./metricsService');
+const llmCache = require('./llmCacheService');
+const { selectSchemaContext, formatSchemaContext } = require('../utils/schemaContext');
+
+// Conversation turns sent back to the model with each chat message
+const MAX_HISTORY_MESSAGES = Number(process.env.AI_MAX_HISTORY_MESSAGES) || 12;
+const MAX_HISTORY_CHARS = 2000;
+// Schema sent when the selector finds no table in the prompt (formatted lines, whole tables only)
+const FALLBACK_SCHEMA_CONTEXT_CHARS = 6000;
+
+// Groq client whose chat completions are timed and token-counted (see metricsService)
+function createGroqClient(apiKey) {
+    const client = new Groq({ apiKey });
+    const completions = client.chat.completions;
+    const create = completions.create.bind(completions);
+    completions.create = async (body, options) => {
+        const labels = { model: (body && body.model) || 'unknown' };
+        const stop = metrics.startTimer('groq_request_ms', labels);
+        try {
+            const completion = await create(body, options);
+            stop({ status: 'ok' });
+            const usage = completion && completion.usage;
+            if (usage) {
+                metrics.increment('groq_prompt_tokens_total', labels, usage.prompt_tokens || 0);
+                metrics.increment('groq_completion_tokens_total', labels, usage.completion_tokens || 0);
+            }
+            return completion;
+        } catch (err) {
+            stop({ status: 'error' });
+            throw err;
+        }
+    };
+    return client;
+}
 
 class AiService {
 
@@ -14,7 +48,7 @@ class AiService {
         this.modelName = process.env.AI_MODEL || "llama-3.3-70b-versatile";
 
         if (this.apiKey) {
-            this.groq = new Groq({ apiKey: this.apiKey });
+            this.groq = createGroqClient(this.apiKey);
         } else {
             console.warn("GROQ_API_KEY not found. AI features disabled.");
         }
@@ -75,7 +109,7 @@ class AiService {
         if (config.groqApiKey && config.groqApiKey !== this.apiKey) {
             console.log(`[AiService] Updating API Key from config (Length: ${config.groqApiKey.length})...`);
             this.apiKey = config.groqApiKey;
-            this.groq = new Groq({ apiKey: this.apiKey });
+            this.groq = createGroqClient(this.apiKey);
             changed = true;
         }
 
@@ -852,7 +886,7 @@ class AiService {
 
         for (const w of words) {
             if (w.length > 3) {
-                const activation = neuralService.activate(w);
+                const activation = neuralService.activate(w, { minSignal: 0.4 });
                 for (const node of activation) {
                     if (!seen.has(node.id) && node.relevance > 0.4) {
                         activatedNodes.push(node);
@@ -1009,7 +1043,10 @@ class AiService {
         // --- 1.2 HANDLE CONTEXTUAL FILTERING (Phase 7 - Backend Injection) ---
         const messages = [
             { role: "system", content: systemPrompt + sessionContext },
-            ...history.map(h => ({ role: h.sender === 'user' ? 'user' : 'assistant', content: h.text })),
+            ...history.slice(-MAX_HISTORY_MESSAGES).map(h => ({
+                role: h.sender === 'user' ? 'user' : 'assistant',
+                content: String(h.text || '').substring(0, MAX_HISTORY_CHARS)
+            })),
             { role: "user", content: message }
         ];
 
@@ -1901,7 +1938,7 @@ class AiService {
         const userPrompt = `SQL Incorreto:\n\`\`\`sql\n${sql}\n\`\`\`\n\nErro:\n${error}`;
 
         try {
-            const completion = await this.groq.chat.completions.create({
+            const completion = await llmCache.complete(this.groq, {
                 messages: [{ role: "system", content: systemPrompt }, { role: "user", content: userPrompt }],
                 model: this.modelName,
                 temperature: 0.1
@@ -1924,7 +1961,7 @@ class AiService {
         3. Destaque tabelas e colunas importantes.`;
 
         try {
-            const completion = await this.groq.chat.completions.create({
+            const completion = await llmCache.complete(this.groq, {
                 messages: [{ role: "system", content: systemPrompt }, { role: "user", content: sql }],
                 model: this.modelName,
                 temperature: 0.3
@@ -1956,7 +1993,7 @@ class AiService {
         `;
 
         try {
-            const completion = await this.groq.chat.completions.create({
+            const completion = await llmCache.complete(this.groq, {
                 messages: [{ role: "system", content: systemPrompt }, { role: "user", content: sql }],
                 model: this.modelName,
                 temperature: 0.1
@@ -1970,7 +2007,17 @@ class AiService {
     async generateSql(userPrompt, schemaContext) {
         if (!this.groq) return { text: "⚠️ IA não configurada." };
 
-        const contextStr = schemaContext ? `\nContexto (Tabelas/Colunas):\n${JSON.stringify(schemaContext, null, 2)}` : "";
+        // Only the tables related to the request (and their join partners) go into the prompt
+        const hints = knowledgeService.search(userPrompt, 'all').map(k => k.target).filter(Boolean);
+        const relevant = selectSchemaContext(userPrompt, schemaContext, { hints });
+        if (schemaContext && relevant) {
+            console.log(`[AiService] Schema context: ${Object.keys(relevant).length} of ${Object.keys(schemaContext).length} tables`);
+        }
+        // Nothing matched the wording: keep the tables the user opened in the sidebar, capped
+        const tablesStr = relevant
+            ? formatSchemaContext(relevant)
+            : formatSchemaContext(schemaContext, { maxChars: FALLBACK_SCHEMA_CONTEXT_CHARS });
+        const contextStr = tablesStr ? `\nContexto (Tabelas: Colunas):\n${tablesStr}` : "";
 
         const systemPrompt = `Você é um Gerador de SQL Oracle.
         Gere uma query SQL baseada no pedido.
@@ -1984,7 +2031,7 @@ class AiService {
         5. Se não souber a resposta, retorne apenas um comentário SQL: -- Não consegui gerar a query para isso.`;
 
         try {
-            const completion = await this.groq.chat.completions.create({
+            const completion = await llmCache.complete(this.groq, {
                 messages: [{ role: "system", content: systemPrompt }, { role: "user", content: userPrompt }],
                 model: this.modelName,
                 temperature: 0.2
@@ -2010,7 +2057,16 @@ class AiService {
                 contextText += `=== DOCUMENTO ABERTO (Foco Principal) ===\n[Título: ${currentContext.title}]\nConteúdo: ${currentContext.content.substring(0, 50000)}\n\n`;
             }
 
-            // ... (existing RAG logic)
+            // 2. Global Search Results (ranked by the docs inverted index)
+            if (relevantNodes.length > 0) {
+                contextText += `=== OUTROS DOCUMENTOS RELACIONADOS ===\n` + relevantNodes.map(n =>
+                    `[Título: ${n.NM_TITLE}]\nConteúdo: ${n.SNIPPET.substring(0, 3000)}...`
+                ).join("\n\n---\n\n");
+            }
+
+            if (!contextText) {
+                contextText = "Nenhum documento relevante encontrado.";
+            }
 
             // --- COMPLEMENTATION LOGIC ---
             // Detect special instruction from frontend
@@ -0,0 +1,161 @@
+const crypto = require('crypto');
+const readline = require('readline');
+const db = require('../db');
+
+// Chunked bulk inserts for client-side data (DataProcessor "export to table").
+// A load session holds one db.openBulkLoader connection: the INSERT is prepared once with
+// typed array binds, and each NDJSON chunk posted by the client (one JSON array per line)
+// goes through executeMany in batches of BATCH_SIZE. Abandoned sessions are rolled back.
+
+const BATCH_SIZE = 5000;
+const IDENTIFIER = /^[A-Za-z][A-Za-z0-9_$#]{0,127}$/;
+
+class BulkInsertService {
+    constructor() {
+        this.sessions = new Map();
+        this.idleTtlMs = Number(process.env.BULK_INSERT_IDLE_MS) || 10 * 60 * 1000;
+
+        this.reaper = setInterval(() => this.reap(), 60 * 1000);
+        if (this.reaper.unref) this.reaper.unref();
+    }
+
+    /**
+     * Opens a load session. columns: [{ name, type }] with the types used in the CREATE TABLE
+     * ('NUMBER', 'DATE', 'VARCHAR2(n)', ...), in the same order as the row arrays.
+     */
+    async open(tableName, columns, options = {}) {
+        if (!IDENTIFIER.test(tableName || '')) throw new Error(`Nome de tabela inválido: ${tableName}`);
+        if (!Array.isArray(columns) || columns.length === 0) throw new Error('Nenhuma coluna informada.');
+        for (const col of columns) {
+            if (!IDENTIFIER.test(col.name || '')) throw new Error(`Nome de coluna inválido: ${col.name}`);
+        }
+
+        const cols = columns.map(c => ({ name: c.name, type: String(c.type || 'VARCHAR2(4000)').toUpperCase() }));
+        const loader = await db.openBulkLoader(tableName, cols, { commitEvery: options.commitEvery }, options.connectionParams);
+
+        const session = {
+            id: crypto.randomUUID(),
+            tableName,
+            columns: cols,
+            loader,
+            status: 'open',
+            received: 0,
+            queue: Promise.resolve(),
+            lastActivity: Date.now()
+        };
+        this.sessions.set(session.id, session);
+        console.log(`[BulkInsert] Session ${session.id} opened for ${tableName} (${cols.length} columns)`);
+        return this.describe(session);
+    }
+
+    getSession(id) {
+        const session = this.sessions.get(id);
+        if (!session) throw new Error('Sessão de carga não encontrada ou expirada.');
+        return session;
+    }
+
+    describe(session) {
+        return {
+            id: session.id,
+            tableName: session.tableName,
+            status: session.status,
+            received: session.received,
+            inserted: session.loader.stats.inserted,
+            failed: session.loader.stats.failed,
+            error: session.error
+        };
+    }
+
+    get(id) {
+        const session = this.sessions.get(id);
+        return session ? this.describe(session) : null;
+    }
+
+    /**
+     * Reads NDJSON rows from a readable (the request) and inserts them. Chunks posted to the
+     * same session are serialized, so the client may pipeline its uploads.
+     */
+    appendNdjson(id, input) {
+        const session = this.getSession(id);
+        const run = session.queue.then(() => this.consume(session, input));
+        session.queue = run.catch(() => { });
+        return run;
+    }
+
+    async consume(session, input) {
+        if (session.status !== 'open') throw new Error(`Sessão de carga não está aberta (${session.status}).`);
+        session.lastActivity = Date.now();
+
+        const lines = readline.createInterface({ input, crlfDelay: Infinity });
+        let batch = [];
+        // Pipelining: the previous executeMany runs while the next batch is being parsed
+        let pending = null;
+        const flush = async () => {
+            if (pending) await pending;
+            pending = session.loader.insert(batch);
+            batch = [];
+        };
+
+        try {
+            for await (const line of lines) {
+                if (!line) continue;
+                const row = JSON.parse(line);
+                if (!Array.isArray(row)) throw new Error('Cada linha NDJSON deve ser um array de valores.');
+                batch.push(row);
+                session.received++;
+                if (batch.length >= BATCH_SIZE) await flush();
+            }
+            if (batch.length > 0) await flush();
+            if (pending) await pending;
+        } catch (err) {
+            if (pending) await pending.catch(() => { });
+            await this.fail(session, err);
+            throw err;
+        } finally {
+            session.lastActivity = Date.now();
+        }
+        return this.describe(session);
+    }
+
+    async finish(id) {
+        const session = this.getSession(id);
+        await session.queue;
+        if (session.status !== 'open') throw new Error(session.error || `Sessão de carga não está aberta (${session.status}).`);
+        await session.loader.finish();
+        session.status = 'finished';
+        this.sessions.delete(id);
+        console.log(`[BulkInsert] Session ${id} finished: ${session.loader.stats.inserted} rows into ${session.tableName}`);
+        return this.describe(session);
+    }
+
+    async abort(id) {
+        const session = this.sessions.get(id);
+        if (!session) return false;
+        this.sessions.delete(id);
+        if (session.status === 'open') {
+            session.status = 'aborted';
+            await session.loader.abort();
+        }
+        return true;
+    }
+
+    async fail(session, err) {
+        if (session.status !== 'open') return;
+        session.status = 'error';
+        session.error = err.message;
+        console.error(`[BulkInsert] Session ${session.id} failed:`, err.message);
+        await session.loader.abort();
+    }
+
+    reap() {
+        const now = Date.now();
+        for (const session of Array.from(this.sessions.values())) {
+            if (now - session.lastActivity > this.idleTtlMs) {
+                console.log(`[BulkInsert] Aborting idle session ${session.id}`);
+                this.abort(session.id);
+            }
+        }
+    }
+}
+
+module.exports = new BulkInsertService();
@@ -1,6 +1,10 @@
 const fs = require('fs');
 const path = require('path');
 const SupabaseAdapter = require('./adapters/SupabaseAdapter');
+const OracleAdapter = require('./adapters/OracleAdapter');
+const LocalAdapter = require('./adapters/LocalAdapter');
+const MessageLog = require('../utils/messageLog');
+const { JsonStore } = require('../utils/jsonStore');
 
 class ChatService {
     constructor() {
@@ -18,13 +22,14 @@ class ChatService {
         this.configPath = path.join(this.dbDir, 'config.json');
         this.usersFile = path.join(this.dbDir, 'users.json');
         this.onStatusCallback = null;
-        this.messagesFile = path.join(this.dbDir, 'messages.json');
+        this.messagesFile = path.join(this.dbDir, 'messages.json'); // legacy, migrated into messagesDir
+        this.messagesDir = path.join(this.dbDir, 'messages');
+        this.messageLog = null; // opened on first use, only without an adapter
+        this.stores = new Map(); // file -> JsonStore (users, dashboards, AI sessions)
         this.dashboardsFile = path.join(this.dbDir, 'dashboards.json');
         this.aiSessionsFile = path.join(this.dbDir, 'ai_sessions.json');
 
-        if (!fs.existsSync(this.aiSessionsFile)) fs.writeFileSync(this.aiSessionsFile, '[]', 'utf-8');
-
-        if (!fs.existsSync(this.usersFile)) fs.writeFileSync(this.usersFile, '[]', 'utf-8');
+        this.configStore = new JsonStore(this.configPath, { defaults: () => ({ activeBackend: 'local' }) });
 
         // Load & Migrate Configuration
         this.loadConfig();
@@ -51,12 +56,8 @@ class ChatService {
             }
 
             // 2. Load from APPDATA
-            if (fs.existsSync(this.configPath)) {
-                this.config = JSON.parse(fs.readFileSync(this.configPath, 'utf-8'));
-            } else {
-                console.warn("Chat config not found in APPDATA, defaulting to local/empty.");
-                this.config = { activeBackend: 'local' };
-            }
+            this.config = this.configStore.load();
+            if (!this.configStore.existed) console.warn("Chat config not found in APPDATA, defaulting to local/empty.");
         } catch (e) {
             console.error("Failed to load chat config:", e);
             this.config = { activeBackend: 'local' };
@@ -86,59 +87,50 @@ class ChatService {
 
     async initAdapter() {
         // Disconnect existing if any
-        if (this.adapter && this.adapter.pool) { // crude check for Oracle
-            try { await this.adapter.pool.close(); } catch (e) { }
+        if (this.adapter && this.adapter.disconnect) {
+            try { await this.adapter.disconnect(); } catch (e) { }
         }
-        if (this.adapter && this.adapter.client) { // crude check for Supabase
-            // Supabase cleanup if needed
+        this.adapter = null;
+
+        const adapters = {
+            supabase: { label: 'Supabase', create: () => new SupabaseAdapter(this.config.supabase) },
+            oracle: { label: 'Oracle', create: () => new OracleAdapter(this.config.oracle) },
+            memory: { label: 'Memory (offline)', create: () => new LocalAdapter(this.config.memory) }
+        };
+        const entry = adapters[this.config.activeBackend];
+        if (!entry) {
+            console.log("ChatService: Using Local File Backend (Legacy).");
+            return;
         }
 
-        if (this.config.activeBackend === 'supabase') {
-            this.adapter = new SupabaseAdapter(this.config.supabase);
-            const connected = await this.adapter.connect();
-            if (connected) {
-                console.log("ChatService: Connected to Supabase.");
-
-                // Set up listener for incoming messages
-                this.adapter.setMessageHandler((msg) => {
-                    this.broadcastToLocalClients(msg);
-                });
-
-                // Set up listener for message updates (Read Receipts)
-                if (this.adapter.setMessageUpdateHandler) {
-                    this.adapter.setMessageUpdateHandler((msg) => {
-                        if (this.io) this.io.emit('message_update', msg);
-                    });
-                }
+        const adapter = entry.create();
+        this.adapter = adapter;
+        const connected = await adapter.connect();
+        if (!connected) {
+            console.error(`ChatService: FAILED to connect to ${entry.label}. Check Adapter logs.`);
+            return;
+        }
+        console.log(`ChatService: Connected to ${entry.label}.`);
 
-                // Set up listener for presence (Online Users)
-                this.adapter.setPresenceHandler((onlineUsers) => {
-                    if (this.io) this.io.emit('update_user_list', onlineUsers);
-                });
+        // Adapters push; this is the single fan-out point to the socket.io clients
+        adapter.setMessageHandler((msg) => {
+            this.broadcastToLocalClients(msg);
+        });
 
-                if (this.onStatusCallback && this.adapter.setStatusHandler) {
-                    this.adapter.setStatusHandler(this.onStatusCallback);
-                }
+        // Message updates (Read Receipts, Reactions)
+        if (adapter.setMessageUpdateHandler) {
+            adapter.setMessageUpdateHandler((msg) => {
+                if (this.io) this.io.emit('message_update', msg);
+            });
+        }
 
-            } else {
-                console.error("ChatService: FAILED to connect to Supabase. Check Adapter logs.");
-            }
-        } else if (this.config.activeBackend === 'oracle') {
-            this.adapter = new OracleAdapter(this.config.oracle);
-            const connected = await this.adapter.connect();
-            if (connected) {
-                console.log("ChatService: Connected to Oracle.");
-
-                this.adapter.setMessageHandler((msg) => {
-                    this.broadcastToLocalClients(msg);
-                });
-
-                this.adapter.setPresenceHandler((onlineUsers) => {
-                    if (this.io) this.io.emit('update_user_list', onlineUsers);
-                });
-            }
-        } else {
-            console.log("ChatService: Using Local File Backend (Legacy).");
+        // Presence (Online Users)
+        adapter.setPresenceHandler((onlineUsers) => {
+            if (this.io) this.io.emit('update_user_list', onlineUsers);
+        });
+
+        if (this.onStatusCallback && adapter.setStatusHandler) {
+            adapter.setStatusHandler(this.onStatusCallback);
         }
     }
 
@@ -146,10 +138,8 @@ class ChatService {
         console.log(`ChatService: Switching backend to ${newBackend}`);
         this.config.activeBackend = newBackend;
 
-        // Persist change
-        try {
-            fs.writeFileSync(this.configPath, JSON.stringify(this.config, null, 2), 'utf-8');
-        } catch (e) { console.error("Failed to save config switch", e); }
+        // Persist change (written behind)
+        this.configStore.set(this.config);
 
         await this.initAdapter();
         return true;
@@ -165,17 +155,31 @@ class ChatService {
         }
     }
 
-    // Helper: Read JSON (for users)
+    // Local message store (no adapter): append-only log, loaded once
+    localMessages() {
+        if (!this.messageLog) this.messageLog = new MessageLog(this.messagesDir).open(this.messagesFile);
+        return this.messageLog;
+    }
+
+    flush() {
+        return this.messageLog ? this.messageLog.flush() : Promise.resolve();
+    }
+
+    // JSON lists (users, dashboards, AI sessions) live in memory once read; writes are
+    // debounced and atomic (utils/jsonStore)
+    storeFor(filePath) {
+        if (!this.stores.has(filePath)) this.stores.set(filePath, new JsonStore(filePath, { defaults: () => [] }));
+        return this.stores.get(filePath);
+    }
+
+    // Helper: Read JSON (for users). Returns the live list: mutate, then writeJSON.
     readJSON(filePath) {
-        try {
-            if (!fs.existsSync(filePath)) return [];
-            return JSON.parse(fs.readFileSync(filePath, 'utf-8'));
-        } catch (e) { return []; }
+        return this.storeFor(filePath).get();
     }
 
     // Helper: Write JSON (for users)
     writeJSON(filePath, data) {
-        try { fs.writeFileSync(filePath, JSON.stringify(data, null, 2), 'utf-8'); } catch (e) { }
+        this.storeFor(filePath).set(data);
     }
 
     // Auth Methods (Kept Local for Simplicity/Stability)
@@ -221,12 +225,8 @@ class ChatService {
         if (this.adapter) {
             await this.adapter.sendMessage(msg);
         } else {
-            // Local JSON Persistence
-            const messages = this.readJSON(this.messagesFile);
-            messages.push(msg);
-            // Limit history to 1000 messages
-            if (messages.length > 1000) messages.shift();
-            this.writeJSON(this.messagesFile, messages);
+            // Local log keeps the last 1000 messages
+            this.localMessages().append(msg);
 
             // Should we broadcast here? server/index.js handles socket.io broadcast.
             // But if we want consistent ID, we should return the msg object?
@@ -238,21 +238,20 @@ class ChatService {
     async getHistory(username) {
         if (this.adapter) {
             return await this.adapter.getHistory();
-        } else {
-            // Local JSON
-            // Filter: Public (ALL) or Private involving 'username'
-            const messages = this.readJSON(this.messagesFile);
-            if (!username || username === 'ALL') {
-                // Return last 50 global messages? 
-                // Current logic usually fetches ALL relevant.
-                return messages;
-            }
-            return messages.filter(m =>
-                m.recipient === 'ALL' ||
-                m.recipient === username ||
-                m.sender === username
-            );
         }
+        // Local: Public (ALL) or Private involving 'username'
+        return this.localMessages().history({ username }).messages;
+    }
+
+    /**
+     * Paginated history: { messages, nextCursor }. Pass nextCursor back as `before` for older
+     * messages. Adapters have no cursor, they return their latest `limit` messages.
+     */
+    async getHistoryPage(username, { before, limit = 50 } = {}) {
+        if (this.adapter) {
+            return { messages: await this.adapter.getHistory(limit), nextCursor: null };
+        }
+        return this.localMessages().history({ username, before, limit });
     }
 
     async markAsRead(messageIds) {
@@ -260,16 +259,7 @@ class ChatService {
         if (this.adapter && this.adapter.markAsRead) {
             await this.adapter.markAsRead(messageIds);
         } else {
-            // Local JSON
-            const messages = this.readJSON(this.messagesFile);
-            let updated = false;
-            messages.forEach(m => {
-                if (messageIds.includes(m.id) && !m.read_at) {
-                    m.read_at = timestamp;
-                    updated = true;
-                }
-            });
-            if (updated) this.writeJSON(this.messagesFile, messages);
+            this.localMessages().markAsRead(messageIds, timestamp);
         }
     }
 
@@ -279,26 +269,16 @@ class ChatService {
                 await this.adapter.addReaction(messageId, emoji, username);
             } catch (e) { }
         } else {
-            // Local JSON
-            const messages = this.readJSON(this.messagesFile);
-            const msg = messages.find(m => m.id === messageId);
-            if (msg) {
-                if (!msg.reactions) msg.reactions = [];
-                // Dedup
-                if (!msg.reactions.some(r => r.user === username && r.emoji === emoji)) {
-                    msg.reactions.push({ emoji, user: username });
-                    this.writeJSON(this.messagesFile, messages);
-
-                    // Broadcast reaction? index.js handles socket event but uses `addReaction` just for storage.
-                    // Ideally we emit here too? No, index.js listens to event provided by User.
-                }
-            }
+            // Dedup by (user, emoji). index.js handles the socket broadcast.
+            this.localMessages().addReaction(messageId, emoji, username);
         }
     }
 
     async cleanup(daysToKeep) {
         if (this.adapter && this.adapter.cleanupOldMessages) {
             await this.adapter.cleanupOldMessages(daysToKeep);
+        } else if (!this.adapter) {
+            await this.localMessages().setRetention({ maxAgeMs: daysToKeep * 24 * 60 * 60 * 1000 });
         }
     }
 
@@ -0,0 +1,48 @@
+const path = require('path');
+const { Worker } = require('worker_threads');
+const { analyzeCsv } = require('../workers/csvAnalysisWorker');
+
+const WORKER_FILE = path.join(__dirname, '../workers/csvAnalysisWorker.js');
+
+class CsvAnalysisService {
+    /**
+     * Analyzes a CSV file in a worker thread (line count, sampled column stats, suggested types).
+     * Falls back to running on the main thread if the worker cannot be started.
+     * @returns {Promise<{ headers, columns, preview, totalRows, sampledRows, exact }>}
+     */
+    analyze(filePath, delimiter, options = {}) {
+        const task = { task: 'analyzeCsv', filePath, delimiter, options };
+
+        return new Promise((resolve, reject) => {
+            let worker;
+            try {
+                worker = new Worker(WORKER_FILE, { workerData: task });
+            } catch (e) {
+                console.warn("[CsvAnalysis] Worker unavailable, analyzing inline:", e.message);
+                return analyzeCsv(task).then(resolve, reject);
+            }
+
+            let settled = false;
+            worker.once('message', (msg) => {
+                settled = true;
+                if (msg.ok) return resolve(msg.result);
+                const err = new Error(msg.error);
+                err.code = msg.code; // CSV_INVALID: the file itself is unusable (empty, no header)
+                reject(err);
+            });
+            worker.once('error', (err) => {
+                if (settled) return;
+                settled = true;
+                reject(err);
+            });
+            worker.once('exit', (code) => {
+                if (!settled) {
+                    settled = true;
+                    reject(new Error(`CSV analysis worker exited with code ${code}`));
+                }
+            });
+        });
+    }
+}
+
+module.exports = new CsvAnalysisService();
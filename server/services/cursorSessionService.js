@@ -0,0 +1,212 @@
+const crypto = require('crypto');
+const db = require('../db');
+const executions = require('./queryExecutionService');
+const metrics = require('./metricsService');
+
+// Server-side cursor sessions for paginated /api/query.
+// The first request opens a result set on a dedicated pooled connection; "next page" requests
+// fetch the following chunk from the open cursor instead of re-running the query with ROWNUM.
+// Session: { id, conn, resultSet, metaData, position, exhausted, lastUsed, queue, count, countPromise }
+
+class CursorSessionService {
+    constructor() {
+        this.sessions = new Map();
+        this.idleTimeoutMs = Number(process.env.CURSOR_IDLE_TIMEOUT_MS) || 2 * 60 * 1000;
+        // Each open cursor pins a pooled connection, so keep this well below poolMax
+        this.maxSessions = Number(process.env.CURSOR_MAX_SESSIONS) || 5;
+
+        this.reaper = setInterval(() => this.reap(), 30 * 1000);
+        if (this.reaper.unref) this.reaper.unref();
+    }
+
+    /**
+     * Executes the query with `resultSet: true` and returns the first page.
+     * Statements that produce no result set (DML/DDL) are returned as-is and no session is kept.
+     */
+    async open(sql, params = [], pageSize = 100, connectionParams = null, execution = null) {
+        pageSize = Number(pageSize) || 100;
+        await this.makeRoom();
+
+        // The execution (cancellable, call timeout) covers opening the cursor and the first page
+        const conn = await db.getTrackedConnection(connectionParams, execution);
+        let result;
+        const stop = metrics.startTimer('db_execute_ms', { op: 'cursor' });
+        try {
+            result = await conn.execute(sql, params, {
+                resultSet: true,
+                fetchArraySize: Math.min(Math.max(pageSize, 100), 1000)
+            });
+            stop();
+        } catch (err) {
+            try { await db.releaseTracked(conn, execution); } catch (e) { /* ignore */ }
+            throw err;
+        }
+
+        if (!result.resultSet) {
+            await db.releaseTracked(conn, execution);
+            return { metaData: result.metaData, rows: result.rows, rowsAffected: result.rowsAffected };
+        }
+
+        const session = {
+            id: crypto.randomUUID(),
+            conn,
+            resultSet: result.resultSet,
+            metaData: result.metaData,
+            sql,
+            params,
+            connectionParams,
+            position: 0,
+            exhausted: false,
+            lastUsed: Date.now(),
+            queue: Promise.resolve(),
+            count: null,
+            countPromise: null
+        };
+        this.sessions.set(session.id, session);
+        console.log(`[Cursor] Opened session ${session.id} (${this.sessions.size} active)`);
+
+        try {
+            return await this.fetch(session.id, pageSize);
+        } catch (err) {
+            // The caller never gets the sessionId: release the cursor and its connection now
+            await this.close(session.id);
+            throw err;
+        } finally {
+            if (execution) executions.detach(execution);
+        }
+    }
+
+    /**
+     * Fetches the next `pageSize` rows. If `offset` is ahead of the cursor the gap is skipped
+     * server-side; an offset behind the cursor cannot be served (cursors are forward-only).
+     */
+    async fetch(sessionId, pageSize = 100, offset = undefined) {
+        const session = this.sessions.get(sessionId);
+        if (!session) {
+            const err = new Error("Sessão de consulta expirada. Execute a consulta novamente.");
+            err.code = 'CURSOR_EXPIRED';
+            throw err;
+        }
+        pageSize = Number(pageSize) || 100;
+
+        // Serialize fetches on the same cursor
+        const run = session.queue.then(async () => {
+            session.lastUsed = Date.now();
+            const target = offset !== undefined && offset !== null ? Number(offset) : session.position;
+
+            if (target < session.position) {
+                const err = new Error(`Cursor já está na posição ${session.position}; não é possível voltar para ${target}.`);
+                err.code = 'CURSOR_REWIND';
+                throw err;
+            }
+
+            // Skip forward in bounded chunks
+            while (!session.exhausted && session.position < target) {
+                const skipped = await session.resultSet.getRows(Math.min(target - session.position, 1000));
+                session.position += skipped.length;
+                if (skipped.length === 0) session.exhausted = true;
+            }
+
+            const stopFetch = metrics.startTimer('db_fetch_ms', { op: 'cursor' });
+            const rows = session.exhausted ? [] : await session.resultSet.getRows(pageSize);
+            stopFetch();
+            metrics.increment('db_rows_returned_total', { op: 'cursor' }, rows.length);
+            session.position += rows.length;
+            if (rows.length < pageSize) session.exhausted = true;
+
+            const page = {
+                metaData: session.metaData,
+                rows,
+                sessionId: session.id,
+                position: session.position,
+                hasMore: !session.exhausted
+            };
+
+            if (session.exhausted) {
+                // Total is known for free once the cursor is drained
+                session.count = session.position;
+                page.count = session.count;
+                page.sessionId = null;
+                await this.close(session.id);
+            }
+            return page;
+        });
+
+        // Keep the chain alive after failures
+        session.queue = run.catch(() => { });
+        return run;
+    }
+
+    /**
+     * Total row count for a session, computed lazily on a separate connection the first time
+     * it is asked for. Resolves to null if the session is gone.
+     */
+    async getCount(sessionId) {
+        const session = this.sessions.get(sessionId);
+        if (!session) return null;
+        if (session.count !== null) return session.count;
+
+        if (!session.countPromise) {
+            const countSql = `SELECT COUNT(*) FROM (${session.sql}\n)`;
+            session.countPromise = db.executeQuery(countSql, session.params, 1, {}, session.connectionParams)
+                .then(result => {
+                    session.count = result.rows[0][0];
+                    return session.count;
+                })
+                .catch(err => {
+                    session.countPromise = null;
+                    throw err;
+                });
+        }
+        return session.countPromise;
+    }
+
+    async close(sessionId) {
+        const session = this.sessions.get(sessionId);
+        if (!session) return false;
+        this.sessions.delete(sessionId);
+
+        try { await session.resultSet.close(); } catch (e) { /* already closed */ }
+        try { await session.conn.close(); } catch (e) { console.error("[Cursor] Failed to release connection:", e.message); }
+        console.log(`[Cursor] Closed session ${sessionId} at row ${session.position} (${this.sessions.size} active)`);
+        return true;
+    }
+
+    // Evicts the least recently used session when the limit is reached
+    async makeRoom() {
+        if (this.sessions.size < this.maxSessions) return;
+        let oldest = null;
+        for (const session of this.sessions.values()) {
+            if (!oldest || session.lastUsed < oldest.lastUsed) oldest = session;
+        }
+        if (oldest) {
+            console.log(`[Cursor] Session limit reached, evicting ${oldest.id}`);
+            await oldest.queue;
+            await this.close(oldest.id);
+        }
+    }
+
+    reap() {
+        const now = Date.now();
+        for (const session of Array.from(this.sessions.values())) {
+            if (now - session.lastUsed > this.idleTimeoutMs) {
+                console.log(`[Cursor] Reaping idle session ${session.id}`);
+                session.queue.then(() => this.close(session.id));
+            }
+        }
+    }
+
+    async closeAll() {
+        await Promise.all(Array.from(this.sessions.keys()).map(id => this.close(id)));
+    }
+
+    stats() {
+        return {
+            active: this.sessions.size,
+            maxSessions: this.maxSessions,
+            idleTimeoutMs: this.idleTimeoutMs
+        };
+    }
+}
+
+module.exports = new CursorSessionService();
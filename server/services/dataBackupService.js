@@ -2,6 +2,24 @@ const fs = require('fs');
 const path = require('path');
 const archiver = require('archiver');
 const os = require('os');
+const { Worker } = require('worker_threads');
+const { TASKS } = require('../workers/snapshotWorker');
+const { flushAll: flushStores, closeAll: closeStores } = require('../utils/jsonStore');
+
+const WORKER_FILE = path.join(__dirname, '../workers/snapshotWorker.js');
+
+// Backups of the data directory. The default mode takes content-addressed snapshots (see
+// workers/snapshotWorker.js): only changed files are read and only new contents stored, with a
+// fast gzip level, in a worker thread. BACKUP_MODE=zip keeps the old full-archive behaviour.
+//   BACKUP_COMPRESSION_LEVEL  gzip/zip level (default 1)
+//   BACKUP_INTERVAL_MINUTES   background snapshot interval (default 60, 0 disables)
+//   BACKUP_THROTTLE_MBPS      read rate cap for background snapshots (default 16, 0 = none)
+//   BACKUP_KEEP_SNAPSHOTS     snapshots kept by pruning (default 24)
+const BACKUP_MODE = process.env.BACKUP_MODE || 'snapshot';
+const COMPRESSION_LEVEL = Number(process.env.BACKUP_COMPRESSION_LEVEL) || 1;
+const INTERVAL_MINUTES = process.env.BACKUP_INTERVAL_MINUTES !== undefined ? Number(process.env.BACKUP_INTERVAL_MINUTES) : 60;
+const THROTTLE_MBPS = process.env.BACKUP_THROTTLE_MBPS !== undefined ? Number(process.env.BACKUP_THROTTLE_MBPS) : 16;
+const KEEP_SNAPSHOTS = Number(process.env.BACKUP_KEEP_SNAPSHOTS) || 24;
 
 class DataBackupService {
     constructor() {
@@ -11,6 +29,11 @@ class DataBackupService {
 
         // Destination: Documents/HapBackups
         this.backupDir = path.join(os.homedir(), 'Documents', 'HapBackups');
+        this.snapshotDir = path.join(this.backupDir, 'snapshots');
+
+        // Snapshot tasks share the store, so they run one at a time
+        this.queue = Promise.resolve();
+        this.scheduleTimer = null;
 
         if (!fs.existsSync(this.backupDir)) {
             try {
@@ -21,11 +44,21 @@ class DataBackupService {
         }
     }
 
+    /**
+     * Backs up the data directory: a snapshot (default) or, with BACKUP_MODE=zip, a full zip.
+     * @returns {Promise<string>} Path to the snapshot manifest or the zip file.
+     */
+    async createBackup(version = 'unknown') {
+        if (BACKUP_MODE === 'zip') return this.createZipBackup(version);
+        const snapshot = await this.createSnapshot(version);
+        return snapshot ? path.join(this.snapshotDir, 'manifests', `${snapshot.id}.json`) : null;
+    }
+
     /**
      * Creates a zip backup of the entire data directory.
      * @returns {Promise<string>} Path to the created zip file.
      */
-    async createBackup(version = 'unknown') {
+    async createZipBackup(version = 'unknown') {
         return new Promise((resolve, reject) => {
             if (!fs.existsSync(this.sourceDir)) {
                 console.warn('[DataBackupService] Source directory does not exist. Skipping backup.');
@@ -38,7 +71,7 @@ class DataBackupService {
 
             const output = fs.createWriteStream(outputPath);
             const archive = archiver('zip', {
-                zlib: { level: 9 } // Sets the compression level.
+                zlib: { level: COMPRESSION_LEVEL } // Fast: the data is mostly small JSON/HTML
             });
 
             output.on('close', function () {
@@ -66,6 +99,145 @@ class DataBackupService {
             archive.finalize();
         });
     }
+
+    /**
+     * Runs a snapshot task in a worker thread (inline if the worker cannot be started),
+     * after the tasks already queued.
+     */
+    runTask(task) {
+        const run = () => new Promise((resolve, reject) => {
+            let worker;
+            try {
+                worker = new Worker(WORKER_FILE, { workerData: task });
+            } catch (e) {
+                console.warn('[DataBackupService] Worker unavailable, running inline:', e.message);
+                return TASKS[task.task](task).then(resolve, reject);
+            }
+
+            let settled = false;
+            worker.once('message', (msg) => {
+                settled = true;
+                if (msg.ok) resolve(msg.result);
+                else reject(new Error(msg.error));
+            });
+            worker.once('error', (err) => {
+                if (settled) return;
+                settled = true;
+                reject(err);
+            });
+            worker.once('exit', (code) => {
+                if (!settled) {
+                    settled = true;
+                    reject(new Error(`Snapshot worker exited with code ${code}`));
+                }
+            });
+        });
+        const result = this.queue.then(run);
+        this.queue = result.catch(() => { });
+        return result;
+    }
+
+    /**
+     * Snapshot summaries, newest first.
+     */
+    async listSnapshots() {
+        const dir = path.join(this.snapshotDir, 'manifests');
+        const names = await fs.promises.readdir(dir).catch(() => []);
+        const snapshots = [];
+        for (const name of names.filter(n => n.endsWith('.json'))) {
+            try {
+                const { id, version, createdAt, summary } = JSON.parse(await fs.promises.readFile(path.join(dir, name), 'utf-8'));
+                snapshots.push({ id, version, createdAt, ...summary });
+            } catch (e) {
+                console.warn(`[DataBackupService] Unreadable manifest ${name}:`, e.message);
+            }
+        }
+        return snapshots.sort((a, b) => (a.id < b.id ? 1 : -1));
+    }
+
+    /**
+     * Incremental snapshot of the data directory.
+     * @param {object} options { level, throttleBytesPerSec }
+     */
+    async createSnapshot(version = 'unknown', options = {}) {
+        if (!fs.existsSync(this.sourceDir)) {
+            console.warn('[DataBackupService] Source directory does not exist. Skipping backup.');
+            return null;
+        }
+        // Pending write-behind state goes to disk first
+        await flushStores();
+
+        const previous = (await this.listSnapshots())[0];
+        const result = await this.runTask({
+            task: 'createSnapshot',
+            sourceDir: this.sourceDir,
+            storeDir: this.snapshotDir,
+            id: new Date().toISOString().replace(/[:.]/g, '-'),
+            version,
+            previousId: previous ? previous.id : null,
+            level: options.level || COMPRESSION_LEVEL,
+            throttleBytesPerSec: options.throttleBytesPerSec || 0
+        });
+        console.log(`[DataBackupService] Snapshot ${result.id}: ${result.files} files, ${result.reused} unchanged, ${result.newBlobs} new blobs (${result.storedBytes} bytes) in ${result.elapsedMs}ms`);
+        return result;
+    }
+
+    /**
+     * Makes targetDir (default: the data directory) match snapshot `id`. Services keep their data
+     * in memory, so restoring over the live directory closes every write-behind writer (JSON
+     * stores, message log) first and needs an app restart to take effect.
+     */
+    async restoreSnapshot(id, options = {}) {
+        const manifest = path.join(this.snapshotDir, 'manifests', `${id}.json`);
+        if (!/^[\w.-]+$/.test(String(id)) || !fs.existsSync(manifest)) throw new Error(`Snapshot não encontrado: ${id}`);
+        const targetDir = options.targetDir || this.sourceDir;
+        // Nothing in memory may be written over the restored files, now or at exit
+        if (path.resolve(targetDir) === path.resolve(this.sourceDir)) await closeStores();
+        else await flushStores();
+        const result = await this.runTask({
+            task: 'restoreSnapshot',
+            storeDir: this.snapshotDir,
+            id,
+            targetDir,
+            throttleBytesPerSec: options.throttleBytesPerSec || 0
+        });
+        console.log(`[DataBackupService] Restored snapshot ${id}: ${result.files} files, ${result.removed} removed in ${result.elapsedMs}ms`);
+        return result;
+    }
+
+    /**
+     * Drops old snapshots and the blobs only they referenced.
+     * @param {object} options { keep, maxAgeDays }
+     */
+    async pruneSnapshots(options = {}) {
+        const result = await this.runTask({
+            task: 'pruneSnapshots',
+            storeDir: this.snapshotDir,
+            keep: options.keep || KEEP_SNAPSHOTS,
+            maxAgeDays: options.maxAgeDays || 0
+        });
+        if (result.removed > 0) console.log(`[DataBackupService] Pruned ${result.removed} snapshots, ${result.blobsRemoved} blobs (${result.bytesFreed} bytes)`);
+        return result;
+    }
+
+    /**
+     * Background snapshots every BACKUP_INTERVAL_MINUTES, throttled, followed by pruning.
+     */
+    startSchedule(version = 'unknown') {
+        if (this.scheduleTimer || BACKUP_MODE === 'zip' || !(INTERVAL_MINUTES > 0)) return;
+        const throttleBytesPerSec = THROTTLE_MBPS > 0 ? THROTTLE_MBPS * 1024 * 1024 : 0;
+        this.scheduleTimer = setInterval(() => {
+            this.createSnapshot(version, { throttleBytesPerSec })
+                .then(() => this.pruneSnapshots())
+                .catch(e => console.error('[DataBackupService] Scheduled snapshot failed:', e.message));
+        }, INTERVAL_MINUTES * 60 * 1000);
+        if (this.scheduleTimer.unref) this.scheduleTimer.unref();
+    }
+
+    stopSchedule() {
+        if (this.scheduleTimer) clearInterval(this.scheduleTimer);
+        this.scheduleTimer = null;
+    }
 }
 
 module.exports = new DataBackupService();
@@ -1,4 +1,8 @@
+const path = require('path');
 const db = require('../db');
+const { createLogger } = require('../utils/logger');
+
+const searchLog = createLogger('Search', { file: path.join(__dirname, '../search_debug.log') });
 
 class DocService {
 
@@ -28,13 +32,7 @@ class DocService {
 
     // --- SEARCH ---
     async searchNodes(query) {
-        const fs = require('fs');
-        const logPath = require('path').join(__dirname, '../search_debug.log');
-        const log = (m) => {
-            try { fs.appendFileSync(logPath, `[${new Date().toISOString()}] ${m}\n`); } catch (e) { }
-        };
-
-        log(`Incoming search query: "${query}"`);
+        searchLog.debug(`Incoming search query: "${query}"`);
 
         // Robust Search Strategy:
         // 1. Title: Standard LIKE with Upper case normalization
@@ -49,13 +47,13 @@ class DocService {
 
         try {
             const result = await db.executeQuery(sql, { q: query }, 50, { outFormat: db.oracledb.OUT_FORMAT_OBJECT });
-            log(`Query executed successfully. Rows found: ${result.rows.length}`);
+            searchLog.debug(`Query executed successfully. Rows found: ${result.rows.length}`);
             if (result.rows.length > 0) {
-                log(`First match: ${result.rows[0].NM_TITLE}`);
+                searchLog.debug(`First match: ${result.rows[0].NM_TITLE}`);
             }
             return result.rows;
         } catch (e) {
-            log(`FATAL SEARCH ERROR: ${e.message}`);
+            searchLog.error(`FATAL SEARCH ERROR: ${e.message}`);
             console.error(`[SEARCH] Error:`, e);
             throw e;
         }
@@ -0,0 +1,376 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const crypto = require('crypto');
+const zlib = require('zlib');
+const { Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const db = require('../db');
+const { MAX_ROWS, columnKind, XlsxSheetTransform, createXlsxArchive } = require('../utils/xlsxStream');
+const { applyColumnFilter } = require('../utils/columnFilter');
+const { EXTENTS_SQL, parseSplittableQuery, withRowidRange, splitTableName, groupExtents } = require('../utils/rowidSplit');
+const metrics = require('./metricsService');
+
+// Export pipelines for /api/export/csv and /api/export/xlsx.
+// Rows flow queryStream -> CsvTransform -> [gzip] (or sheet XML -> zip) -> response/file through
+// stream.pipeline, so a slow consumer pauses the Oracle stream instead of piling rows up in memory.
+// Export jobs write large results to a temp file (optionally splitting the query by ROWID ranges
+// across several pooled connections) and are downloaded once finished.
+
+const DELIMITER = ';';
+const FLUSH_BYTES = 64 * 1024;
+const PAD2 = Array.from({ length: 100 }, (_, i) => String(i).padStart(2, '0'));
+
+// DD/MM/YYYY, with HH:MI:SS only when the time part is not midnight
+function formatDate(d) {
+    if (isNaN(d.getTime())) return '';
+    const date = `${PAD2[d.getDate()]}/${PAD2[d.getMonth() + 1]}/${d.getFullYear()}`;
+    const h = d.getHours(), mi = d.getMinutes(), s = d.getSeconds();
+    if (h === 0 && mi === 0 && s === 0) return date;
+    return `${date} ${PAD2[h]}:${PAD2[mi]}:${PAD2[s]}`;
+}
+
+function quoteText(str) {
+    if (str.includes(DELIMITER) || str.includes('"') || str.includes('\n') || str.includes('\r')) {
+        return `"${str.replace(/"/g, '""')}"`;
+    }
+    return str;
+}
+
+const formatters = {
+    date: (val) => (val === null || val === undefined ? '' : formatDate(val)),
+    number: (val) => (val === null || val === undefined ? '' : String(val)),
+    text: (val) => (val === null || val === undefined ? '' : quoteText(String(val))),
+    any: (val) => {
+        if (val === null || val === undefined) return '';
+        if (val instanceof Date) return formatDate(val);
+        return quoteText(String(val));
+    }
+};
+
+/**
+ * Picks one formatter per column from the result metadata, so the per-cell work is a single call.
+ */
+function buildFormatters(metaData) {
+    return metaData.map(meta => formatters[columnKind(meta)]);
+}
+
+/**
+ * Object-mode rows in, CSV text out. Lines are buffered into ~64KB chunks before being pushed.
+ * Call setMetaData() before the first row (queryStream emits 'metadata' before 'data').
+ */
+class CsvTransform extends Transform {
+    constructor(options = {}) {
+        super({ writableObjectMode: true });
+        this.includeHeader = options.header !== false;
+        this.formatters = null;
+        this.buffered = '';
+        this.rows = 0;
+        if (options.bom) this.buffered = '\ufeff';
+    }
+
+    setMetaData(metaData) {
+        this.formatters = buildFormatters(metaData);
+        if (this.includeHeader) this.buffered += metaData.map(m => m.name).join(DELIMITER) + '\n';
+    }
+
+    _transform(row, encoding, callback) {
+        const fmt = this.formatters;
+        let line = '';
+        for (let i = 0; i < row.length; i++) {
+            if (i > 0) line += DELIMITER;
+            line += fmt ? fmt[i](row[i]) : formatters.any(row[i]);
+        }
+        this.buffered += line + '\n';
+        this.rows++;
+        if (this.buffered.length >= FLUSH_BYTES) {
+            this.push(this.buffered);
+            this.buffered = '';
+        }
+        callback();
+    }
+
+    _flush(callback) {
+        if (this.buffered) this.push(this.buffered);
+        this.buffered = '';
+        callback();
+    }
+}
+
+/**
+ * Streams a query result as CSV into `output` (HTTP response or file stream).
+ * Resolves with the number of rows written; the connection is always released.
+ */
+async function streamQueryToCsv(sql, params, output, options = {}) {
+    const started = Date.now();
+    const { stream, connection } = await db.getStream(sql, params || [], options.connectionParams, {
+        fetchArraySize: 1000
+    });
+    const csvStream = new CsvTransform({ header: options.header, bom: options.bom });
+    stream.once('metadata', (meta) => csvStream.setMetaData(meta));
+    if (options.onStream) options.onStream(stream, csvStream);
+
+    const stages = [stream, csvStream];
+    if (options.gzip) stages.push(zlib.createGzip());
+    stages.push(output);
+
+    try {
+        await pipeline(...stages);
+        metrics.recordTransfer('export', { format: 'csv' }, csvStream.rows, Date.now() - started);
+        return csvStream.rows;
+    } finally {
+        try { await connection.close(); } catch (e) { /* already released */ }
+    }
+}
+
+/**
+ * Streams a query result as a single-sheet XLSX into `output`. Memory stays flat: rows are
+ * serialized to sheet XML and deflated as they arrive.
+ * @returns {Promise<{ rows: number, truncated: boolean }>}
+ */
+async function streamQueryToXlsx(sql, params, output, options = {}) {
+    // One row past the Excel limit is enough to know the result was cut
+    const started = Date.now();
+    const limitedSql = `SELECT * FROM (${sql}\n) WHERE ROWNUM <= ${MAX_ROWS}`;
+    const { stream, connection } = await db.getStream(limitedSql, params || [], options.connectionParams, {
+        fetchArraySize: 1000
+    });
+    const sheet = new XlsxSheetTransform();
+    stream.once('metadata', (meta) => sheet.setMetaData(meta));
+    if (options.onStream) options.onStream(stream, sheet);
+    const archive = createXlsxArchive(sheet, { sheetName: options.sheetName });
+
+    try {
+        await Promise.all([pipeline(stream, sheet), pipeline(archive, output)]);
+        metrics.recordTransfer('export', { format: 'xlsx' }, sheet.rows, Date.now() - started);
+        return { rows: sheet.rows, truncated: sheet.truncated };
+    } catch (err) {
+        archive.abort();
+        throw err;
+    } finally {
+        try { await connection.close(); } catch (e) { /* already released */ }
+    }
+}
+
+class ExportService {
+    constructor() {
+        this.jobs = new Map();
+        this.exportDir = path.join(os.tmpdir(), 'hap_exports');
+        this.jobTtlMs = Number(process.env.EXPORT_JOB_TTL_MS) || 60 * 60 * 1000;
+        // Each part holds a pooled connection for the whole export (pool max is 10)
+        this.maxParallel = Number(process.env.EXPORT_MAX_PARALLEL) || 4;
+
+        this.reaper = setInterval(() => this.reap(), 10 * 60 * 1000);
+        if (this.reaper.unref) this.reaper.unref();
+    }
+
+    streamQueryToCsv(sql, params, output, options) {
+        return streamQueryToCsv(sql, params, output, options);
+    }
+
+    streamQueryToXlsx(sql, params, output, options) {
+        return streamQueryToXlsx(sql, params, output, options);
+    }
+
+    /**
+     * Starts a background export to a temp file and returns the job descriptor immediately.
+     * options: { format: 'csv' | 'xlsx', filter (compileColumnFilter result), gzip, parallel, connectionParams }
+     */
+    startJob(sql, params = [], options = {}) {
+        if (!fs.existsSync(this.exportDir)) fs.mkdirSync(this.exportDir, { recursive: true });
+
+        const id = crypto.randomUUID();
+        const format = options.format === 'xlsx' ? 'xlsx' : 'csv';
+        const ext = format === 'xlsx' ? 'xlsx' : (options.gzip ? 'csv.gz' : 'csv');
+        const job = {
+            id,
+            status: 'running',
+            format,
+            rows: 0,
+            truncated: false,
+            parts: 1,
+            gzip: format === 'csv' && !!options.gzip,
+            filePath: path.join(this.exportDir, `${id}.${ext}`),
+            fileName: `exportacao_${new Date().toISOString().slice(0, 19).replace(/[:T]/g, '-')}.${ext}`,
+            error: null,
+            startedAt: Date.now(),
+            finishedAt: null,
+            streams: new Set(),
+            counters: new Set(), // Transforms of the running parts, for live row counts
+            cancelled: false
+        };
+        this.jobs.set(id, job);
+
+        this.runJob(job, sql, params || [], options)
+            .then(() => {
+                job.status = 'done';
+                console.log(`[Export] Job ${id} finished: ${job.rows} rows in ${job.parts} part(s), ${Date.now() - job.startedAt}ms`);
+            })
+            .catch(err => {
+                job.status = job.cancelled ? 'cancelled' : 'error';
+                job.error = err.message;
+                if (!job.cancelled) console.error(`[Export] Job ${id} failed:`, err.message);
+                fs.promises.unlink(job.filePath).catch(() => { });
+            })
+            .finally(() => {
+                job.finishedAt = Date.now();
+                job.streams.clear();
+                job.counters.clear();
+            });
+
+        return this.describe(job);
+    }
+
+    async runJob(job, sql, params, options) {
+        const parallel = Math.min(Number(options.parallel) || 1, this.maxParallel);
+        const wrap = (text, binds) => applyColumnFilter(text, binds, options.filter);
+        const track = (stream, transform) => {
+            job.streams.add(stream);
+            job.counters.add(transform);
+        };
+
+        if (job.format === 'xlsx') {
+            const filtered = wrap(sql, params);
+            const result = await streamQueryToXlsx(filtered.sql, filtered.binds, fs.createWriteStream(job.filePath), {
+                connectionParams: options.connectionParams,
+                onStream: track
+            });
+            job.rows = result.rows;
+            job.truncated = result.truncated;
+            return;
+        }
+
+        const query = parallel > 1 ? parseSplittableQuery(sql) : null;
+        const ranges = query ? await this.getRowidRanges(query.table, parallel, options.connectionParams) : null;
+
+        if (!ranges || ranges.length < 2) {
+            const filtered = wrap(sql, params);
+            job.rows = await streamQueryToCsv(filtered.sql, filtered.binds, fs.createWriteStream(job.filePath), {
+                gzip: options.gzip,
+                bom: true,
+                connectionParams: options.connectionParams,
+                onStream: track
+            });
+            return;
+        }
+
+        // Each range goes to its own part file (no header), then parts are concatenated
+        job.parts = ranges.length;
+        const partPaths = ranges.map((_, i) => `${job.filePath}.part${i}`);
+        let metaData = null;
+        try {
+            const counts = await Promise.all(ranges.map((range, i) => {
+                const chunk = withRowidRange(query, params, range);
+                const filtered = wrap(chunk.sql, chunk.binds);
+                return streamQueryToCsv(filtered.sql, filtered.binds, fs.createWriteStream(partPaths[i]), {
+                    header: false,
+                    connectionParams: options.connectionParams,
+                    onStream: (stream, transform) => {
+                        track(stream, transform);
+                        stream.once('metadata', (meta) => { metaData = metaData || meta; });
+                    }
+                });
+            }));
+            job.rows = counts.reduce((a, b) => a + b, 0);
+
+            const header = '\ufeff' + (metaData ? metaData.map(m => m.name).join(DELIMITER) + '\n' : '');
+            await pipeline(
+                async function* () {
+                    yield header;
+                    for (const partPath of partPaths) {
+                        yield* fs.createReadStream(partPath);
+                    }
+                },
+                ...(options.gzip ? [zlib.createGzip()] : []),
+                fs.createWriteStream(job.filePath)
+            );
+        } finally {
+            await Promise.all(partPaths.map(p => fs.promises.unlink(p).catch(() => { })));
+        }
+    }
+
+    /**
+     * Splits the table into up to `parts` contiguous ROWID ranges of similar size, read from the
+     * extent map (no table scan). Returns null when the source has no extents of its own (views,
+     * synonyms, remote objects) or the dictionary can't be read.
+     */
+    async getRowidRanges(table, parts, connectionParams) {
+        try {
+            const result = await db.executeQuery(EXTENTS_SQL, splitTableName(table), 'all', {}, connectionParams);
+            if (!result.rows || result.rows.length === 0) return null;
+            return groupExtents(result.rows.map(r => ({ lo: r[0], hi: r[1], blocks: r[2] })), parts);
+        } catch (err) {
+            console.warn(`[Export] ROWID split unavailable for ${table}, exporting serially:`, err.message);
+            return null;
+        }
+    }
+
+    getJob(id) {
+        return this.jobs.get(id) || null;
+    }
+
+    describe(job) {
+        let rows = job.rows;
+        if (job.status === 'running') {
+            rows = 0;
+            for (const transform of job.counters) rows += transform.rows;
+        }
+        return {
+            id: job.id,
+            status: job.status,
+            format: job.format,
+            rows,
+            truncated: job.truncated,
+            parts: job.parts,
+            gzip: job.gzip,
+            fileName: job.fileName,
+            error: job.error,
+            startedAt: job.startedAt,
+            finishedAt: job.finishedAt
+        };
+    }
+
+    /**
+     * Copies a finished export to `destPath` (e.g. a path picked in the Electron save dialog),
+     * so the renderer only handles the path, never the file contents.
+     */
+    async saveJobAs(id, destPath) {
+        const job = this.jobs.get(id);
+        if (!job) throw new Error('Exportação não encontrada ou expirada.');
+        if (job.status !== 'done') throw new Error(`Exportação ainda não concluída (${job.status}).`);
+        await fs.promises.copyFile(job.filePath, destPath);
+        return destPath;
+    }
+
+    /**
+     * Stops a running job (or discards a finished one) and removes its file.
+     */
+    async removeJob(id) {
+        const job = this.jobs.get(id);
+        if (!job) return false;
+        if (job.status === 'running') {
+            job.cancelled = true;
+            for (const stream of job.streams) stream.destroy(new Error('Exportação cancelada.'));
+        }
+        this.jobs.delete(id);
+        await fs.promises.unlink(job.filePath).catch(() => { });
+        return true;
+    }
+
+    reap() {
+        const now = Date.now();
+        for (const job of Array.from(this.jobs.values())) {
+            if (job.finishedAt && now - job.finishedAt > this.jobTtlMs) {
+                console.log(`[Export] Removing expired job ${job.id}`);
+                this.removeJob(job.id);
+            }
+        }
+    }
+}
+
+const exportService = new ExportService();
+exportService.CsvTransform = CsvTransform;
+exportService.buildFormatters = buildFormatters;
+exportService.formatDate = formatDate;
+
+module.exports = exportService;
@@ -1,35 +1,25 @@
 
-const fs = require('fs');
 const path = require('path');
+const { JsonStore } = require('../utils/jsonStore');
 
 class KnowledgeService {
     constructor() {
         this.storagePath = path.join(__dirname, '../data/semantic_knowledge.json');
-        this.knowledge = { schemas: [], documents: [] };
+        this.store = new JsonStore(this.storagePath, {
+            defaults: () => ({ schemas: [], documents: [] }),
+            name: 'semantic_knowledge.json'
+        });
         this.loadKnowledge();
     }
 
     loadKnowledge() {
-        try {
-            const dir = path.dirname(this.storagePath);
-            if (!fs.existsSync(dir)) fs.mkdirSync(dir, { recursive: true });
-
-            if (fs.existsSync(this.storagePath)) {
-                this.knowledge = JSON.parse(fs.readFileSync(this.storagePath, 'utf8'));
-            } else {
-                this.saveKnowledge(); // Create empty
-            }
-        } catch (e) {
-            console.error("[KnowledgeService] Load Error:", e);
-        }
+        this.knowledge = this.store.load();
+        if (!this.store.existed) this.saveKnowledge(); // Create empty
     }
 
+    // Debounced atomic write of the in-memory knowledge (utils/jsonStore)
     saveKnowledge() {
-        try {
-            fs.writeFileSync(this.storagePath, JSON.stringify(this.knowledge, null, 2));
-        } catch (e) {
-            console.error("[KnowledgeService] Save Error:", e);
-        }
+        this.store.set(this.knowledge);
     }
 
     /**
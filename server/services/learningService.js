@@ -1,37 +1,24 @@
-const fs = require('fs');
 const path = require('path');
 const os = require('os');
+const { JsonStore } = require('../utils/jsonStore');
 
 // Store learning data in user specific directory to persist across restarts/updates
 const LEARNING_FILE = path.join(os.homedir(), '.gemini', 'antigravity', 'oracle_lowcode_learning.json');
 
 class LearningService {
     constructor() {
-        this.data = {
-            interactions: [],
-            patterns: {},
-            skills: [],
-            headlines: []
-        };
+        this.store = new JsonStore(LEARNING_FILE, {
+            defaults: () => ({ interactions: [], patterns: {}, skills: [], headlines: [] })
+        });
         this.loadData();
     }
 
     loadData() {
         try {
-            if (fs.existsSync(LEARNING_FILE)) {
-                const raw = fs.readFileSync(LEARNING_FILE, 'utf8');
-                this.data = JSON.parse(raw);
-
-                // Force-inject defaults even if file exists (to update for existing users)
-                this.ensureDefaults();
-
-            } else {
-                this.ensureDefaults();
-
-                const dir = path.dirname(LEARNING_FILE);
-                if (!fs.existsSync(dir)) fs.mkdirSync(dir, { recursive: true });
-                this.saveData();
-            }
+            this.data = this.store.load();
+            // Force-inject defaults even if file exists (to update for existing users)
+            this.ensureDefaults();
+            if (!this.store.existed) this.saveData();
         } catch (e) {
             console.error("Failed to load learning data:", e);
         }
@@ -76,12 +63,9 @@ class LearningService {
         });
     }
 
+    // Written behind (debounced, atomic); see utils/jsonStore
     saveData() {
-        try {
-            fs.writeFileSync(LEARNING_FILE, JSON.stringify(this.data, null, 2));
-        } catch (e) {
-            console.error("Failed to save learning data:", e);
-        }
+        this.store.set(this.data);
     }
 
     logInteraction(intent, prompt, success = true) {
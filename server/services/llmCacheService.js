@@ -0,0 +1,130 @@
+const path = require('path');
+const os = require('os');
+const crypto = require('crypto');
+const LruCache = require('../utils/lruCache');
+const { JsonStore } = require('../utils/jsonStore');
+const metrics = require('./metricsService');
+
+// Content-addressed cache of chat completions (fix/explain/optimize/generate SQL).
+// The key is a hash of model + temperature + response format + the exact messages, so the
+// same question about the same SQL is answered from disk instead of another Groq round trip.
+// Entries are evicted LRU (LLM_CACHE_MAX_ENTRIES) and expire after LLM_CACHE_TTL_HOURS.
+// The cache is persisted through a JsonStore (write-behind, atomic rename) in the app data
+// folder, or in LLM_CACHE_FILE when set. Identical requests in flight share one call.
+//
+// complete(client, body) takes the client explicitly: anything exposing
+// chat.completions.create(body) works, which keeps it testable with a stub.
+
+const CACHE_VERSION = 1;
+const PERSIST_DELAY_MS = 2000;
+
+// Rough in-memory size of a cached completion (UTF-16 text plus usage and bookkeeping)
+function sizeOf(value) {
+    return (value.content ? value.content.length * 2 : 0) + 200;
+}
+
+function defaultFile() {
+    const appData = process.env.APPDATA || (process.platform == 'darwin' ? process.env.HOME + '/Library/Preferences' : process.env.HOME + "/.local/share");
+    return path.join(appData || os.tmpdir(), 'HapAssistenteDeDados', 'llm_cache.json');
+}
+
+class LlmCacheService {
+    constructor() {
+        this.file = process.env.LLM_CACHE_FILE || defaultFile();
+        this.ttlMs = (Number(process.env.LLM_CACHE_TTL_HOURS) || 7 * 24) * 60 * 60 * 1000;
+        this.cache = new LruCache({
+            maxEntries: Number(process.env.LLM_CACHE_MAX_ENTRIES) || 500,
+            ttlMs: this.ttlMs,
+            sizeOf
+        });
+        this.store = new JsonStore(this.file, { defaults: () => null, delayMs: PERSIST_DELAY_MS, name: 'llm_cache.json' });
+        this.inflight = new Map();
+        this.loaded = false;
+        this.tokensSaved = 0;
+    }
+
+    keyFor(body) {
+        const canonical = JSON.stringify({
+            model: body.model,
+            temperature: body.temperature ?? null,
+            response_format: body.response_format || null,
+            messages: (body.messages || []).map(m => [m.role, m.content])
+        });
+        return crypto.createHash('sha256').update(canonical).digest('hex');
+    }
+
+    load() {
+        if (this.loaded) return;
+        this.loaded = true;
+        const data = this.store.load();
+        if (!data || data.version !== CACHE_VERSION || !Array.isArray(data.entries)) return;
+        const now = Date.now();
+        // Stored oldest first, so re-inserting keeps the LRU order
+        data.entries.forEach(([key, value]) => {
+            const remaining = this.ttlMs - (now - value.storedAt);
+            if (remaining > 0) this.cache.set(key, value, remaining);
+        });
+        console.log(`[LlmCache] Loaded ${this.cache.size} cached completions`);
+    }
+
+    // The store writes behind (debounced); the snapshot is cheap next to a Groq round trip
+    schedulePersist() {
+        this.store.set({ version: CACHE_VERSION, entries: this.cache.entries() });
+    }
+
+    persist() {
+        this.schedulePersist();
+        return this.store.flush();
+    }
+
+    /**
+     * Cached chat.completions.create. Resolves with a completion-shaped object
+     * ({ choices: [{ message: { content } }], usage, cached }) either way.
+     */
+    async complete(client, body) {
+        this.load();
+        const key = this.keyFor(body);
+        const labels = { model: body.model || 'unknown' };
+
+        const hit = this.cache.get(key);
+        if (hit) {
+            metrics.increment('llm_cache_hits_total', labels);
+            if (hit.usage) this.tokensSaved += hit.usage.total_tokens || 0;
+            return { choices: [{ message: { role: 'assistant', content: hit.content } }], usage: hit.usage, cached: true };
+        }
+
+        const running = this.inflight.get(key);
+        if (running) {
+            metrics.increment('llm_cache_coalesced_total', labels);
+            return running;
+        }
+
+        metrics.increment('llm_cache_misses_total', labels);
+        const pending = client.chat.completions.create(body).then(completion => {
+            const content = completion && completion.choices && completion.choices[0]?.message?.content;
+            // Empty answers are not worth keeping
+            if (content) {
+                this.cache.set(key, { content, usage: completion.usage || null, storedAt: Date.now() });
+                this.schedulePersist();
+            }
+            return completion;
+        });
+        this.inflight.set(key, pending);
+        try {
+            return await pending;
+        } finally {
+            this.inflight.delete(key);
+        }
+    }
+
+    clear() {
+        this.cache.clear();
+        this.schedulePersist();
+    }
+
+    stats() {
+        return { ...this.cache.stats(), inflight: this.inflight.size, tokensSaved: this.tokensSaved };
+    }
+}
+
+module.exports = new LlmCacheService();
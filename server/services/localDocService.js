@@ -1,7 +1,8 @@
 const fs = require('fs');
 const path = require('path');
 const os = require('os');
-
+const { DocSearchIndex, htmlToText } = require('../utils/docSearchIndex');
+const { JsonStore } = require('../utils/jsonStore');
 
 // Determine base directory for docs
 // We want this to be persistent.
@@ -24,20 +25,21 @@ if (!fs.existsSync(baseDir)) {
 }
 
 const BOOKS_FILE = path.join(baseDir, 'books.json');
+const SEARCH_INDEX_FILE = path.join(baseDir, 'search_index.json');
+
+// books.json and each structure.json are read once and kept in memory; writes are debounced
+// and atomic (utils/jsonStore). The read helpers return the live arrays.
+const booksStore = new JsonStore(BOOKS_FILE, { defaults: () => [] });
+const structureStores = new Map(); // bookId -> JsonStore
 
 // Helper: Read Books Index
 function readBooks() {
-    if (!fs.existsSync(BOOKS_FILE)) return [];
-    try {
-        return JSON.parse(fs.readFileSync(BOOKS_FILE, 'utf-8'));
-    } catch (e) {
-        return [];
-    }
+    return booksStore.get();
 }
 
 // Helper: Write Books Index
 function writeBooks(books) {
-    fs.writeFileSync(BOOKS_FILE, JSON.stringify(books, null, 2), 'utf-8');
+    booksStore.set(books);
 }
 
 // Helper: Get Book Dir
@@ -52,26 +54,46 @@ function getStructureFile(bookId) {
     return path.join(getBookDir(bookId), 'structure.json');
 }
 
+function structureStore(bookId) {
+    const key = String(bookId);
+    if (!structureStores.has(key)) {
+        structureStores.set(key, new JsonStore(getStructureFile(bookId), { defaults: () => [], name: `structure.json (${key})` }));
+    }
+    return structureStores.get(key);
+}
+
 // Helper: Read Structure
 function readStructure(bookId) {
-    const file = getStructureFile(bookId);
-    if (!fs.existsSync(file)) return [];
-    try {
-        return JSON.parse(fs.readFileSync(file, 'utf-8'));
-    } catch (e) {
-        return [];
-    }
+    return structureStore(bookId).get();
 }
 
 // Helper: Write Structure
 function writeStructure(bookId, nodes) {
-    fs.writeFileSync(getStructureFile(bookId), JSON.stringify(nodes, null, 2), 'utf-8');
+    structureStore(bookId).set(nodes);
+}
+
+// Book whose structure holds the node, or null
+function findNode(id) {
+    for (const book of readBooks()) {
+        const nodes = readStructure(book.ID_BOOK);
+        const node = nodes.find(n => n.ID_NODE == id);
+        if (node) return { book, nodes, node };
+    }
+    return null;
 }
 
 class LocalDocService {
 
     constructor() {
         console.log(`[LocalDocService] Initialized at ${baseDir}`);
+        this.index = new DocSearchIndex(SEARCH_INDEX_FILE, () => this.readAllNodes());
+        // Warm the search index in the background once startup is done
+        setImmediate(() => this.index.ensureLoaded().catch(e => console.error("[LocalDocService] Search index load failed:", e)));
+    }
+
+    // Reports index maintenance failures without failing the edit that triggered them
+    updateIndex(task) {
+        return task.catch(e => console.error("[LocalDocService] Search index update failed:", e));
     }
 
     // --- BOOKS ---
@@ -116,6 +138,12 @@ class LocalDocService {
         let books = readBooks();
         books = books.filter(b => b.ID_BOOK != id);
         writeBooks(books);
+        const store = structureStores.get(String(id));
+        if (store) {
+            structureStores.delete(String(id));
+            await store.discard();
+        }
+        await this.updateIndex(this.index.removeBook(id));
         // We could delete the folder here, but keeping it as trash for now is safer, 
         // or we can rename it. For now, strict deletion:
         const dir = getBookDir(id);
@@ -129,62 +157,65 @@ class LocalDocService {
         return true;
     }
 
-    async getAllSearchableNodes() {
+    // Full scan of every page with its raw HTML; only used to (re)build the search index
+    async readAllNodes() {
         const books = readBooks();
-        console.log(`[RAG] Indexing ${books.length} books...`);
         const allNodes = [];
         for (const book of books) {
             try {
                 const nodes = readStructure(book.ID_BOOK);
                 for (const node of nodes) {
-                    // Read content file
                     const contentPath = path.join(getBookDir(book.ID_BOOK), `${node.ID_NODE}.html`);
                     let content = '';
-                    if (fs.existsSync(contentPath)) {
-                        // Read full content to ensure "all sheets" are indexed
-                        // We will rely on aiService to manage the prompt context window size
-                        content = fs.readFileSync(contentPath, 'utf-8');
-                    }
+                    try {
+                        content = await fs.promises.readFile(contentPath, 'utf-8');
+                    } catch (e) { /* page without content file */ }
 
                     allNodes.push({
                         ID_NODE: node.ID_NODE,
                         ID_BOOK: book.ID_BOOK,
                         NM_TITLE: node.NM_TITLE,
-                        SNIPPET: content
+                        content
                     });
                 }
             } catch (e) {
                 console.error(`Error indexing book ${book.ID_BOOK}:`, e);
             }
         }
-        console.log(`[RAG] Found ${allNodes.length} searchable nodes.`);
         return allNodes;
     }
 
-    async searchNodes(query) {
-        const allNodes = await this.getAllSearchableNodes();
-        if (!query) return [];
-
-        const terms = query.toLowerCase().split(/\s+/).filter(t => t.length > 2);
-        console.log(`[RAG] Searching for: ${terms.join(', ')}`);
+    async getAllSearchableNodes() {
+        const nodes = await this.readAllNodes();
+        console.log(`[RAG] Found ${nodes.length} searchable nodes.`);
+        return nodes.map(n => ({ ID_NODE: n.ID_NODE, ID_BOOK: n.ID_BOOK, NM_TITLE: n.NM_TITLE, SNIPPET: n.content }));
+    }
 
-        const scored = allNodes.map(node => {
-            let score = 0;
-            const title = node.NM_TITLE.toLowerCase();
-            const content = node.SNIPPET.toLowerCase();
+    /**
+     * Spotlight: ranked matches for `query` (or every indexed page) with short plain-text snippets.
+     */
+    async getSearchIndex(query = '', limit = 50) {
+        if (query && query.trim()) return this.index.search(query, limit);
+        return this.index.list();
+    }
 
-            terms.forEach(term => {
-                if (title.includes(term)) score += 10;
-                if (content.includes(term)) score += 2;
-            });
+    /**
+     * BM25 search over the inverted index. Only the top results have their page read from disk;
+     * SNIPPET carries the page as plain text for RAG prompts.
+     */
+    async searchNodes(query, limit = 5) {
+        if (!query) return [];
 
-            return { ...node, score };
-        });
+        const results = await this.index.search(query, limit);
+        console.log(`[RAG] Search "${query.substring(0, 80)}": ${results.length} matches.`);
 
-        // Retorna top 5 relevants
-        const results = scored.filter(n => n.score > 0).sort((a, b) => b.score - a.score).slice(0, 5);
-        console.log(`[RAG] Found ${results.length} matches.`);
-        return results;
+        return Promise.all(results.map(async (result) => {
+            const contentPath = path.join(baseDir, String(result.ID_BOOK), `${result.ID_NODE}.html`);
+            try {
+                result.SNIPPET = htmlToText(await fs.promises.readFile(contentPath, 'utf-8'));
+            } catch (e) { /* keep the indexed snippet */ }
+            return result;
+        }));
     }
 
     async getBookTree(bookId) {
@@ -215,22 +246,14 @@ class LocalDocService {
     }
 
     async getNode(id) {
-        const books = readBooks();
-        for (const book of books) {
-            const nodes = readStructure(book.ID_BOOK);
-            const node = nodes.find(n => n.ID_NODE == id);
-            if (node) {
-                // Read content
-                const contentPath = path.join(getBookDir(book.ID_BOOK), `${id}.html`);
-                if (fs.existsSync(contentPath)) {
-                    node.CL_CONTENT = fs.readFileSync(contentPath, 'utf-8');
-                } else {
-                    node.CL_CONTENT = '';
-                }
-                return node;
-            }
-        }
-        return null;
+        const found = findNode(id);
+        if (!found) return null;
+        // Copy: the structure entry stays free of page content
+        const node = { ...found.node, CL_CONTENT: '' };
+        try {
+            node.CL_CONTENT = await fs.promises.readFile(path.join(getBookDir(found.book.ID_BOOK), `${id}.html`), 'utf-8');
+        } catch (e) { /* page without content file */ }
+        return node;
     }
 
     async createNode(bookId, parentId, title, type = 'PAGE') {
@@ -250,89 +273,83 @@ class LocalDocService {
         // Create empty content file
         const contentPath = path.join(getBookDir(bookId), `${newNode.ID_NODE}.html`);
         fs.writeFileSync(contentPath, '', 'utf-8');
+        await this.updateIndex(this.index.upsert(newNode.ID_NODE, bookId, title, ''));
 
         return newNode.ID_NODE;
     }
 
     async updateNodeContent(id, content, title) {
-        const books = readBooks();
-        for (const book of books) {
-            const nodes = readStructure(book.ID_BOOK);
-            const index = nodes.findIndex(n => n.ID_NODE == id);
-
-            if (index !== -1) {
-                // Update Metadata
-                if (title) nodes[index].NM_TITLE = title;
-                nodes[index].DT_UPDATED = new Date().toISOString();
-                writeStructure(book.ID_BOOK, nodes);
-
-                // Update Content
-                if (content !== undefined) {
-                    const contentPath = path.join(getBookDir(book.ID_BOOK), `${id}.html`);
-                    fs.writeFileSync(contentPath, content, 'utf-8');
-                }
-                return true;
-            }
+        const found = findNode(id);
+        if (!found) throw new Error("Node not found");
+        const { book, nodes, node } = found;
+
+        // Update Metadata
+        if (title) node.NM_TITLE = title;
+        node.DT_UPDATED = new Date().toISOString();
+        writeStructure(book.ID_BOOK, nodes);
+
+        // Update Content
+        const contentPath = path.join(getBookDir(book.ID_BOOK), `${id}.html`);
+        if (content !== undefined) {
+            await fs.promises.writeFile(contentPath, content, 'utf-8');
         }
-        throw new Error("Node not found");
+
+        let indexedContent = content;
+        if (indexedContent === undefined) {
+            indexedContent = await fs.promises.readFile(contentPath, 'utf-8').catch(() => '');
+        }
+        await this.updateIndex(this.index.upsert(node.ID_NODE, book.ID_BOOK, node.NM_TITLE, indexedContent));
+        return true;
     }
 
     async deleteNode(id) {
-        const books = readBooks();
-        for (const book of books) {
-            let nodes = readStructure(book.ID_BOOK);
-            const node = nodes.find(n => n.ID_NODE == id);
-
-            if (node) {
-                // Recursive collect all descendants to delete their files
-                // Ensure we use the correct type from the found node
-                const targetId = node.ID_NODE;
-                const toDeleteIds = [targetId];
-
-                const findDescendants = (parentId) => {
-                    // Use loose equality for parent check too just in case
-                    const children = nodes.filter(n => n.ID_PARENT_NODE == parentId);
-                    for (const child of children) {
-                        toDeleteIds.push(child.ID_NODE);
-                        findDescendants(child.ID_NODE);
-                    }
-                };
-                findDescendants(targetId);
-
-                // Delete files
-                for (const delId of toDeleteIds) {
-                    const filePath = path.join(getBookDir(book.ID_BOOK), `${delId}.html`);
-                    if (fs.existsSync(filePath)) {
-                        fs.unlinkSync(filePath);
-                    }
-                }
-
-                // Remove from structure - Use filter with includes on IDs
-                nodes = nodes.filter(n => !toDeleteIds.includes(n.ID_NODE));
-                writeStructure(book.ID_BOOK, nodes);
+        const found = findNode(id);
+        if (!found) throw new Error("Node not found");
+        const { book, node } = found;
+        let nodes = found.nodes;
+
+        // Recursive collect all descendants to delete their files
+        // Ensure we use the correct type from the found node
+        const targetId = node.ID_NODE;
+        const toDeleteIds = [targetId];
+
+        const findDescendants = (parentId) => {
+            // Use loose equality for parent check too just in case
+            const children = nodes.filter(n => n.ID_PARENT_NODE == parentId);
+            for (const child of children) {
+                toDeleteIds.push(child.ID_NODE);
+                findDescendants(child.ID_NODE);
+            }
+        };
+        findDescendants(targetId);
 
-                return true;
+        // Delete files
+        for (const delId of toDeleteIds) {
+            const filePath = path.join(getBookDir(book.ID_BOOK), `${delId}.html`);
+            if (fs.existsSync(filePath)) {
+                fs.unlinkSync(filePath);
             }
         }
-        throw new Error("Node not found");
+
+        // Remove from structure - Use filter with includes on IDs
+        nodes = nodes.filter(n => !toDeleteIds.includes(n.ID_NODE));
+        writeStructure(book.ID_BOOK, nodes);
+        await this.updateIndex(this.index.remove(toDeleteIds));
+
+        return true;
     }
 
     async moveNode(nodeId, targetBookId, targetParentId, newIndex) {
-        const books = readBooks();
         let sourceBookId = null;
         let nodeToMove = null;
         let sourceNodes = null;
 
         // 1. Find Source
-        for (const book of books) {
-            const nodes = readStructure(book.ID_BOOK);
-            const node = nodes.find(n => n.ID_NODE == nodeId);
-            if (node) {
-                sourceBookId = book.ID_BOOK;
-                nodeToMove = { ...node }; // Clone
-                sourceNodes = nodes;
-                break;
-            }
+        const found = findNode(nodeId);
+        if (found) {
+            sourceBookId = found.book.ID_BOOK;
+            nodeToMove = { ...found.node }; // Clone
+            sourceNodes = found.nodes;
         }
 
         if (!nodeToMove) throw new Error("Source node not found");
@@ -384,28 +401,25 @@ class LocalDocService {
         const finalNodes = [...nonSiblings, ...siblings];
 
         writeStructure(targetBookId, finalNodes);
+        if (sourceBookId != targetBookId) await this.updateIndex(this.index.setBook(nodeId, targetBookId));
 
         return true;
     }
 
     async copyNode(nodeId, targetBookId, targetParentId, newIndex) {
-        const books = readBooks();
         let sourceBookId = null;
         let nodeToCopy = null;
 
-        for (const book of books) {
-            const nodes = readStructure(book.ID_BOOK);
-            const node = nodes.find(n => n.ID_NODE == nodeId);
-            if (node) {
-                sourceBookId = book.ID_BOOK;
-                nodeToCopy = { ...node };
-                break;
-            }
+        const found = findNode(nodeId);
+        if (found) {
+            sourceBookId = found.book.ID_BOOK;
+            nodeToCopy = { ...found.node };
         }
 
         if (!nodeToCopy) throw new Error("Source node not found");
 
         const targetNodes = readStructure(targetBookId);
+        const copiedIds = []; // [sourceId, newId]
 
         const copyRecursive = (originalNode, pId) => {
             const newId = Date.now() + Math.floor(Math.random() * 100000);
@@ -426,6 +440,7 @@ class LocalDocService {
             } else {
                 fs.writeFileSync(targetPath, '', 'utf-8');
             }
+            copiedIds.push([originalNode.ID_NODE, newId]);
 
             return newNode;
         };
@@ -458,6 +473,9 @@ class LocalDocService {
         copyDescendants(nodeToCopy.ID_NODE, newRoot.ID_NODE);
 
         writeStructure(targetBookId, finalNodes);
+        for (const [sourceId, newId] of copiedIds) {
+            await this.updateIndex(this.index.copy(sourceId, newId, targetBookId));
+        }
 
         return newRoot.ID_NODE;
     }
@@ -488,6 +506,7 @@ class LocalDocService {
         const sourceRoots = sourceNodes.filter(n => !n.ID_PARENT_NODE);
 
         const newNodes = [];
+        const copiedIds = []; // [sourceId, newId]
 
         // Helper to copy tree
         const copyTree = (nodesToCopy, parentId) => {
@@ -512,6 +531,7 @@ class LocalDocService {
                 } else {
                     fs.writeFileSync(targetPath, '', 'utf-8');
                 }
+                copiedIds.push([node.ID_NODE, newId]);
 
                 // Recurse children
                 const children = sourceNodes.filter(n => n.ID_PARENT_NODE == node.ID_NODE);
@@ -524,6 +544,9 @@ class LocalDocService {
 
         // Write Structure
         writeStructure(newBookId, newNodes);
+        for (const [sourceId, newId] of copiedIds) {
+            await this.updateIndex(this.index.copy(sourceId, newId, newBookId));
+        }
 
         return newBookId;
     }
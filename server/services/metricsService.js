@@ -0,0 +1,245 @@
+const crypto = require('crypto');
+const os = require('os');
+const path = require('path');
+const { monitorEventLoopDelay } = require('perf_hooks');
+const { createLogger } = require('../utils/logger');
+
+// In-process metrics: counters and latency histograms keyed by name + labels, plus gauges
+// pulled from registered collectors (pools, executions, caches) when a snapshot is taken.
+// Exposed by GET /api/metrics as JSON or Prometheus text (?format=prometheus).
+//
+// Slow statements (>= SLOW_QUERY_MS, default 2000) are kept in a small ring and written to
+// slow_queries.log in the app data directory with a hash of the SQL and the bind count — never
+// the SQL or bind values.
+//
+// Histograms are recorded in milliseconds (names end in _ms); the Prometheus output converts
+// them to seconds (_ms -> _seconds) as the convention expects.
+
+const BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000];
+const SLOW_QUERY_MS = Number(process.env.SLOW_QUERY_MS) || 2000;
+const SLOW_QUERY_KEEP = 100;
+
+const appData = process.env.APPDATA || (process.platform === 'darwin' ? process.env.HOME + '/Library/Preferences' : process.env.HOME + "/.local/share");
+const slowLog = createLogger('SlowQuery', { file: path.join(appData || os.tmpdir(), 'HapAssistenteDeDados', 'slow_queries.log') });
+
+function labelKey(labels) {
+    const keys = Object.keys(labels || {}).sort();
+    return keys.map(k => `${k}=${labels[k]}`).join(',');
+}
+
+function promLabels(labels) {
+    const keys = Object.keys(labels || {});
+    if (keys.length === 0) return '';
+    return `{${keys.map(k => `${k}="${String(labels[k]).replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"`).join(',')}}`;
+}
+
+class MetricsService {
+    constructor() {
+        this.counters = new Map(); // name -> Map(labelKey -> { labels, value })
+        this.histograms = new Map(); // name -> Map(labelKey -> { labels, counts, sum, count, max })
+        this.collectors = new Map(); // name -> () => object of numeric gauges (or nested groups)
+        this.slowQueries = [];
+        this.startedAt = Date.now();
+
+        // Event loop delay shows synchronous work (serialization, sync I/O) blocking requests
+        this.loopDelay = monitorEventLoopDelay({ resolution: 20 });
+        this.loopDelay.enable();
+        this.registerCollector('process', () => {
+            const memory = process.memoryUsage();
+            return {
+                rssBytes: memory.rss,
+                heapUsedBytes: memory.heapUsed,
+                eventLoopDelayP99Ms: Math.round(this.loopDelay.percentile(99) / 1e4) / 100,
+                eventLoopDelayMaxMs: Math.round(this.loopDelay.max / 1e4) / 100
+            };
+        });
+    }
+
+    series(store, name, labels, create) {
+        let byLabels = store.get(name);
+        if (!byLabels) {
+            byLabels = new Map();
+            store.set(name, byLabels);
+        }
+        const key = labelKey(labels);
+        let entry = byLabels.get(key);
+        if (!entry) {
+            entry = create();
+            entry.labels = { ...labels };
+            byLabels.set(key, entry);
+        }
+        return entry;
+    }
+
+    increment(name, labels = {}, value = 1) {
+        this.series(this.counters, name, labels, () => ({ value: 0 })).value += value;
+    }
+
+    observe(name, labels = {}, ms) {
+        const entry = this.series(this.histograms, name, labels,
+            () => ({ counts: new Array(BUCKETS_MS.length).fill(0), sum: 0, count: 0, max: 0 }));
+        const bucket = BUCKETS_MS.findIndex(limit => ms <= limit);
+        if (bucket !== -1) entry.counts[bucket]++;
+        entry.sum += ms;
+        entry.count++;
+        if (ms > entry.max) entry.max = ms;
+    }
+
+    /**
+     * Starts a timer; the returned function records the elapsed ms (labels may be extended
+     * at stop time, e.g. with the outcome) and returns it.
+     */
+    startTimer(name, labels = {}) {
+        const started = process.hrtime.bigint();
+        return (extraLabels = {}) => {
+            const ms = Number(process.hrtime.bigint() - started) / 1e6;
+            this.observe(name, { ...labels, ...extraLabels }, ms);
+            return ms;
+        };
+    }
+
+    /**
+     * Wraps an async function so every call is timed under `name` with `labels`.
+     */
+    wrap(name, labels, fn) {
+        const metrics = this;
+        return async function timed(...args) {
+            const stop = metrics.startTimer(name, labels);
+            try {
+                const result = await fn.apply(this, args);
+                stop({ status: 'ok' });
+                return result;
+            } catch (err) {
+                stop({ status: 'error' });
+                throw err;
+            }
+        };
+    }
+
+    /**
+     * Rows moved by imports/exports: totals per kind, so throughput = rows_total / seconds_total.
+     */
+    recordTransfer(kind, labels, rows, ms) {
+        this.increment(`${kind}_rows_total`, labels, rows);
+        this.increment(`${kind}_seconds_total`, labels, ms / 1000);
+        this.increment(`${kind}_jobs_total`, labels);
+    }
+
+    /**
+     * Called by db.js after each statement; only slow ones are kept.
+     */
+    recordStatement(sql, binds, ms, rows, op) {
+        if (ms < SLOW_QUERY_MS) return;
+        const bindCount = Array.isArray(binds) ? binds.length : Object.keys(binds || {}).length;
+        const sqlHash = crypto.createHash('sha1').update(String(sql).replace(/\s+/g, ' ').trim()).digest('hex').substring(0, 12);
+        const entry = { at: new Date().toISOString(), op, sqlHash, bindCount, ms: Math.round(ms), rows };
+        this.slowQueries.push(entry);
+        if (this.slowQueries.length > SLOW_QUERY_KEEP) this.slowQueries.shift();
+        this.increment('db_slow_queries_total', { op });
+        slowLog.warn(`${op} ${sqlHash} took ${entry.ms}ms (${bindCount} binds, ${rows} rows)`);
+    }
+
+    registerCollector(name, fn) {
+        this.collectors.set(name, fn);
+    }
+
+    collectGauges() {
+        const gauges = {};
+        this.collectors.forEach((fn, name) => {
+            try {
+                gauges[name] = fn();
+            } catch (e) {
+                gauges[name] = { error: e.message };
+            }
+        });
+        return gauges;
+    }
+
+    snapshot() {
+        const counters = {};
+        this.counters.forEach((byLabels, name) => {
+            counters[name] = Array.from(byLabels.values(), e => ({ labels: e.labels, value: e.value }));
+        });
+        const histograms = {};
+        this.histograms.forEach((byLabels, name) => {
+            histograms[name] = Array.from(byLabels.values(), e => ({
+                labels: e.labels,
+                count: e.count,
+                avgMs: e.count ? Math.round((e.sum / e.count) * 10) / 10 : 0,
+                maxMs: Math.round(e.max * 10) / 10,
+                buckets: Object.fromEntries(BUCKETS_MS.map((limit, i) => [limit, e.counts[i]]))
+            }));
+        });
+        return {
+            uptimeSeconds: Math.round((Date.now() - this.startedAt) / 1000),
+            counters,
+            histograms,
+            gauges: this.collectGauges(),
+            slowQueries: { thresholdMs: SLOW_QUERY_MS, recent: this.slowQueries.slice(-20) }
+        };
+    }
+
+    /**
+     * Prometheus text exposition (version 0.0.4). Every family is written as one block (HELP,
+     * TYPE, then all its samples). Histograms are converted to seconds. Gauges from collectors
+     * are flattened: { pools: { pools: [{ key, inUse }] } } -> hap_pools_pools_in_use{key="..."}.
+     */
+    toPrometheus() {
+        const families = new Map(); // name -> { type, help, samples }
+        const family = (name, type, help) => {
+            if (!families.has(name)) families.set(name, { type, help, samples: [] });
+            return families.get(name).samples;
+        };
+        const metric = (name) => `hap_${name}`;
+
+        this.counters.forEach((byLabels, name) => {
+            const samples = family(metric(name), 'counter', `Counter ${name}`);
+            byLabels.forEach(e => samples.push(`${metric(name)}${promLabels(e.labels)} ${e.value}`));
+        });
+
+        this.histograms.forEach((byLabels, name) => {
+            const full = metric(name.replace(/_ms$/, '') + '_seconds');
+            const samples = family(full, 'histogram', `Latency of ${name.replace(/_ms$/, '')} in seconds`);
+            byLabels.forEach(e => {
+                let cumulative = 0;
+                BUCKETS_MS.forEach((limit, i) => {
+                    cumulative += e.counts[i];
+                    samples.push(`${full}_bucket${promLabels({ ...e.labels, le: limit / 1000 })} ${cumulative}`);
+                });
+                samples.push(`${full}_bucket${promLabels({ ...e.labels, le: '+Inf' })} ${e.count}`);
+                samples.push(`${full}_sum${promLabels(e.labels)} ${e.sum / 1000}`);
+                samples.push(`${full}_count${promLabels(e.labels)} ${e.count}`);
+            });
+        });
+
+        const gauges = this.collectGauges();
+        const emit = (name, labels, value) => {
+            const full = metric(name.replace(/([a-z0-9])([A-Z])/g, '$1_$2').toLowerCase());
+            family(full, 'gauge', `Gauge ${name}`).push(`${full}${promLabels(labels)} ${value}`);
+        };
+        const walk = (prefix, value, labels) => {
+            if (typeof value === 'number' && Number.isFinite(value)) return emit(prefix, labels, value);
+            if (typeof value === 'boolean') return emit(prefix, labels, value ? 1 : 0);
+            if (Array.isArray(value)) {
+                return value.forEach((item, i) => {
+                    const key = item && (item.key || item.name || item.id);
+                    walk(prefix, item, { ...labels, key: key !== undefined ? key : i });
+                });
+            }
+            if (value && typeof value === 'object') {
+                Object.keys(value).forEach(k => walk(`${prefix}_${k}`, value[k], labels));
+            }
+        };
+        Object.keys(gauges).forEach(name => walk(name, gauges[name], {}));
+        family(metric('uptime_seconds'), 'gauge', 'Seconds since the server started')
+            .push(`${metric('uptime_seconds')} ${Math.round((Date.now() - this.startedAt) / 1000)}`);
+
+        const lines = [];
+        families.forEach(({ type, help, samples }, name) => {
+            lines.push(`# HELP ${name} ${help}`, `# TYPE ${name} ${type}`, ...samples);
+        });
+        return lines.join('\n') + '\n';
+    }
+}
+
+module.exports = new MetricsService();
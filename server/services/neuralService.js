@@ -1,17 +1,37 @@
 const fs = require('fs');
 const path = require('path');
+const PriorityQueue = require('../utils/priorityQueue');
+const { writeFileAtomic } = require('../utils/jsonStore');
 
 // Storage structure:
 // {
 //   nodes: { "id": { id, type, current_activation: 0 } },
 //   edges: [ { from, to, weight, relation } ]
 // }
+// Persistence: neural_memory.json is a compact snapshot; changes since the snapshot are appended
+// to neural_memory.log (one JSON op per line) and replayed on load. The log is folded back into
+// the snapshot once it grows past COMPACT_AFTER ops.
+// In memory, `outgoing` (from -> to -> edge) and `incoming` (to -> from -> edge) index the edges.
+
+const SAVE_DEBOUNCE_MS = 500;
+const COMPACT_AFTER = 5000;
 
 class NeuralService {
     constructor() {
         this.storagePath = path.join(__dirname, '../data/neural_memory.json');
+        this.journalPath = path.join(__dirname, '../data/neural_memory.log');
         this.graph = { nodes: {}, edges: [] };
+        this.outgoing = new Map();
+        this.incoming = new Map();
+        this.pendingOps = [];
+        this.journalOps = 0;
+        this.saveTimer = null;
+        this.compacting = null;
+        this.nextCompaction = null;
         this.loadGraph();
+
+        // Don't lose the last debounce window on shutdown
+        process.on('exit', () => this.flushSync());
     }
 
     loadGraph() {
@@ -21,23 +41,166 @@ class NeuralService {
 
             if (fs.existsSync(this.storagePath)) {
                 this.graph = JSON.parse(fs.readFileSync(this.storagePath, 'utf8'));
+                this.buildIndex();
+                this.replayJournal();
             } else {
                 this.seedBaseKnowledge(); // Start with some base knowledge as requested
-                this.saveGraph();
+                this.compact();
             }
         } catch (e) {
             console.error("NeuralService Load Error:", e);
         }
     }
 
+    // Older snapshots may hold duplicated from/to pairs; the first one wins
+    buildIndex() {
+        this.outgoing = new Map();
+        this.incoming = new Map();
+        const unique = [];
+        for (const edge of this.graph.edges) {
+            if (this.getEdge(edge.from, edge.to)) continue;
+            this.indexEdge(edge);
+            unique.push(edge);
+        }
+        this.graph.edges = unique;
+    }
+
+    indexEdge(edge) {
+        if (!this.outgoing.has(edge.from)) this.outgoing.set(edge.from, new Map());
+        if (!this.incoming.has(edge.to)) this.incoming.set(edge.to, new Map());
+        this.outgoing.get(edge.from).set(edge.to, edge);
+        this.incoming.get(edge.to).set(edge.from, edge);
+    }
+
+    unindexEdge(edge) {
+        const out = this.outgoing.get(edge.from);
+        if (out) out.delete(edge.to);
+        const inc = this.incoming.get(edge.to);
+        if (inc) inc.delete(edge.from);
+    }
+
+    getEdge(from, to) {
+        const out = this.outgoing.get(from);
+        return out ? out.get(to) : undefined;
+    }
+
+    replayJournal() {
+        if (!fs.existsSync(this.journalPath)) return;
+        const lines = fs.readFileSync(this.journalPath, 'utf8').split('\n');
+        let applied = 0;
+        for (const line of lines) {
+            if (!line) continue;
+            try {
+                this.applyOp(JSON.parse(line));
+                applied++;
+            } catch (e) {
+                // A torn last line from a crash; everything before it is still valid
+                console.warn("[NeuralService] Skipping unreadable journal entry");
+            }
+        }
+        this.journalOps = applied;
+        if (applied > 0) console.log(`[NeuralService] Replayed ${applied} journal entries.`);
+    }
+
+    applyOp(op) {
+        if (op.op === 'node') {
+            if (!this.graph.nodes[op.node.id]) this.graph.nodes[op.node.id] = op.node;
+        } else if (op.op === 'edge') {
+            const existing = this.getEdge(op.from, op.to);
+            if (existing) {
+                existing.weight = op.weight;
+                existing.relation = op.relation;
+            } else {
+                const edge = { from: op.from, to: op.to, weight: op.weight, relation: op.relation };
+                this.graph.edges.push(edge);
+                this.indexEdge(edge);
+            }
+        }
+    }
+
+    retargetEdge(edge, newTo) {
+        this.unindexEdge(edge);
+        edge.to = newTo;
+        this.indexEdge(edge);
+    }
+
+    record(op) {
+        this.pendingOps.push(op);
+        this.saveGraph();
+    }
+
+    /**
+     * Schedules a flush of pending changes. Cheap to call after every mutation.
+     */
     saveGraph() {
+        if (this.saveTimer) return;
+        this.saveTimer = setTimeout(() => {
+            this.saveTimer = null;
+            this.flush();
+        }, SAVE_DEBOUNCE_MS);
+        if (this.saveTimer.unref) this.saveTimer.unref();
+    }
+
+    flush() {
+        // Ops recorded during a compaction wait for it, the journal is about to be emptied
+        if (this.compacting) return this.compacting.then(() => this.flush());
+        if (this.pendingOps.length === 0) return Promise.resolve();
+        if (this.journalOps + this.pendingOps.length > COMPACT_AFTER) {
+            return this.compact();
+        }
+        const ops = this.pendingOps;
+        this.pendingOps = [];
+        this.journalOps += ops.length;
+        return fs.promises.appendFile(this.journalPath, ops.map(op => JSON.stringify(op)).join('\n') + '\n')
+            .catch(e => console.error("NeuralService Save Error:", e));
+    }
+
+    flushSync() {
+        if (this.saveTimer) {
+            clearTimeout(this.saveTimer);
+            this.saveTimer = null;
+        }
+        if (this.pendingOps.length === 0) return;
         try {
-            fs.writeFileSync(this.storagePath, JSON.stringify(this.graph, null, 2));
+            fs.appendFileSync(this.journalPath, this.pendingOps.map(op => JSON.stringify(op)).join('\n') + '\n');
+            this.pendingOps = [];
         } catch (e) {
             console.error("NeuralService Save Error:", e);
         }
     }
 
+    /**
+     * Rewrites the snapshot (temp file + rename, off the event loop) and empties the journal.
+     * The snapshot is serialized up front, so it already holds every pending op.
+     */
+    compact() {
+        if (this.compacting) {
+            // The running pass serialized the graph before this call, so write it once more afterwards
+            if (!this.nextCompaction) {
+                this.nextCompaction = this.compacting.then(() => {
+                    this.nextCompaction = null;
+                    return this.compact();
+                });
+            }
+            return this.nextCompaction;
+        }
+        if (this.saveTimer) {
+            clearTimeout(this.saveTimer);
+            this.saveTimer = null;
+        }
+        const data = JSON.stringify(this.graph);
+        this.pendingOps = [];
+        this.compacting = writeFileAtomic(this.storagePath, data)
+            .then(() => fs.promises.writeFile(this.journalPath, ''))
+            .then(() => { this.journalOps = 0; })
+            .catch(e => console.error("NeuralService Save Error:", e))
+            .finally(() => {
+                this.compacting = null;
+                if (this.pendingOps.length > 0) this.saveGraph();
+            });
+        return this.compacting;
+    }
+
     /**
      * Seeds the neural network with basic concepts about the user's domain.
      * This ensures the "Agent" isn't empty on day 1.
@@ -58,13 +221,15 @@ class NeuralService {
     addNode(id, type, tags = []) {
         const nodeId = id.toUpperCase();
         if (!this.graph.nodes[nodeId]) {
-            this.graph.nodes[nodeId] = {
+            const node = {
                 id: nodeId,
                 type,
                 tags,
                 activation: 0,
                 last_activated: null
             };
+            this.graph.nodes[nodeId] = node;
+            this.record({ op: 'node', node });
             return true;
         }
         return false;
@@ -78,14 +243,16 @@ class NeuralService {
         this.addNode(fromId, 'auto');
         this.addNode(toId, 'auto');
 
-        const existing = this.graph.edges.find(e => e.from === fromId && e.to === toId);
-        if (existing) {
-            existing.weight = Math.min(1.0, existing.weight + 0.1); // Reinforce
-            existing.relation = relation;
+        let edge = this.getEdge(fromId, toId);
+        if (edge) {
+            edge.weight = Math.min(1.0, edge.weight + 0.1); // Reinforce
+            edge.relation = relation;
         } else {
-            this.graph.edges.push({ from: fromId, to: toId, weight, relation });
+            edge = { from: fromId, to: toId, weight, relation };
+            this.graph.edges.push(edge);
+            this.indexEdge(edge);
         }
-        this.saveGraph();
+        this.record({ op: 'edge', from: edge.from, to: edge.to, weight: edge.weight, relation: edge.relation });
     }
 
     /**
@@ -105,6 +272,8 @@ class NeuralService {
         if (forceReset === 'true') {
             console.warn('[NeuralService] ⚠️ GLOBAL KILL SWITCH DETECTED. Wiping local memory...');
             this.graph = { nodes: {}, edges: [] };
+            this.buildIndex();
+            this.pendingOps = [];
             this.seedBaseKnowledge(); // Re-seed basics
             // We don't save yet, we wait to pull valid data
         }
@@ -119,11 +288,14 @@ class NeuralService {
         console.log(`[NeuralService] Pulled ${globalNodes.length} nodes from Hive Mind.`);
 
         // 3. Merge Strategy (Hierarchy)
+        // Lookups go through the adjacency index; everything is written once as a new snapshot.
         let newEdgesCount = 0;
         let conflictsResolved = 0;
 
         for (const globalNode of globalNodes) {
             const { term, target, type, source_type, validation_status } = globalNode;
+            const termId = term.toUpperCase();
+            const targetId = target.toUpperCase();
 
             // source_type: 'MANUAL_OVERRIDE' (Individual), 'OFFICIAL_DEV' (Base), 'PASSIVE_OBSERVATION' (Collective)
             // Local graph edges don't track 'source_type' yet. We assume local edges are 'MANUAL' or 'PASSIVE-LOCAL'.
@@ -134,10 +306,12 @@ class NeuralService {
             // Let's assume everything currently in JSON is "Local Truth".
 
             // Conflict Check: Do we have an edge for this Term?
-            const existingEdge = this.graph.edges.find(e => e.from === term.toUpperCase());
+            const outgoing = this.outgoing.get(termId);
+            const sameEdge = outgoing ? outgoing.get(targetId) : undefined;
+            const existingEdge = sameEdge || (outgoing && outgoing.size > 0 ? outgoing.values().next().value : undefined);
 
             if (existingEdge) {
-                if (existingEdge.to === target.toUpperCase()) {
+                if (existingEdge === sameEdge) {
                     // Same connection. Reinforce weight?
                     if (source_type === 'OFFICIAL_DEV') existingEdge.weight = 1.0;
                     continue;
@@ -149,7 +323,8 @@ class NeuralService {
                     // Unless we add a flag 'is_locked' to local edges?
                     // For Phase 4, let's say Base wins.
                     console.log(`[Neural] Conflict: Local(${existingEdge.to}) vs Base(${target}). Base wins.`);
-                    existingEdge.to = target.toUpperCase();
+                    this.addNode(targetId, 'auto');
+                    this.retargetEdge(existingEdge, targetId);
                     existingEdge.weight = 1.0;
                     existingEdge.relation = type;
                     conflictsResolved++;
@@ -166,26 +341,40 @@ class NeuralService {
             }
         }
 
-        this.saveGraph();
+        this.compact();
         console.log(`[NeuralService] Sync Complete. Added: ${newEdgesCount}, Conflicts Resolved: ${conflictsResolved}.`);
     }
 
     /**
      * "Activates" the neural network around a specific term to find related concepts.
+     * Best-first spreading activation: the strongest signal is expanded first, so every node
+     * gets its best path and expansion stops as soon as the remaining signals fall below the cutoff.
      * @param {string} startTerm e.g. "CLIENTE"
+     * @param {{ limit?: number, minSignal?: number }} options
      * @returns {Array} List of related nodes sorted by weight
      */
-    activate(startTerm) {
+    activate(startTerm, options = {}) {
         const root = startTerm.toUpperCase();
         if (!this.graph.nodes[root]) return [];
 
-        // Simple BFS with weight decay
+        const limit = options.limit || Infinity;
+        const minSignal = options.minSignal || 0.01;
+        const propagateAbove = 0.2; // Threshold
+
         const activated = [];
         const visited = new Set();
-        const queue = [{ id: root, signal: 1.0 }];
-
-        while (queue.length > 0) {
-            const current = queue.shift();
+        const best = new Map([[root, 1.0]]);
+        const queue = new PriorityQueue(item => item.signal);
+        queue.push({ id: root, signal: 1.0 });
+
+        const offer = (id, signal) => {
+            if (signal < minSignal || visited.has(id) || (best.get(id) || 0) >= signal) return;
+            best.set(id, signal);
+            queue.push({ id, signal });
+        };
+
+        while (queue.size > 0 && activated.length < limit) {
+            const current = queue.pop();
             if (visited.has(current.id)) continue;
             visited.add(current.id);
 
@@ -195,27 +384,22 @@ class NeuralService {
             }
 
             // Propagate
-            if (current.signal > 0.2) { // Threshold
-                const outgoing = this.graph.edges.filter(e => e.from === current.id);
-                for (const edge of outgoing) {
-                    queue.push({
-                        id: edge.to,
-                        signal: current.signal * edge.weight
-                    });
+            if (current.signal > propagateAbove) {
+                const outgoing = this.outgoing.get(current.id);
+                if (outgoing) {
+                    for (const edge of outgoing.values()) offer(edge.to, current.signal * edge.weight);
                 }
 
                 // Bidirectional association (weaker reverse)
-                const incoming = this.graph.edges.filter(e => e.to === current.id);
-                for (const edge of incoming) {
-                    queue.push({
-                        id: edge.from,
-                        signal: current.signal * edge.weight * 0.5
-                    });
+                const incoming = this.incoming.get(current.id);
+                if (incoming) {
+                    for (const edge of incoming.values()) offer(edge.from, current.signal * edge.weight * 0.5);
                 }
             }
         }
 
-        return activated.sort((a, b) => b.relevance - a.relevance);
+        // Popped in descending signal order already
+        return activated;
     }
 }
 
@@ -0,0 +1,172 @@
+const crypto = require('crypto');
+const LruCache = require('../utils/lruCache');
+
+// Short-lived result cache for /api/query (dashboard widgets, drill-down counts, lookups).
+// Entries are keyed by connection + normalized SQL + binds + paging, live for the TTL the
+// caller asks for (capped by MAX_TTL_MS) and are evicted LRU within a memory budget.
+// Identical requests that arrive while one is executing share that execution.
+// Invalidation only sees DML/DDL sent through /api/query on the same connection; changes made
+// anywhere else (other sessions, jobs, the ERP itself) show up once the TTL runs out.
+
+const MAX_TTL_MS = 10 * 60 * 1000;
+const SIZE_SAMPLE_ROWS = 50;
+const Q_QUOTE_CLOSERS = { '[': ']', '(': ')', '{': '}', '<': '>' };
+
+// End index of the quoted text starting at i: '...' / "..." with doubled quotes, or an Oracle
+// q'[...]' literal (any delimiter, quotes inside don't end it). -1 if there is none at i.
+function quotedEnd(text, i, out) {
+    const ch = text[i];
+    if (ch === "'" || ch === '"') {
+        let j = i + 1;
+        while (j < text.length) {
+            if (text[j] === ch) {
+                if (text[j + 1] === ch) { j += 2; continue; } // escaped quote
+                break;
+            }
+            j++;
+        }
+        return Math.min(j, text.length - 1);
+    }
+    // q'…' / Q'…' (also after N for nq'…'), not the tail of an identifier
+    if ((ch === 'q' || ch === 'Q') && text[i + 1] === "'" && i + 2 < text.length && !/[\w$#]$/.test(out.replace(/[nN]$/, ''))) {
+        const close = Q_QUOTE_CLOSERS[text[i + 2]] || text[i + 2];
+        const end = text.indexOf(`${close}'`, i + 3);
+        return end === -1 ? text.length - 1 : end + 1;
+    }
+    return -1;
+}
+
+// Collapses whitespace and drops comments outside quoted text, so formatting differences
+// between widgets don't split the cache
+function normalizeSql(sql) {
+    let out = '';
+    let i = 0;
+    let pendingSpace = false;
+    const text = String(sql).trim().replace(/;\s*$/, '');
+    while (i < text.length) {
+        const ch = text[i];
+        const end = quotedEnd(text, i, pendingSpace ? '' : out);
+        if (end !== -1) {
+            if (pendingSpace && out) out += ' ';
+            pendingSpace = false;
+            out += text.substring(i, end + 1);
+            i = end + 1;
+        } else if (ch === '-' && text[i + 1] === '-') {
+            const end = text.indexOf('\n', i);
+            i = end === -1 ? text.length : end;
+            pendingSpace = true;
+        } else if (ch === '/' && text[i + 1] === '*' && text[i + 2] !== '+') { // keep optimizer hints
+            const end = text.indexOf('*/', i + 2);
+            i = end === -1 ? text.length : end + 2;
+            pendingSpace = true;
+        } else if (/\s/.test(ch)) {
+            pendingSpace = true;
+            i++;
+        } else {
+            if (pendingSpace && out) out += ' ';
+            pendingSpace = false;
+            out += ch;
+            i++;
+        }
+    }
+    return out;
+}
+
+// Rough byte size from a sample of rows; exact serialization of big results would cost
+// more than the cache saves
+function estimateSize(result) {
+    const rows = result && Array.isArray(result.rows) ? result.rows : [];
+    const meta = JSON.stringify(result && result.metaData ? result.metaData : []).length;
+    if (rows.length === 0) return meta + 64;
+    const sample = rows.length <= SIZE_SAMPLE_ROWS ? rows : rows.slice(0, SIZE_SAMPLE_ROWS);
+    let sampleBytes = 0;
+    for (const row of sample) sampleBytes += JSON.stringify(row).length;
+    return meta + Math.ceil((sampleBytes / sample.length) * rows.length * 2); // UTF-16 in memory
+}
+
+class QueryCacheService {
+    constructor() {
+        this.cache = new LruCache({
+            maxEntries: Number(process.env.QUERY_CACHE_MAX_ENTRIES) || 200,
+            maxBytes: (Number(process.env.QUERY_CACHE_MAX_MB) || 64) * 1024 * 1024,
+            sizeOf: estimateSize
+        });
+        this.inflight = new Map();
+        this.coalesced = 0;
+    }
+
+    buildKey(connectionKey, sql, binds, options = {}) {
+        const hash = crypto.createHash('sha1')
+            .update(normalizeSql(sql))
+            .update('\0')
+            .update(JSON.stringify(binds || []))
+            .update('\0')
+            .update(`${options.limit ?? ''}|${options.offset ?? ''}|${options.cursor ? 'cursor' : ''}`)
+            .digest('hex');
+        return `${connectionKey}|${hash}`;
+    }
+
+    /**
+     * Returns { result, status: 'HIT' | 'MISS' | 'COALESCED', ageMs }.
+     * refresh: skip a cached entry (still joins an execution already in flight).
+     */
+    async run(key, ttlMs, loader, options = {}) {
+        if (!options.refresh) {
+            const cached = this.lookup(key);
+            if (cached) return cached;
+        }
+
+        const running = this.inflight.get(key);
+        if (running) {
+            this.coalesced++;
+            const result = await running;
+            return { result, status: 'COALESCED', ageMs: 0 };
+        }
+
+        const pending = loader();
+        this.inflight.set(key, pending);
+        try {
+            const result = await pending;
+            this.store(key, result, ttlMs);
+            return { result, status: 'MISS', ageMs: 0 };
+        } finally {
+            this.inflight.delete(key);
+        }
+    }
+
+    /**
+     * { result, status: 'HIT', ageMs } for a live entry, else null.
+     */
+    lookup(key) {
+        const cached = this.cache.get(key);
+        if (cached === undefined) return null;
+        return { result: cached, status: 'HIT', ageMs: Date.now() - this.cache.peek(key).storedAt };
+    }
+
+    store(key, result, ttlMs) {
+        const ttl = Math.min(Math.max(Number(ttlMs) || 0, 0), MAX_TTL_MS);
+        if (ttl > 0) this.cache.set(key, result, ttl);
+    }
+
+    /**
+     * Drops every cached result of a connection (after DML/DDL run through it).
+     */
+    invalidate(connectionKey) {
+        const removed = this.cache.deleteWhere(key => key.startsWith(`${connectionKey}|`));
+        if (removed > 0) console.log(`[QueryCache] Invalidated ${removed} entries for ${connectionKey}`);
+        return removed;
+    }
+
+    clear() {
+        this.cache.clear();
+    }
+
+    stats() {
+        return { ...this.cache.stats(), inflight: this.inflight.size, coalesced: this.coalesced };
+    }
+}
+
+const queryCache = new QueryCacheService();
+queryCache.normalizeSql = normalizeSql;
+
+module.exports = queryCache;
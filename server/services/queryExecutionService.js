@@ -0,0 +1,172 @@
+const crypto = require('crypto');
+
+// Registry of running statements, so they can be stopped while Oracle is still working.
+// Each execution gets an id (client-supplied or generated). Once db.js has checked out its
+// connection, the execution is attached to it. cancel() then calls connection.break(): the
+// running call fails with ORA-01013 and the connection goes back to the pool instead of being
+// held until a runaway scan finishes. callTimeout (per connection profile or DB_CALL_TIMEOUT_MS)
+// is applied to the attached connection and reset before it is released.
+
+const DEFAULT_CALL_TIMEOUT_MS = Number(process.env.DB_CALL_TIMEOUT_MS) || 0;
+const CANCELLED = /ORA-01013/;
+const TIMED_OUT = /DPI-1067|NJS-123|ORA-03156/;
+
+function cancelledError() {
+    const err = new Error('Consulta cancelada.');
+    err.code = 'QUERY_CANCELLED';
+    return err;
+}
+
+class QueryExecutionService {
+    constructor() {
+        this.executions = new Map();
+        this.counters = { started: 0, completed: 0, failed: 0, cancelled: 0, timedOut: 0 };
+    }
+
+    /**
+     * Call timeout (ms) for a connection profile: profile.callTimeout is in seconds.
+     */
+    callTimeoutFor(connectionParams) {
+        const seconds = Number(connectionParams && connectionParams.callTimeout);
+        return seconds > 0 ? seconds * 1000 : DEFAULT_CALL_TIMEOUT_MS;
+    }
+
+    /**
+     * Registers an execution. A client-supplied id already in use is rejected (EXECUTION_ID_IN_USE):
+     * silently picking another one would leave the client unable to cancel its statement.
+     */
+    start({ id, kind, sql, connectionParams }) {
+        if (id && this.executions.has(String(id))) {
+            const err = new Error(`Já existe uma execução em andamento com o id ${id}.`);
+            err.code = 'EXECUTION_ID_IN_USE';
+            throw err;
+        }
+        const execution = {
+            id: id ? String(id) : crypto.randomUUID(),
+            kind: kind || 'query',
+            sql: sql ? String(sql).substring(0, 200) : '',
+            startedAt: Date.now(),
+            callTimeoutMs: this.callTimeoutFor(connectionParams),
+            conn: null,
+            cancelled: false,
+            reason: null
+        };
+        this.executions.set(execution.id, execution);
+        this.counters.started++;
+        return execution;
+    }
+
+    /**
+     * Called by db.js with the checked-out connection. A cancel that arrived while the request
+     * was still queued for a connection throws QUERY_CANCELLED: break() on an idle connection
+     * does nothing, so the statement must not be started at all (the caller releases `conn`).
+     */
+    attach(execution, conn) {
+        if (execution.cancelled) throw cancelledError();
+        execution.conn = conn;
+        if (execution.callTimeoutMs > 0) conn.callTimeout = execution.callTimeoutMs;
+    }
+
+    detach(execution) {
+        const conn = execution.conn;
+        execution.conn = null;
+        if (conn && execution.callTimeoutMs > 0) {
+            try { conn.callTimeout = 0; } catch (e) { /* connection already closed */ }
+        }
+    }
+
+    breakConnection(execution) {
+        const conn = execution.conn;
+        if (!conn) return;
+        conn.break().catch(err => console.warn(`[Executions] break() failed for ${execution.id}:`, err.message));
+    }
+
+    cancel(id, reason = 'user') {
+        const execution = this.executions.get(id);
+        if (!execution || execution.cancelled) return false;
+        execution.cancelled = true;
+        execution.reason = reason;
+        console.log(`[Executions] Cancelling ${execution.kind} ${id} (${reason}) after ${Date.now() - execution.startedAt}ms`);
+        this.breakConnection(execution);
+        return true;
+    }
+
+    /**
+     * Records the outcome. Returns the error to surface: cancellations and call timeouts get a
+     * readable message and a code (QUERY_CANCELLED / QUERY_TIMEOUT).
+     */
+    finish(execution, err = null) {
+        this.executions.delete(execution.id);
+        if (!err) {
+            this.counters.completed++;
+            return null;
+        }
+        const message = String(err.message || '');
+        if (execution.cancelled || CANCELLED.test(message)) {
+            this.counters.cancelled++;
+            return cancelledError();
+        }
+        if (TIMED_OUT.test(message)) {
+            this.counters.timedOut++;
+            const timedOut = new Error(`Consulta excedeu o tempo limite de ${Math.round(execution.callTimeoutMs / 1000)}s.`);
+            timedOut.code = 'QUERY_TIMEOUT';
+            return timedOut;
+        }
+        this.counters.failed++;
+        return err;
+    }
+
+    /**
+     * Runs fn(execution) and records the outcome; failures are rethrown as finish() maps them.
+     */
+    async run(options, fn) {
+        const execution = this.start(options);
+        try {
+            const result = await fn(execution);
+            this.finish(execution);
+            return result;
+        } catch (err) {
+            throw this.finish(execution, err);
+        }
+    }
+
+    /**
+     * run() for an HTTP request: the statement is cancelled if the client goes away (tab closed,
+     * fetch aborted) before the response is sent. The client may pick the id (body.executionId)
+     * to cancel explicitly later.
+     */
+    async runForRequest(req, res, options, fn) {
+        let current = null;
+        const onClose = () => {
+            if (current && !res.writableEnded) this.cancel(current.id, 'client disconnected');
+        };
+        res.on('close', onClose);
+        try {
+            return await this.run({ ...options, id: req.body && req.body.executionId }, (execution) => {
+                current = execution;
+                res.set('X-Execution-Id', execution.id);
+                return fn(execution);
+            });
+        } finally {
+            res.off('close', onClose);
+        }
+    }
+
+    list() {
+        const now = Date.now();
+        return Array.from(this.executions.values()).map(e => ({
+            id: e.id,
+            kind: e.kind,
+            sql: e.sql,
+            runningMs: now - e.startedAt,
+            callTimeoutMs: e.callTimeoutMs,
+            cancelled: e.cancelled
+        }));
+    }
+
+    stats() {
+        return { running: this.executions.size, ...this.counters };
+    }
+}
+
+module.exports = new QueryExecutionService();
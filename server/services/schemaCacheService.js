@@ -0,0 +1,183 @@
+const fs = require('fs');
+const path = require('path');
+const os = require('os');
+const crypto = require('crypto');
+
+// On-disk cache of the schema dictionary (owner -> table -> columns), one file per pool key.
+// File layout:
+// {
+//   version: 1,
+//   poolKey: "USER_host/service",
+//   currentUser: "USER",
+//   syncedAt: 1700000000000,                       // last time we validated against ALL_OBJECTS
+//   tables: { "OWNER.TABLE": { d: <LAST_DDL_TIME ms>, c: ["COL1", "COL2"] } }
+// }
+
+const CACHE_VERSION = 1;
+const PRIORITY_OWNERS = ['HUMASTER', 'INCORPORA'];
+
+class SchemaCacheService {
+    constructor() {
+        const appData = process.env.APPDATA || (process.platform == 'darwin' ? process.env.HOME + '/Library/Preferences' : process.env.HOME + "/.local/share");
+        this.cacheDir = path.join(appData || os.tmpdir(), 'HapAssistenteDeDados', 'schema_cache');
+
+        // Within this window a cached dictionary is served without touching the database at all
+        this.minRefreshMs = Number(process.env.SCHEMA_CACHE_REFRESH_MS) || 60 * 1000;
+
+        this.entries = new Map(); // poolKey -> entry
+        this.payloads = new Map(); // poolKey -> { full, compact } serialized bodies + etags
+    }
+
+    fileFor(poolKey) {
+        const hash = crypto.createHash('sha1').update(poolKey).digest('hex').substring(0, 16);
+        return path.join(this.cacheDir, `dictionary_${hash}.json`);
+    }
+
+    /**
+     * Returns the cached entry for a pool, loading it from disk on first access.
+     */
+    get(poolKey) {
+        if (this.entries.has(poolKey)) return this.entries.get(poolKey);
+
+        try {
+            const file = this.fileFor(poolKey);
+            if (fs.existsSync(file)) {
+                const entry = JSON.parse(fs.readFileSync(file, 'utf-8'));
+                if (entry && entry.version === CACHE_VERSION && entry.poolKey === poolKey && entry.tables) {
+                    this.entries.set(poolKey, entry);
+                    console.log(`[SchemaCache] Loaded ${Object.keys(entry.tables).length} tables from disk for ${poolKey}`);
+                    return entry;
+                }
+            }
+        } catch (e) {
+            console.error("[SchemaCache] Failed to read cache file:", e.message);
+        }
+        return null;
+    }
+
+    isFresh(entry) {
+        return !!entry && (Date.now() - entry.syncedAt) < this.minRefreshMs;
+    }
+
+    /**
+     * Stores a refreshed entry. `changed` tells whether table contents differ from the previous
+     * entry; when false only the sync timestamp moves and serialized payloads are kept.
+     */
+    set(poolKey, entry, changed = true) {
+        entry.version = CACHE_VERSION;
+        entry.poolKey = poolKey;
+        this.entries.set(poolKey, entry);
+        if (changed) this.payloads.delete(poolKey);
+        this.persist(poolKey, entry);
+    }
+
+    /**
+     * Forces the next request for this pool to revalidate against the database.
+     */
+    invalidate(poolKey) {
+        const entry = this.entries.get(poolKey);
+        if (entry) entry.syncedAt = 0;
+    }
+
+    persist(poolKey, entry) {
+        const file = this.fileFor(poolKey);
+        const tmp = `${file}.${process.pid}.tmp`;
+        fs.promises.mkdir(this.cacheDir, { recursive: true })
+            .then(() => fs.promises.writeFile(tmp, JSON.stringify(entry), 'utf-8'))
+            .then(() => fs.promises.rename(tmp, file))
+            .catch(e => console.error("[SchemaCache] Failed to persist cache:", e.message));
+    }
+
+    ownerRank(owner, currentUser) {
+        if (owner === currentUser) return 0;
+        if (PRIORITY_OWNERS.includes(owner)) return 1;
+        return 2;
+    }
+
+    /**
+     * Groups cached tables by owner, with owners in lookup priority order
+     * (current user, then HUMASTER/INCORPORA, then alphabetical).
+     */
+    groupByOwner(entry) {
+        const owners = {};
+        Object.keys(entry.tables).forEach(fullName => {
+            const cols = entry.tables[fullName].c;
+            if (!cols || cols.length === 0) return;
+            const dot = fullName.indexOf('.');
+            const owner = fullName.substring(0, dot);
+            const table = fullName.substring(dot + 1);
+            if (!owners[owner]) owners[owner] = {};
+            owners[owner][table] = cols;
+        });
+
+        const ordered = {};
+        Object.keys(owners)
+            .sort((a, b) => (this.ownerRank(a, entry.currentUser) - this.ownerRank(b, entry.currentUser)) || a.localeCompare(b))
+            .forEach(owner => {
+                ordered[owner] = {};
+                Object.keys(owners[owner]).sort().forEach(table => {
+                    ordered[owner][table] = owners[owner][table];
+                });
+            });
+        return ordered;
+    }
+
+    /**
+     * Legacy flat format: { "OWNER.TABLE": cols, "TABLE": cols }.
+     * Short names resolve to the current user's table first, then the first owner by priority.
+     */
+    buildDictionary(entry) {
+        const dictionary = {};
+        const owners = this.groupByOwner(entry);
+
+        Object.keys(owners).forEach(owner => {
+            Object.keys(owners[owner]).forEach(table => {
+                const cols = owners[owner][table];
+                dictionary[`${owner}.${table}`] = cols;
+
+                if (owner === entry.currentUser || !dictionary[table]) {
+                    dictionary[table] = cols;
+                }
+            });
+        });
+
+        return dictionary;
+    }
+
+    /**
+     * Compact format: each table listed once under its owner, no short-name duplicates.
+     * Clients rebuild short-name lookups using `currentUser` and the owner order.
+     */
+    buildCompact(entry) {
+        return {
+            version: CACHE_VERSION,
+            currentUser: entry.currentUser,
+            owners: this.groupByOwner(entry)
+        };
+    }
+
+    /**
+     * Returns { etag, body } for the requested format, serializing at most once per change.
+     * @param {string} format 'full' | 'compact'
+     */
+    getPayload(poolKey, format = 'full') {
+        const entry = this.entries.get(poolKey);
+        if (!entry) return null;
+
+        let cached = this.payloads.get(poolKey);
+        if (!cached) {
+            cached = {};
+            this.payloads.set(poolKey, cached);
+        }
+
+        if (!cached[format]) {
+            const data = format === 'compact' ? this.buildCompact(entry) : this.buildDictionary(entry);
+            const body = JSON.stringify(data);
+            const hash = crypto.createHash('sha1').update(body).digest('hex');
+            cached[format] = { etag: `"${format}-${hash}"`, body };
+        }
+        return cached[format];
+    }
+}
+
+module.exports = new SchemaCacheService();
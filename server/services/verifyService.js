@@ -0,0 +1,114 @@
+const readline = require('readline');
+const db = require('../db');
+
+// "Which of these values don't exist in table.column?" for lists of up to millions of values.
+// Values are consumed from any (async) iterable in chunks, each chunk bound as a single
+// SYS.ODCIVARCHAR2LIST collection and anti-joined in the database, so the SQL text is constant
+// (parsed once per connection) and only the missing values come back. Memory is bounded by the
+// chunk size plus the missing values already reported (used to dedupe across chunks).
+
+const CHUNK_SIZE = 10000; // ODCIVARCHAR2LIST is a VARRAY(32767)
+const IN_LIST_SIZE = 1000; // Fallback without the collection type: bound IN lists
+const MAX_VALUE_LENGTH = 4000;
+
+const TABLE_NAME = /^("?[\w$#]+"?\.)?"?[\w$#]+"?$/;
+const COLUMN_NAME = /^"?[\w$#]+"?$/;
+
+class VerifyService {
+    /**
+     * @param {AsyncIterable|Iterable} values raw values (trimmed; blanks are skipped)
+     * @param {Function} onMissing called with each batch of missing values as they are found
+     * @returns {Promise<{checked: number, missing: number}>}
+     */
+    async verifyMissing(tableName, columnName, values, onMissing, connectionParams = null) {
+        if (!TABLE_NAME.test(tableName || '')) throw new Error(`Nome de tabela inválido: ${tableName}`);
+        if (!COLUMN_NAME.test(columnName || '')) throw new Error(`Nome de coluna inválido: ${columnName}`);
+
+        const conn = await db.getConnection(connectionParams);
+        const stats = { checked: 0, missing: 0 };
+        const reported = new Set();
+
+        const report = async (missing) => {
+            const fresh = missing.filter(v => !reported.has(v));
+            if (fresh.length === 0) return;
+            fresh.forEach(v => reported.add(v));
+            stats.missing += fresh.length;
+            await onMissing(fresh);
+        };
+
+        try {
+            const findMissing = await this.prepareCheck(conn, tableName, columnName);
+            let chunk = new Set();
+            const flush = async () => {
+                const vals = Array.from(chunk);
+                chunk = new Set();
+                stats.checked += vals.length;
+                // Longer than any VARCHAR2 column: can't be there
+                const tooLong = vals.filter(v => v.length > MAX_VALUE_LENGTH);
+                const candidates = tooLong.length ? vals.filter(v => v.length <= MAX_VALUE_LENGTH) : vals;
+                await report(tooLong.concat(await findMissing(candidates)));
+            };
+
+            for await (const raw of values) {
+                if (raw === null || raw === undefined) continue;
+                const val = String(raw).trim();
+                if (val === '' || reported.has(val)) continue;
+                chunk.add(val);
+                if (chunk.size >= CHUNK_SIZE) await flush();
+            }
+            if (chunk.size > 0) await flush();
+        } finally {
+            await conn.close();
+        }
+        return stats;
+    }
+
+    /**
+     * Returns chunk => missing values. Prefers the collection anti-join; falls back to fixed-size
+     * bound IN lists (same SQL text for every slice) when the collection type isn't accessible.
+     */
+    async prepareCheck(conn, tableName, columnName) {
+        let listClass = null;
+        try {
+            listClass = await conn.getDbObjectClass('SYS.ODCIVARCHAR2LIST');
+        } catch (e) {
+            console.warn(`[Verify] SYS.ODCIVARCHAR2LIST unavailable (${e.message}). Using bound IN lists.`);
+        }
+
+        if (listClass) {
+            const sql = `SELECT v.COLUMN_VALUE FROM TABLE(:vals) v
+                WHERE NOT EXISTS (SELECT 1 FROM ${tableName} t WHERE t.${columnName} = v.COLUMN_VALUE)`;
+            return async (vals) => {
+                if (vals.length === 0) return [];
+                const result = await conn.execute(sql, { vals: { type: listClass, val: vals } }, {
+                    outFormat: db.oracledb.OUT_FORMAT_ARRAY,
+                    fetchArraySize: 1000
+                });
+                return result.rows.map(r => r[0]);
+            };
+        }
+
+        const placeholders = Array.from({ length: IN_LIST_SIZE }, (_, i) => `:${i + 1}`).join(',');
+        const sql = `SELECT DISTINCT ${columnName} FROM ${tableName} WHERE ${columnName} IN (${placeholders})`;
+        return async (vals) => {
+            const missing = [];
+            for (let i = 0; i < vals.length; i += IN_LIST_SIZE) {
+                const slice = vals.slice(i, i + IN_LIST_SIZE);
+                const binds = slice.concat(new Array(IN_LIST_SIZE - slice.length).fill(null));
+                const result = await conn.execute(sql, binds, { outFormat: db.oracledb.OUT_FORMAT_ARRAY });
+                const found = new Set(result.rows.map(r => String(r[0])));
+                for (const v of slice) if (!found.has(v)) missing.push(v);
+            }
+            return missing;
+        };
+    }
+
+    /**
+     * Values from a text stream, one per line.
+     */
+    lines(input) {
+        return readline.createInterface({ input, crlfDelay: Infinity });
+    }
+}
+
+module.exports = new VerifyService();
@@ -1,4 +1,6 @@
 @echo off
+rem Oracle calls run on libuv worker threads; the size must be set before the app starts
+if not defined UV_THREADPOOL_SIZE set UV_THREADPOOL_SIZE=16
 echo Starting Oracle Low-Code Builder...
 start "" "http://localhost:3001"
 oracle-builder.exe
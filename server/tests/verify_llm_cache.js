@@ -0,0 +1,78 @@
+// Manual check for the LLM completion cache and the schema-context selector.
+// Uses a stub Groq client, so no API key or network is needed:
+//   node tests/verify_llm_cache.js
+const os = require('os');
+const path = require('path');
+const fs = require('fs');
+const assert = require('assert');
+
+const cacheFile = path.join(os.tmpdir(), `llm_cache_test_${process.pid}.json`);
+process.env.LLM_CACHE_FILE = cacheFile;
+
+const llmCache = require('../services/llmCacheService');
+const { selectSchemaContext, formatSchemaContext } = require('../utils/schemaContext');
+
+const stubGroq = {
+    calls: 0,
+    chat: {
+        completions: {
+            create: async (body) => {
+                stubGroq.calls++;
+                await new Promise(r => setTimeout(r, 20));
+                return {
+                    choices: [{ message: { content: `resposta ${stubGroq.calls} para ${body.messages[1].content}` } }],
+                    usage: { prompt_tokens: 100, completion_tokens: 20, total_tokens: 120 }
+                };
+            }
+        }
+    }
+};
+
+const body = (sql, temperature = 0.1) => ({
+    model: 'stub-model',
+    temperature,
+    messages: [{ role: 'system', content: 'Explique.' }, { role: 'user', content: sql }]
+});
+
+async function run() {
+    // Miss, then hit for the same content; different temperature is a different entry
+    const first = await llmCache.complete(stubGroq, body('SELECT 1 FROM DUAL'));
+    const second = await llmCache.complete(stubGroq, body('SELECT 1 FROM DUAL'));
+    assert.strictEqual(stubGroq.calls, 1);
+    assert.strictEqual(second.cached, true);
+    assert.strictEqual(second.choices[0].message.content, first.choices[0].message.content);
+    await llmCache.complete(stubGroq, body('SELECT 1 FROM DUAL', 0.3));
+    assert.strictEqual(stubGroq.calls, 2);
+
+    // Concurrent identical requests share one call
+    await Promise.all([1, 2, 3].map(() => llmCache.complete(stubGroq, body('SELECT 2 FROM DUAL'))));
+    assert.strictEqual(stubGroq.calls, 3);
+    console.log('Cache stats:', llmCache.stats());
+    assert.ok(llmCache.stats().bytes > 0, 'entry sizes are tracked');
+
+    // Persistence round trip
+    await llmCache.persist();
+    const saved = JSON.parse(fs.readFileSync(cacheFile, 'utf-8'));
+    assert.strictEqual(saved.entries.length, 3);
+
+    // Schema context: only related tables, plus join partners through key columns
+    const schema = {
+        'HUMASTER.PACIENTE': ['CD_PACIENTE', 'NM_PACIENTE', 'DT_NASCIMENTO'],
+        'HUMASTER.ATENDIMENTO': ['CD_ATENDIMENTO', 'CD_PACIENTE', 'DT_ATENDIMENTO', 'CD_PRESTADOR'],
+        'HUMASTER.PRESTADOR': ['CD_PRESTADOR', 'NM_PRESTADOR'],
+        'INCORPORA.TB_OPE_AJUSTES_DE_PARA_REPASSE': ['ID_AJUSTE', 'VL_AJUSTE'],
+        'HUMASTER.EMPRESA_CONVENIADA': ['CD_EMPRESA', 'NM_EMPRESA']
+    };
+    const context = selectSchemaContext('Quantos atendimentos por paciente nascidos depois de 1990?', schema, { maxTables: 3 });
+    console.log(formatSchemaContext(context));
+    assert.ok(context['HUMASTER.ATENDIMENTO'] && context['HUMASTER.PACIENTE']);
+    assert.ok(!context['INCORPORA.TB_OPE_AJUSTES_DE_PARA_REPASSE']);
+    assert.ok(context['HUMASTER.PRESTADOR'], 'join partner via CD_PRESTADOR');
+    assert.strictEqual(selectSchemaContext('abacaxi', schema), null);
+
+    console.log('OK');
+}
+
+run()
+    .catch(err => { console.error(err); process.exitCode = 1; })
+    .finally(() => { try { fs.unlinkSync(cacheFile); } catch (e) { /* not written */ } });
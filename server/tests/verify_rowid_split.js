@@ -0,0 +1,52 @@
+// Manual check for which queries the parallel CSV export may split by ROWID ranges:
+//   node tests/verify_rowid_split.js
+const assert = require('assert');
+const { parseSplittableQuery, withRowidRange, splitTableName, groupExtents } = require('../utils/rowidSplit');
+
+// Plain row filters split
+const plain = parseSplittableQuery('SELECT a.CD_PACIENTE, a.NM_PACIENTE FROM HUMASTER.PACIENTE a WHERE a.SN_ATIVO = :1');
+assert.deepStrictEqual(plain, { columns: 'a.CD_PACIENTE, a.NM_PACIENTE', table: 'HUMASTER.PACIENTE', alias: 'a', where: 'a.SN_ATIVO = :1' });
+const chunk = withRowidRange(plain, ['S'], { lo: 'AAA', hi: 'BBB' });
+assert.ok(chunk.sql.endsWith('(a.SN_ATIVO = :1) AND a.ROWID BETWEEN CHARTOROWID(:rid_lo) AND CHARTOROWID(:rid_hi)'));
+assert.deepStrictEqual(chunk.binds, ['S', 'AAA', 'BBB']);
+assert.ok(parseSplittableQuery('select * from t'));
+
+// Anything computed across rows would be computed per range: single cursor instead
+[
+    'SELECT COUNT(*) FROM t',
+    'SELECT count (1) FROM t WHERE x = 1',
+    'SELECT SUM(VL_TOTAL) FROM t',
+    'SELECT MAX(DT_ATENDIMENTO), MIN(DT_ATENDIMENTO) FROM t',
+    'SELECT LISTAGG(NM, \',\') WITHIN GROUP (ORDER BY NM) FROM t',
+    'SELECT x, row_number() over(partition by y order by z) rn FROM t',
+    'SELECT x, SUM(v) OVER () FROM t',
+    'SELECT x, count(*) FROM t GROUP BY x',
+    'SELECT DISTINCT x FROM t',
+    'SELECT UNIQUE x FROM t',
+    'SELECT x FROM t ORDER BY x',
+    'SELECT x FROM t WHERE ROWNUM <= 10',
+    'SELECT x FROM t FETCH FIRST 10 ROWS ONLY',
+    'SELECT x FROM t OFFSET 10 ROWS FETCH NEXT 10 ROWS ONLY',
+    'SELECT x FROM t SAMPLE (10)',
+    'SELECT a.x FROM t a JOIN u b ON a.id = b.id',
+    'SELECT x FROM t UNION ALL SELECT x FROM u',
+    'SELECT x FROM (SELECT x FROM t)'
+].forEach(sql => assert.strictEqual(parseSplittableQuery(sql), null, sql));
+
+// Table names resolve like the dictionary stores them
+assert.deepStrictEqual(splitTableName('humaster.paciente'), { owner: 'HUMASTER', name: 'PACIENTE' });
+assert.deepStrictEqual(splitTableName('"MixedCase"'), { owner: null, name: 'MixedCase' });
+
+// Ranges follow the extent map: consecutive extents, similar block counts, every extent covered once
+const extents = [
+    { lo: 'e1lo', hi: 'e1hi', blocks: 8 },
+    { lo: 'e2lo', hi: 'e2hi', blocks: 8 },
+    { lo: 'e3lo', hi: 'e3hi', blocks: 128 },
+    { lo: 'e4lo', hi: 'e4hi', blocks: 128 },
+    { lo: 'e5lo', hi: 'e5hi', blocks: 8 }
+];
+assert.deepStrictEqual(groupExtents(extents, 2), [{ lo: 'e1lo', hi: 'e3hi' }, { lo: 'e4lo', hi: 'e5hi' }]);
+assert.strictEqual(groupExtents(extents, 8).length, 3, 'an extent is never split, small ones are merged');
+assert.deepStrictEqual(groupExtents(extents.slice(0, 1), 4), [{ lo: 'e1lo', hi: 'e1hi' }]);
+
+console.log('OK');
@@ -0,0 +1,58 @@
+// Manual check for incremental data snapshots (dedup, restore, prune) in temp folders:
+//   node tests/verify_snapshots.js
+const os = require('os');
+const path = require('path');
+const fs = require('fs');
+const assert = require('assert');
+const { randomBytes } = require('crypto');
+const { createSnapshot, restoreSnapshot, pruneSnapshots } = require('../workers/snapshotWorker');
+
+const root = fs.mkdtempSync(path.join(os.tmpdir(), 'snapshot_test_'));
+const sourceDir = path.join(root, 'data');
+const storeDir = path.join(root, 'snapshots');
+
+async function run() {
+    fs.mkdirSync(path.join(sourceDir, 'docs'), { recursive: true });
+    fs.writeFileSync(path.join(sourceDir, 'config.json'), '{"activeBackend":"local"}');
+    fs.writeFileSync(path.join(sourceDir, 'docs', 'copia.json'), '{"activeBackend":"local"}');
+    fs.writeFileSync(path.join(sourceDir, 'grande.bin'), randomBytes(2 * 1024 * 1024));
+    fs.writeFileSync(path.join(sourceDir, 'config.json.123.tmp'), 'half written');
+
+    const first = await createSnapshot({ sourceDir, storeDir, id: 's1', version: 'test' });
+    assert.strictEqual(first.files, 3, 'temp files are skipped');
+    assert.strictEqual(first.newBlobs, 2, 'identical files share one blob');
+
+    await new Promise(r => setTimeout(r, 20));
+    fs.writeFileSync(path.join(sourceDir, 'config.json'), '{"activeBackend":"supabase"}');
+    const second = await createSnapshot({ sourceDir, storeDir, id: 's2', version: 'test', previousId: 's1', throttleBytesPerSec: 64 * 1024 * 1024 });
+    assert.strictEqual(second.reused, 2, 'unchanged files are not read again');
+    assert.strictEqual(second.newBlobs, 1);
+
+    const target = path.join(root, 'restored');
+    const restored = await restoreSnapshot({ storeDir, id: 's1', targetDir: target });
+    assert.strictEqual(restored.files, 3);
+    assert.strictEqual(fs.readFileSync(path.join(target, 'config.json'), 'utf-8'), '{"activeBackend":"local"}');
+    assert.ok(fs.readFileSync(path.join(target, 'grande.bin')).equals(fs.readFileSync(path.join(sourceDir, 'grande.bin'))));
+
+    // Restore over the changed directory: edited files go back, files added since are removed
+    fs.writeFileSync(path.join(sourceDir, 'docs', 'novo.json'), '{"criado":"depois"}');
+    fs.writeFileSync(path.join(sourceDir, 'docs', 'copia.json'), '{"editado":true}');
+    const over = await restoreSnapshot({ storeDir, id: 's1', targetDir: sourceDir });
+    assert.strictEqual(over.removed, 1, 'the file added after the snapshot is deleted');
+    assert.ok(!fs.existsSync(path.join(sourceDir, 'docs', 'novo.json')));
+    assert.strictEqual(fs.readFileSync(path.join(sourceDir, 'docs', 'copia.json'), 'utf-8'), '{"activeBackend":"local"}');
+    assert.strictEqual(fs.readFileSync(path.join(sourceDir, 'config.json'), 'utf-8'), '{"activeBackend":"local"}');
+    assert.deepStrictEqual(fs.readdirSync(root).sort(), ['data', 'restored', 'snapshots'], 'staging directory is cleaned up');
+
+    const pruned = await pruneSnapshots({ storeDir, keep: 1 });
+    assert.deepStrictEqual([pruned.kept, pruned.removed], [1, 1]);
+    assert.strictEqual(pruned.blobsRemoved, 0, 'the old config blob is still used by docs/copia.json');
+    await assert.rejects(restoreSnapshot({ storeDir, id: 's1', targetDir: target }));
+
+    console.log(first, second, pruned);
+    console.log('OK');
+}
+
+run()
+    .catch(err => { console.error(err); process.exitCode = 1; })
+    .finally(() => fs.rmSync(root, { recursive: true, force: true }));
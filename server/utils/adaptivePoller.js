@@ -0,0 +1,66 @@
+/**
+ * Polling loop with adaptive backoff. The task resolves truthy when it found activity:
+ * the next run is then scheduled at `minMs`; idle runs (and errors) stretch the delay
+ * by `factor` up to `maxMs`. poke() runs the task right away and resets the delay.
+ */
+class AdaptivePoller {
+    constructor(task, options = {}) {
+        this.task = task;
+        this.minMs = options.minMs || 1000;
+        this.maxMs = options.maxMs || 15000;
+        this.factor = options.factor || 2;
+        this.name = options.name || 'AdaptivePoller';
+        this.delay = this.minMs;
+        this.timer = null;
+        this.running = false;
+        this.active = false;
+        this.pending = false;
+    }
+
+    start() {
+        if (this.active) return;
+        this.active = true;
+        this.delay = this.minMs;
+        this.run();
+    }
+
+    stop() {
+        this.active = false;
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+    }
+
+    poke() {
+        if (!this.active) return;
+        this.delay = this.minMs;
+        if (this.running) {
+            this.pending = true;
+            return;
+        }
+        this.run();
+    }
+
+    async run() {
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+        this.running = true;
+        let busy = false;
+        try {
+            busy = await this.task();
+        } catch (e) {
+            console.error(`[${this.name}] Poll error:`, e.message);
+        }
+        this.running = false;
+        if (!this.active) return;
+
+        if (this.pending) {
+            this.pending = false;
+            return this.run();
+        }
+        this.delay = busy ? this.minMs : Math.min(this.maxMs, Math.round(this.delay * this.factor));
+        this.timer = setTimeout(() => this.run(), this.delay);
+        if (this.timer.unref) this.timer.unref();
+    }
+}
+
+module.exports = AdaptivePoller;
@@ -0,0 +1,105 @@
+const { compileColumnFilter, applyColumnFilter } = require('./columnFilter');
+const { columnKind } = require('./xlsxStream');
+
+// Compiles a dashboard widget (dimension, measure, aggregation, filters) into one GROUP BY
+// query over the widget's source SQL, so only the aggregated points leave the database.
+// With topN, groups are ranked by value in the same statement and everything past the N-th
+// is folded into a single "others" row (OTHERS = 1), computed from the partial aggregates so
+// averages stay exact. Result columns: NAME, VALUE, OTHERS, GROUPS (distinct groups before
+// folding). A spec without dimension yields a single row (KPI).
+
+const MAX_TOP_N = 1000;
+
+// Per-group expression and how partial groups combine into the "others" row
+const AGGREGATIONS = {
+    count: { numeric: false, group: () => 'COUNT(*)', fold: 'SUM(VALUE)' },
+    sum: { numeric: true, group: (m) => `SUM(${m})`, fold: 'SUM(VALUE)' },
+    min: { numeric: false, group: (m) => `MIN(${m})`, fold: 'MIN(VALUE)' },
+    max: { numeric: false, group: (m) => `MAX(${m})`, fold: 'MAX(VALUE)' },
+    avg: { numeric: true, group: (m) => `SUM(${m}) / NULLIF(COUNT(${m}), 0)`, fold: 'SUM(S) / NULLIF(SUM(C), 0)' }
+};
+
+function resolveColumn(name, columns, label) {
+    if (!name || typeof name !== 'string') throw new Error(`${label} não informado.`);
+    if (columns) {
+        const meta = columns.get(name) || columns.get(name.toUpperCase());
+        if (!meta) throw new Error(`${label} inválido: ${name}`);
+        return { sql: `"${meta.name.replace(/"/g, '""')}"`, meta };
+    }
+    const clean = name.replace(/[^a-zA-Z0-9_$#]/g, '');
+    if (!clean) throw new Error(`${label} inválido: ${name}`);
+    return { sql: `"${clean}"`, meta: null };
+}
+
+/**
+ * @param {Object} spec { sql, params, dimension, measure, aggType, filter, topN, others, order }
+ *   order: 'value' (default, descending) or 'dimension'
+ * @param {Array|null} metaData result columns of spec.sql ({ name, dbTypeName }); when given,
+ *   dimension/measure must be among them and sum/avg need a numeric measure
+ * @returns {{ sql: string, binds: Array|Object }}
+ */
+function compileChartQuery(spec, metaData = null) {
+    const aggType = String(spec.aggType || 'count').toLowerCase();
+    const agg = AGGREGATIONS[aggType];
+    if (!agg) throw new Error(`Agregação não suportada: ${spec.aggType}`);
+
+    const columns = metaData ? new Map(metaData.map(m => [m.name, m])) : null;
+    const measure = aggType === 'count' ? null : resolveColumn(spec.measure, columns, 'Campo de valor');
+    if (measure && agg.numeric && measure.meta && columnKind(measure.meta) !== 'number') {
+        throw new Error(`Campo de valor não é numérico: ${spec.measure}`);
+    }
+
+    const compiled = compileColumnFilter(spec.filter, metaData);
+    const source = applyColumnFilter(String(spec.sql).trim().replace(/;\s*$/, ''), spec.params || [], compiled);
+    const m = measure ? measure.sql : null;
+
+    if (!spec.dimension) {
+        return {
+            sql: `SELECT NULL AS NAME, ${agg.group(m)} AS VALUE, 0 AS OTHERS, 1 AS GROUPS FROM (${source.sql}\n) src`,
+            binds: source.binds
+        };
+    }
+
+    const dim = resolveColumn(spec.dimension, columns, 'Campo de categoria').sql;
+    const byDimension = spec.order === 'dimension';
+    const topN = Math.min(Math.floor(Number(spec.topN) || 0), MAX_TOP_N);
+
+    if (topN <= 0) {
+        return {
+            sql: `SELECT ${dim} AS NAME, ${agg.group(m)} AS VALUE, 0 AS OTHERS, COUNT(*) OVER () AS GROUPS
+                FROM (${source.sql}\n) src GROUP BY ${dim}
+                ORDER BY ${byDimension ? '1 NULLS LAST' : '2 DESC NULLS LAST, 1'}`,
+            binds: source.binds
+        };
+    }
+
+    // avg keeps SUM/COUNT per group so the folded row is a true average
+    const partials = aggType === 'avg' ? `, SUM(${m}) AS S, COUNT(${m}) AS C` : '';
+    const ranked = `SELECT g.*, ROW_NUMBER() OVER (ORDER BY VALUE DESC NULLS LAST, NAME) AS RN, COUNT(*) OVER () AS GROUPS
+        FROM (SELECT ${dim} AS NAME, ${agg.group(m)} AS VALUE${partials} FROM (${source.sql}\n) src GROUP BY ${dim}) g`;
+    const bucket = `CASE WHEN RN <= ${topN} THEN RN ELSE ${topN + 1} END`;
+    const others = spec.others !== false;
+
+    return {
+        sql: `SELECT CASE WHEN MIN(RN) <= ${topN} THEN MAX(NAME) END AS NAME, CASE WHEN MIN(RN) <= ${topN} THEN MAX(VALUE) ELSE ${agg.fold} END AS VALUE,
+                CASE WHEN MIN(RN) <= ${topN} THEN 0 ELSE 1 END AS OTHERS, MAX(GROUPS) AS GROUPS
+            FROM (${ranked})
+            ${others ? '' : `WHERE RN <= ${topN}`}
+            GROUP BY ${bucket}
+            ORDER BY 3, ${byDimension ? '1 NULLS LAST' : `MIN(RN)`}`,
+        binds: source.binds
+    };
+}
+
+/**
+ * Maps the compiled query's rows (array format) to chart points.
+ */
+function toChartPoints(rows) {
+    const points = rows.map(r => (r[2] ? { name: null, value: r[1], others: true } : { name: r[0], value: r[1] }));
+    return { points, groups: rows.length ? Number(rows[0][3]) : 0 };
+}
+
+module.exports = {
+    compileChartQuery,
+    toChartPoints
+};
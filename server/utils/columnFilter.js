@@ -0,0 +1,198 @@
+const { columnKind } = require('./xlsxStream');
+
+// Compiles the grid's header filters ({ column: text }) into a WHERE clause with bind variables,
+// so every keystroke reuses the same SQL text (one cursor per filter shape, not per value).
+// Operators by column type:
+//   text:   abc (contains) | =abc (equals) | abc* (starts with)
+//   number: 10 | >10 | >=10 | <10 | <=10 | <>10 | 10..20
+//   date:   dd/mm/yyyy [hh:mi[:ss]] | yyyy-mm-dd | mm/yyyy | yyyy, with the same operators and ranges
+// Text compares UPPER("COL") against an upper-cased bind, matching the UPPER() indexes created
+// on import; "=" and "abc*" can use them. Numbers and dates compare the bare column.
+// Values that don't parse for the column type fall back to a contains match on the text form.
+
+const BIND_PREFIX = 'hqf';
+const DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS';
+const DISPLAY_DATE_FORMAT = 'DD/MM/YYYY HH24:MI:SS';
+
+const OPERATOR = /^(>=|<=|<>|!=|>|<|=)\s*(.*)$/;
+const RANGE = /^(.+?)\s*\.\.\s*(.+)$/;
+
+function escapeLike(str) {
+    return str.replace(/[\\%_]/g, '\\$&');
+}
+
+// Accepts 10, -1.5, 1,5 and 1.234,56
+function parseNumber(str) {
+    let s = str.replace(/\s/g, '');
+    if (/^-?\d{1,3}(\.\d{3})+(,\d+)?$/.test(s)) s = s.replace(/\./g, '').replace(',', '.');
+    else s = s.replace(',', '.');
+    if (!/^-?(\d+\.?\d*|\.\d+)$/.test(s)) return null;
+    return Number(s);
+}
+
+function pad(n) {
+    return String(n).padStart(2, '0');
+}
+
+// Components may overflow (day 32, month 13, minute 60): Date.UTC carries them over
+function formatBound(y, mo, d, h = 0, mi = 0, s = 0) {
+    const dt = new Date(Date.UTC(y, mo - 1, d, h, mi, s));
+    return `${dt.getUTCFullYear()}-${pad(dt.getUTCMonth() + 1)}-${pad(dt.getUTCDate())} ${pad(dt.getUTCHours())}:${pad(dt.getUTCMinutes())}:${pad(dt.getUTCSeconds())}`;
+}
+
+/**
+ * Half-open interval [from, to) covered by a typed date, as 'YYYY-MM-DD HH24:MI:SS' strings.
+ * The precision typed decides the width: a day, a month, a year, a minute or a second.
+ */
+function parseDateBounds(str) {
+    let m = /^(\d{1,2})\/(\d{1,2})\/(\d{4})(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?$/.exec(str)
+        || /^(\d{4})-(\d{1,2})-(\d{1,2})(?:[\sT](\d{1,2}):(\d{2})(?::(\d{2}))?)?$/.exec(str);
+    if (m) {
+        const iso = str.includes('-');
+        const y = Number(iso ? m[1] : m[3]), mo = Number(m[2]), d = Number(iso ? m[3] : m[1]);
+        if (new Date(Date.UTC(y, mo - 1, d)).getUTCDate() !== d || mo < 1 || mo > 12) return null; // 31/02 etc.
+        if (m[4] === undefined) return { from: formatBound(y, mo, d), to: formatBound(y, mo, d + 1) };
+        const h = Number(m[4]), mi = Number(m[5]);
+        if (m[6] === undefined) return { from: formatBound(y, mo, d, h, mi), to: formatBound(y, mo, d, h, mi + 1) };
+        const s = Number(m[6]);
+        return { from: formatBound(y, mo, d, h, mi, s), to: formatBound(y, mo, d, h, mi, s + 1) };
+    }
+    m = /^(\d{1,2})\/(\d{4})$/.exec(str);
+    if (m) {
+        const mo = Number(m[1]), y = Number(m[2]);
+        if (mo < 1 || mo > 12) return null;
+        return { from: formatBound(y, mo, 1), to: formatBound(y, mo + 1, 1) };
+    }
+    m = /^(\d{4})$/.exec(str);
+    if (m) return { from: formatBound(Number(m[1]), 1, 1), to: formatBound(Number(m[1]) + 1, 1, 1) };
+    return null;
+}
+
+class FilterBuilder {
+    constructor() {
+        this.values = [];
+        this.clauses = [];
+    }
+
+    bind(value) {
+        this.values.push(value);
+        return `:${BIND_PREFIX}${this.values.length - 1}`;
+    }
+
+    contains(expr, text) {
+        this.clauses.push(`${expr} LIKE ${this.bind('%' + escapeLike(text.toUpperCase()) + '%')} ESCAPE '\\'`);
+    }
+
+    text(col, raw) {
+        const expr = `UPPER(${col})`;
+        if (raw.startsWith('=') && raw.length > 1) {
+            this.clauses.push(`${expr} = ${this.bind(raw.substring(1).toUpperCase())}`);
+        } else if (raw.endsWith('*') && raw.length > 1 && !raw.slice(0, -1).includes('*')) {
+            this.clauses.push(`${expr} LIKE ${this.bind(escapeLike(raw.slice(0, -1).toUpperCase()) + '%')} ESCAPE '\\'`);
+        } else {
+            this.contains(expr, raw);
+        }
+    }
+
+    number(col, raw) {
+        const range = RANGE.exec(raw);
+        if (range) {
+            const lo = parseNumber(range[1]), hi = parseNumber(range[2]);
+            if (lo !== null && hi !== null) {
+                this.clauses.push(`${col} BETWEEN ${this.bind(lo)} AND ${this.bind(hi)}`);
+                return;
+            }
+        }
+        const op = OPERATOR.exec(raw);
+        const value = parseNumber(op ? op[2] : raw);
+        if (value === null) return this.contains(`TO_CHAR(${col})`, raw);
+        const sqlOp = op ? (op[1] === '!=' ? '<>' : op[1]) : '=';
+        this.clauses.push(`${col} ${sqlOp} ${this.bind(value)}`);
+    }
+
+    date(col, raw) {
+        const toDate = (value) => `TO_DATE(${this.bind(value)}, '${DATE_FORMAT}')`;
+
+        const range = RANGE.exec(raw);
+        if (range) {
+            const lo = parseDateBounds(range[1]), hi = parseDateBounds(range[2]);
+            if (lo && hi) {
+                this.clauses.push(`${col} >= ${toDate(lo.from)} AND ${col} < ${toDate(hi.to)}`);
+                return;
+            }
+        }
+        const op = OPERATOR.exec(raw);
+        const bounds = parseDateBounds(op ? op[2] : raw);
+        if (!bounds) return this.contains(`TO_CHAR(${col}, '${DISPLAY_DATE_FORMAT}')`, raw);
+
+        switch (op ? op[1] : '=') {
+            case '>': this.clauses.push(`${col} >= ${toDate(bounds.to)}`); break;
+            case '>=': this.clauses.push(`${col} >= ${toDate(bounds.from)}`); break;
+            case '<': this.clauses.push(`${col} < ${toDate(bounds.from)}`); break;
+            case '<=': this.clauses.push(`${col} < ${toDate(bounds.to)}`); break;
+            case '<>':
+            case '!=': this.clauses.push(`(${col} < ${toDate(bounds.from)} OR ${col} >= ${toDate(bounds.to)})`); break;
+            default: this.clauses.push(`${col} >= ${toDate(bounds.from)} AND ${col} < ${toDate(bounds.to)}`);
+        }
+    }
+}
+
+/**
+ * @param {Object} filter { columnName: filterText }
+ * @param {Array|null} metaData result columns ({ name, dbTypeName }) of the filtered query.
+ *   With metadata, filters on unknown columns are ignored; without it every column is text.
+ * @returns {{ where: string, values: Array }} where is '' when there is nothing to filter
+ */
+function compileColumnFilter(filter, metaData = null) {
+    const builder = new FilterBuilder();
+    if (!filter || typeof filter !== 'object') return { where: '', values: [] };
+
+    const columns = metaData ? new Map(metaData.map(m => [m.name, m])) : null;
+
+    for (const [name, val] of Object.entries(filter)) {
+        if (val === null || val === undefined) continue;
+        const raw = String(val).trim();
+        if (raw === '') continue;
+
+        let kind = 'text';
+        let col;
+        if (columns) {
+            const meta = columns.get(name);
+            if (!meta) continue;
+            kind = columnKind(meta);
+            col = `"${name.replace(/"/g, '""')}"`;
+        } else {
+            col = `"${name.replace(/[^a-zA-Z0-9_$#]/g, '')}"`;
+        }
+
+        if (kind === 'number') builder.number(col, raw);
+        else if (kind === 'date') builder.date(col, raw);
+        else builder.text(col, raw);
+    }
+
+    return { where: builder.clauses.join(' AND '), values: builder.values };
+}
+
+/**
+ * Wraps sql with the compiled filter and merges its values into the caller's binds.
+ * Positional (array) binds get the filter values appended, which matches the placeholder
+ * order since the filter follows the inner query; named binds get hqf0, hqf1, ...
+ */
+function applyColumnFilter(sql, params, compiled) {
+    if (!compiled || !compiled.where) return { sql, binds: params || [] };
+
+    const wrapped = `SELECT * FROM(${sql}\n) WHERE ${compiled.where} `;
+    if (!params || Array.isArray(params)) {
+        return { sql: wrapped, binds: [...(params || []), ...compiled.values] };
+    }
+    const binds = { ...params };
+    compiled.values.forEach((value, i) => { binds[`${BIND_PREFIX}${i}`] = value; });
+    return { sql: wrapped, binds };
+}
+
+module.exports = {
+    compileColumnFilter,
+    applyColumnFilter,
+    parseDateBounds,
+    parseNumber
+};
@@ -0,0 +1,77 @@
+// Value classification shared by the CSV analysis worker and the import binder.
+
+// Recognized date layouts, most specific first. `mask` is the Oracle format model.
+const DATE_FORMATS = [
+    { mask: 'DD/MM/YYYY HH24:MI:SS', re: /^(\d{1,2})\/(\d{1,2})\/(\d{4})[ T](\d{1,2}):(\d{2}):(\d{2})$/, parts: ['d', 'm', 'y', 'h', 'mi', 's'] },
+    { mask: 'DD/MM/YYYY HH24:MI', re: /^(\d{1,2})\/(\d{1,2})\/(\d{4})[ T](\d{1,2}):(\d{2})$/, parts: ['d', 'm', 'y', 'h', 'mi'] },
+    { mask: 'DD/MM/YYYY', re: /^(\d{1,2})\/(\d{1,2})\/(\d{4})$/, parts: ['d', 'm', 'y'] },
+    { mask: 'DD-MM-YYYY', re: /^(\d{1,2})-(\d{1,2})-(\d{4})$/, parts: ['d', 'm', 'y'] },
+    { mask: 'YYYY-MM-DD HH24:MI:SS', re: /^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2}):(\d{2})(\.\d+)?Z?$/, parts: ['y', 'm', 'd', 'h', 'mi', 's'] },
+    { mask: 'YYYY-MM-DD', re: /^(\d{4})-(\d{2})-(\d{2})$/, parts: ['y', 'm', 'd'] },
+    { mask: 'YYYYMMDD', re: /^(\d{4})(\d{2})(\d{2})$/, parts: ['y', 'm', 'd'], strict: true }
+];
+
+function matchDate(str, format) {
+    const m = format.re.exec(str);
+    if (!m) return null;
+    const p = { h: 0, mi: 0, s: 0 };
+    format.parts.forEach((name, i) => { p[name] = Number(m[i + 1]); });
+    if (p.m < 1 || p.m > 12 || p.d < 1 || p.d > 31 || p.h > 23 || p.mi > 59 || p.s > 59) return null;
+    if (format.strict && (p.y < 1900 || p.y > 2100)) return null;
+    const date = new Date(p.y, p.m - 1, p.d, p.h, p.mi, p.s);
+    // Reject rollovers such as 31/02
+    if (date.getMonth() !== p.m - 1) return null;
+    return date;
+}
+
+/**
+ * Returns the Oracle mask of the first layout that matches, or null.
+ */
+function detectDateFormat(value) {
+    const str = String(value).trim();
+    for (const format of DATE_FORMATS) {
+        if (matchDate(str, format)) return format.mask;
+    }
+    return null;
+}
+
+/**
+ * Parses a value with a known mask; falls back to Date parsing when no mask is given.
+ * @returns {Date|null}
+ */
+function parseDate(value, mask = null) {
+    const str = String(value).trim();
+    if (mask) {
+        const format = DATE_FORMATS.find(f => f.mask === mask);
+        if (format) return matchDate(str, format);
+    }
+    const d = new Date(str);
+    return isNaN(d.getTime()) ? null : d;
+}
+
+/**
+ * Numeric check matching the import binder (comma accepted as decimal separator).
+ * @returns {{ precision: number, scale: number, leadingZero: boolean }|null}
+ */
+function classifyNumber(value) {
+    const str = String(value).trim().replace(',', '.');
+    if (str === '' || isNaN(Number(str))) return null;
+    if (!/^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$/.test(str)) return null;
+
+    const unsigned = str.replace(/^[-+]/, '');
+    const [intPart, fracPart = ''] = unsigned.split(/[eE]/)[0].split('.');
+    const intDigits = intPart.replace(/^0+(?=\d)/, '').length;
+    return {
+        precision: intDigits + fracPart.length,
+        scale: fracPart.length,
+        // "007" style codes must stay text, NUMBER would drop the zeros
+        leadingZero: intPart.length > 1 && intPart.startsWith('0')
+    };
+}
+
+module.exports = {
+    DATE_FORMATS,
+    detectDateFormat,
+    parseDate,
+    classifyNumber
+};
@@ -0,0 +1,350 @@
+const fs = require('fs');
+const { register, unregister, writeFileAtomic, writeFileAtomicSync } = require('./jsonStore');
+
+// Persistent inverted index for the local documentation (books/pages in localDocService).
+// On disk we keep the forward index (node -> term frequencies); postings (term -> node -> tf)
+// are rebuilt in memory on load. Ranking is BM25 with title occurrences boosted. The last
+// query word also matches longer terms (search-as-you-type: "conv" finds "conversão").
+
+const INDEX_VERSION = 1;
+const TITLE_BOOST = 3;
+const SNIPPET_CHARS = 300;
+const K1 = 1.2;
+const B = 0.75;
+const PREFIX_WEIGHT = 0.5; // completions of the last word score below an exact match
+const MAX_PREFIX_TERMS = 50;
+
+const STOPWORDS = new Set([
+    'de', 'da', 'do', 'das', 'dos', 'que', 'para', 'com', 'uma', 'um', 'os', 'as', 'em', 'no', 'na',
+    'nos', 'nas', 'por', 'se', 'ao', 'aos', 'ou', 'e', 'o', 'a', 'the', 'and', 'of', 'to', 'in', 'is'
+]);
+
+const ENTITIES = { nbsp: ' ', amp: '&', lt: '<', gt: '>', quot: '"', apos: "'" };
+
+/**
+ * HTML -> plain text (tags removed, entities decoded, whitespace collapsed).
+ */
+function htmlToText(html) {
+    if (!html) return '';
+    return String(html)
+        .replace(/<(script|style)[^>]*>[\s\S]*?<\/\1>/gi, ' ')
+        .replace(/<[^>]+>/g, ' ')
+        .replace(/&(#\d+|#x[0-9a-f]+|[a-z]+);/gi, (m, code) => {
+            if (code[0] === '#') {
+                const n = code[1].toLowerCase() === 'x' ? parseInt(code.slice(2), 16) : parseInt(code.slice(1), 10);
+                return Number.isFinite(n) ? String.fromCodePoint(n) : ' ';
+            }
+            return ENTITIES[code.toLowerCase()] || ' ';
+        })
+        .replace(/\s+/g, ' ')
+        .trim();
+}
+
+/**
+ * Lower-cased, accent-folded tokens without stopwords.
+ */
+function tokenize(text) {
+    if (!text) return [];
+    return text
+        .normalize('NFD').replace(/[\u0300-\u036f]/g, '') // Fold accents
+        .toLowerCase()
+        .split(/[^a-z0-9_]+/)
+        .filter(t => t.length > 1 && !STOPWORDS.has(t));
+}
+
+function countTerms(tokens, weight, into = {}) {
+    for (const t of tokens) into[t] = (into[t] || 0) + weight;
+    return into;
+}
+
+class DocSearchIndex {
+    /**
+     * @param {string} filePath where the index is persisted
+     * @param {() => Promise<Array<{ID_NODE, ID_BOOK, NM_TITLE, content}>>} loadAll full scan used
+     *        when there is no index file yet (or it has an older version)
+     */
+    constructor(filePath, loadAll) {
+        this.filePath = filePath;
+        this.loadAll = loadAll;
+        this.docs = new Map();     // nodeId -> { book, title, len, snippet, terms: { term: tf } }
+        this.postings = new Map(); // term -> Map(nodeId -> tf)
+        this.sortedTerms = null;   // term dictionary for prefix lookups, rebuilt when terms change
+        this.totalLength = 0;
+        this.ready = null;
+        this.saveTimer = null;
+        this.dirty = false;
+        this.writing = null;
+        this.closed = false;
+        register(this); // flushed with the JSON stores (shutdown, snapshots) and at exit
+    }
+
+    /**
+     * Loads the index on first use; rebuilds it from the documents if the file is missing.
+     */
+    ensureLoaded() {
+        if (!this.ready) {
+            this.ready = this.load().catch(err => {
+                this.ready = null;
+                throw err;
+            });
+        }
+        return this.ready;
+    }
+
+    async load() {
+        const started = Date.now();
+        try {
+            const data = JSON.parse(await fs.promises.readFile(this.filePath, 'utf-8'));
+            if (data.version === INDEX_VERSION && data.docs) {
+                for (const [id, doc] of Object.entries(data.docs)) this.addDoc(id, doc);
+                console.log(`[DocIndex] Loaded ${this.docs.size} documents in ${Date.now() - started}ms`);
+                return;
+            }
+        } catch (e) {
+            if (e.code !== 'ENOENT') console.warn("[DocIndex] Index file unreadable, rebuilding:", e.message);
+        }
+
+        const nodes = await this.loadAll();
+        for (const node of nodes) {
+            this.addDoc(String(node.ID_NODE), this.analyze(node.ID_BOOK, node.NM_TITLE, node.content));
+        }
+        console.log(`[DocIndex] Rebuilt index with ${this.docs.size} documents in ${Date.now() - started}ms`);
+        this.scheduleSave();
+    }
+
+    analyze(bookId, title, html) {
+        const text = htmlToText(html);
+        const bodyTokens = tokenize(text);
+        const titleTokens = tokenize(title || '');
+        const terms = countTerms(titleTokens, TITLE_BOOST, countTerms(bodyTokens, 1));
+        return {
+            book: bookId,
+            title: title || '',
+            len: bodyTokens.length + titleTokens.length * TITLE_BOOST,
+            snippet: text.substring(0, SNIPPET_CHARS),
+            terms
+        };
+    }
+
+    addDoc(id, doc) {
+        this.docs.set(id, doc);
+        this.totalLength += doc.len;
+        for (const [term, tf] of Object.entries(doc.terms)) {
+            let list = this.postings.get(term);
+            if (!list) {
+                list = new Map();
+                this.postings.set(term, list);
+                this.sortedTerms = null;
+            }
+            list.set(id, tf);
+        }
+    }
+
+    removeDoc(id) {
+        const doc = this.docs.get(id);
+        if (!doc) return null;
+        for (const term of Object.keys(doc.terms)) {
+            const list = this.postings.get(term);
+            if (!list) continue;
+            list.delete(id);
+            if (list.size === 0) {
+                this.postings.delete(term);
+                this.sortedTerms = null;
+            }
+        }
+        this.totalLength -= doc.len;
+        this.docs.delete(id);
+        return doc;
+    }
+
+    // --- Incremental maintenance (called by localDocService after the files are written) ---
+
+    async upsert(nodeId, bookId, title, html) {
+        await this.ensureLoaded();
+        const id = String(nodeId);
+        this.removeDoc(id);
+        this.addDoc(id, this.analyze(bookId, title, html));
+        this.scheduleSave();
+    }
+
+    async remove(nodeIds) {
+        await this.ensureLoaded();
+        for (const nodeId of [].concat(nodeIds)) this.removeDoc(String(nodeId));
+        this.scheduleSave();
+    }
+
+    async setBook(nodeId, bookId) {
+        await this.ensureLoaded();
+        const doc = this.docs.get(String(nodeId));
+        if (doc) {
+            doc.book = bookId;
+            this.scheduleSave();
+        }
+    }
+
+    async copy(sourceId, targetId, bookId) {
+        await this.ensureLoaded();
+        const doc = this.docs.get(String(sourceId));
+        if (!doc) return;
+        this.removeDoc(String(targetId));
+        this.addDoc(String(targetId), { ...doc, book: bookId, terms: { ...doc.terms } });
+        this.scheduleSave();
+    }
+
+    async removeBook(bookId) {
+        await this.ensureLoaded();
+        for (const [id, doc] of Array.from(this.docs.entries())) {
+            if (doc.book == bookId) this.removeDoc(id);
+        }
+        this.scheduleSave();
+    }
+
+    // --- Queries ---
+
+    /**
+     * Indexed terms starting with prefix (the term itself first, if indexed), binary search
+     * over the sorted dictionary.
+     */
+    termsWithPrefix(prefix) {
+        if (!this.sortedTerms) this.sortedTerms = Array.from(this.postings.keys()).sort();
+        const terms = this.sortedTerms;
+        let lo = 0;
+        let hi = terms.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (terms[mid] < prefix) lo = mid + 1;
+            else hi = mid;
+        }
+        const found = [];
+        for (let i = lo; i < terms.length && found.length < MAX_PREFIX_TERMS && terms[i].startsWith(prefix); i++) {
+            found.push(terms[i]);
+        }
+        return found;
+    }
+
+    /**
+     * BM25 ranking over the query terms; the last one is also matched as a prefix.
+     * @returns {Promise<Array<{ ID_NODE, ID_BOOK, NM_TITLE, SNIPPET, score }>>}
+     */
+    async search(query, limit = 5) {
+        await this.ensureLoaded();
+        const tokens = tokenize(query);
+        const n = this.docs.size;
+        if (tokens.length === 0 || n === 0) return [];
+
+        const avgLen = this.totalLength / n || 1;
+        const scoreTerm = (term, weight, combine) => {
+            const list = this.postings.get(term);
+            if (!list) return;
+            const idf = Math.log(1 + (n - list.size + 0.5) / (list.size + 0.5));
+            for (const [id, tf] of list) {
+                const len = this.docs.get(id).len;
+                combine(id, weight * idf * (tf * (K1 + 1)) / (tf + K1 * (1 - B + B * len / avgLen)));
+            }
+        };
+
+        const scores = new Map();
+        const last = tokens[tokens.length - 1];
+        for (const term of new Set(tokens)) {
+            if (term !== last) scoreTerm(term, 1, (id, score) => scores.set(id, (scores.get(id) || 0) + score));
+        }
+        // A page counts once for the last word: its best match among the completions
+        const completions = new Map();
+        for (const term of this.termsWithPrefix(last)) {
+            scoreTerm(term, term === last ? 1 : PREFIX_WEIGHT,
+                (id, score) => completions.set(id, Math.max(completions.get(id) || 0, score)));
+        }
+        completions.forEach((score, id) => scores.set(id, (scores.get(id) || 0) + score));
+
+        return Array.from(scores.entries())
+            .sort((a, b) => b[1] - a[1])
+            .slice(0, limit)
+            .map(([id, score]) => ({ ...this.describe(id), score: +score.toFixed(4) }));
+    }
+
+    /**
+     * Every indexed page with a short plain-text snippet (for the Spotlight list).
+     */
+    async list() {
+        await this.ensureLoaded();
+        return Array.from(this.docs.keys()).map(id => this.describe(id));
+    }
+
+    describe(id) {
+        const doc = this.docs.get(id);
+        return {
+            ID_NODE: Number(id),
+            ID_BOOK: doc.book,
+            NM_TITLE: doc.title,
+            SNIPPET: doc.snippet
+        };
+    }
+
+    // Coalesces bursts of edits into one write; temp file + rename keeps the index readable
+    scheduleSave() {
+        if (this.closed) return;
+        this.dirty = true;
+        if (this.saveTimer) return;
+        this.saveTimer = setTimeout(() => {
+            this.saveTimer = null;
+            this.flush();
+        }, 1000);
+        if (this.saveTimer.unref) this.saveTimer.unref();
+    }
+
+    serialize() {
+        const docs = {};
+        for (const [id, doc] of this.docs) docs[id] = doc;
+        return JSON.stringify({ version: INDEX_VERSION, docs });
+    }
+
+    /**
+     * Writes the index if it changed; one write at a time, edits made meanwhile get one more.
+     */
+    flush() {
+        if (this.saveTimer) {
+            clearTimeout(this.saveTimer);
+            this.saveTimer = null;
+        }
+        if (this.writing) return this.writing.then(() => this.flush());
+        if (!this.dirty) return Promise.resolve();
+
+        this.dirty = false;
+        this.writing = writeFileAtomic(this.filePath, this.serialize())
+            .catch(e => {
+                console.error("[DocIndex] Failed to persist index:", e.message);
+                this.dirty = true;
+            })
+            .finally(() => { this.writing = null; });
+        return this.writing;
+    }
+
+    /**
+     * Exit path only: the event loop won't run the async write anymore.
+     */
+    flushSync() {
+        if (this.saveTimer) clearTimeout(this.saveTimer);
+        this.saveTimer = null;
+        if (!this.dirty) return;
+        try {
+            writeFileAtomicSync(this.filePath, this.serialize());
+            this.dirty = false;
+        } catch (e) { /* exiting */ }
+    }
+
+    /**
+     * Writes what is pending, then stops persisting (the data directory is about to be replaced).
+     */
+    close() {
+        const done = this.flush();
+        this.closed = true;
+        unregister(this);
+        return done;
+    }
+}
+
+module.exports = {
+    DocSearchIndex,
+    htmlToText,
+    tokenize
+};
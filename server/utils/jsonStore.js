@@ -0,0 +1,185 @@
+const fs = require('fs');
+const path = require('path');
+
+/**
+ * Write-behind JSON file. The parsed value is loaded once and stays authoritative in memory;
+ * callers mutate it and call markDirty() (or set()). Writes are debounced and coalesced: a
+ * burst of changes becomes one compact JSON.stringify written to a temp file and renamed over
+ * the target, so a crash leaves either the previous or the new version, never half a file.
+ *
+ * Every store registers itself: flushAll() awaits pending writes (server shutdown, snapshots),
+ * closeAll() flushes and then stops writing for good (before the data directory is restored
+ * under the running app) and the 'exit' hook writes anything still dirty synchronously.
+ * Other write-behind writers (MessageLog) join the same registry through register().
+ */
+
+const DEFAULT_DELAY_MS = 500;
+
+const stores = new Set();
+
+/**
+ * Atomic async write: temp file in the same directory, then rename.
+ */
+async function writeFileAtomic(file, data) {
+    const tmp = `${file}.${process.pid}.tmp`;
+    await fs.promises.mkdir(path.dirname(file), { recursive: true });
+    await fs.promises.writeFile(tmp, data, 'utf-8');
+    await fs.promises.rename(tmp, file);
+}
+
+function writeFileAtomicSync(file, data) {
+    const tmp = `${file}.${process.pid}.tmp`;
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+    fs.writeFileSync(tmp, data, 'utf-8');
+    fs.renameSync(tmp, file);
+}
+
+class JsonStore {
+    /**
+     * @param {string} file
+     * @param {object} options { defaults: () => initial value when the file is missing or unreadable,
+     *                           delayMs: debounce window, name: tag for error messages }
+     */
+    constructor(file, options = {}) {
+        this.file = file;
+        this.defaults = options.defaults || (() => ({}));
+        this.delayMs = options.delayMs !== undefined ? options.delayMs : DEFAULT_DELAY_MS;
+        this.name = options.name || path.basename(file);
+
+        this.value = undefined;
+        this.loaded = false;
+        this.existed = false;
+        this.dirty = false;
+        this.timer = null;
+        this.writing = null;
+        this.closed = false;
+        stores.add(this);
+    }
+
+    load() {
+        if (this.loaded) return this.value;
+        this.loaded = true;
+        try {
+            this.value = JSON.parse(fs.readFileSync(this.file, 'utf-8'));
+            this.existed = true;
+        } catch (e) {
+            if (e.code !== 'ENOENT') console.error(`[JsonStore] Failed to read ${this.name}:`, e.message);
+            this.value = this.defaults();
+        }
+        return this.value;
+    }
+
+    get() {
+        return this.loaded ? this.value : this.load();
+    }
+
+    set(value) {
+        this.loaded = true;
+        this.value = value;
+        this.markDirty();
+        return value;
+    }
+
+    markDirty() {
+        if (this.closed) return;
+        this.dirty = true;
+        if (this.timer) return;
+        this.timer = setTimeout(() => {
+            this.timer = null;
+            this.flush();
+        }, this.delayMs);
+        if (this.timer.unref) this.timer.unref();
+    }
+
+    /**
+     * Writes the current value if dirty; changes made while a write is running are picked up
+     * by one more write right after it.
+     */
+    flush() {
+        if (this.timer) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+        if (this.writing) return this.writing.then(() => this.flush());
+        if (!this.dirty) return Promise.resolve();
+
+        this.dirty = false;
+        const data = JSON.stringify(this.value);
+        this.writing = writeFileAtomic(this.file, data)
+            .then(() => { this.existed = true; })
+            .catch(e => {
+                console.error(`[JsonStore] Failed to save ${this.name}:`, e.message);
+                this.dirty = true;
+            })
+            .finally(() => { this.writing = null; });
+        return this.writing;
+    }
+
+    /**
+     * Exit path only: the event loop won't run the async write anymore.
+     */
+    flushSync() {
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+        if (!this.dirty) return;
+        try {
+            writeFileAtomicSync(this.file, JSON.stringify(this.value));
+            this.dirty = false;
+        } catch (e) { /* exiting */ }
+    }
+
+    /**
+     * Forgets the store without writing (its file or directory is about to be deleted);
+     * resolves once a write already running has finished.
+     */
+    discard() {
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+        this.dirty = false;
+        stores.delete(this);
+        return this.writing || Promise.resolve();
+    }
+
+    /**
+     * Writes what is pending, then ignores further changes (they stay in memory only).
+     */
+    close() {
+        const done = this.flush();
+        this.closed = true;
+        stores.delete(this);
+        return done;
+    }
+}
+
+/**
+ * Adds a writer with flush(), flushSync() and close() to flushAll/closeAll and the exit hook.
+ */
+function register(writer) {
+    stores.add(writer);
+}
+
+function unregister(writer) {
+    stores.delete(writer);
+}
+
+function flushAll() {
+    return Promise.all(Array.from(stores, store => store.flush()));
+}
+
+function closeAll() {
+    return Promise.all(Array.from(stores, store => store.close()));
+}
+
+process.on('exit', () => {
+    stores.forEach(store => store.flushSync());
+});
+
+module.exports = {
+    JsonStore,
+    flushAll,
+    closeAll,
+    register,
+    unregister,
+    writeFileAtomic,
+    writeFileAtomicSync
+};
@@ -0,0 +1,221 @@
+const fs = require('fs');
+const path = require('path');
+const util = require('util');
+
+/**
+ * Buffered file logging for server hot paths. Lines go into a bounded ring buffer and are
+ * appended to disk asynchronously: on a timer (flushMs), or sooner once `batchLines` are
+ * waiting. When the disk can't keep up the oldest lines are dropped and the count is logged.
+ * Files rotate by size (file -> file.1 -> ... -> file.<maxFiles>). Whatever is still buffered
+ * when the process exits is written synchronously from the 'exit' hook, after the part of an
+ * interrupted async append that hadn't reached the file yet, so lines keep their order.
+ *
+ * Messages go without the logger's tag; it is added to file lines and console echoes.
+ *
+ * Level: LOG_LEVEL (debug | info | warn | error | silent), default info.
+ */
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40, silent: 100 };
+const CONSOLE_METHODS = { debug: 'log', info: 'log', warn: 'warn', error: 'error' };
+
+const DEFAULT_LEVEL = LEVELS[String(process.env.LOG_LEVEL || '').toLowerCase()] || LEVELS.info;
+
+class LogFile {
+    constructor(filePath, options = {}) {
+        this.filePath = filePath;
+        this.capacity = options.capacity || 5000;
+        this.batchLines = options.batchLines || 500;
+        this.flushMs = options.flushMs || 1000;
+        this.maxBytes = options.maxBytes || Number(process.env.LOG_MAX_BYTES) || 5 * 1024 * 1024;
+        this.maxFiles = options.maxFiles || 3;
+
+        this.ring = new Array(this.capacity);
+        this.head = 0;
+        this.count = 0;
+        this.dropped = 0;
+        this.size = null; // bytes on disk, read on first flush
+        this.timer = null;
+        this.writing = null;
+        this.inflight = null; // { data, base: file size before the append (null until known) } while a write runs
+    }
+
+    push(line) {
+        if (this.count === this.capacity) {
+            this.head = (this.head + 1) % this.capacity;
+            this.count--;
+            this.dropped++;
+        }
+        this.ring[(this.head + this.count) % this.capacity] = line;
+        this.count++;
+
+        if (this.count >= this.batchLines) this.schedule(0);
+        else this.schedule(this.flushMs);
+    }
+
+    schedule(delay) {
+        if (this.timer && delay > 0) return;
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = setTimeout(() => {
+            this.timer = null;
+            this.flush();
+        }, delay);
+        this.timer.unref();
+    }
+
+    drain() {
+        const lines = [];
+        if (this.dropped > 0) {
+            lines.push(`[${new Date().toISOString()}] [WARN] [Logger] ${this.dropped} log lines dropped (buffer full)`);
+            this.dropped = 0;
+        }
+        for (let i = 0; i < this.count; i++) {
+            const idx = (this.head + i) % this.capacity;
+            lines.push(this.ring[idx]);
+            this.ring[idx] = undefined;
+        }
+        this.head = 0;
+        this.count = 0;
+        return lines.length > 0 ? lines.join('\n') + '\n' : '';
+    }
+
+    /**
+     * Appends the buffered lines; one write at a time, lines arriving meanwhile wait for the next.
+     */
+    flush() {
+        if (this.writing) return this.writing.then(() => (this.count > 0 ? this.flush() : undefined));
+        const chunk = this.drain();
+        if (!chunk) return Promise.resolve();
+
+        this.inflight = { data: Buffer.from(chunk), base: null };
+        this.writing = this.write(this.inflight)
+            .catch(err => console.error(`[Logger] Failed to write ${this.filePath}:`, err.message))
+            .finally(() => {
+                this.writing = null;
+                this.inflight = null;
+            });
+        return this.writing;
+    }
+
+    async write(inflight) {
+        const { data } = inflight;
+        if (this.size === null) {
+            await fs.promises.mkdir(path.dirname(this.filePath), { recursive: true });
+            try { this.size = (await fs.promises.stat(this.filePath)).size; } catch (e) { this.size = 0; }
+        }
+        if (this.size > 0 && this.size + data.length > this.maxBytes) await this.rotate();
+        inflight.base = this.size;
+        await fs.promises.appendFile(this.filePath, data);
+        this.size += data.length;
+    }
+
+    async rotate() {
+        const rename = (from, to) => fs.promises.rename(from, to).catch(err => {
+            if (err.code !== 'ENOENT') throw err;
+        });
+        await fs.promises.unlink(`${this.filePath}.${this.maxFiles}`).catch(() => { });
+        for (let i = this.maxFiles - 1; i >= 1; i--) await rename(`${this.filePath}.${i}`, `${this.filePath}.${i + 1}`);
+        await rename(this.filePath, `${this.filePath}.1`);
+        this.size = 0;
+    }
+
+    /**
+     * Exit path only: the event loop won't run the async write anymore.
+     */
+    flushSync() {
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+        try {
+            const parts = [];
+            if (this.inflight) {
+                // The async append may not have reached the file (or only partly): its missing tail goes first
+                const { data, base } = this.inflight;
+                this.inflight = null;
+                let written = 0;
+                if (base !== null) {
+                    try { written = fs.statSync(this.filePath).size - base; } catch (e) { /* not created yet */ }
+                }
+                parts.push(data.subarray(Math.min(Math.max(written, 0), data.length)));
+            }
+            const chunk = this.drain();
+            if (chunk) parts.push(Buffer.from(chunk));
+            const data = Buffer.concat(parts);
+            if (data.length === 0) return;
+            fs.mkdirSync(path.dirname(this.filePath), { recursive: true });
+            fs.appendFileSync(this.filePath, data);
+        } catch (e) { /* nothing left to report to */ }
+    }
+}
+
+const files = new Map(); // path -> LogFile, shared by loggers writing to the same file
+
+function fileFor(filePath, options) {
+    if (!files.has(filePath)) files.set(filePath, new LogFile(filePath, options));
+    return files.get(filePath);
+}
+
+class Logger {
+    /**
+     * @param {string} name tag used in file lines ("[DB]")
+     * @param {object} options { file, level, console: echo to the console too, fileOptions }
+     */
+    constructor(name, options = {}) {
+        this.name = name;
+        this.level = LEVELS[options.level] || DEFAULT_LEVEL;
+        this.echo = !!options.console;
+        this.file = options.file ? fileFor(options.file, options.fileOptions) : null;
+        this.samples = new Map(); // key -> { until, suppressed }
+    }
+
+    enabled(level) {
+        return LEVELS[level] >= this.level;
+    }
+
+    write(level, args) {
+        if (!this.enabled(level)) return;
+        const message = util.format(...args);
+        if (this.echo) console[CONSOLE_METHODS[level]](`[${this.name}] ${message}`);
+        if (this.file) this.file.push(`[${new Date().toISOString()}] [${level.toUpperCase()}] [${this.name}] ${message}`);
+    }
+
+    debug(...args) { this.write('debug', args); }
+    info(...args) { this.write('info', args); }
+    warn(...args) { this.write('warn', args); }
+    error(...args) { this.write('error', args); }
+
+    /**
+     * Rate-limited logging for per-request messages: at most one line per `key` every
+     * `intervalMs`; the next line that gets through reports how many were skipped.
+     */
+    sample(key, intervalMs, level, ...args) {
+        if (!this.enabled(level)) return;
+        const now = Date.now();
+        const state = this.samples.get(key);
+        if (state && now < state.until) {
+            state.suppressed++;
+            return;
+        }
+        const suppressed = state ? state.suppressed : 0;
+        this.samples.set(key, { until: now + intervalMs, suppressed: 0 });
+        if (suppressed > 0) args = [...args, `(+${suppressed} similar suppressed)`];
+        this.write(level, args);
+    }
+}
+
+function createLogger(name, options) {
+    return new Logger(name, options);
+}
+
+function flushAll() {
+    return Promise.all(Array.from(files.values(), file => file.flush()));
+}
+
+process.on('exit', () => {
+    files.forEach(file => file.flushSync());
+});
+
+module.exports = {
+    createLogger,
+    flushAll,
+    Logger,
+    LEVELS
+};
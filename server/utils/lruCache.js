@@ -0,0 +1,130 @@
+/**
+ * Small in-memory LRU cache with per-entry TTL and optional size budget.
+ * Relies on Map insertion order: the first key is always the least recently used.
+ *
+ * Options:
+ *   maxEntries  - hard cap on number of entries (default 500)
+ *   ttlMs       - default time-to-live for entries (0 = never expires)
+ *   maxBytes    - optional budget; requires `sizeOf` to estimate entry size
+ *   sizeOf      - (value) => approximate size in bytes
+ */
+class LruCache {
+    constructor(options = {}) {
+        this.maxEntries = options.maxEntries || 500;
+        this.ttlMs = options.ttlMs || 0;
+        this.maxBytes = options.maxBytes || 0;
+        this.sizeOf = options.sizeOf || null;
+
+        this.map = new Map(); // key -> { value, expiresAt, size }
+        this.bytes = 0;
+        this.hits = 0;
+        this.misses = 0;
+        this.evictions = 0;
+    }
+
+    get(key) {
+        const entry = this.map.get(key);
+        if (!entry) {
+            this.misses++;
+            return undefined;
+        }
+        if (entry.expiresAt && entry.expiresAt <= Date.now()) {
+            this.delete(key);
+            this.misses++;
+            return undefined;
+        }
+        // Refresh recency
+        this.map.delete(key);
+        this.map.set(key, entry);
+        this.hits++;
+        return entry.value;
+    }
+
+    /**
+     * Returns the entry metadata without touching recency or counters.
+     */
+    peek(key) {
+        const entry = this.map.get(key);
+        if (!entry || (entry.expiresAt && entry.expiresAt <= Date.now())) return undefined;
+        return entry;
+    }
+
+    set(key, value, ttlMs = this.ttlMs) {
+        if (this.map.has(key)) this.delete(key);
+
+        const size = this.sizeOf ? this.sizeOf(value) : 0;
+        if (this.maxBytes && size > this.maxBytes) return false; // Never cache something bigger than the whole budget
+
+        this.map.set(key, {
+            value,
+            size,
+            storedAt: Date.now(),
+            expiresAt: ttlMs ? Date.now() + ttlMs : 0
+        });
+        this.bytes += size;
+
+        while (this.map.size > this.maxEntries || (this.maxBytes && this.bytes > this.maxBytes)) {
+            const oldest = this.map.keys().next().value;
+            this.delete(oldest);
+            this.evictions++;
+        }
+        return true;
+    }
+
+    delete(key) {
+        const entry = this.map.get(key);
+        if (!entry) return false;
+        this.bytes -= entry.size;
+        this.map.delete(key);
+        return true;
+    }
+
+    /**
+     * Removes every entry whose key matches the predicate. Returns the number removed.
+     */
+    deleteWhere(predicate) {
+        let removed = 0;
+        for (const key of Array.from(this.map.keys())) {
+            if (predicate(key)) {
+                this.delete(key);
+                removed++;
+            }
+        }
+        return removed;
+    }
+
+    /**
+     * Live [key, value] pairs, least recently used first, without touching recency or counters.
+     */
+    entries() {
+        const now = Date.now();
+        const live = [];
+        this.map.forEach((entry, key) => {
+            if (!entry.expiresAt || entry.expiresAt > now) live.push([key, entry.value]);
+        });
+        return live;
+    }
+
+    get size() {
+        return this.map.size;
+    }
+
+    clear() {
+        this.map.clear();
+        this.bytes = 0;
+    }
+
+    stats() {
+        const total = this.hits + this.misses;
+        return {
+            entries: this.map.size,
+            bytes: this.bytes,
+            hits: this.hits,
+            misses: this.misses,
+            evictions: this.evictions,
+            hitRate: total > 0 ? +(this.hits / total).toFixed(3) : 0
+        };
+    }
+}
+
+module.exports = LruCache;
@@ -0,0 +1,440 @@
+const fs = require('fs');
+const path = require('path');
+const { register, unregister } = require('./jsonStore');
+
+/**
+ * Append-only chat message store used by chatService when no adapter is configured.
+ *
+ * Disk: NDJSON segments (segment-000001.ndjson, ...) in `dir`. Each line is one record:
+ *   { op: 'msg', seq, msg }              a new message
+ *   { op: 'read', ids, at }              read receipts
+ *   { op: 'react', id, emoji, user }     a reaction
+ *   { op: 'base' }                       first line of a compacted segment: earlier segments are obsolete
+ * Segments are replayed once at startup; after that the in-memory state (indexed by id,
+ * recipient and sender) answers every read and writes only append a line, batched and async.
+ *
+ * Compaction rewrites the live messages (retention: maxMessages, maxAgeMs) into a new segment
+ * (tmp + rename) and deletes the older ones. It runs in the background once enough obsolete
+ * data has accumulated, and whenever retention changes.
+ *
+ * History cursors are message sequence numbers: pass `nextCursor` back as `before` to get the
+ * previous page.
+ */
+
+const SEGMENT_PATTERN = /^segment-(\d+)\.ndjson$/;
+const FLUSH_MS = 200;
+
+class MessageLog {
+    constructor(dir, options = {}) {
+        this.dir = dir;
+        this.maxMessages = options.maxMessages || 1000;
+        this.maxAgeMs = options.maxAgeMs || null;
+        this.segmentBytes = options.segmentBytes || 1024 * 1024;
+        this.compactEvery = options.compactEvery || 2000; // obsolete records tolerated before compacting
+
+        this.entries = []; // { seq, msg } in seq order; entries below `start` are expired
+        this.start = 0;
+        this.byId = new Map(); // id -> entry
+        this.byRecipient = new Map(); // recipient -> entries
+        this.bySender = new Map(); // sender -> entries
+        this.nextSeq = 1;
+
+        this.segment = 0;
+        this.segmentSize = 0;
+        this.obsolete = 0;
+        this.pending = [];
+        this.timer = null;
+        this.writing = null;
+        this.compacting = false;
+        this.closed = false;
+    }
+
+    // --- Loading ---
+
+    open(legacyFile) {
+        fs.mkdirSync(this.dir, { recursive: true });
+        register(this); // flushed with the JSON stores and at exit
+        const segments = this.listSegments();
+        if (segments.length === 0 && legacyFile && fs.existsSync(legacyFile)) {
+            this.migrate(legacyFile);
+            return this;
+        }
+        segments.forEach(n => this.replay(n));
+        this.segment = segments.length > 0 ? segments[segments.length - 1] : 1;
+        this.segmentSize = segments.length > 0 ? fs.statSync(this.segmentPath(this.segment)).size : 0;
+        this.applyRetention();
+        console.log(`[MessageLog] Loaded ${this.size()} messages from ${segments.length} segment(s)`);
+        return this;
+    }
+
+    listSegments() {
+        return fs.readdirSync(this.dir)
+            .map(name => SEGMENT_PATTERN.exec(name))
+            .filter(Boolean)
+            .map(m => Number(m[1]))
+            .sort((a, b) => a - b);
+    }
+
+    segmentPath(n) {
+        return path.join(this.dir, `segment-${String(n).padStart(6, '0')}.ndjson`);
+    }
+
+    replay(n) {
+        const lines = fs.readFileSync(this.segmentPath(n), 'utf-8').split('\n');
+        for (const line of lines) {
+            if (!line) continue;
+            let record;
+            try { record = JSON.parse(line); } catch (e) { continue; } // torn last line after a crash
+            this.apply(record);
+        }
+    }
+
+    apply(record) {
+        switch (record.op) {
+            case 'base':
+                this.reset();
+                break;
+            case 'msg':
+                this.insert(record.seq, record.msg);
+                break;
+            case 'read':
+                record.ids.forEach(id => {
+                    const entry = this.byId.get(id);
+                    if (entry && !entry.msg.read_at) entry.msg.read_at = record.at;
+                });
+                this.obsolete++;
+                break;
+            case 'react': {
+                const entry = this.byId.get(record.id);
+                if (entry) this.pushReaction(entry.msg, record.emoji, record.user);
+                this.obsolete++;
+                break;
+            }
+        }
+    }
+
+    // One-time import of the old messages.json
+    migrate(legacyFile) {
+        let messages = [];
+        try {
+            messages = JSON.parse(fs.readFileSync(legacyFile, 'utf-8'));
+        } catch (e) {
+            console.error("[MessageLog] Failed to read legacy messages file:", e.message);
+        }
+        if (!Array.isArray(messages)) messages = [];
+        messages.forEach(msg => this.insert(this.nextSeq, msg));
+        this.applyRetention();
+        this.segment = 1;
+        this.segmentSize = this.writeSnapshotSync(this.segment);
+        fs.renameSync(legacyFile, legacyFile + '.migrated');
+        console.log(`[MessageLog] Migrated ${this.size()} messages from ${path.basename(legacyFile)}`);
+    }
+
+    // --- In-memory state ---
+
+    reset() {
+        this.entries = [];
+        this.start = 0;
+        this.byId.clear();
+        this.byRecipient.clear();
+        this.bySender.clear();
+        this.obsolete = 0;
+    }
+
+    insert(seq, msg) {
+        const existing = this.byId.get(msg.id);
+        if (existing) {
+            Object.assign(existing.msg, msg);
+            return existing;
+        }
+        const entry = { seq, msg };
+        this.entries.push(entry);
+        this.byId.set(msg.id, entry);
+        this.indexPush(this.byRecipient, msg.recipient || 'ALL', entry);
+        this.indexPush(this.bySender, msg.sender, entry);
+        if (seq >= this.nextSeq) this.nextSeq = seq + 1;
+        return entry;
+    }
+
+    indexPush(index, key, entry) {
+        let list = index.get(key);
+        if (!list) {
+            list = [];
+            index.set(key, list);
+        }
+        list.push(entry);
+    }
+
+    pushReaction(msg, emoji, user) {
+        if (!msg.reactions) msg.reactions = [];
+        if (msg.reactions.some(r => r.user === user && r.emoji === emoji)) return false;
+        msg.reactions.push({ emoji, user });
+        return true;
+    }
+
+    size() {
+        return this.entries.length - this.start;
+    }
+
+    minSeq() {
+        return this.start < this.entries.length ? this.entries[this.start].seq : this.nextSeq;
+    }
+
+    /**
+     * Expires messages beyond maxMessages / older than maxAgeMs. Expired entries stay in the
+     * arrays (skipped by seq) until the next compaction rebuilds them.
+     */
+    applyRetention() {
+        const cutoff = this.maxAgeMs ? new Date(Date.now() - this.maxAgeMs).toISOString() : null;
+        let expired = 0;
+        while (this.start < this.entries.length) {
+            const { msg } = this.entries[this.start];
+            const overflow = this.size() > this.maxMessages;
+            const tooOld = cutoff && msg.created_at && msg.created_at < cutoff;
+            if (!overflow && !tooOld) break;
+            this.byId.delete(msg.id);
+            this.start++;
+            expired++;
+        }
+        this.obsolete += expired;
+        return expired;
+    }
+
+    // --- Writes ---
+
+    append(msg) {
+        const entry = this.insert(this.nextSeq, msg);
+        this.write({ op: 'msg', seq: entry.seq, msg });
+        this.applyRetention();
+        return msg;
+    }
+
+    markAsRead(ids, at) {
+        const changed = [];
+        ids.forEach(id => {
+            const entry = this.byId.get(id);
+            if (entry && !entry.msg.read_at) {
+                entry.msg.read_at = at;
+                changed.push(id);
+            }
+        });
+        if (changed.length > 0) {
+            this.write({ op: 'read', ids: changed, at });
+            this.obsolete++;
+        }
+        return changed.length;
+    }
+
+    addReaction(id, emoji, user) {
+        const entry = this.byId.get(id);
+        if (!entry || !this.pushReaction(entry.msg, emoji, user)) return null;
+        this.write({ op: 'react', id, emoji, user });
+        this.obsolete++;
+        return entry.msg;
+    }
+
+    write(record) {
+        if (this.closed) return;
+        this.pending.push(JSON.stringify(record));
+        if (!this.timer) {
+            this.timer = setTimeout(() => {
+                this.timer = null;
+                this.flush();
+            }, FLUSH_MS);
+            this.timer.unref();
+        }
+    }
+
+    /**
+     * Appends the pending records to the active segment (rotating it when full); one write
+     * at a time. Compaction is started from here so it never interleaves with an append.
+     */
+    flush() {
+        if (this.writing) return this.writing.then(() => this.flush());
+        if (this.pending.length === 0) return Promise.resolve();
+
+        const chunk = this.pending.join('\n') + '\n';
+        this.pending = [];
+        this.writing = (async () => {
+            if (this.segmentSize > 0 && this.segmentSize >= this.segmentBytes) {
+                this.segment++;
+                this.segmentSize = 0;
+            }
+            await fs.promises.appendFile(this.segmentPath(this.segment), chunk);
+            this.segmentSize += Buffer.byteLength(chunk);
+        })()
+            .catch(e => console.error("[MessageLog] Failed to append messages:", e.message))
+            .finally(() => { this.writing = null; });
+
+        return this.writing.then(() => {
+            if (this.obsolete >= this.compactEvery && !this.closed) return this.compact();
+        });
+    }
+
+    // --- Compaction ---
+
+    snapshotLines() {
+        const lines = [JSON.stringify({ op: 'base' })];
+        for (let i = this.start; i < this.entries.length; i++) {
+            const { seq, msg } = this.entries[i];
+            lines.push(JSON.stringify({ op: 'msg', seq, msg }));
+        }
+        return lines.join('\n') + '\n';
+    }
+
+    writeSnapshotSync(n) {
+        const data = this.snapshotLines();
+        const tmp = `${this.segmentPath(n)}.tmp`;
+        fs.writeFileSync(tmp, data, 'utf-8');
+        fs.renameSync(tmp, this.segmentPath(n));
+        return Buffer.byteLength(data);
+    }
+
+    /**
+     * Writes the live messages into a fresh segment and drops everything before it. Holds the
+     * write slot, so appends queue behind it. A crash halfway leaves either the old segments
+     * alone or a 'base' segment that supersedes them.
+     */
+    async compact() {
+        if (this.compacting || this.closed) return;
+        this.compacting = true;
+        try {
+            while (this.writing) await this.writing;
+            this.writing = this.rewrite()
+                .catch(e => console.error("[MessageLog] Compaction failed:", e.message))
+                .finally(() => { this.writing = null; });
+            await this.writing;
+        } finally {
+            this.compacting = false;
+        }
+    }
+
+    async rewrite() {
+        this.applyRetention();
+        const previous = this.segment;
+        const target = previous + 1;
+        // The snapshot already reflects the records still waiting to be appended
+        const data = this.snapshotLines();
+        this.pending = [];
+        this.rebuildIndexes();
+
+        const tmp = `${this.segmentPath(target)}.tmp`;
+        await fs.promises.writeFile(tmp, data, 'utf-8');
+        await fs.promises.rename(tmp, this.segmentPath(target));
+        this.segment = target;
+        this.segmentSize = Buffer.byteLength(data);
+        const stale = this.listSegments().filter(n => n <= previous);
+        await Promise.all(stale.map(n => fs.promises.unlink(this.segmentPath(n)).catch(() => { })));
+    }
+
+    rebuildIndexes() {
+        const live = this.entries.slice(this.start);
+        this.reset();
+        live.forEach(({ seq, msg }) => this.insert(seq, msg));
+    }
+
+    setRetention({ maxMessages, maxAgeMs } = {}) {
+        if (maxMessages) this.maxMessages = maxMessages;
+        if (maxAgeMs !== undefined) this.maxAgeMs = maxAgeMs;
+        if (this.applyRetention() > 0) return this.compact();
+        return Promise.resolve();
+    }
+
+    /**
+     * Exit path only: appends whatever is still pending synchronously.
+     */
+    flushSync() {
+        if (this.timer) clearTimeout(this.timer);
+        this.timer = null;
+        if (this.pending.length === 0) return;
+        const chunk = this.pending.join('\n') + '\n';
+        this.pending = [];
+        try { fs.appendFileSync(this.segmentPath(this.segment), chunk); } catch (e) { /* exiting */ }
+    }
+
+    /**
+     * Appends what is pending and stops writing: the segments are about to be replaced.
+     */
+    close() {
+        const done = this.flush();
+        this.closed = true;
+        unregister(this);
+        return done;
+    }
+
+    // --- Reads ---
+
+    /**
+     * Messages visible to `username` (public ones, plus private ones sent to or by them), newest
+     * page first in chronological order. Without a username, every message.
+     * Returns { messages, nextCursor } — nextCursor is null on the oldest page.
+     */
+    history({ username, before, limit } = {}) {
+        const max = Number(limit) > 0 ? Number(limit) : Infinity;
+        const upper = Number(before) > 0 ? Number(before) : Infinity;
+        const floor = this.minSeq();
+
+        let lists;
+        if (!username || username === 'ALL') {
+            lists = [this.entries];
+        } else {
+            lists = [this.byRecipient.get('ALL'), this.byRecipient.get(username), this.bySender.get(username)]
+                .filter(Boolean);
+        }
+
+        // Walk the sorted lists backwards from `before`, merging by seq (a message can be in
+        // two lists: public and sent by the user)
+        const cursors = lists.map(list => lowerBound(list, upper) - 1);
+        const page = [];
+        let lastSeq = Infinity;
+        let more = false;
+        for (;;) {
+            let best = -1;
+            for (let i = 0; i < lists.length; i++) {
+                const idx = cursors[i];
+                if (idx < 0 || lists[i][idx].seq < floor) continue;
+                if (best === -1 || lists[i][idx].seq > lists[best][cursors[best]].seq) best = i;
+            }
+            if (best === -1) break;
+            const entry = lists[best][cursors[best]];
+            cursors[best]--;
+            if (entry.seq === lastSeq) continue;
+            if (page.length === max) {
+                more = true;
+                break;
+            }
+            page.push(entry);
+            lastSeq = entry.seq;
+        }
+
+        page.reverse();
+        return {
+            messages: page.map(e => e.msg),
+            nextCursor: more && page.length > 0 ? String(page[0].seq) : null
+        };
+    }
+
+    stats() {
+        return {
+            messages: this.size(),
+            segment: this.segment,
+            segmentBytes: this.segmentSize,
+            obsoleteRecords: this.obsolete,
+            pendingWrites: this.pending.length
+        };
+    }
+}
+
+// First index whose seq is >= seq (list sorted by seq)
+function lowerBound(list, seq) {
+    let lo = 0;
+    let hi = list.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (list[mid].seq < seq) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+module.exports = MessageLog;
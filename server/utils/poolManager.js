@@ -0,0 +1,250 @@
+/**
+ * Owns the node-oracledb pools, one per credential key.
+ * Map insertion order doubles as recency: the first entry is the least recently used pool.
+ *
+ * - Sizing, queue limit (queueMax) and queue timeout come from the options. Requests past
+ *   either limit fail fast with a POOL_EXHAUSTED error.
+ * - The number of live pools (plus those being created) is bounded (maxPools). Creating one
+ *   more closes the least recently used pool with no connection in use; its connections get
+ *   drainSeconds to be released. If every pool is busy or pinned, creation fails with POOL_LIMIT.
+ * - threadPoolSize is only reported: UV_THREADPOOL_SIZE must be set in the environment before
+ *   the process starts (start_app.bat) for libuv to use it.
+ * - Pools left unused for idleMs are closed by a background sweep. Pinned pools are exempt.
+ * - pingInterval makes the driver ping a connection that sat idle before handing it out.
+ *   A checkout failure on a pool that is no longer open closes and discards the pool.
+ * - stats() reports open/in-use/queued connections and checkout wait times per pool.
+ */
+
+const EXHAUSTED_CODES = ['NJS-040', 'NJS-076']; // queueTimeout reached / queueMax reached
+
+class PoolManager {
+    constructor(oracledb, options = {}) {
+        this.oracledb = oracledb;
+        this.log = options.log || (msg => console.log(`[DB] ${msg}`));
+        this.poolOptions = {
+            poolMin: options.poolMin ?? 1,
+            poolMax: options.poolMax || 10,
+            poolIncrement: options.poolIncrement || 1,
+            poolTimeout: options.poolTimeout ?? 60,
+            queueMax: options.queueMax ?? 500,
+            queueTimeout: options.queueTimeout ?? 60000,
+            pingInterval: options.pingInterval ?? 60,
+            stmtCacheSize: options.stmtCacheSize ?? 30
+        };
+        this.maxPools = options.maxPools || 8;
+        this.idleMs = options.idleMs || 15 * 60 * 1000;
+        this.drainSeconds = options.drainSeconds ?? 10;
+        this.threadPoolSize = options.threadPoolSize || 4;
+
+        this.pools = new Map(); // key -> entry
+        this.creating = new Map(); // key -> Promise<entry>
+        this.closed = 0;
+
+        this.sweeper = setInterval(() => this.drainIdle(), Math.min(this.idleMs, 60 * 1000));
+        if (this.sweeper.unref) this.sweeper.unref();
+    }
+
+    /**
+     * Returns the pool for key, creating it on first use. overrides: extra createPool
+     * attributes (e.g. { events: true, poolMax: 4 }) plus { pinned } to skip idle draining.
+     */
+    async getPool(key, params, overrides = {}) {
+        const existing = this.pools.get(key);
+        if (existing) {
+            if (existing.pool.status === this.oracledb.POOL_STATUS_OPEN) {
+                this.touch(key, existing);
+                return existing.pool;
+            }
+            this.pools.delete(key);
+        }
+
+        let pending = this.creating.get(key);
+        if (!pending) {
+            pending = this.create(key, params, overrides);
+            this.creating.set(key, pending);
+            pending.then(() => this.creating.delete(key), () => this.creating.delete(key));
+        }
+        return (await pending).pool;
+    }
+
+    async create(key, params, overrides) {
+        const { pinned, ...attrs } = overrides;
+        // Counted synchronously, together with pools still being created, so concurrent
+        // create() calls can't overshoot the limit while awaiting createPool
+        if (this.pools.size + this.creating.size >= this.maxPools && !this.evictOne()) {
+            const err = new Error(`Limite de ${this.maxPools} pools de conexão atingido e todos estão em uso. Tente novamente em instantes.`);
+            err.code = 'POOL_LIMIT';
+            throw err;
+        }
+
+        const config = { ...this.poolOptions, ...attrs };
+        this.log(`Creating new connection pool for: ${key} (min ${config.poolMin}, max ${config.poolMax})`);
+        let pool;
+        try {
+            pool = await this.oracledb.createPool({
+                user: params.user,
+                password: params.password,
+                connectString: params.connectString,
+                enableStatistics: true,
+                ...config
+            });
+        } catch (err) {
+            this.log(`Failed to create pool: ${err.message}`);
+            throw err;
+        }
+
+        const entry = {
+            pool,
+            key,
+            pinned: !!pinned,
+            createdAt: Date.now(),
+            lastUsed: Date.now(),
+            checkouts: 0,
+            failures: 0,
+            exhausted: 0,
+            waitTotalMs: 0,
+            waitMaxMs: 0
+        };
+        this.pools.set(key, entry);
+        this.log(`Pool created successfully.`);
+
+        const totalMax = Array.from(this.pools.values()).reduce((acc, e) => acc + e.pool.poolMax, 0);
+        if (totalMax > this.threadPoolSize) {
+            this.log(`Warning: pools allow ${totalMax} connections but the libuv thread pool has ${this.threadPoolSize} threads; calls will queue in Node. Set UV_THREADPOOL_SIZE before starting the app.`);
+        }
+        return entry;
+    }
+
+    touch(key, entry) {
+        entry.lastUsed = Date.now();
+        this.pools.delete(key);
+        this.pools.set(key, entry);
+    }
+
+    /**
+     * Checks out a connection, recording how long the request waited for it.
+     */
+    async acquire(key, params, overrides = {}) {
+        const pool = await this.getPool(key, params, overrides);
+        const entry = this.pools.get(key);
+        const started = Date.now();
+        try {
+            const conn = await pool.getConnection();
+            if (entry) {
+                const waited = Date.now() - started;
+                entry.checkouts++;
+                entry.waitTotalMs += waited;
+                if (waited > entry.waitMaxMs) entry.waitMaxMs = waited;
+            }
+            return conn;
+        } catch (err) {
+            if (entry) entry.failures++;
+            if (EXHAUSTED_CODES.some(code => String(err.message).startsWith(code))) {
+                if (entry) entry.exhausted++;
+                this.log(`Pool ${key} exhausted: ${err.message}`);
+                const exhausted = new Error(`Pool de conexões esgotado (${pool.connectionsInUse}/${pool.poolMax} em uso). Tente novamente em instantes.`);
+                exhausted.code = 'POOL_EXHAUSTED';
+                exhausted.cause = err;
+                throw exhausted;
+            }
+            this.log(`Error getting connection from pool: ${err.message}`);
+            // A pool that is no longer usable is closed (not just forgotten) so its sessions are released
+            if (pool.status !== this.oracledb.POOL_STATUS_OPEN || /^(NJS-500|NJS-503|DPI-1080|ORA-03113|ORA-03114)/.test(String(err.message))) {
+                await this.close(key, 0);
+            }
+            throw err;
+        }
+    }
+
+    /**
+     * Opens up to count connections right away so the first queries don't pay for the logon.
+     */
+    async warm(key, params, count) {
+        const pool = await this.getPool(key, params);
+        const target = Math.min(count, pool.poolMax);
+        if (pool.connectionsOpen >= target) return pool.connectionsOpen;
+        const conns = await Promise.allSettled(Array.from({ length: target }, () => pool.getConnection()));
+        await Promise.all(conns.filter(r => r.status === 'fulfilled').map(r => r.value.close().catch(() => { })));
+        return pool.connectionsOpen;
+    }
+
+    /**
+     * Closes the least recently used pool that is neither pinned nor serving a connection.
+     * Returns false when there is none.
+     */
+    evictOne() {
+        const victim = Array.from(this.pools.values()).find(e => !e.pinned && e.pool.connectionsInUse === 0);
+        if (!victim) return false;
+        this.log(`Pool limit (${this.maxPools}) reached, closing least recently used pool ${victim.key}`);
+        this.close(victim.key, this.drainSeconds); // drains in the background
+        return true;
+    }
+
+    drainIdle() {
+        const cutoff = Date.now() - this.idleMs;
+        for (const entry of Array.from(this.pools.values())) {
+            if (entry.pinned || entry.lastUsed > cutoff || entry.pool.connectionsInUse > 0) continue;
+            this.log(`Closing idle pool ${entry.key}`);
+            this.close(entry.key, 0);
+        }
+    }
+
+    async close(key, drainSeconds = this.drainSeconds) {
+        const entry = this.pools.get(key);
+        if (!entry) return false;
+        this.pools.delete(key);
+        this.closed++;
+        try {
+            await entry.pool.close(drainSeconds);
+        } catch (err) {
+            this.log(`Error closing pool ${key}: ${err.message}`);
+        }
+        return true;
+    }
+
+    /**
+     * Graceful shutdown: in-flight work gets drainSeconds to release its connections.
+     */
+    async closeAll(drainSeconds = this.drainSeconds) {
+        clearInterval(this.sweeper);
+        await Promise.all(Array.from(this.pools.keys()).map(key => this.close(key, drainSeconds)));
+    }
+
+    stats() {
+        const pools = Array.from(this.pools.values()).map(entry => {
+            const { pool } = entry;
+            let driver = null;
+            try {
+                driver = pool.getStatistics ? pool.getStatistics() : null;
+            } catch (e) {
+                // statistics unavailable while the pool is closing
+            }
+            return {
+                key: entry.key,
+                status: pool.status === this.oracledb.POOL_STATUS_OPEN ? 'open' : 'closing',
+                pinned: entry.pinned,
+                poolMin: pool.poolMin,
+                poolMax: pool.poolMax,
+                open: pool.connectionsOpen,
+                inUse: pool.connectionsInUse,
+                queued: driver ? driver.currentQueueLength : null,
+                maxQueued: driver ? driver.maximumQueueLength : null,
+                checkouts: entry.checkouts,
+                failures: entry.failures,
+                exhausted: entry.exhausted,
+                avgWaitMs: entry.checkouts ? Math.round(entry.waitTotalMs / entry.checkouts) : 0,
+                maxWaitMs: entry.waitMaxMs,
+                idleForMs: Date.now() - entry.lastUsed,
+                ageMs: Date.now() - entry.createdAt
+            };
+        });
+        return {
+            pools,
+            maxPools: this.maxPools,
+            closed: this.closed,
+            config: this.poolOptions
+        };
+    }
+}
+
+module.exports = PoolManager;
@@ -0,0 +1,53 @@
+/**
+ * Binary heap. By default the item with the highest `priority(item)` comes out first.
+ */
+class PriorityQueue {
+    constructor(priority = (item) => item.priority) {
+        this.priority = priority;
+        this.items = [];
+    }
+
+    get size() {
+        return this.items.length;
+    }
+
+    push(item) {
+        const items = this.items;
+        items.push(item);
+        let i = items.length - 1;
+        while (i > 0) {
+            const parent = (i - 1) >> 1;
+            if (this.priority(items[parent]) >= this.priority(items[i])) break;
+            [items[parent], items[i]] = [items[i], items[parent]];
+            i = parent;
+        }
+    }
+
+    pop() {
+        const items = this.items;
+        if (items.length === 0) return undefined;
+        const top = items[0];
+        const last = items.pop();
+        if (items.length > 0) {
+            items[0] = last;
+            let i = 0;
+            for (; ;) {
+                const left = 2 * i + 1;
+                const right = left + 1;
+                let largest = i;
+                if (left < items.length && this.priority(items[left]) > this.priority(items[largest])) largest = left;
+                if (right < items.length && this.priority(items[right]) > this.priority(items[largest])) largest = right;
+                if (largest === i) break;
+                [items[largest], items[i]] = [items[i], items[largest]];
+                i = largest;
+            }
+        }
+        return top;
+    }
+
+    peek() {
+        return this.items[0];
+    }
+}
+
+module.exports = PriorityQueue;
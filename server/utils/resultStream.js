@@ -0,0 +1,97 @@
+/**
+ * Frame encoders for streamed query results (POST /api/query/stream).
+ * Every frame is one JSON line:
+ *   { t: 'meta', format, metaData }
+ *   { t: 'rows', rows: [[...], ...] }                          format 'ndjson' (row-major)
+ *   { t: 'cols', n, cols: [{ v: [...] } | { d: [...], c: [...] }] }   format 'columnar'
+ *   { t: 'end', rows, truncated, rowsAffected? }
+ *   { t: 'error', error, code }                                after a failure mid-stream
+ *
+ * In columnar frames, string columns are dictionary-encoded: `d` has the strings first seen in
+ * this frame (appended to the column's dictionary on the client), `c` has one code per row
+ * (-1 = null). A column whose strings barely repeat, or whose dictionary grows past MAX_DICT,
+ * switches to plain values ({ v }) for the rest of the stream.
+ */
+
+const MAX_DICT = 20000;
+const MIN_REPEAT_RATIO = 0.5; // distinct/rows above this in the first frame: not worth a dictionary
+const STRING_TYPES = /^(VARCHAR2|NVARCHAR2|CHAR|NCHAR|VARCHAR)/i;
+
+function columnTypeName(meta) {
+    return meta.dbTypeName || (meta.dbType && meta.dbType.name) || '';
+}
+
+class NdjsonEncoder {
+    constructor(metaData) {
+        this.metaData = metaData;
+    }
+
+    encode(rows) {
+        return { t: 'rows', rows };
+    }
+}
+
+class ColumnarEncoder {
+    constructor(metaData) {
+        this.metaData = metaData;
+        // null: plain values; Map: string -> code
+        this.dicts = metaData.map(m => (STRING_TYPES.test(columnTypeName(m)) ? new Map() : null));
+        this.frames = 0;
+    }
+
+    encode(rows) {
+        const n = rows.length;
+        const cols = this.metaData.map((meta, ci) => {
+            const dict = this.dicts[ci];
+            if (!dict) return { v: rows.map(r => r[ci]) };
+
+            const added = [];
+            const codes = new Array(n);
+            for (let ri = 0; ri < n; ri++) {
+                const val = rows[ri][ci];
+                if (val === null || val === undefined) { codes[ri] = -1; continue; }
+                let code = dict.get(val);
+                if (code === undefined) {
+                    code = dict.size;
+                    dict.set(val, code);
+                    added.push(val);
+                }
+                codes[ri] = code;
+            }
+
+            const mostlyUnique = this.frames === 0 && n > 0 && added.length / n > MIN_REPEAT_RATIO;
+            if (mostlyUnique || dict.size > MAX_DICT) {
+                // Codes already sent stay valid on the client; from the next frame on, plain values
+                this.dicts[ci] = null;
+            }
+            return { d: added, c: codes };
+        });
+        this.frames++;
+        return { t: 'cols', n, cols };
+    }
+}
+
+function createEncoder(format, metaData) {
+    return format === 'columnar' ? new ColumnarEncoder(metaData) : new NdjsonEncoder(metaData);
+}
+
+/**
+ * Writes one JSON line per frame honoring backpressure; resolves once the socket can take more.
+ * Flushes through the compression middleware so every frame reaches the client right away.
+ */
+function ndjsonWriter(res) {
+    return (frame) => new Promise((resolve, reject) => {
+        if (res.destroyed) return reject(new Error('Cliente desconectado.'));
+        const ok = res.write(JSON.stringify(frame) + '\n');
+        if (res.flush) res.flush();
+        if (ok) return resolve();
+        const done = () => { res.off('drain', done); res.off('close', done); resolve(); };
+        res.on('drain', done);
+        res.on('close', done);
+    });
+}
+
+module.exports = {
+    createEncoder,
+    ndjsonWriter
+};
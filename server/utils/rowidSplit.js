@@ -0,0 +1,93 @@
+/**
+ * ROWID-range splitting for parallel CSV export jobs (exportService.runJob): a plain
+ * "SELECT ... FROM table [alias] [WHERE ...]" is run once per ROWID range and the parts are
+ * concatenated.
+ *
+ * Ranges come from the segment map (extents), not from the rows: reading every ROWID to cut
+ * equal row counts would cost more than the serial export it is meant to speed up.
+ */
+
+// Row-by-row queries only: each ROWID range must produce exactly the rows it contributes to the
+// whole result. Aggregates, analytics, grouping, ordering and row limits would be computed per
+// range and come out wrong once the parts are concatenated.
+const NOT_SPLITTABLE = /\b(join|group\s+by|having|order\s+by|union|intersect|minus|connect\s+by|start\s+with|fetch\s+(first|next)|offset|distinct|unique|rownum|pivot|unpivot|model|sample)\b/i;
+const AGGREGATE_CALL = /\b(count|sum|avg|min|max|median|stddev\w*|variance|var_pop|var_samp|listagg|xmlagg|json_arrayagg|json_objectagg|collect|corr\w*|covar_\w+|regr_\w+|percentile_\w+|cume_dist|percent_rank|rank|dense_rank|row_number|ntile|lag|lead|first_value|last_value|nth_value|ratio_to_report|approx_\w+|grouping\w*)\s*\(/i;
+const ANALYTIC_CLAUSE = /\bover\s*\(|\bkeep\s*\(/i;
+
+// Splits "SELECT ... FROM table [alias] [WHERE ...]" so a ROWID predicate can be appended.
+// Anything that isn't a plain row filter returns null (not splittable): the export then runs
+// on a single cursor.
+function parseSplittableQuery(sql) {
+    const text = sql.trim().replace(/;$/, '');
+    if (NOT_SPLITTABLE.test(text) || AGGREGATE_CALL.test(text) || ANALYTIC_CLAUSE.test(text)) return null;
+    if ((text.match(/\bfrom\b/gi) || []).length !== 1) return null;
+
+    const m = /^select\s+([\s\S]+?)\s+from\s+((?:"?[\w$#]+"?\.)?"?[\w$#]+"?)(?:\s+(?!where\b)("?[\w$#]+"?))?(?:\s+where\s+([\s\S]+))?$/i.exec(text);
+    if (!m) return null;
+    return { columns: m[1], table: m[2], alias: m[3] || '', where: m[4] || '' };
+}
+
+function withRowidRange(query, params, range) {
+    const target = query.alias ? `${query.alias}.ROWID` : 'ROWID';
+    const sql = `SELECT ${query.columns} FROM ${query.table}${query.alias ? ' ' + query.alias : ''} WHERE `
+        + (query.where ? `(${query.where}) AND ` : '')
+        + `${target} BETWEEN CHARTOROWID(:rid_lo) AND CHARTOROWID(:rid_hi)`;
+
+    // Positional binds stay positional: the range placeholders are the last two in the text
+    const binds = Array.isArray(params) && params.length > 0
+        ? [...params, range.lo, range.hi]
+        : { ...(Array.isArray(params) ? {} : params), rid_lo: range.lo, rid_hi: range.hi };
+    return { sql, binds };
+}
+
+// First and last possible ROWID of every extent of the table (partitions included), in ROWID
+// order: data object, relative file, block. Needs DBA_EXTENTS; without it the export is serial.
+const EXTENTS_SQL = `
+    SELECT ROWIDTOCHAR(DBMS_ROWID.ROWID_CREATE(1, o.DATA_OBJECT_ID, e.RELATIVE_FNO, e.BLOCK_ID, 0)) AS LO,
+           ROWIDTOCHAR(DBMS_ROWID.ROWID_CREATE(1, o.DATA_OBJECT_ID, e.RELATIVE_FNO, e.BLOCK_ID + e.BLOCKS - 1, 32767)) AS HI,
+           e.BLOCKS
+    FROM DBA_EXTENTS e
+    JOIN ALL_OBJECTS o
+      ON o.OWNER = e.OWNER AND o.OBJECT_NAME = e.SEGMENT_NAME AND o.OBJECT_TYPE = e.SEGMENT_TYPE
+     AND NVL(o.SUBOBJECT_NAME, '-') = NVL(e.PARTITION_NAME, '-')
+    WHERE e.OWNER = NVL(:owner, SYS_CONTEXT('USERENV', 'CURRENT_SCHEMA'))
+      AND e.SEGMENT_NAME = :name
+      AND e.SEGMENT_TYPE IN ('TABLE', 'TABLE PARTITION', 'TABLE SUBPARTITION')
+      AND o.DATA_OBJECT_ID IS NOT NULL
+    ORDER BY o.DATA_OBJECT_ID, e.RELATIVE_FNO, e.BLOCK_ID`;
+
+// "OWNER.TABLE" / "TABLE" / quoted parts -> dictionary names (owner null: current schema)
+function splitTableName(table) {
+    const parts = table.split('.').map(p => (/^".*"$/.test(p) ? p.slice(1, -1) : p.toUpperCase()));
+    return parts.length === 2 ? { owner: parts[0], name: parts[1] } : { owner: null, name: parts[0] };
+}
+
+/**
+ * Groups consecutive extents ({ lo, hi, blocks }, in ROWID order) into at most `parts` ranges
+ * of similar block counts; each range runs from its first extent's lo to its last extent's hi.
+ */
+function groupExtents(extents, parts) {
+    const total = extents.reduce((sum, e) => sum + Number(e.blocks), 0);
+    const ranges = [];
+    let current = null;
+    let seen = 0;
+    for (const extent of extents) {
+        if (!current) current = { lo: extent.lo, hi: extent.hi };
+        current.hi = extent.hi;
+        seen += Number(extent.blocks);
+        if (seen >= (total * (ranges.length + 1)) / parts && ranges.length < parts - 1) {
+            ranges.push(current);
+            current = null;
+        }
+    }
+    if (current) ranges.push(current);
+    return ranges;
+}
+
+module.exports = {
+    EXTENTS_SQL,
+    parseSplittableQuery,
+    withRowidRange,
+    splitTableName,
+    groupExtents
+};
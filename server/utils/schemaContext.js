@@ -0,0 +1,159 @@
+/**
+ * Picks the part of a schema worth sending to the LLM for one question.
+ *
+ * schema: { "TABLE" | "OWNER.TABLE": ["COL1", "COL2", ...] } (what SqlRunner sends as schemaContext)
+ *
+ * 1. Keyword match: question words (accents stripped, stopwords dropped) are compared with the
+ *    parts of table and column names ("PACIENTES" matches TB_PACIENTE, "nascimento" matches
+ *    DT_NASCIMENTO); table hits weigh more than column hits, `hints` (names suggested by the
+ *    learned terminology) weigh most.
+ * 2. Graph expansion: tables sharing key columns (CD_/ID_/NR_/SQ_...) with the best matches are
+ *    their likely join partners and are added while there is room.
+ * 3. Column pruning: wide tables keep matched columns and key columns only.
+ *
+ * Returns the pruned schema, or null when nothing in the schema relates to the question.
+ */
+
+const STOPWORDS = new Set([
+    'QUE', 'COM', 'POR', 'PARA', 'DOS', 'DAS', 'UMA', 'UNS', 'UMAS', 'TODOS', 'TODAS', 'TODO', 'TODA',
+    'QUAIS', 'QUAL', 'ONDE', 'COMO', 'QUANDO', 'MOSTRE', 'MOSTRAR', 'LISTE', 'LISTAR', 'TRAGA', 'TRAZER',
+    'BUSCAR', 'BUSQUE', 'QUERO', 'PRECISO', 'GERE', 'GERAR', 'QUERY', 'SQL', 'SELECT', 'FROM', 'WHERE',
+    'TABELA', 'TABELAS', 'COLUNA', 'COLUNAS', 'DADOS', 'REGISTROS', 'ENTRE', 'MAIOR', 'MENOR', 'ANTES',
+    'DEPOIS', 'CADA', 'PELO', 'PELA', 'NOS', 'NAS', 'SEM', 'MAIS', 'MENOS', 'THE', 'AND'
+]);
+const KEY_COLUMN = /^(CD|ID|NR|SQ|NU|COD)_/;
+const NAME_NOISE = new Set(['TB', 'VW', 'CD', 'ID', 'NM', 'DT', 'NR', 'DS', 'FL', 'SQ', 'NU', 'VL', 'QT', 'TP', 'IN', 'OPE']);
+
+function normalize(text) {
+    return String(text || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toUpperCase();
+}
+
+function questionTerms(question) {
+    return Array.from(new Set(normalize(question).split(/[^A-Z0-9]+/)
+        .filter(t => t.length >= 3 && !STOPWORDS.has(t) && !/^\d+$/.test(t))));
+}
+
+function nameParts(name) {
+    return normalize(name).split(/[^A-Z0-9]+/).filter(p => p.length >= 3 && !NAME_NOISE.has(p));
+}
+
+// "PACIENTES" ~ "PACIENTE", "NASC" ~ "NASCIMENTO": shared prefix of at least 4 chars covering the shorter word
+function termMatches(term, part) {
+    if (term === part) return true;
+    const shorter = term.length < part.length ? term : part;
+    const longer = shorter === term ? part : term;
+    return shorter.length >= 4 && longer.startsWith(shorter);
+}
+
+function matchScore(terms, parts) {
+    let score = 0;
+    for (const term of terms) {
+        if (parts.some(part => termMatches(term, part))) score++;
+    }
+    return score;
+}
+
+function selectSchemaContext(question, schema, options = {}) {
+    if (!schema || typeof schema !== 'object') return null;
+    const tables = Object.keys(schema);
+    if (tables.length === 0) return null;
+
+    const maxTables = options.maxTables || 8;
+    const maxColumns = options.maxColumns || 40;
+    const hints = new Set((options.hints || []).map(h => normalize(h)));
+    const terms = questionTerms(question);
+    const upperQuestion = normalize(question);
+
+    // 1. Keyword scoring
+    const scored = new Map(); // table -> { score, columns: Set(matched) }
+    tables.forEach(table => {
+        const shortName = normalize(table).split('.').pop();
+        let score = 3 * matchScore(terms, nameParts(shortName));
+        if (upperQuestion.includes(shortName) && shortName.length >= 4) score += 10;
+        if (hints.has(normalize(table)) || hints.has(shortName)) score += 8;
+
+        const matchedColumns = new Set();
+        (schema[table] || []).forEach(col => {
+            const colName = typeof col === 'string' ? col : col && col.name;
+            if (!colName) return;
+            if (upperQuestion.includes(normalize(colName)) || matchScore(terms, nameParts(colName)) > 0) matchedColumns.add(colName);
+        });
+        score += Math.min(matchedColumns.size, 5);
+        if (score > 0) scored.set(table, { score, columns: matchedColumns });
+    });
+    if (scored.size === 0) return null;
+
+    // Weak matches (a single column name in common) only count next to much better ones
+    const ranked = Array.from(scored.entries()).sort((a, b) => b[1].score - a[1].score);
+    const cutoff = ranked[0][1].score / 3;
+    const selected = ranked.filter(([, s]) => s.score >= cutoff).slice(0, maxTables).map(([table]) => table);
+
+    // 2. Join partners of the best matches, through shared key columns
+    if (selected.length < maxTables) {
+        const keyIndex = new Map(); // key column -> tables
+        tables.forEach(table => {
+            (schema[table] || []).forEach(col => {
+                const colName = typeof col === 'string' ? col : col && col.name;
+                if (!colName || !KEY_COLUMN.test(colName)) return;
+                if (!keyIndex.has(colName)) keyIndex.set(colName, []);
+                keyIndex.get(colName).push(table);
+            });
+        });
+        const neighbors = new Map();
+        selected.slice(0, 3).forEach(seed => {
+            (schema[seed] || []).forEach(col => {
+                const partners = keyIndex.get(typeof col === 'string' ? col : col && col.name);
+                // Keys present everywhere (audit columns) say nothing about relations
+                if (!partners || partners.length > Math.max(10, tables.length / 4)) return;
+                partners.forEach(t => {
+                    if (!selected.includes(t)) neighbors.set(t, (neighbors.get(t) || 0) + 1);
+                });
+            });
+        });
+        Array.from(neighbors.entries())
+            .sort((a, b) => b[1] - a[1])
+            .slice(0, maxTables - selected.length)
+            .forEach(([table]) => selected.push(table));
+    }
+
+    // 3. Column pruning for wide tables
+    const context = {};
+    selected.forEach(table => {
+        const columns = schema[table] || [];
+        if (columns.length <= maxColumns) {
+            context[table] = columns;
+            return;
+        }
+        const matched = scored.has(table) ? scored.get(table).columns : new Set();
+        const keep = columns.filter(col => {
+            const colName = typeof col === 'string' ? col : col && col.name;
+            return matched.has(colName) || KEY_COLUMN.test(colName || '');
+        });
+        context[table] = keep.slice(0, maxColumns);
+    });
+    return context;
+}
+
+/**
+ * One line per table ("OWNER.TABLE: COL1, COL2"): far fewer tokens than pretty-printed JSON.
+ * With maxChars, whole lines are kept in order until the budget is used up.
+ */
+function formatSchemaContext(context, options = {}) {
+    const lines = Object.keys(context || {})
+        .map(table => `${table}: ${(context[table] || []).map(c => (typeof c === 'string' ? c : c.name)).join(', ')}`);
+    if (!options.maxChars) return lines.join('\n');
+
+    const kept = [];
+    let used = 0;
+    for (const line of lines) {
+        if (kept.length > 0 && used + line.length + 1 > options.maxChars) break;
+        kept.push(line.length > options.maxChars ? line.substring(0, options.maxChars) : line);
+        used += line.length + 1;
+    }
+    return kept.join('\n');
+}
+
+module.exports = {
+    selectSchemaContext,
+    formatSchemaContext
+};
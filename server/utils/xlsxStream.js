@@ -0,0 +1,157 @@
+const archiver = require('archiver');
+const { Transform } = require('stream');
+
+// Minimal streaming XLSX (SpreadsheetML) writer.
+// Rows are serialized as inline strings straight into xl/worksheets/sheet1.xml, which archiver
+// deflates as a streamed zip entry: no shared string table, no in-memory workbook.
+
+const MAX_ROWS = 1048576; // Excel sheet limit, header included
+const MAX_CELL_CHARS = 32767;
+
+const DATE_TYPES = new Set(['DATE', 'TIMESTAMP', 'TIMESTAMP WITH TIME ZONE', 'TIMESTAMP WITH LOCAL TIME ZONE']);
+const NUMBER_TYPES = new Set(['NUMBER', 'BINARY_FLOAT', 'BINARY_DOUBLE', 'BINARY_INTEGER', 'FLOAT']);
+
+// Style indexes in STYLES_XML cellXfs
+const STYLE_HEADER = 1;
+const STYLE_DATE = 2;
+const STYLE_DATETIME = 3;
+
+const CONTENT_TYPES_XML = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"><Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/><Default Extension="xml" ContentType="application/xml"/><Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/><Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/><Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/></Types>`;
+
+const ROOT_RELS_XML = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>`;
+
+const WORKBOOK_RELS_XML = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/><Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/></Relationships>`;
+
+const STYLES_XML = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy"/><numFmt numFmtId="165" formatCode="dd/mm/yyyy hh:mm:ss"/></numFmts><fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts><fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills><borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders><cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs><cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/><xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/><xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs></styleSheet>`;
+
+function workbookXml(sheetName) {
+    return `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets><sheet name="${escapeXml(sheetName)}" sheetId="1" r:id="rId1"/></sheets></workbook>`;
+}
+
+const SHEET_START = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>`;
+const SHEET_END = '</sheetData></worksheet>';
+
+function escapeXml(str) {
+    return str
+        .replace(/[\x00-\x08\x0B\x0C\x0E-\x1F]/g, '') // Not allowed in XML 1.0
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;');
+}
+
+function stringCell(val, style = 0) {
+    let str = String(val);
+    if (str.length > MAX_CELL_CHARS) str = str.substring(0, MAX_CELL_CHARS);
+    return `<c t="inlineStr"${style ? ` s="${style}"` : ''}><is><t xml:space="preserve">${escapeXml(str)}</t></is></c>`;
+}
+
+// Excel serial date from the local wall-clock time (what the grid shows)
+function dateCell(d) {
+    if (isNaN(d.getTime())) return '<c/>';
+    const serial = Date.UTC(d.getFullYear(), d.getMonth(), d.getDate(), d.getHours(), d.getMinutes(), d.getSeconds()) / 86400000 + 25569;
+    const midnight = d.getHours() === 0 && d.getMinutes() === 0 && d.getSeconds() === 0;
+    return `<c s="${midnight ? STYLE_DATE : STYLE_DATETIME}"><v>${serial}</v></c>`;
+}
+
+const cellWriters = {
+    date: (val) => (val === null || val === undefined ? '<c/>' : dateCell(val)),
+    number: (val) => {
+        if (val === null || val === undefined) return '<c/>';
+        return Number.isFinite(Number(val)) ? `<c><v>${val}</v></c>` : stringCell(val);
+    },
+    text: (val) => (val === null || val === undefined ? '<c/>' : stringCell(val)),
+    any: (val) => {
+        if (val === null || val === undefined) return '<c/>';
+        if (val instanceof Date) return dateCell(val);
+        if (typeof val === 'number' && Number.isFinite(val)) return `<c><v>${val}</v></c>`;
+        return stringCell(val);
+    }
+};
+
+/**
+ * Classifies a result column from its metadata: 'date', 'number', 'text' or 'any' (unknown type).
+ */
+function columnKind(meta) {
+    const typeName = meta.dbTypeName || '';
+    if (DATE_TYPES.has(typeName)) return 'date';
+    if (NUMBER_TYPES.has(typeName)) return 'number';
+    return typeName ? 'text' : 'any';
+}
+
+function buildCellWriters(metaData) {
+    return metaData.map(meta => cellWriters[columnKind(meta)]);
+}
+
+/**
+ * Object-mode rows in, sheet1.xml text out. Rows past the Excel limit are dropped and
+ * flagged in `truncated`. Call setMetaData() before the first row.
+ */
+class XlsxSheetTransform extends Transform {
+    constructor() {
+        super({ writableObjectMode: true });
+        this.writers = null;
+        this.buffered = SHEET_START;
+        this.rows = 0;
+        this.truncated = false;
+    }
+
+    setMetaData(metaData) {
+        this.writers = buildCellWriters(metaData);
+        this.buffered += '<row>' + metaData.map(m => stringCell(m.name, STYLE_HEADER)).join('') + '</row>';
+    }
+
+    _transform(row, encoding, callback) {
+        if (this.rows >= MAX_ROWS - 1) {
+            this.truncated = true;
+            return callback();
+        }
+        const writers = this.writers;
+        let xml = '<row>';
+        for (let i = 0; i < row.length; i++) {
+            xml += writers ? writers[i](row[i]) : cellWriters.any(row[i]);
+        }
+        this.buffered += xml + '</row>';
+        this.rows++;
+        if (this.buffered.length >= 64 * 1024) {
+            this.push(this.buffered);
+            this.buffered = '';
+        }
+        callback();
+    }
+
+    _flush(callback) {
+        this.push(this.buffered + SHEET_END);
+        this.buffered = '';
+        callback();
+    }
+}
+
+/**
+ * Zip archive (readable) with the static workbook parts and the streamed sheet.
+ * Pipe it to the destination; it ends once the sheet stream ends.
+ */
+function createXlsxArchive(sheetStream, options = {}) {
+    const archive = archiver('zip', { zlib: { level: 6 } });
+    archive.append(CONTENT_TYPES_XML, { name: '[Content_Types].xml' });
+    archive.append(ROOT_RELS_XML, { name: '_rels/.rels' });
+    archive.append(workbookXml(options.sheetName || 'Resultados'), { name: 'xl/workbook.xml' });
+    archive.append(WORKBOOK_RELS_XML, { name: 'xl/_rels/workbook.xml.rels' });
+    archive.append(STYLES_XML, { name: 'xl/styles.xml' });
+    archive.append(sheetStream, { name: 'xl/worksheets/sheet1.xml' });
+    archive.finalize();
+    return archive;
+}
+
+module.exports = {
+    MAX_ROWS,
+    columnKind,
+    XlsxSheetTransform,
+    createXlsxArchive
+};
@@ -0,0 +1,314 @@
+const fs = require('fs');
+const { isMainThread, parentPort, workerData } = require('worker_threads');
+const csv = require('csv-parser');
+const { detectDateFormat, classifyNumber } = require('../utils/csvTypes');
+
+// CSV analysis stage for /api/upload/csv and /api/analyze-local-csv.
+// Runs off the Express event loop: counts lines at byte level, samples rows across the whole
+// file (head + evenly spaced strata) and derives per-column statistics that drive the
+// suggested Oracle types.
+
+const DEFAULTS = {
+    headRows: 1000,
+    strata: 20,
+    rowsPerStratum: 200,
+    windowBytes: 256 * 1024,
+    fullScanBytes: 8 * 1024 * 1024 // Small files are parsed entirely, no sampling needed
+};
+
+/**
+ * Counts records by scanning raw bytes for '\n' (quoted multi-line fields make this an estimate).
+ */
+async function countLines(filePath) {
+    let lines = 0;
+    let lastByte = null;
+    let bytes = 0;
+    const stream = fs.createReadStream(filePath, { highWaterMark: 1024 * 1024 });
+    for await (const chunk of stream) {
+        let idx = chunk.indexOf(10);
+        while (idx !== -1) {
+            lines++;
+            idx = chunk.indexOf(10, idx + 1);
+        }
+        bytes += chunk.length;
+        lastByte = chunk[chunk.length - 1];
+    }
+    if (bytes > 0 && lastByte !== 10) lines++; // Last line without trailing newline
+    return lines;
+}
+
+/**
+ * Splits one CSV record honoring double-quoted fields ("" escapes a quote).
+ */
+function parseCsvLine(line, delimiter) {
+    const fields = [];
+    let current = '';
+    let inQuotes = false;
+
+    for (let i = 0; i < line.length; i++) {
+        const ch = line[i];
+        if (inQuotes) {
+            if (ch === '"') {
+                if (line[i + 1] === '"') {
+                    current += '"';
+                    i++;
+                } else {
+                    inQuotes = false;
+                }
+            } else {
+                current += ch;
+            }
+        } else if (ch === '"') {
+            inQuotes = true;
+        } else if (ch === delimiter) {
+            fields.push(current);
+            current = '';
+        } else {
+            current += ch;
+        }
+    }
+    fields.push(current);
+    return fields;
+}
+
+// Header + first rows through csv-parser, so keys match what the import stream produces
+function readHead(filePath, delimiter, maxRows) {
+    return new Promise((resolve, reject) => {
+        const rows = [];
+        let headers = [];
+        let done = false;
+        const source = fs.createReadStream(filePath);
+        const finish = () => {
+            if (done) return;
+            done = true;
+            source.destroy();
+            resolve({ headers, rows });
+        };
+
+        source.pipe(csv({ separator: delimiter }))
+            .on('headers', (headerList) => { headers = headerList; })
+            .on('data', (row) => {
+                if (done) return;
+                rows.push(row);
+                if (maxRows && rows.length >= maxRows) finish();
+            })
+            .on('end', finish)
+            .on('error', (err) => {
+                if (!done) {
+                    done = true;
+                    reject(err);
+                }
+            });
+    });
+}
+
+/**
+ * Reads rows from evenly spaced byte windows past the head. Each window skips its first
+ * (probably partial) line and drops records whose field count doesn't match the header.
+ */
+async function sampleStrata(filePath, fileSize, headers, delimiter, options) {
+    const rows = [];
+    const handle = await fs.promises.open(filePath, 'r');
+    try {
+        const buffer = Buffer.alloc(options.windowBytes);
+        for (let i = 1; i <= options.strata; i++) {
+            const offset = Math.floor((fileSize * i) / (options.strata + 1));
+            const { bytesRead } = await handle.read(buffer, 0, options.windowBytes, offset);
+            if (bytesRead === 0) continue;
+
+            const lines = buffer.toString('utf8', 0, bytesRead).split(/\r?\n/);
+            // First line is partial; the last one is partial unless we reached EOF
+            const complete = lines.slice(1, offset + bytesRead >= fileSize ? lines.length : lines.length - 1);
+
+            let taken = 0;
+            for (const line of complete) {
+                if (taken >= options.rowsPerStratum) break;
+                if (line === '') continue;
+                const fields = parseCsvLine(line, delimiter);
+                if (fields.length !== headers.length) continue;
+                const row = {};
+                headers.forEach((h, idx) => { row[h] = fields[idx]; });
+                rows.push(row);
+                taken++;
+            }
+        }
+    } finally {
+        await handle.close();
+    }
+    return rows;
+}
+
+/**
+ * Per-column statistics over the sampled rows.
+ */
+function collectStats(headers, rows) {
+    const stats = headers.map(() => ({
+        samples: 0,
+        nulls: 0,
+        maxLength: 0,
+        numeric: 0,
+        leadingZero: false,
+        maxPrecision: 0,
+        maxScale: 0,
+        dateFormats: {}
+    }));
+
+    for (const row of rows) {
+        headers.forEach((header, idx) => {
+            const s = stats[idx];
+            const raw = row[header];
+            s.samples++;
+            if (raw === undefined || raw === null || String(raw).trim() === '') {
+                s.nulls++;
+                return;
+            }
+            const val = String(raw).trim();
+            const len = Buffer.byteLength(val, 'utf8');
+            if (len > s.maxLength) s.maxLength = len;
+
+            const num = classifyNumber(val);
+            if (num) {
+                s.numeric++;
+                if (num.leadingZero) s.leadingZero = true;
+                if (num.precision > s.maxPrecision) s.maxPrecision = num.precision;
+                if (num.scale > s.maxScale) s.maxScale = num.scale;
+            }
+
+            const mask = detectDateFormat(val);
+            if (mask) s.dateFormats[mask] = (s.dateFormats[mask] || 0) + 1;
+        });
+    }
+
+    return stats.map(s => ({
+        ...s,
+        nullRatio: s.samples > 0 ? +(s.nulls / s.samples).toFixed(4) : 1
+    }));
+}
+
+// Sanitize & truncate header names into unique Oracle identifiers (30 chars)
+function sanitizeColumnNames(headers) {
+    const usedNames = new Set();
+    return headers.map(header => {
+        let cleanName = header
+            .normalize("NFD").replace(/[\u0300-\u036f]/g, "") // Remove accents
+            .replace(/[^a-zA-Z0-9]/g, "_") // Replace special chars with _
+            .toUpperCase();
+
+        // Ensure it starts with a letter (Oracle requirement for unquoted identifiers)
+        if (!/^[A-Z]/.test(cleanName)) {
+            cleanName = 'C_' + cleanName;
+        }
+
+        // Truncate to 28 chars to leave room for deduplication suffix
+        if (cleanName.length > 28) {
+            cleanName = cleanName.substring(0, 28);
+        }
+
+        let finalName = cleanName;
+        let counter = 1;
+        while (usedNames.has(finalName)) {
+            finalName = `${cleanName}_${counter}`;
+            counter++;
+        }
+        usedNames.add(finalName);
+        return finalName;
+    });
+}
+
+// VARCHAR2 size with headroom for values the sample didn't see, in steps of 50 bytes
+function varcharSize(maxLength) {
+    return Math.min(4000, Math.ceil(Math.max(maxLength * 2, 50) / 50) * 50);
+}
+
+/**
+ * Chooses the Oracle type for a column from its statistics.
+ */
+function suggestType(s) {
+    const nonNull = s.samples - s.nulls;
+    if (nonNull === 0) return { type: 'VARCHAR2(255)' };
+
+    if (s.numeric === nonNull && !s.leadingZero) return { type: 'NUMBER' };
+
+    // Every value must share one recognizable layout, otherwise DD/MM vs MM/DD is ambiguous
+    const masks = Object.keys(s.dateFormats);
+    if (masks.length === 1 && s.dateFormats[masks[0]] === nonNull) {
+        return { type: 'DATE', dateFormat: masks[0] };
+    }
+
+    if (s.maxLength > 4000) return { type: 'CLOB' };
+    return { type: `VARCHAR2(${varcharSize(s.maxLength)})` };
+}
+
+async function analyzeCsv({ filePath, delimiter, options = {} }) {
+    const opts = { ...DEFAULTS, ...options };
+    const started = Date.now();
+    const { size } = await fs.promises.stat(filePath);
+    const fullScan = size <= opts.fullScanBytes;
+
+    const head = await readHead(filePath, delimiter, fullScan ? 0 : opts.headRows);
+    const headers = head.headers;
+    if (headers.length === 0) {
+        const err = new Error('Arquivo CSV vazio ou sem linha de cabeçalho.');
+        err.code = 'CSV_INVALID';
+        throw err;
+    }
+
+    let sample = head.rows;
+    let totalRows;
+    if (fullScan) {
+        totalRows = head.rows.length;
+    } else {
+        const [lines, strataRows] = await Promise.all([
+            countLines(filePath),
+            sampleStrata(filePath, size, headers, delimiter, opts)
+        ]);
+        totalRows = Math.max(lines - 1, head.rows.length); // minus header line
+        sample = head.rows.concat(strataRows);
+    }
+
+    const stats = collectStats(headers, sample);
+    const names = sanitizeColumnNames(headers);
+
+    const columns = headers.map((header, idx) => {
+        const suggestion = suggestType(stats[idx]);
+        return {
+            name: names[idx],
+            type: suggestion.type,
+            originalName: header,
+            ...(suggestion.dateFormat ? { dateFormat: suggestion.dateFormat } : {}),
+            stats: {
+                maxLength: stats[idx].maxLength,
+                nullRatio: stats[idx].nullRatio,
+                maxPrecision: stats[idx].maxPrecision,
+                maxScale: stats[idx].maxScale,
+                dateFormats: stats[idx].dateFormats
+            }
+        };
+    });
+
+    return {
+        headers,
+        columns,
+        preview: head.rows.slice(0, 5),
+        totalRows,
+        sampledRows: sample.length,
+        exact: fullScan,
+        fileSize: size,
+        elapsedMs: Date.now() - started
+    };
+}
+
+if (!isMainThread && workerData && workerData.task === 'analyzeCsv') {
+    analyzeCsv(workerData)
+        .then(result => parentPort.postMessage({ ok: true, result }))
+        .catch(err => parentPort.postMessage({ ok: false, error: err.message, code: err.code }));
+}
+
+module.exports = {
+    analyzeCsv,
+    countLines,
+    parseCsvLine,
+    collectStats,
+    suggestType,
+    sanitizeColumnNames
+};
@@ -0,0 +1,275 @@
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const zlib = require('zlib');
+const { Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const { isMainThread, parentPort, workerData, threadId } = require('worker_threads');
+
+// Content-addressed snapshots for dataBackupService, run off the main thread.
+// Store layout (storeDir):
+//   blobs/<2 hex>/<sha256>.gz   file contents (gzip, fast level by default), shared by all snapshots
+//   manifests/<id>.json          { id, version, createdAt, files: [{ path, size, mtimeMs, hash }] }
+// A file whose size and mtime match the previous manifest reuses its hash without being read.
+// Other files are hashed and compressed in a single pass; the blob is kept only if it is new.
+// `throttleBytesPerSec` caps the read rate so background runs don't compete with the app.
+
+let tmpCounter = 0;
+
+function blobPath(storeDir, hash) {
+    return path.join(storeDir, 'blobs', hash.substring(0, 2), `${hash}.gz`);
+}
+
+function manifestPath(storeDir, id) {
+    return path.join(storeDir, 'manifests', `${id}.json`);
+}
+
+function tmpPath(dir) {
+    return path.join(dir, `.${process.pid}.${threadId}.${++tmpCounter}.tmp`);
+}
+
+/**
+ * Relative paths of the regular files under `dir` (temp files of in-progress writes skipped).
+ */
+async function listFiles(dir, base = '') {
+    const files = [];
+    let entries;
+    try {
+        entries = await fs.promises.readdir(path.join(dir, base), { withFileTypes: true });
+    } catch (e) {
+        if (e.code === 'ENOENT') return files;
+        throw e;
+    }
+    for (const entry of entries) {
+        const rel = base ? path.join(base, entry.name) : entry.name;
+        if (entry.isDirectory()) files.push(...await listFiles(dir, rel));
+        else if (entry.isFile() && !entry.name.endsWith('.tmp')) files.push(rel);
+    }
+    return files;
+}
+
+function throttle(bytesPerSec) {
+    const started = Date.now();
+    let bytes = 0;
+    return new Transform({
+        transform(chunk, encoding, callback) {
+            bytes += chunk.length;
+            const ahead = (bytes / bytesPerSec) * 1000 - (Date.now() - started);
+            if (ahead > 5) setTimeout(() => callback(null, chunk), ahead);
+            else callback(null, chunk);
+        }
+    });
+}
+
+function hashTap(hash) {
+    return new Transform({
+        transform(chunk, encoding, callback) {
+            hash.update(chunk);
+            callback(null, chunk);
+        }
+    });
+}
+
+async function writeJsonAtomic(file, value) {
+    const tmp = tmpPath(path.dirname(file));
+    await fs.promises.writeFile(tmp, JSON.stringify(value), 'utf-8');
+    await fs.promises.rename(tmp, file);
+}
+
+async function readManifest(storeDir, id) {
+    return JSON.parse(await fs.promises.readFile(manifestPath(storeDir, id), 'utf-8'));
+}
+
+/**
+ * Hashes and compresses one file; returns { hash, stored } (stored: a new blob was written).
+ */
+async function storeBlob(file, storeDir, level, throttleBytesPerSec) {
+    const blobsDir = path.join(storeDir, 'blobs');
+    const tmp = tmpPath(blobsDir);
+    const hash = crypto.createHash('sha256');
+    const stages = [fs.createReadStream(file, { highWaterMark: 256 * 1024 })];
+    if (throttleBytesPerSec > 0) stages.push(throttle(throttleBytesPerSec));
+    stages.push(hashTap(hash), zlib.createGzip({ level }), fs.createWriteStream(tmp));
+
+    try {
+        await pipeline(...stages);
+    } catch (e) {
+        await fs.promises.unlink(tmp).catch(() => { });
+        throw e;
+    }
+
+    const digest = hash.digest('hex');
+    const target = blobPath(storeDir, digest);
+    if (fs.existsSync(target)) {
+        await fs.promises.unlink(tmp);
+        return { hash: digest, stored: false, storedBytes: 0 };
+    }
+    const { size } = await fs.promises.stat(tmp);
+    await fs.promises.mkdir(path.dirname(target), { recursive: true });
+    await fs.promises.rename(tmp, target);
+    return { hash: digest, stored: true, storedBytes: size };
+}
+
+async function createSnapshot({ sourceDir, storeDir, id, version, previousId, level = 1, throttleBytesPerSec = 0 }) {
+    const started = Date.now();
+    await fs.promises.mkdir(path.join(storeDir, 'blobs'), { recursive: true });
+    await fs.promises.mkdir(path.join(storeDir, 'manifests'), { recursive: true });
+
+    const known = new Map(); // path -> previous manifest entry
+    if (previousId) {
+        try {
+            (await readManifest(storeDir, previousId)).files.forEach(f => known.set(f.path, f));
+        } catch (e) { /* previous manifest pruned or unreadable: hash everything */ }
+    }
+
+    const summary = { files: 0, bytes: 0, reused: 0, newBlobs: 0, storedBytes: 0, skipped: 0 };
+    const files = [];
+    for (const rel of await listFiles(sourceDir)) {
+        const full = path.join(sourceDir, rel);
+        let stat;
+        try {
+            stat = await fs.promises.stat(full);
+        } catch (e) {
+            summary.skipped++; // removed while we were walking
+            continue;
+        }
+        const relPath = rel.split(path.sep).join('/');
+        const prev = known.get(relPath);
+        let hash;
+        if (prev && prev.size === stat.size && prev.mtimeMs === stat.mtimeMs && fs.existsSync(blobPath(storeDir, prev.hash))) {
+            hash = prev.hash;
+            summary.reused++;
+        } else {
+            try {
+                const blob = await storeBlob(full, storeDir, level, throttleBytesPerSec);
+                hash = blob.hash;
+                if (blob.stored) {
+                    summary.newBlobs++;
+                    summary.storedBytes += blob.storedBytes;
+                }
+            } catch (e) {
+                summary.skipped++;
+                continue;
+            }
+        }
+        files.push({ path: relPath, size: stat.size, mtimeMs: stat.mtimeMs, hash });
+        summary.files++;
+        summary.bytes += stat.size;
+    }
+
+    const manifest = { id, version, createdAt: new Date().toISOString(), summary, files };
+    await writeJsonAtomic(manifestPath(storeDir, id), manifest);
+    return { id, version, createdAt: manifest.createdAt, ...summary, elapsedMs: Date.now() - started };
+}
+
+/**
+ * Makes targetDir match snapshot `id`. Every file is first written into a staging directory
+ * next to it (hash checked), so a missing or corrupted blob leaves targetDir untouched; then
+ * the files are renamed into place and files the snapshot doesn't have are deleted.
+ */
+async function restoreSnapshot({ storeDir, id, targetDir, throttleBytesPerSec = 0 }) {
+    const started = Date.now();
+    const manifest = await readManifest(storeDir, id);
+    const root = path.resolve(targetDir);
+    const staging = `${root}.restore-${process.pid}-${threadId}`;
+    const keep = new Set();
+    let bytes = 0;
+
+    await fs.promises.rm(staging, { recursive: true, force: true });
+    try {
+        for (const file of manifest.files) {
+            const parts = file.path.split('/');
+            if (!path.resolve(root, ...parts).startsWith(root + path.sep)) {
+                throw new Error(`Caminho inválido no snapshot: ${file.path}`);
+            }
+            const staged = path.join(staging, ...parts);
+            await fs.promises.mkdir(path.dirname(staged), { recursive: true });
+            const hash = crypto.createHash('sha256');
+            const stages = [fs.createReadStream(blobPath(storeDir, file.hash))];
+            if (throttleBytesPerSec > 0) stages.push(throttle(throttleBytesPerSec));
+            stages.push(zlib.createGunzip(), hashTap(hash), fs.createWriteStream(staged));
+            await pipeline(...stages);
+            if (hash.digest('hex') !== file.hash) throw new Error(`Conteúdo corrompido no snapshot: ${file.path}`);
+            keep.add(path.join(...parts));
+            bytes += file.size;
+        }
+
+        for (const rel of keep) {
+            const target = path.join(root, rel);
+            await fs.promises.mkdir(path.dirname(target), { recursive: true });
+            await fs.promises.rename(path.join(staging, rel), target);
+        }
+    } finally {
+        await fs.promises.rm(staging, { recursive: true, force: true }).catch(() => { });
+    }
+
+    let removed = 0;
+    for (const rel of await listFiles(root)) {
+        if (keep.has(rel)) continue;
+        try {
+            await fs.promises.unlink(path.join(root, rel));
+            removed++;
+        } catch (e) {
+            if (e.code !== 'ENOENT') throw e;
+        }
+    }
+    return { id, files: manifest.files.length, bytes, removed, elapsedMs: Date.now() - started };
+}
+
+/**
+ * Keeps the newest `keep` snapshots (and, with maxAgeDays, only those younger than that; the
+ * newest is never removed), then deletes blobs no remaining manifest references.
+ */
+async function pruneSnapshots({ storeDir, keep = 20, maxAgeDays = 0 }) {
+    const manifestsDir = path.join(storeDir, 'manifests');
+    const ids = (await fs.promises.readdir(manifestsDir).catch(() => []))
+        .filter(name => name.endsWith('.json'))
+        .map(name => name.slice(0, -5))
+        .sort(); // ids are timestamps
+
+    const cutoff = maxAgeDays > 0 ? Date.now() - maxAgeDays * 24 * 60 * 60 * 1000 : null;
+    const kept = [];
+    const removed = [];
+    for (let i = ids.length - 1; i >= 0; i--) {
+        const newest = i === ids.length - 1;
+        let manifest = null;
+        try { manifest = await readManifest(storeDir, ids[i]); } catch (e) { /* unreadable: drop it */ }
+        const tooOld = cutoff && manifest && new Date(manifest.createdAt).getTime() < cutoff;
+        if (manifest && (newest || (kept.length < keep && !tooOld))) kept.push(manifest);
+        else removed.push(ids[i]);
+    }
+    await Promise.all(removed.map(id => fs.promises.unlink(manifestPath(storeDir, id)).catch(() => { })));
+
+    const live = new Set();
+    kept.forEach(m => m.files.forEach(f => live.add(f.hash)));
+    let blobsRemoved = 0;
+    let bytesFreed = 0;
+    const blobsDir = path.join(storeDir, 'blobs');
+    for (const rel of await listFiles(blobsDir)) {
+        const name = path.basename(rel);
+        if (live.has(name.replace(/\.gz$/, ''))) continue;
+        const full = path.join(blobsDir, rel);
+        try {
+            bytesFreed += (await fs.promises.stat(full)).size;
+            await fs.promises.unlink(full);
+            blobsRemoved++;
+        } catch (e) { /* already gone */ }
+    }
+    return { kept: kept.length, removed: removed.length, blobsRemoved, bytesFreed };
+}
+
+const TASKS = { createSnapshot, restoreSnapshot, pruneSnapshots };
+
+if (!isMainThread && workerData && TASKS[workerData.task]) {
+    TASKS[workerData.task](workerData)
+        .then(result => parentPort.postMessage({ ok: true, result }))
+        .catch(err => parentPort.postMessage({ ok: false, error: err.message }));
+}
+
+module.exports = {
+    TASKS,
+    createSnapshot,
+    restoreSnapshot,
+    pruneSnapshots,
+    listFiles
+};